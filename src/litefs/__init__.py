@@ -30,6 +30,7 @@ from .cache import (
     LiteFile,
     MemoryCache,
     RedisCache,
+    TieredCache,
     TreeCache,
     get_global_cache,
 )
@@ -80,6 +81,7 @@ __all__ = [
     "TreeCache",
     "MemoryCache",
     "RedisCache",
+    "TieredCache",
     "CacheBackend",
     "CacheFactory",
     "CacheManager",
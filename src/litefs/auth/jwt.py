@@ -10,7 +10,7 @@ JWT Token 管理
 import base64
 import hashlib
 import hmac
-import json
+from .. import json
 import time
 from typing import Any, Dict, Optional
 
@@ -85,8 +85,8 @@ class JWTManager:
         if expires_in:
             token_payload['exp'] = now + expires_in
         
-        header_encoded = self._base64url_encode(json.dumps(header).encode('utf-8'))
-        payload_encoded = self._base64url_encode(json.dumps(token_payload).encode('utf-8'))
+        header_encoded = self._base64url_encode(json.dumps_bytes(header))
+        payload_encoded = self._base64url_encode(json.dumps_bytes(token_payload))
         
         signature = self._create_signature(header_encoded, payload_encoded)
         
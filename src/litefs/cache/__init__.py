@@ -1,10 +1,13 @@
 from .cache import FileEventHandler, LiteFile, MemoryCache, TreeCache
+from .codec import CacheCodec
 from .factory import CacheBackend, CacheFactory
 from .redis import RedisCache
 from .db import DatabaseCache
 from .memcache import MemcacheCache
 from .manager import CacheManager, get_global_cache
 from .form_cache import FormCache
+from .shm import SharedMemoryCache
+from .tiered import RedisInvalidator, SocketInvalidator, TieredCache
 
 __all__ = [
     "TreeCache",
@@ -19,4 +22,9 @@ __all__ = [
     "CacheManager",
     "get_global_cache",
     "FormCache",
+    "TieredCache",
+    "RedisInvalidator",
+    "SocketInvalidator",
+    "SharedMemoryCache",
+    "CacheCodec",
 ]
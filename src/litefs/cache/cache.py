@@ -2,12 +2,14 @@
 # coding: utf-8
 
 import os
-import sqlite3
+import sys
+import threading
 import time
 from collections import OrderedDict, deque
-from gzip import GzipFile
+from functools import cached_property
 from hashlib import sha1
-from io import BytesIO
+from heapq import heapify, heappop, heappush
+from itertools import count
 from mimetypes import guess_type
 from os import stat
 from posixpath import splitext as path_splitext
@@ -16,7 +18,9 @@ from zlib import compress
 
 from watchdog.events import FileSystemEventHandler
 
+from ..static_compress import accepts_encoding, compress as compress_text, parse_accept_encoding
 from ..utils import gmt_date, log_info
+from ..utils.aio import InlineAsyncMixin
 
 suffixes = (".py", ".pyc", ".pyo", ".so")
 
@@ -118,7 +122,7 @@ class FileEventHandler(FileSystemEventHandler):
         self._app._need_reload = True
         
         # 清除所有缓存
-        self._app.caches.data.clear()
+        self._app.caches.clear()
         
         # 关闭服务器，触发重新加载
         if hasattr(self._app, 'server') and self._app.server:
@@ -152,7 +156,7 @@ class FileEventHandler(FileSystemEventHandler):
             self._reload_app('moved', dest_path)
         else:
             # 只清空缓存
-            self._app.caches.data.clear()
+            self._app.caches.clear()
 
     def on_created(self, event):
         src_path = event.src_path
@@ -168,7 +172,7 @@ class FileEventHandler(FileSystemEventHandler):
             self._reload_app('created', src_path)
         else:
             # 只清空缓存
-            self._app.caches.data.clear()
+            self._app.caches.clear()
 
     def on_modified(self, event):
         src_path = event.src_path
@@ -184,7 +188,7 @@ class FileEventHandler(FileSystemEventHandler):
             self._reload_app('modified', src_path)
         else:
             # 只清空缓存
-            self._app.caches.data.clear()
+            self._app.caches.clear()
 
     def on_deleted(self, event):
         src_path = event.src_path
@@ -200,7 +204,7 @@ class FileEventHandler(FileSystemEventHandler):
             self._reload_app('deleted', src_path)
         else:
             # 只清空缓存
-            self._app.caches.data.clear()
+            self._app.caches.clear()
 
 
 class LiteFile(object):
@@ -209,14 +213,7 @@ class LiteFile(object):
         self.status_code = int(status_code)
         self.path = path
         self.text = text
-        self.etag = etag = sha1(text).hexdigest()
-        self.zlib_text = zlib_text = compress(text, 9)[2:-4]
-        self.zlib_etag = sha1(zlib_text).hexdigest()
-        stream = BytesIO()
-        with GzipFile(fileobj=stream, mode="wb") as f:
-            f.write(text)
-        self.gzip_text = gzip_text = stream.getvalue()
-        self.gzip_etag = sha1(gzip_text).hexdigest()
+        self.etag = sha1(text).hexdigest()
         self.last_modified = gmt_date(stat(path).st_mtime)
         mimetype, coding = guess_type(name)
         headers = [("Content-Type", "text/html;charset=utf-8")]
@@ -225,22 +222,39 @@ class LiteFile(object):
         headers.append(("Last-Modified", self.last_modified))
         self.headers = headers
 
+    # 压缩版本在第一次被请求时生成，不需要压缩的客户端不承担压缩开销
+
+    @cached_property
+    def zlib_text(self):
+        return compress(self.text, 9)[2:-4]
+
+    @cached_property
+    def zlib_etag(self):
+        return sha1(self.zlib_text).hexdigest()
+
+    @cached_property
+    def gzip_text(self):
+        return compress_text(self.text, "gzip")
+
+    @cached_property
+    def gzip_etag(self):
+        return sha1(self.gzip_text).hexdigest()
+
     def handler(self, request):
         environ = request.environ
         if_modified_since = environ.get("HTTP_IF_MODIFIED_SINCE")
         if if_modified_since == self.last_modified:
             return request._response(304)
         if_none_match = environ.get("HTTP_IF_NONE_MATCH")
-        accept_encodings = environ.get("HTTP_ACCEPT_ENCODING", "").split(",")
-        accept_encodings = [s.strip().lower() for s in accept_encodings]
+        accept_encodings = parse_accept_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
         headers = list(self.headers)
-        if "gzip" in accept_encodings:
+        if accepts_encoding(accept_encodings, "gzip"):
             if if_none_match == self.gzip_etag:
                 return request._response(304)
             headers.append(("Etag", self.gzip_etag))
             headers.append(("Content-Encoding", "gzip"))
             text = self.gzip_text
-        elif "deflate" in accept_encodings:
+        elif accepts_encoding(accept_encodings, "deflate"):
             if if_none_match == self.zlib_etag:
                 return request._response(304)
             headers.append(("Etag", self.zlib_etag))
@@ -255,49 +269,79 @@ class LiteFile(object):
         return request._response(self.status_code, headers=headers, content=text)
 
 
-class TreeCache(object):
+class _TrieNode(object):
+    """前缀树节点，每一层对应键中以 / 分隔的一段"""
+
+    __slots__ = ("children", "key")
+
+    def __init__(self):
+        self.children = {}
+        self.key = _EMPTY
+
+
+# 节点上没有缓存项的标记
+_EMPTY = object()
+
+
+def _segments(key):
+    if isinstance(key, str):
+        return key.split("/")
+    return (key,)
+
+
+class TreeCache(InlineAsyncMixin):
+    """
+    支持按路径前缀删除的过期缓存
+
+    键按 / 分段存入前缀树，delete 删除键本身及其下的全部键（key/...）；
+    过期时间存入最小堆，清理时只弹出已过期的项，不扫描全部缓存
+    """
 
     def __init__(self, clean_period=60, expiration_time=3600):
+        # 键 -> (值, 过期时间)
         self.data = {}
         self.clean_time = time.time()
         self.clean_period = clean_period
         self.expiration_time = expiration_time
-        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
-        self.conn.text_factory = str
-        self.conn.executescript("""
-            CREATE TABLE IF NOT EXISTS cache (
-                key VARCHAR PRIMARY KEY,
-                timestamp INTEGER
-            );
-            CREATE INDEX idx_cache ON cache (key);
-        """)
+        self._root = _TrieNode()
+        # (过期时间, 序号, 键)，键更新或删除后旧的项留在堆中，弹出时跳过
+        self._expiry = []
+        self._counter = count()
+        self._lock = threading.Lock()
 
     def __len__(self):
         return len(self.data)
 
-    def put(self, key, val):
+    def put(self, key, val, expiration=None):
+        """
+        写入缓存
+
+        Args:
+            key: 键
+            val: 值
+            expiration: 过期时间（秒），None 使用 expiration_time
+        """
         current_time = time.time()
         
         # 检查是否需要清理
         if current_time - self.clean_time >= self.clean_period:
             self.auto_clean()
         
-        timestamp = int(current_time)
-        if key not in self.data:
-            self.conn.execute(
-                """
-                INSERT INTO cache (key, timestamp) VALUES (?, ?);
-            """,
-                (key, timestamp),
-            )
-        else:
-            self.conn.execute(
-                """
-                UPDATE cache SET timestamp=? WHERE key=?;
-            """,
-                (timestamp, key),
-            )
-        self.data[key] = [val, timestamp]
+        expires = current_time + (self.expiration_time if expiration is None else expiration)
+        with self._lock:
+            if key not in self.data:
+                node = self._root
+                for segment in _segments(key):
+                    child = node.children.get(segment)
+                    if child is None:
+                        child = node.children[segment] = _TrieNode()
+                    node = child
+                node.key = key
+            self.data[key] = (val, expires)
+            heappush(self._expiry, (expires, next(self._counter), key))
+            # 频繁更新同一批键时堆中的旧项会越积越多，超过一定比例时重建
+            if len(self._expiry) > 2 * len(self.data) + 64:
+                self._rebuild_expiry()
 
     def get(self, key):
         current_time = time.time()
@@ -309,41 +353,47 @@ class TreeCache(object):
         ret = self.data.get(key)
         if ret is None:
             return None
-        val, timestamp = ret
-        if int(current_time - timestamp) > self.expiration_time:
-            del self.data[key]
+        val, expires = ret
+        if current_time > expires:
+            with self._lock:
+                if self.data.get(key) is ret:
+                    self._remove(key)
             return None
         return val
 
     def delete(self, key):
+        """删除键以及以 key/ 开头的全部键"""
         current_time = time.time()
         
         # 检查是否需要清理
         if current_time - self.clean_time >= self.clean_period:
             self.auto_clean()
         
-        curr = self.conn.execute(
-            """\
-            SELECT key FROM cache WHERE key=? OR key LIKE ?;
-        """,
-            (key, key + "/%"),
-        )
-        keys = curr.fetchall()
-        self.conn.executemany(
-            """\
-            DELETE FROM cache WHERE key=?;
-        """,
-            keys,
-        )
-        for item in keys:
-            item_key = item[0]
-            if item_key in self.data:
-                del self.data[item_key]
+        with self._lock:
+            path = self._find(key)
+            if path is None:
+                return
+            node = path[-1][1]
+            stack = [node]
+            while stack:
+                item = stack.pop()
+                if item.key is not _EMPTY:
+                    self.data.pop(item.key, None)
+                stack.extend(item.children.values())
+            node.children.clear()
+            node.key = _EMPTY
+            self._prune(path)
+
+    def clear(self):
+        with self._lock:
+            self.data.clear()
+            self._root = _TrieNode()
+            self._expiry = []
 
     def auto_clean(self):
-        """优化的清理机制
-        
-        避免每次清理都查询数据库，只在清理周期到达时执行清理
+        """清理过期数据
+
+        只在清理周期到达时执行，从过期时间堆中弹出已过期的项
         """
         current_time = time.time()
         
@@ -351,51 +401,242 @@ class TreeCache(object):
         if current_time - self.clean_time < self.clean_period:
             return
         
-        # 使用批量删除，避免先查询再删除
-        self.conn.execute(
-            "DELETE FROM cache WHERE timestamp < ?;",
-            (int(current_time - self.expiration_time),)
-        )
-        
-        # 清理内存缓存，使用列表推导式提高效率
-        expired_keys = [
-            k for k, v in self.data.items()
-            if current_time - v[1] > self.expiration_time
-        ]
-        for key in expired_keys:
-            del self.data[key]
+        with self._lock:
+            expiry = self._expiry
+            data = self.data
+            while expiry and expiry[0][0] < current_time:
+                expires, _, key = heappop(expiry)
+                ret = data.get(key)
+                if ret is not None and ret[1] == expires:
+                    self._remove(key)
         
         # 更新清理时间
         self.clean_time = current_time
 
-
-class MemoryCache(object):
-
-    def __init__(self, max_size=10000):
+    def _find(self, key):
+        """返回从根到键所在节点的 (段, 节点) 列表，键不在树中时返回 None"""
+        node = self._root
+        path = [(None, node)]
+        for segment in _segments(key):
+            node = node.children.get(segment)
+            if node is None:
+                return None
+            path.append((segment, node))
+        return path
+
+    def _prune(self, path):
+        """自下而上删除没有缓存项也没有子节点的节点"""
+        for i in range(len(path) - 1, 0, -1):
+            segment, node = path[i]
+            if node.children or node.key is not _EMPTY:
+                break
+            del path[i - 1][1].children[segment]
+
+    def _remove(self, key):
+        self.data.pop(key, None)
+        path = self._find(key)
+        if path is not None:
+            path[-1][1].key = _EMPTY
+            self._prune(path)
+
+    def _rebuild_expiry(self):
+        counter = self._counter
+        self._expiry = [
+            (expires, next(counter), key)
+            for key, (_, expires) in self.data.items()
+        ]
+        heapify(self._expiry)
+
+
+class _CacheShard(object):
+    """MemoryCache 的一个分段，有独立的锁、LRU 顺序、过期时间堆和统计"""
+
+    __slots__ = (
+        "lock", "data", "expiry", "max_size", "max_bytes", "bytes",
+        "hits", "misses", "evictions", "expirations",
+    )
+
+    def __init__(self, max_size, max_bytes):
+        self.lock = threading.Lock()
+        # 键 -> (值, 过期时间, 大小)，过期时间为 None 表示不过期
+        self.data = OrderedDict()
+        # (过期时间, 序号, 键)，只包含设置了过期时间的项
+        self.expiry = []
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class MemoryCache(InlineAsyncMixin):
+    """
+    进程内 LRU 缓存
+
+    按条目数和值的总字节数限制容量，支持按键设置过期时间，并统计命中、
+    未命中、淘汰和过期次数。键按哈希分配到多个分段，每个分段有独立的锁，
+    多线程访问不同分段时互不等待；容量平均分配给各分段，淘汰在分段内按 LRU 进行
+    """
+
+    def __init__(self, max_size=10000, max_bytes=None, expiration_time=None, sizer=None, stripes=None):
+        """
+        Args:
+            max_size: 最大条目数
+            max_bytes: 值的最大总字节数，None 表示不限制（此时不计算值的大小）
+            expiration_time: 默认过期时间（秒），None 或不大于 0 表示不过期
+            sizer: 计算值大小的函数，默认为 sys.getsizeof
+            stripes: 分段数，默认每 1000 个条目一个分段，最多 16 个；
+                条目数较少时只有一个分段，淘汰顺序是严格的 LRU
+        """
         self._max_size = int(max_size)
-        self._cache = OrderedDict()
+        self._max_bytes = None if max_bytes is None else int(max_bytes)
+        self._expiration_time = expiration_time
+        self._sizer = sizer or sys.getsizeof
+        if stripes is None:
+            stripes = self._max_size // 1000
+        stripes = max(1, min(int(stripes), 16, self._max_size))
+        self._shards = tuple(
+            _CacheShard(
+                self._max_size // stripes + (i < self._max_size % stripes),
+                None if self._max_bytes is None else self._max_bytes // stripes,
+            )
+            for i in range(stripes)
+        )
+        self._counter = count()
 
     def __str__(self):
-        return str(self._cache)
+        items = OrderedDict()
+        for shard in self._shards:
+            with shard.lock:
+                items.update((key, entry[0]) for key, entry in shard.data.items())
+        return str(items)
 
     def __len__(self):
-        return len(self._cache)
+        return sum(len(shard.data) for shard in self._shards)
+
+    def _shard(self, key):
+        shards = self._shards
+        if len(shards) == 1:
+            return shards[0]
+        return shards[hash(key) % len(shards)]
 
-    def put(self, key, val):
-        if key in self._cache:
-            del self._cache[key]
-        elif len(self._cache) >= self._max_size:
-            self._cache.popitem(last=False)
-        self._cache[key] = val
+    def put(self, key, val, expiration=None):
+        """
+        存储值
+
+        Args:
+            key: 缓存键
+            val: 缓存值
+            expiration: 过期时间（秒），None 使用默认过期时间，不大于 0 表示不过期
+        """
+        if expiration is None:
+            expiration = self._expiration_time
+        now = time.monotonic()
+        expires = now + expiration if expiration and expiration > 0 else None
+        size = 0 if self._max_bytes is None else self._sizer(val)
+
+        shard = self._shard(key)
+        with shard.lock:
+            data = shard.data
+            old = data.pop(key, None)
+            if old is not None:
+                shard.bytes -= old[2]
+            # 单个值超过分段容量时不缓存
+            if shard.max_bytes is not None and size > shard.max_bytes:
+                return
+
+            self._expire(shard, now)
+            while data and (
+                len(data) >= shard.max_size
+                or (shard.max_bytes is not None and shard.bytes + size > shard.max_bytes)
+            ):
+                _, evicted = data.popitem(last=False)
+                shard.bytes -= evicted[2]
+                shard.evictions += 1
+
+            data[key] = (val, expires, size)
+            shard.bytes += size
+            if expires is not None:
+                heappush(shard.expiry, (expires, next(self._counter), key))
+                # 频繁更新同一批键时堆中的旧项会越积越多，超过一定比例时重建
+                if len(shard.expiry) > 2 * len(data) + 64:
+                    self._rebuild_expiry(shard)
 
     def get(self, key):
-        val = self._cache.get(key)
-        if val is None:
-            return None
-        self._cache.move_to_end(key)
-        return val
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.data.get(key)
+            if entry is None:
+                shard.misses += 1
+                return None
+            expires = entry[1]
+            if expires is not None and expires <= time.monotonic():
+                del shard.data[key]
+                shard.bytes -= entry[2]
+                shard.expirations += 1
+                shard.misses += 1
+                return None
+            shard.data.move_to_end(key)
+            shard.hits += 1
+            return entry[0]
 
     def delete(self, key):
-        if key not in self._cache:
-            return
-        del self._cache[key]
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.data.pop(key, None)
+            if entry is not None:
+                shard.bytes -= entry[2]
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.data.clear()
+                shard.expiry = []
+                shard.bytes = 0
+
+    def get_stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典：size、max_size、bytes、max_bytes、hits、misses、
+            hit_rate、evictions、expirations、stripes
+        """
+        stats = dict.fromkeys(("size", "bytes", "hits", "misses", "evictions", "expirations"), 0)
+        for shard in self._shards:
+            with shard.lock:
+                stats["size"] += len(shard.data)
+                stats["bytes"] += shard.bytes
+                stats["hits"] += shard.hits
+                stats["misses"] += shard.misses
+                stats["evictions"] += shard.evictions
+                stats["expirations"] += shard.expirations
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_size"] = self._max_size
+        stats["max_bytes"] = self._max_bytes
+        stats["stripes"] = len(self._shards)
+        return stats
+
+    def _expire(self, shard, now):
+        """删除分段中已过期的项，调用方持有分段的锁"""
+        expiry = shard.expiry
+        data = shard.data
+        while expiry and expiry[0][0] <= now:
+            expires, _, key = heappop(expiry)
+            entry = data.get(key)
+            if entry is not None and entry[1] == expires:
+                del data[key]
+                shard.bytes -= entry[2]
+                shard.expirations += 1
+
+    def _rebuild_expiry(self, shard):
+        counter = self._counter
+        shard.expiry = [
+            (entry[1], next(counter), key)
+            for key, entry in shard.data.items()
+            if entry[1] is not None
+        ]
+        heapify(shard.expiry)
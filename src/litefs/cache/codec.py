@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+缓存值的序列化和压缩
+
+RedisCache 和 MemcacheCache 写入的值以一个格式字节开头：0x10 | 序列化方式 << 2 | 压缩方式。
+读取时按格式字节解码，与当前配置无关，更换序列化方式或压缩算法后已有的缓存仍然可以读取。
+JSON 不压缩时不写格式字节，与旧版本写入的数据和其他按 JSON 读取的客户端兼容；
+JSON 文本不会以 0x10-0x1F 开头，不带格式字节的值都按 JSON 读取
+"""
+
+import importlib
+import pickle
+import zlib
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from .. import json
+
+# 序列化方式和压缩算法在格式字节中的编号即在元组中的位置
+SERIALIZERS = ("json", "pickle", "msgpack")
+COMPRESSIONS = (None, "zlib", "lz4", "zstd")
+
+_HEADER = 0x10
+_PICKLE_PROTOCOL = 4
+
+
+def _import(module: str, package: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise ImportError(f"{package} 包未安装，请使用 pip install {package} 安装")
+
+
+def _serializer(name: str) -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    """返回 (序列化函数, 反序列化函数)"""
+    if name == "json":
+        return json.dumps_bytes, json.loads
+    if name == "pickle":
+        return (lambda value: pickle.dumps(value, _PICKLE_PROTOCOL)), pickle.loads
+    msgpack = _import("msgpack", "msgpack")
+    return (
+        lambda value: msgpack.packb(value, use_bin_type=True, default=json.default),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+
+def _compressor(name: str, level: Optional[int]) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """返回 (压缩函数, 解压函数)"""
+    if name == "zlib":
+        return (lambda data: zlib.compress(data, -1 if level is None else level)), zlib.decompress
+    if name == "lz4":
+        frame = _import("lz4.frame", "lz4")
+        return (lambda data: frame.compress(data, compression_level=level or 0)), frame.decompress
+    zstandard = _import("zstandard", "zstandard")
+    # 压缩和解压对象不能被多个线程同时使用，每次调用时创建
+    return (
+        lambda data: zstandard.ZstdCompressor(level=3 if level is None else level).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+
+class CacheCodec:
+    """
+    缓存值的编解码器
+
+    pickle 可以保存任意 Python 对象（datetime、bytes、模型实例等），但读取 pickle 数据
+    会执行其中的代码，只应从可信的缓存读取；不在 accept 中的格式按未命中处理。
+    压缩只作用于序列化后不小于 compress_threshold 的值，压缩后没有变小时保存原值
+    """
+
+    def __init__(
+        self,
+        serializer: str = "json",
+        compression: Optional[str] = None,
+        compress_threshold: int = 1024,
+        compress_level: Optional[int] = None,
+        accept: Optional[Iterable[str]] = None
+    ):
+        """
+        初始化编解码器
+
+        Args:
+            serializer: 序列化方式，json、pickle 或 msgpack（需要安装 msgpack）
+            compression: 压缩算法，None、zlib、lz4（需要安装 lz4）或 zstd（需要安装 zstandard）
+            compress_threshold: 序列化后达到该字节数才压缩
+            compress_level: 压缩级别，None 使用各算法的默认级别
+            accept: 读取时接受的序列化方式，默认为 serializer 和 json
+        """
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"不支持的序列化方式: {serializer}，支持: {', '.join(SERIALIZERS)}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩算法: {compression}，支持: {', '.join(map(str, COMPRESSIONS))}")
+        accept = (serializer, "json") if accept is None else tuple(accept)
+        for name in accept:
+            if name not in SERIALIZERS:
+                raise ValueError(f"不支持的序列化方式: {name}")
+
+        self.serializer = serializer
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        self.accept = accept
+
+        self._dumps = _serializer(serializer)[0]
+        self._loaders = {SERIALIZERS.index(name): _serializer(name)[1] for name in accept}
+        self._serializer_id = SERIALIZERS.index(serializer)
+        self._compression_id = COMPRESSIONS.index(compression)
+        self._compress = _compressor(compression, compress_level)[0] if compression else None
+        self._decompressors = {}
+
+    def __repr__(self):
+        return f"CacheCodec(serializer={self.serializer!r}, compression={self.compression!r})"
+
+    @property
+    def binary(self) -> bool:
+        """编码结果是否可能不是 UTF-8 文本，此时 Redis 客户端不能使用 decode_responses"""
+        return self.serializer != "json" or self.compression is not None
+
+    def dumps(self, value: Any) -> bytes:
+        """
+        编码缓存值
+
+        Raises:
+            ValueError: 值无法序列化
+        """
+        try:
+            data = self._dumps(value)
+        except Exception as e:
+            raise ValueError(f"无法序列化值: {e}")
+
+        compression = 0
+        if self._compress is not None and len(data) >= self.compress_threshold:
+            compressed = self._compress(data)
+            if len(compressed) < len(data):
+                data, compression = compressed, self._compression_id
+
+        if self._serializer_id == 0 and compression == 0:
+            return data
+        return bytes((_HEADER | self._serializer_id << 2 | compression,)) + data
+
+    def loads(self, data) -> Any:
+        """
+        解码缓存值
+
+        Args:
+            data: bytes，或 decode_responses 的 Redis 客户端返回的 str
+
+        Returns:
+            缓存值；不带格式字节且不是合法 JSON 的值原样返回
+
+        Raises:
+            ValueError: 带格式字节的值无法解码，或其序列化方式不在 accept 中
+        """
+        header = (ord(data[0]) if isinstance(data, str) else data[0]) if data else 0
+        if not _HEADER <= header < _HEADER + 16:
+            try:
+                return json.loads(data)
+            except Exception:
+                # 不是本模块写入的值
+                return data
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        serializer, compression = header >> 2 & 3, header & 3
+        loads = self._loaders.get(serializer)
+        if loads is None:
+            name = SERIALIZERS[serializer] if serializer < len(SERIALIZERS) else serializer
+            raise ValueError(f"不接受的缓存格式: {name}")
+        try:
+            payload = data[1:]
+            if compression:
+                payload = self._decompressor(compression)(payload)
+            return loads(payload)
+        except ImportError:
+            raise
+        except Exception as e:
+            raise ValueError(f"无法解码缓存值: {e}")
+
+    def _decompressor(self, compression: int) -> Callable[[bytes], bytes]:
+        decompress = self._decompressors.get(compression)
+        if decompress is None:
+            decompress = self._decompressors[compression] = _compressor(COMPRESSIONS[compression], None)[1]
+        return decompress
+
+
+def make_codec(codec=None) -> CacheCodec:
+    """
+    按参数创建编解码器
+
+    Args:
+        codec: CacheCodec 实例、序列化方式名或 None（json）
+    """
+    if isinstance(codec, CacheCodec):
+        return codec
+    return CacheCodec(codec or "json")
+
+
+__all__ = [
+    "COMPRESSIONS",
+    "SERIALIZERS",
+    "CacheCodec",
+    "make_codec",
+]
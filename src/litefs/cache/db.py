@@ -7,16 +7,24 @@
 提供基于关系数据库的缓存实现
 """
 
-import sqlite3
+import pickle
 import time
 from typing import Any, Optional
 
+from ..utils.sqlite import DELETED, SQLiteAsyncMixin, SQLiteStore
 
-class DatabaseCache:
+# 批量查询时每条语句的最大参数数量
+_MAX_VARIABLES = 500
+
+
+class DatabaseCache(SQLiteAsyncMixin):
     """
     数据库缓存实现
     
-    使用 SQLite 数据库作为缓存后端，提供持久化的缓存支持
+    使用 SQLite 数据库作为缓存后端，提供持久化的缓存支持。
+
+    写入和删除默认由后台线程合并后在一个事务中提交（见 SQLiteStore），
+    当前进程总能读到自己的写入；过期数据每 cleanup_interval 秒在批量写入时清理一次
     """
 
     def __init__(
@@ -24,6 +32,10 @@ class DatabaseCache:
         db_path: str = ":memory:",
         table_name: str = "cache",
         expiration_time: int = 3600,
+        write_behind: bool = True,
+        flush_interval: float = 0.05,
+        batch_size: int = 256,
+        cleanup_interval: int = 60,
         **kwargs
     ):
         """
@@ -32,23 +44,32 @@ class DatabaseCache:
         Args:
             db_path: 数据库文件路径，默认为内存数据库
             table_name: 缓存表名
-            expiration_time: 默认过期时间（秒）
+            expiration_time: 默认过期时间（秒），0 表示永不过期
+            write_behind: 是否在后台批量写入，False 时每次写入立即提交
+            flush_interval: 批量写入最多等待的时间（秒）
+            batch_size: 等待写入的键达到该数量时立即写入
+            cleanup_interval: 清理过期数据的间隔（秒）
             **kwargs: 其他数据库连接参数
         """
         self._db_path = db_path
         self._table_name = table_name
         self._expiration_time = expiration_time
-        self._conn = None
-        self._cursor = None
+        self._cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+        self._store = SQLiteStore(
+            db_path,
+            f"INSERT OR REPLACE INTO {table_name} (key, value, timestamp, expiration) VALUES (?, ?, ?, ?)",
+            f"DELETE FROM {table_name} WHERE key = ?",
+            write_behind=write_behind,
+            flush_interval=flush_interval,
+            batch_size=batch_size,
+        )
         
         self._initialize_database()
 
     def _initialize_database(self):
         """初始化数据库和表结构"""
-        self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
-        self._cursor = self._conn.cursor()
-        
-        self._cursor.execute(f"""
+        self._store.execute(f"""
             CREATE TABLE IF NOT EXISTS {self._table_name} (
                 key TEXT PRIMARY KEY,
                 value BLOB,
@@ -57,24 +78,31 @@ class DatabaseCache:
             )
         """)
         
-        self._cursor.execute(f"""
+        self._store.execute(f"""
             CREATE INDEX IF NOT EXISTS idx_expiration 
             ON {self._table_name}(expiration)
         """)
-        
-        self._conn.commit()
 
     def _cleanup_expired(self):
-        """清理过期的缓存条目"""
-        if self._cursor is None:
+        """在下一次批量写入时清理过期的缓存条目，每 cleanup_interval 秒最多一次"""
+        now = time.time()
+        if now < self._next_cleanup:
             return
-            
-        current_time = int(time.time())
-        self._cursor.execute(
-            f"DELETE FROM {self._table_name} WHERE expiration < ?",
-            (current_time,)
+        self._next_cleanup = now + self._cleanup_interval
+        self._store.schedule(
+            f"DELETE FROM {self._table_name} WHERE expiration > 0 AND expiration < ?",
+            (int(now),)
         )
-        self._conn.commit()
+
+    def _row(self, key: str, val: Any, expiration: Optional[int]) -> tuple:
+        current_time = int(time.time())
+        expiration_time = expiration if expiration is not None else self._expiration_time
+        expire_timestamp = current_time + expiration_time if expiration_time > 0 else 0
+        return (key, pickle.dumps(val), current_time, expire_timestamp)
+
+    @staticmethod
+    def _alive(expiration: int, now: int) -> bool:
+        return expiration == 0 or expiration > now
 
     def put(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
         """
@@ -83,28 +111,13 @@ class DatabaseCache:
         Args:
             key: 缓存键
             val: 缓存值
-            expiration: 过期时间（秒），如果为 None 则使用默认过期时间
+            expiration: 过期时间（秒），如果为 None 则使用默认过期时间，0 表示永不过期
         """
-        import pickle
-        
-        if self._cursor is None:
+        if self._store is None:
             return
             
-        current_time = int(time.time())
-        expiration_time = expiration if expiration is not None else self._expiration_time
-        expire_timestamp = current_time + expiration_time if expiration_time > 0 else 0
-        
-        serialized_value = pickle.dumps(val)
-        
-        self._cursor.execute(
-            f"""
-            INSERT OR REPLACE INTO {self._table_name} 
-            (key, value, timestamp, expiration) 
-            VALUES (?, ?, ?, ?)
-            """,
-            (key, serialized_value, current_time, expire_timestamp)
-        )
-        self._conn.commit()
+        self._store.put(key, self._row(key, val, expiration))
+        self._cleanup_expired()
 
     def get(self, key: str) -> Optional[Any]:
         """
@@ -116,21 +129,22 @@ class DatabaseCache:
         Returns:
             缓存值，如果不存在或已过期则返回 None
         """
-        import pickle
-        
-        if self._cursor is None:
+        if self._store is None:
             return None
             
-        self._cleanup_expired()
-        
-        self._cursor.execute(
-            f"SELECT value FROM {self._table_name} WHERE key = ? AND expiration > ?",
-            (key, int(time.time()))
+        now = int(time.time())
+        pending = self._store.pending(key)
+        if pending is not None:
+            if pending is DELETED or not self._alive(pending[3], now):
+                return None
+            return pickle.loads(pending[1])
+        
+        rows = self._store.query(
+            f"SELECT value FROM {self._table_name} WHERE key = ? AND (expiration = 0 OR expiration > ?)",
+            (key, now)
         )
-        result = self._cursor.fetchone()
-        
-        if result:
-            return pickle.loads(result[0])
+        if rows:
+            return pickle.loads(rows[0][0])
         return None
 
     def delete(self, key: str) -> None:
@@ -140,14 +154,10 @@ class DatabaseCache:
         Args:
             key: 缓存键
         """
-        if self._cursor is None:
+        if self._store is None:
             return
             
-        self._cursor.execute(
-            f"DELETE FROM {self._table_name} WHERE key = ?",
-            (key,)
-        )
-        self._conn.commit()
+        self._store.delete(key)
 
     def delete_pattern(self, pattern: str) -> int:
         """
@@ -159,15 +169,13 @@ class DatabaseCache:
         Returns:
             删除的键数量
         """
-        if self._cursor is None:
+        if self._store is None:
             return 0
             
-        self._cursor.execute(
+        return self._store.execute(
             f"DELETE FROM {self._table_name} WHERE key LIKE ?",
             (pattern,)
         )
-        self._conn.commit()
-        return self._cursor.rowcount
 
     def exists(self, key: str) -> bool:
         """
@@ -179,16 +187,18 @@ class DatabaseCache:
         Returns:
             键是否存在且未过期
         """
-        if self._cursor is None:
+        if self._store is None:
             return False
             
-        self._cleanup_expired()
-        
-        self._cursor.execute(
-            f"SELECT 1 FROM {self._table_name} WHERE key = ? AND expiration > ?",
-            (key, int(time.time()))
-        )
-        return self._cursor.fetchone() is not None
+        now = int(time.time())
+        pending = self._store.pending(key)
+        if pending is not None:
+            return pending is not DELETED and self._alive(pending[3], now)
+        
+        return bool(self._store.query(
+            f"SELECT 1 FROM {self._table_name} WHERE key = ? AND (expiration = 0 OR expiration > ?)",
+            (key, now)
+        ))
 
     def expire(self, key: str, expiration: int) -> bool:
         """
@@ -201,18 +211,16 @@ class DatabaseCache:
         Returns:
             是否设置成功
         """
-        if self._cursor is None:
+        if self._store is None:
             return False
             
         current_time = int(time.time())
         expire_timestamp = current_time + expiration
         
-        self._cursor.execute(
+        return self._store.execute(
             f"UPDATE {self._table_name} SET expiration = ? WHERE key = ?",
             (expire_timestamp, key)
-        )
-        self._conn.commit()
-        return self._cursor.rowcount > 0
+        ) > 0
 
     def ttl(self, key: str) -> int:
         """
@@ -222,52 +230,54 @@ class DatabaseCache:
             key: 缓存键
         
         Returns:
-            剩余过期时间（秒），如果键不存在或已过期则返回 -2
+            剩余过期时间（秒），永不过期返回 -1，如果键不存在或已过期则返回 -2
         """
-        if self._cursor is None:
+        if self._store is None:
             return -2
             
-        self._cleanup_expired()
-        
-        self._cursor.execute(
-            f"SELECT expiration FROM {self._table_name} WHERE key = ?",
-            (key,)
-        )
-        result = self._cursor.fetchone()
+        now = int(time.time())
+        pending = self._store.pending(key)
+        if pending is not None:
+            expiration = None if pending is DELETED else pending[3]
+        else:
+            rows = self._store.query(
+                f"SELECT expiration FROM {self._table_name} WHERE key = ?",
+                (key,)
+            )
+            expiration = rows[0][0] if rows else None
         
-        if result:
-            expiration = result[0]
-            if expiration == 0:
-                return -1  # 永不过期
-            return max(0, expiration - int(time.time()))
-        return -2  # 键不存在
+        if expiration is None or not self._alive(expiration, now):
+            return -2  # 键不存在
+        if expiration == 0:
+            return -1  # 永不过期
+        return expiration - now
 
     def clear(self) -> None:
         """
         清空所有缓存
         """
-        if self._cursor is None:
+        if self._store is None:
             return
             
-        self._cursor.execute(f"DELETE FROM {self._table_name}")
-        self._conn.commit()
+        self._store.discard()
+        self._store.execute(f"DELETE FROM {self._table_name}")
 
     def __len__(self) -> int:
         """
         获取缓存中的键数量
         
         Returns:
-            键数量
+            未过期的键数量
         """
-        if self._cursor is None:
+        if self._store is None:
             return 0
             
-        self._cleanup_expired()
-        
-        self._cursor.execute(
-            f"SELECT COUNT(*) FROM {self._table_name}"
+        self._store.flush()
+        rows = self._store.query(
+            f"SELECT COUNT(*) FROM {self._table_name} WHERE expiration = 0 OR expiration > ?",
+            (int(time.time()),)
         )
-        return self._cursor.fetchone()[0]
+        return rows[0][0]
 
     def get_many(self, keys: list) -> dict:
         """
@@ -279,23 +289,29 @@ class DatabaseCache:
         Returns:
             键值字典
         """
-        import pickle
-        
-        if self._cursor is None or not keys:
+        if self._store is None or not keys:
             return {}
         
-        self._cleanup_expired()
-        
-        placeholders = ','.join(['?' for _ in keys])
-        self._cursor.execute(
-            f"SELECT key, value FROM {self._table_name} WHERE key IN ({placeholders}) AND expiration > ?",
-            keys + [int(time.time())]
-        )
-        results = self._cursor.fetchall()
-        
+        now = int(time.time())
         result = {}
-        for key, value in results:
-            result[key] = pickle.loads(value)
+        missing = []
+        for key in keys:
+            pending = self._store.pending(key)
+            if pending is None:
+                missing.append(key)
+            elif pending is not DELETED and self._alive(pending[3], now):
+                result[key] = pickle.loads(pending[1])
+        
+        for i in range(0, len(missing), _MAX_VARIABLES):
+            chunk = missing[i:i + _MAX_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._store.query(
+                f"SELECT key, value FROM {self._table_name} "
+                f"WHERE key IN ({placeholders}) AND (expiration = 0 OR expiration > ?)",
+                chunk + [now]
+            )
+            for key, value in rows:
+                result[key] = pickle.loads(value)
         
         return result
 
@@ -307,29 +323,13 @@ class DatabaseCache:
             mapping: 键值字典
             expiration: 过期时间（秒），如果为 None 则使用默认过期时间
         """
-        import pickle
-        
-        if self._cursor is None or not mapping:
+        if self._store is None or not mapping:
             return
         
-        current_time = int(time.time())
-        expiration_time = expiration if expiration is not None else self._expiration_time
-        expire_timestamp = current_time + expiration_time if expiration_time > 0 else 0
-        
-        data = []
-        for key, value in mapping.items():
-            serialized_value = pickle.dumps(value)
-            data.append((key, serialized_value, current_time, expire_timestamp))
-        
-        self._cursor.executemany(
-            f"""
-            INSERT OR REPLACE INTO {self._table_name} 
-            (key, value, timestamp, expiration) 
-            VALUES (?, ?, ?, ?)
-            """,
-            data
+        self._store.put_many(
+            (key, self._row(key, value, expiration)) for key, value in mapping.items()
         )
-        self._conn.commit()
+        self._cleanup_expired()
 
     def delete_many(self, keys: list) -> None:
         """
@@ -338,27 +338,23 @@ class DatabaseCache:
         Args:
             keys: 缓存键列表
         """
-        if self._cursor is None or not keys:
+        if self._store is None or not keys:
             return
         
-        placeholders = ','.join(['?' for _ in keys])
-        self._cursor.execute(
-            f"DELETE FROM {self._table_name} WHERE key IN ({placeholders})",
-            keys
-        )
-        self._conn.commit()
+        self._store.put_many((key, DELETED) for key in keys)
+
+    def flush(self) -> None:
+        """立即写入等待中的写入和删除"""
+        if self._store is not None:
+            self._store.flush()
 
     def close(self) -> None:
         """
-        关闭数据库连接
+        写入等待中的操作并关闭数据库连接
         """
-        if self._cursor:
-            self._cursor.close()
-        if self._conn:
-            self._conn.close()
-        
-        self._cursor = None
-        self._conn = None
+        if self._store is not None:
+            self._store.close()
+        self._store = None
 
     def __enter__(self):
         """支持上下文管理器"""
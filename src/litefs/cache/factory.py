@@ -10,9 +10,12 @@
 from typing import Optional, Union
 
 from .cache import MemoryCache, TreeCache
+from .codec import CacheCodec
 from .redis import RedisCache
 from .db import DatabaseCache
 from .memcache import MemcacheCache
+from .shm import SharedMemoryCache
+from .tiered import RedisInvalidator, SocketInvalidator, TieredCache
 
 
 class CacheBackend:
@@ -23,6 +26,8 @@ class CacheBackend:
     REDIS = "redis"
     DATABASE = "database"
     MEMCACHE = "memcache"
+    TIERED = "tiered"
+    SHM = "shm"
 
 
 class CacheFactory:
@@ -36,12 +41,12 @@ class CacheFactory:
     def create_cache(
         backend: str = CacheBackend.MEMORY,
         **kwargs
-    ) -> Union[MemoryCache, TreeCache, RedisCache, DatabaseCache, MemcacheCache]:
+    ) -> Union[MemoryCache, TreeCache, RedisCache, DatabaseCache, MemcacheCache, TieredCache, SharedMemoryCache]:
         """
         创建缓存实例
         
         Args:
-            backend: 缓存后端类型（memory, tree, redis, database, memcache）
+            backend: 缓存后端类型（memory, tree, redis, database, memcache, tiered, shm）
             **kwargs: 缓存配置参数
         
         Returns:
@@ -55,7 +60,9 @@ class CacheFactory:
 
         if backend == CacheBackend.MEMORY:
             max_size = kwargs.get("max_size", 10000)
-            return MemoryCache(max_size=max_size)
+            max_bytes = kwargs.get("max_bytes")
+            expiration_time = kwargs.get("expiration_time")
+            return MemoryCache(max_size=max_size, max_bytes=max_bytes, expiration_time=expiration_time)
 
         elif backend == CacheBackend.TREE:
             clean_period = kwargs.get("clean_period", 60)
@@ -80,7 +87,7 @@ class CacheFactory:
                 key_prefix=key_prefix,
                 expiration_time=expiration_time,
                 **{k: v for k, v in kwargs.items()
-                   if k not in ["redis_client", "host", "port", "db", "password", "key_prefix", "expiration_time", "max_size", "clean_period"]}
+                   if k not in ["redis_client", "host", "port", "db", "password", "key_prefix", "expiration_time", "max_size", "max_bytes", "clean_period"]}
             )
 
         elif backend == CacheBackend.DATABASE:
@@ -93,7 +100,7 @@ class CacheFactory:
                 table_name=table_name,
                 expiration_time=expiration_time,
                 **{k: v for k, v in kwargs.items()
-                   if k not in ["db_path", "table_name", "expiration_time", "max_size", "clean_period"]}
+                   if k not in ["db_path", "table_name", "expiration_time", "max_size", "max_bytes", "clean_period"]}
             )
 
         elif backend == CacheBackend.MEMCACHE:
@@ -108,29 +115,58 @@ class CacheFactory:
                 key_prefix=key_prefix,
                 expiration_time=expiration_time,
                 **{k: v for k, v in kwargs.items()
-                   if k not in ["memcache_client", "servers", "key_prefix", "expiration_time", "max_size", "clean_period"]}
+                   if k not in ["memcache_client", "servers", "key_prefix", "expiration_time", "max_size", "max_bytes", "clean_period"]}
+            )
+
+        elif backend == CacheBackend.SHM:
+            return SharedMemoryCache(
+                max_size=kwargs.get("max_size", 16384),
+                slot_size=kwargs.get("slot_size", 1024),
+                expiration_time=kwargs.get("expiration_time"),
+                path=kwargs.get("shm_path"),
+            )
+
+        elif backend == CacheBackend.TIERED:
+            tiered_keys = (
+                "l2", "l2_backend", "l1_max_size", "l1_expiration_time",
+                "invalidator", "invalidation_channel", "invalidation_socket_dir",
+            )
+            l2 = kwargs.get("l2")
+            if l2 is None:
+                l2_backend = kwargs.get("l2_backend", CacheBackend.REDIS)
+                if l2_backend.lower() == CacheBackend.TIERED:
+                    raise ValueError("两级缓存的 L2 不能是 tiered")
+                l2 = CacheFactory.create_cache(
+                    l2_backend,
+                    **{k: v for k, v in kwargs.items() if k not in tiered_keys}
+                )
+
+            invalidator = kwargs.get("invalidator")
+            if invalidator is None:
+                socket_dir = kwargs.get("invalidation_socket_dir")
+                if socket_dir:
+                    invalidator = SocketInvalidator(socket_dir)
+                elif isinstance(l2, RedisCache):
+                    channel = kwargs.get("invalidation_channel", f"{l2._key_prefix}invalidate")
+                    invalidator = RedisInvalidator(l2._redis, channel)
+
+            return TieredCache(
+                l2,
+                l1_max_size=kwargs.get("l1_max_size", 1000),
+                l1_expiration_time=kwargs.get("l1_expiration_time", 5),
+                invalidator=invalidator,
             )
 
         else:
             raise ValueError(
                 f"不支持的缓存后端: {backend}。支持的类型: "
                 f"{CacheBackend.MEMORY}, {CacheBackend.TREE}, {CacheBackend.REDIS}, "
-                f"{CacheBackend.DATABASE}, {CacheBackend.MEMCACHE}"
+                f"{CacheBackend.DATABASE}, {CacheBackend.MEMCACHE}, {CacheBackend.TIERED}, {CacheBackend.SHM}"
             )
 
     @staticmethod
-    def create_from_config(config) -> Union[MemoryCache, TreeCache, RedisCache, DatabaseCache, MemcacheCache]:
-        """
-        从配置对象创建缓存实例
-        
-        Args:
-            config: 配置对象，应包含 cache_backend 和相关配置
-        
-        Returns:
-            缓存实例
-        """
-        backend = getattr(config, "cache_backend", CacheBackend.MEMORY)
-
+    def _backend_config(backend: str, config) -> dict:
+        """从配置对象读取单个后端的参数"""
         cache_config = {}
         if backend == CacheBackend.REDIS:
             cache_config = {
@@ -140,28 +176,77 @@ class CacheFactory:
                 "password": getattr(config, "redis_password", None),
                 "key_prefix": getattr(config, "redis_key_prefix", "litefs:"),
                 "expiration_time": getattr(config, "cache_expiration_time", 3600),
+                "codec": CacheFactory._codec_config(config),
             }
         elif backend == CacheBackend.DATABASE:
             cache_config = {
                 "db_path": getattr(config, "database_path", ":memory:"),
                 "table_name": getattr(config, "database_cache_table", "cache"),
                 "expiration_time": getattr(config, "cache_expiration_time", 3600),
+                "write_behind": getattr(config, "database_write_behind", True),
+                "flush_interval": getattr(config, "database_flush_interval", 0.05),
             }
         elif backend == CacheBackend.MEMCACHE:
             cache_config = {
                 "servers": getattr(config, "memcache_servers", ["localhost:11211"]),
                 "key_prefix": getattr(config, "memcache_key_prefix", "litefs:"),
                 "expiration_time": getattr(config, "cache_expiration_time", 3600),
+                "codec": CacheFactory._codec_config(config),
             }
         elif backend == CacheBackend.MEMORY:
             cache_config = {
                 "max_size": getattr(config, "cache_max_size", 10000),
+                "max_bytes": getattr(config, "cache_max_bytes", 0) or None,
+                "expiration_time": getattr(config, "cache_expiration_time", None),
             }
         elif backend == CacheBackend.TREE:
             cache_config = {
                 "clean_period": getattr(config, "cache_clean_period", 60),
                 "expiration_time": getattr(config, "cache_expiration_time", 3600),
             }
+        elif backend == CacheBackend.SHM:
+            cache_config = {
+                "max_size": getattr(config, "cache_max_size", 10000),
+                "slot_size": getattr(config, "cache_shm_slot_size", 1024),
+                "expiration_time": getattr(config, "cache_expiration_time", None),
+                "shm_path": getattr(config, "cache_shm_path", None),
+            }
+
+        return cache_config
+
+    @staticmethod
+    def _codec_config(config) -> CacheCodec:
+        """从配置对象读取 Redis/Memcache 缓存值的编解码器"""
+        return CacheCodec(
+            serializer=getattr(config, "cache_serializer", "json"),
+            compression=getattr(config, "cache_compression", None) or None,
+            compress_threshold=getattr(config, "cache_compress_threshold", 1024),
+        )
+
+    @staticmethod
+    def create_from_config(config) -> Union[MemoryCache, TreeCache, RedisCache, DatabaseCache, MemcacheCache, TieredCache, SharedMemoryCache]:
+        """
+        从配置对象创建缓存实例
+        
+        Args:
+            config: 配置对象，应包含 cache_backend 和相关配置
+        
+        Returns:
+            缓存实例
+        """
+        backend = getattr(config, "cache_backend", CacheBackend.MEMORY)
+
+        if backend == CacheBackend.TIERED:
+            l2_backend = getattr(config, "cache_l2_backend", CacheBackend.REDIS)
+            cache_config = CacheFactory._backend_config(l2_backend, config)
+            cache_config.update({
+                "l2_backend": l2_backend,
+                "l1_max_size": getattr(config, "cache_l1_max_size", 1000),
+                "l1_expiration_time": getattr(config, "cache_l1_expiration_time", 5),
+                "invalidation_socket_dir": getattr(config, "cache_invalidation_socket_dir", None),
+            })
+        else:
+            cache_config = CacheFactory._backend_config(backend, config)
 
         return CacheFactory.create_cache(backend, **cache_config)
 
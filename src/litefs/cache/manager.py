@@ -176,6 +176,22 @@ class CacheManager:
         return list(manager._caches.keys())
 
 
+    @classmethod
+    def get_stats(cls) -> dict:
+        """
+        获取各缓存实例的统计信息
+
+        Returns:
+            缓存标识 -> 统计信息，只包含提供 get_stats 的缓存
+        """
+        manager = cls()
+        return {
+            key: cache.get_stats()
+            for key, cache in list(manager._caches.items())
+            if hasattr(cache, 'get_stats')
+        }
+
+
 def get_global_cache(
     backend: str = CacheBackend.TREE,
     **kwargs
@@ -8,15 +8,23 @@ Memcache 缓存后端
 """
 
 import time
-import json
 from typing import Any, Optional
 
+from ..utils.aio import LoopLocal, run_sync
+from ..utils.aio_memcache import async_memcache_factory
+from .codec import make_codec
+
 
 class MemcacheCache:
     """
     Memcache 缓存实现
     
-    使用 Memcache 作为缓存后端，提供高性能的分布式缓存支持
+    使用 Memcache 作为缓存后端，提供高性能的分布式缓存支持。
+
+    aget、aput、adelete 和 aget_many 使用 AsyncMemcacheClient（每个事件循环一个），
+    服务器地址取自 servers 或 pymemcache 客户端；无法确定时在线程池中执行。
+
+    值的序列化和压缩由 codec 决定（见 CacheCodec），默认为不压缩的 JSON
     """
 
     def __init__(
@@ -25,6 +33,7 @@ class MemcacheCache:
         servers: list = ["localhost:11211"],
         key_prefix: str = "litefs:",
         expiration_time: int = 3600,
+        codec=None,
         **kwargs
     ):
         """
@@ -35,10 +44,12 @@ class MemcacheCache:
             servers: Memcache 服务器列表
             key_prefix: 键前缀
             expiration_time: 默认过期时间（秒）
+            codec: CacheCodec 实例或序列化方式名（json、pickle、msgpack），默认为 json
             **kwargs: 其他 Memcache 连接参数
         """
         self._key_prefix = key_prefix
         self._expiration_time = expiration_time
+        self._codec = make_codec(codec)
 
         if memcache_client is not None:
             self._mc = memcache_client
@@ -59,6 +70,8 @@ class MemcacheCache:
             self._mc = Client(servers[0] if isinstance(servers, list) else servers, **kwargs)
 
         self._test_connection()
+        factory = async_memcache_factory(self._mc)
+        self._async_clients = LoopLocal(factory) if factory is not None else None
 
     def _test_connection(self):
         """测试 Memcache 连接"""
@@ -75,6 +88,18 @@ class MemcacheCache:
         """生成带前缀的键"""
         return f"{self._key_prefix}{key}"
 
+    @property
+    def codec(self):
+        """值的编解码器"""
+        return self._codec
+
+    def _loads(self, val_str) -> Optional[Any]:
+        try:
+            return self._codec.loads(val_str)
+        except ValueError:
+            # 无法解码或不接受的格式按未命中处理
+            return None
+
     def put(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
         """
         存储值到缓存
@@ -87,17 +112,34 @@ class MemcacheCache:
         memcache_key = self._make_key(key)
         expiration = expiration if expiration is not None else self._expiration_time
 
-        # 序列化值
-        try:
-            val_str = json.dumps(val)
-        except Exception as e:
-            raise ValueError(f"无法序列化值: {e}")
+        val_str = self._codec.dumps(val)
 
         if self._use_pymemcache:
             self._mc.set(memcache_key, val_str, expire=expiration if expiration > 0 else 0)
         else:
             self._mc.set(memcache_key, val_str, time=expiration)
 
+    def add(self, key: str, val: Any, expiration: Optional[int] = None) -> bool:
+        """
+        键不存在时存储值，可以用作分布式锁
+        
+        Args:
+            key: 缓存键
+            val: 缓存值
+            expiration: 过期时间（秒），如果为 None 则使用默认过期时间
+        
+        Returns:
+            是否存储成功
+        """
+        memcache_key = self._make_key(key)
+        expiration = expiration if expiration is not None else self._expiration_time
+
+        val_str = self._codec.dumps(val)
+
+        if self._use_pymemcache:
+            return bool(self._mc.add(memcache_key, val_str, expire=expiration if expiration > 0 else 0, noreply=False))
+        return bool(self._mc.add(memcache_key, val_str, time=expiration))
+
     def get(self, key: str) -> Optional[Any]:
         """
         从缓存获取值
@@ -113,13 +155,7 @@ class MemcacheCache:
         
         if val_str is None:
             return None
-        
-        # 反序列化值
-        try:
-            return json.loads(val_str)
-        except Exception as e:
-            # 如果反序列化失败，返回原始字符串
-            return val_str
+        return self._loads(val_str)
 
     def delete(self, key: str) -> None:
         """
@@ -238,26 +274,18 @@ class MemcacheCache:
             result = {}
             for memcache_key, val_str in values.items():
                 original_key = memcache_key.replace(self._key_prefix, '', 1)
-                if val_str is not None:
-                    # 反序列化值
-                    try:
-                        result[original_key] = json.loads(val_str)
-                    except Exception:
-                        # 如果反序列化失败，返回原始字符串
-                        result[original_key] = val_str
+                val = self._loads(val_str) if val_str is not None else None
+                if val is not None:
+                    result[original_key] = val
             return result
         else:
             values = self._mc.get_multi(memcache_keys)
             result = {}
             for memcache_key, val_str in values.items():
                 original_key = memcache_key.replace(self._key_prefix, '', 1)
-                if val_str is not None:
-                    # 反序列化值
-                    try:
-                        result[original_key] = json.loads(val_str)
-                    except Exception:
-                        # 如果反序列化失败，返回原始字符串
-                        result[original_key] = val_str
+                val = self._loads(val_str) if val_str is not None else None
+                if val is not None:
+                    result[original_key] = val
             return result
 
     def set_many(self, mapping: dict, expiration: Optional[int] = None) -> None:
@@ -275,11 +303,7 @@ class MemcacheCache:
 
         memcache_mapping = {}
         for key, value in mapping.items():
-            # 序列化值
-            try:
-                val_str = json.dumps(value)
-            except Exception as e:
-                raise ValueError(f"无法序列化值: {e}")
+            val_str = self._codec.dumps(value)
             
             memcache_key = self._make_key(key)
             memcache_mapping[memcache_key] = val_str
@@ -306,6 +330,59 @@ class MemcacheCache:
         else:
             self._mc.delete_multi(memcache_keys)
 
+    def _async_client(self):
+        """当前事件循环的 AsyncMemcacheClient，无法创建时返回 None"""
+        if self._async_clients is None:
+            return None
+        return self._async_clients.get()
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """异步版本的 get"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.get, key)
+        val_str = await client.get(self._make_key(key))
+        if val_str is None:
+            return None
+        return self._loads(val_str)
+
+    async def aput(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
+        """异步版本的 put"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.put, key, val, expiration)
+        expiration = expiration if expiration is not None else self._expiration_time
+        val_str = self._codec.dumps(val)
+        await client.set(self._make_key(key), val_str, expiration if expiration > 0 else 0)
+
+    async def adelete(self, key: str) -> None:
+        """异步版本的 delete"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.delete, key)
+        await client.delete(self._make_key(key))
+
+    async def aget_many(self, keys: list) -> dict:
+        """异步版本的 get_many"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.get_many, keys)
+        memcache_keys = {self._make_key(key).encode('utf-8'): key for key in keys}
+        values = await client.get_many(memcache_keys)
+        result = {}
+        for memcache_key, val_str in values.items():
+            val = self._loads(val_str)
+            if val is not None:
+                result[memcache_keys[memcache_key]] = val
+        return result
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的 AsyncMemcacheClient"""
+        if self._async_clients is not None:
+            client = self._async_clients.pop()
+            if client is not None:
+                await client.close()
+
     def close(self) -> None:
         """
         关闭 Memcache 连接
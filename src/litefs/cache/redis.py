@@ -8,15 +8,22 @@ Redis 缓存后端
 """
 
 import time
-import json
 from typing import Any, Optional
 
+from ..utils.aio import LoopLocal, async_redis_factory, run_sync
+from .codec import make_codec
+
 
 class RedisCache:
     """
     Redis 缓存实现
     
-    使用 Redis 作为缓存后端，提供高性能的分布式缓存支持
+    使用 Redis 作为缓存后端，提供高性能的分布式缓存支持。
+
+    aget、aput、adelete 和 aget_many 使用按同步客户端的连接参数创建的 redis.asyncio
+    客户端（每个事件循环一个）；无法创建时（如传入的不是 redis.Redis）在线程池中执行。
+
+    值的序列化和压缩由 codec 决定（见 CacheCodec），默认为不压缩的 JSON
     """
 
     def __init__(
@@ -28,6 +35,7 @@ class RedisCache:
         password: Optional[str] = None,
         key_prefix: str = "litefs:",
         expiration_time: int = 3600,
+        codec=None,
         **kwargs
     ):
         """
@@ -41,10 +49,12 @@ class RedisCache:
             password: Redis 密码
             key_prefix: 键前缀
             expiration_time: 默认过期时间（秒）
+            codec: CacheCodec 实例或序列化方式名（json、pickle、msgpack），默认为 json
             **kwargs: 其他 Redis 连接参数
         """
         self._key_prefix = key_prefix
         self._expiration_time = expiration_time
+        self._codec = make_codec(codec)
 
         if redis_client is not None:
             self._redis = redis_client
@@ -60,7 +70,9 @@ class RedisCache:
                 "host": host,
                 "port": port,
                 "db": db,
-                "decode_responses": True,
+                # 始终返回 bytes：codec 按前缀识别其他格式写入的值，
+                # 否则切换到 json 后读到 pickle 等二进制数据会解码失败
+                "decode_responses": False,
                 **kwargs
             }
 
@@ -69,7 +81,11 @@ class RedisCache:
 
             self._redis = redis.Redis(**connection_params)
 
+        if self._codec.binary and _decodes_responses(self._redis):
+            raise ValueError(f"{self._codec!r} 需要 decode_responses=False 的 Redis 客户端")
         self._test_connection()
+        factory = async_redis_factory(self._redis)
+        self._async_clients = LoopLocal(factory) if factory is not None else None
 
     def _test_connection(self):
         """测试 Redis 连接"""
@@ -82,6 +98,21 @@ class RedisCache:
         """生成带前缀的键"""
         return f"{self._key_prefix}{key}"
 
+    @property
+    def codec(self):
+        """值的编解码器"""
+        return self._codec
+
+    def _dumps(self, val: Any) -> bytes:
+        return self._codec.dumps(val)
+
+    def _loads(self, val_str) -> Optional[Any]:
+        try:
+            return self._codec.loads(val_str)
+        except ValueError:
+            # 无法解码或不接受的格式按未命中处理
+            return None
+
     def put(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
         """
         存储值到缓存
@@ -93,18 +124,33 @@ class RedisCache:
         """
         redis_key = self._make_key(key)
         expiration = expiration if expiration is not None else self._expiration_time
-
-        # 序列化值
-        try:
-            val_str = json.dumps(val)
-        except Exception as e:
-            raise ValueError(f"无法序列化值: {e}")
+        val_str = self._dumps(val)
 
         if expiration > 0:
             self._redis.setex(redis_key, expiration, val_str)
         else:
             self._redis.set(redis_key, val_str)
 
+    def add(self, key: str, val: Any, expiration: Optional[int] = None) -> bool:
+        """
+        键不存在时存储值，可以用作分布式锁
+        
+        Args:
+            key: 缓存键
+            val: 缓存值
+            expiration: 过期时间（秒），如果为 None 则使用默认过期时间
+        
+        Returns:
+            是否存储成功
+        """
+        redis_key = self._make_key(key)
+        expiration = expiration if expiration is not None else self._expiration_time
+        val_str = self._dumps(val)
+
+        if expiration > 0:
+            return bool(self._redis.set(redis_key, val_str, nx=True, ex=expiration))
+        return bool(self._redis.set(redis_key, val_str, nx=True))
+
     def get(self, key: str) -> Optional[Any]:
         """
         从缓存获取值
@@ -120,13 +166,7 @@ class RedisCache:
         
         if val_str is None:
             return None
-        
-        # 反序列化值
-        try:
-            return json.loads(val_str)
-        except Exception as e:
-            # 如果反序列化失败，返回原始字符串
-            return val_str
+        return self._loads(val_str)
 
     def delete(self, key: str) -> None:
         """
@@ -229,17 +269,15 @@ class RedisCache:
         redis_keys = [self._make_key(key) for key in keys]
         values = self._redis.mget(redis_keys)
 
+        return self._collect(keys, values)
+
+    def _collect(self, keys: list, values: list) -> dict:
         result = {}
-        for i, key in enumerate(keys):
-            val_str = values[i]
+        for key, val_str in zip(keys, values):
             if val_str is not None:
-                # 反序列化值
-                try:
-                    result[key] = json.loads(val_str)
-                except Exception:
-                    # 如果反序列化失败，返回原始字符串
-                    result[key] = val_str
-
+                val = self._loads(val_str)
+                if val is not None:
+                    result[key] = val
         return result
 
     def set_many(self, mapping: dict, expiration: Optional[int] = None) -> None:
@@ -257,12 +295,7 @@ class RedisCache:
 
         pipe = self._redis.pipeline()
         for key, value in mapping.items():
-            # 序列化值
-            try:
-                val_str = json.dumps(value)
-            except Exception as e:
-                raise ValueError(f"无法序列化值: {e}")
-            
+            val_str = self._dumps(value)
             redis_key = self._make_key(key)
             if expiration > 0:
                 pipe.setex(redis_key, expiration, val_str)
@@ -285,6 +318,52 @@ class RedisCache:
         if redis_keys:
             self._redis.delete(*redis_keys)
 
+    def _async_client(self):
+        """当前事件循环的 redis.asyncio 客户端，无法创建时返回 None"""
+        if self._async_clients is None:
+            return None
+        return self._async_clients.get()
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """异步版本的 get"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.get, key)
+        val_str = await client.get(self._make_key(key))
+        return None if val_str is None else self._loads(val_str)
+
+    async def aput(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
+        """异步版本的 put"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.put, key, val, expiration)
+        expiration = expiration if expiration is not None else self._expiration_time
+        await client.set(self._make_key(key), self._dumps(val), ex=expiration if expiration > 0 else None)
+
+    async def adelete(self, key: str) -> None:
+        """异步版本的 delete"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.delete, key)
+        await client.delete(self._make_key(key))
+
+    async def aget_many(self, keys: list) -> dict:
+        """异步版本的 get_many"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.get_many, keys)
+        if not keys:
+            return {}
+        values = await client.mget([self._make_key(key) for key in keys])
+        return self._collect(keys, values)
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的 redis.asyncio 客户端"""
+        if self._async_clients is not None:
+            client = self._async_clients.pop()
+            if client is not None:
+                await client.aclose()
+
     def close(self) -> None:
         """
         关闭 Redis 连接
@@ -303,6 +382,13 @@ class RedisCache:
         self.close()
 
 
+def _decodes_responses(client) -> bool:
+    """客户端是否把响应解码为 str"""
+    pool = getattr(client, "connection_pool", None)
+    connection_kwargs = getattr(pool, "connection_kwargs", None)
+    return isinstance(connection_kwargs, dict) and bool(connection_kwargs.get("decode_responses"))
+
+
 __all__ = [
     "RedisCache",
 ]
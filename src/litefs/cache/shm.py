@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+共享内存缓存
+
+缓存数据保存在 mmap 映射的共享内存中，ProcessHTTPServer fork 出的所有工作进程
+（或者按同一路径打开的其他进程）读写同一份数据，不需要经过网络。
+
+内存划分为固定大小的槽，按键的哈希分组（组相联）：每个键只能存放在所属组的
+ways 个槽中，组满时淘汰组内最久未访问的槽。每个槽有一个序号（seqlock），
+写入前后各加一，读取方在序号为奇数或前后不一致时重试，因此读取不加锁；
+写入同一组时进程内用线程锁、进程间用 fcntl 记录锁互斥。
+值用 pickle 序列化，连同键超过槽的容量时不缓存
+"""
+
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Optional
+
+from ..utils.aio import InlineAsyncMixin
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# 文件头：魔数、格式版本、槽数、槽大小、每组槽数
+_MAGIC = b'LFSC'
+_VERSION = 1
+_FILE_HEADER = struct.Struct('<4sBIII')
+_DATA_OFFSET = 64
+
+# 槽头：序号、状态、键长度、值长度、键哈希、过期时间（0 表示不过期）、最后访问时间
+_SLOT_HEADER = struct.Struct('<IBxHIIdd')
+_SEQ = struct.Struct('<I')
+_ATIME = struct.Struct('<d')
+_ATIME_OFFSET = _SLOT_HEADER.size - _ATIME.size
+
+_EMPTY = 0
+_USED = 1
+
+# 读取时遇到正在写入的槽最多重试的次数，超过视为未命中
+_READ_RETRIES = 100
+
+# 进程内的线程锁个数，组按序号分配到这些锁上
+_THREAD_LOCKS = 64
+
+
+class SharedMemoryCache(InlineAsyncMixin):
+    """
+    多进程共享的内存缓存
+
+    需要在 fork 工作进程之前创建（Litefs 应用在启动服务器之前创建 app.caches），
+    或者各进程用同一个 path 打开
+    """
+
+    def __init__(
+        self,
+        max_size: int = 16384,
+        slot_size: int = 1024,
+        ways: int = 8,
+        expiration_time: Optional[float] = None,
+        path: Optional[str] = None
+    ):
+        """
+        初始化共享内存缓存
+
+        Args:
+            max_size: 槽数，即最多缓存的条目数
+            slot_size: 每个槽的字节数，键和序列化后的值需要放得下
+            ways: 每组的槽数
+            expiration_time: 默认过期时间（秒），None 或不大于 0 表示不过期
+            path: 共享内存文件路径；文件已存在时按其中的参数打开，
+                None 时在 /dev/shm（或临时目录）中创建一个匿名文件，只能通过 fork 共享
+        """
+        if fcntl is None:
+            raise RuntimeError("共享内存缓存需要支持 fcntl 的 POSIX 系统")
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError(f"slot_size 必须大于 {_SLOT_HEADER.size}")
+
+        self._expiration_time = expiration_time
+        if path is None:
+            directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            fd, tmp_path = tempfile.mkstemp(prefix='litefs-cache-', dir=directory)
+            os.unlink(tmp_path)
+            self.path = None
+        else:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            self.path = path
+        self._fd = fd
+
+        ways = max(1, min(int(ways), int(max_size)))
+        sets = max(1, int(max_size) // ways)
+        with self._file_lock(-1):
+            if os.fstat(fd).st_size < _DATA_OFFSET:
+                os.ftruncate(fd, _DATA_OFFSET + sets * ways * slot_size)
+                os.pwrite(fd, _FILE_HEADER.pack(_MAGIC, _VERSION, sets * ways, slot_size, ways), 0)
+            header = os.pread(fd, _FILE_HEADER.size, 0)
+
+        magic, version, slots, slot_size, ways = _FILE_HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            os.close(fd)
+            raise ValueError(f"Not a litefs shared memory cache: {path}")
+        self._slots = slots
+        self._slot_size = slot_size
+        self._ways = ways
+        self._sets = slots // ways
+        self._payload_size = slot_size - _SLOT_HEADER.size
+        self._mapping = mmap.mmap(fd, _DATA_OFFSET + slots * slot_size)
+        self._locks = tuple(threading.Lock() for _ in range(min(_THREAD_LOCKS, self._sets)))
+
+        # 命中统计只记录当前进程
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _file_lock(self, set_index: int):
+        """进程间的记录锁，锁住文件中与组序号对应的一个字节；-1 用于初始化"""
+        return _RecordLock(self._fd, set_index + 1)
+
+    def _locate(self, key: str):
+        key_bytes = str(key).encode('utf-8')
+        key_hash = zlib.crc32(key_bytes)
+        return key_bytes, key_hash, key_hash % self._sets
+
+    def _slot_offset(self, set_index: int, way: int) -> int:
+        return _DATA_OFFSET + (set_index * self._ways + way) * self._slot_size
+
+    def _read(self, offset: int, key_bytes: bytes, key_hash: int):
+        """
+        无锁读取一个槽
+
+        Returns:
+            (值的序列化数据, 过期时间)，槽中不是该键时返回 None
+        """
+        mapping = self._mapping
+        for _ in range(_READ_RETRIES):
+            seq, state, key_length, value_length, slot_hash, expires, _ = _SLOT_HEADER.unpack_from(mapping, offset)
+            if seq & 1:
+                continue
+            if state != _USED or slot_hash != key_hash or key_length != len(key_bytes):
+                result = None
+            else:
+                start = offset + _SLOT_HEADER.size
+                data = mapping[start:start + key_length + value_length]
+                result = (data[key_length:], expires) if data[:key_length] == key_bytes else None
+            if _SEQ.unpack_from(mapping, offset)[0] == seq:
+                return result
+        return None
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在或已过期时返回 None
+        """
+        key_bytes, key_hash, set_index = self._locate(key)
+        now = time.time()
+        for way in range(self._ways):
+            offset = self._slot_offset(set_index, way)
+            found = self._read(offset, key_bytes, key_hash)
+            if found is None:
+                continue
+            data, expires = found
+            if expires and expires <= now:
+                break
+            # 访问时间只用于淘汰，不加锁写入，与并发写入交错时最多影响淘汰顺序
+            _ATIME.pack_into(self._mapping, offset + _ATIME_OFFSET, now)
+            self._hits += 1
+            return pickle.loads(data)
+        self._misses += 1
+        return None
+
+    def put(self, key: str, val: Any, expiration: Optional[float] = None) -> None:
+        """
+        存储值
+
+        Args:
+            key: 缓存键
+            val: 缓存值，需要可以 pickle
+            expiration: 过期时间（秒），None 使用默认过期时间，不大于 0 表示不过期
+        """
+        key_bytes, key_hash, set_index = self._locate(key)
+        data = pickle.dumps(val, pickle.HIGHEST_PROTOCOL)
+        if expiration is None:
+            expiration = self._expiration_time
+        now = time.time()
+        expires = now + expiration if expiration and expiration > 0 else 0.0
+
+        with self._lock(set_index):
+            if len(key_bytes) + len(data) > self._payload_size:
+                # 放不下时删除旧值，避免读到过时的数据
+                offset = self._find(set_index, key_bytes, key_hash)
+                if offset is not None:
+                    self._write(offset, _EMPTY)
+                return
+            offset = self._find(set_index, key_bytes, key_hash)
+            if offset is None:
+                offset = self._victim(set_index, now)
+            self._write(offset, _USED, key_bytes, data, key_hash, expires, now)
+
+    def delete(self, key: str) -> None:
+        """删除值"""
+        key_bytes, key_hash, set_index = self._locate(key)
+        with self._lock(set_index):
+            offset = self._find(set_index, key_bytes, key_hash)
+            if offset is not None:
+                self._write(offset, _EMPTY)
+
+    def clear(self) -> None:
+        """清空全部进程共享的缓存"""
+        for set_index in range(self._sets):
+            with self._lock(set_index):
+                for way in range(self._ways):
+                    offset = self._slot_offset(set_index, way)
+                    if self._mapping[offset + _SEQ.size] != _EMPTY:
+                        self._write(offset, _EMPTY)
+
+    def __len__(self) -> int:
+        """未过期的条目数，需要扫描全部槽"""
+        now = time.time()
+        count = 0
+        for index in range(self._slots):
+            _, state, _, _, _, expires, _ = _SLOT_HEADER.unpack_from(
+                self._mapping, _DATA_OFFSET + index * self._slot_size
+            )
+            if state == _USED and not (expires and expires <= now):
+                count += 1
+        return count
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典：size、max_size、slot_size、hits、misses、hit_rate、evictions，
+            命中和淘汰次数只统计当前进程
+        """
+        lookups = self._hits + self._misses
+        return {
+            'size': len(self),
+            'max_size': self._slots,
+            'slot_size': self._slot_size,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': self._hits / lookups if lookups else 0.0,
+            'evictions': self._evictions,
+        }
+
+    def close(self) -> None:
+        """关闭映射；匿名缓存在所有进程关闭后释放"""
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+            os.close(self._fd)
+
+    def __enter__(self):
+        """支持上下文管理器"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """支持上下文管理器"""
+        self.close()
+
+    def _lock(self, set_index: int):
+        return _SetLock(self._locks[set_index % len(self._locks)], self._fd, set_index + 1)
+
+    def _find(self, set_index: int, key_bytes: bytes, key_hash: int) -> Optional[int]:
+        """查找键所在的槽，调用方持有组锁"""
+        mapping = self._mapping
+        for way in range(self._ways):
+            offset = self._slot_offset(set_index, way)
+            _, state, key_length, _, slot_hash, _, _ = _SLOT_HEADER.unpack_from(mapping, offset)
+            if state == _USED and slot_hash == key_hash and key_length == len(key_bytes):
+                start = offset + _SLOT_HEADER.size
+                if mapping[start:start + key_length] == key_bytes:
+                    return offset
+        return None
+
+    def _victim(self, set_index: int, now: float) -> int:
+        """选择写入的槽：空槽、已过期的槽，否则为组内最久未访问的槽"""
+        mapping = self._mapping
+        victim = None
+        oldest = None
+        for way in range(self._ways):
+            offset = self._slot_offset(set_index, way)
+            _, state, _, _, _, expires, atime = _SLOT_HEADER.unpack_from(mapping, offset)
+            if state != _USED or (expires and expires <= now):
+                return offset
+            if oldest is None or atime < oldest:
+                victim, oldest = offset, atime
+        self._evictions += 1
+        return victim
+
+    def _write(self, offset, state, key_bytes=b'', data=b'', key_hash=0, expires=0.0, atime=0.0):
+        """写入一个槽，调用方持有组锁；序号在写入期间为奇数"""
+        mapping = self._mapping
+        seq = _SEQ.unpack_from(mapping, offset)[0]
+        _SEQ.pack_into(mapping, offset, (seq + 1) & 0xFFFFFFFF)
+        start = offset + _SLOT_HEADER.size
+        if state == _USED:
+            mapping[start:start + len(key_bytes) + len(data)] = key_bytes + data
+        _SLOT_HEADER.pack_into(
+            mapping, offset, (seq + 1) & 0xFFFFFFFF, state,
+            len(key_bytes), len(data), key_hash, expires, atime
+        )
+        _SEQ.pack_into(mapping, offset, (seq + 2) & 0xFFFFFFFF)
+
+
+class _RecordLock:
+    """fcntl 记录锁，锁住文件中的一个字节"""
+
+    __slots__ = ('_fd', '_offset')
+
+    def __init__(self, fd, offset):
+        self._fd = fd
+        self._offset = offset
+
+    def __enter__(self):
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self._offset)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self._offset)
+
+
+class _SetLock(_RecordLock):
+    """组锁：记录锁只在进程之间互斥，同一进程的线程之间再加一个线程锁"""
+
+    __slots__ = ('_thread_lock',)
+
+    def __init__(self, thread_lock, fd, offset):
+        super().__init__(fd, offset)
+        self._thread_lock = thread_lock
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            super().__enter__()
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            super().__exit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._thread_lock.release()
+
+
+__all__ = [
+    "SharedMemoryCache",
+]
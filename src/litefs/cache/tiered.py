@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+两级缓存
+
+L1 为进程内的 MemoryCache，条目少、过期时间短；L2 为多个工作进程和主机共享的
+Redis、Memcache 或数据库缓存。读取先查 L1，未命中再查 L2 并写回 L1；
+写入和删除同时更新两级，并通过失效通道通知其他工作进程删除各自 L1 中的键
+"""
+
+import os
+import socket
+import threading
+import uuid
+import weakref
+from typing import Any, Callable, Optional
+
+from .. import json
+from ..utils.aio import acall, run_sync
+from .cache import MemoryCache
+
+
+class RedisInvalidator:
+    """
+    基于 Redis 发布/订阅的失效通道
+
+    所有订阅同一频道的工作进程（可以在不同主机上）都会收到失效消息
+    """
+
+    def __init__(self, redis_client, channel: str = "litefs:invalidate"):
+        """
+        Args:
+            redis_client: redis-py 客户端
+            channel: 频道名
+        """
+        self._redis = redis_client
+        self.channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def publish(self, message: bytes) -> None:
+        self._redis.publish(self.channel, message)
+
+    def subscribe(self, callback: Callable[[bytes], None]) -> None:
+        """在后台线程中接收消息，每条消息调用一次 callback"""
+        def handler(message):
+            data = message["data"]
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            callback(data)
+
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: handler})
+        self._thread = self._pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def _after_fork(self):
+        """fork 出的子进程不使用父进程的订阅连接和接收线程"""
+        # 连接池在子进程中会自动重建，不关闭与父进程共用的连接
+        self._pubsub = None
+        self._thread = None
+
+
+class SocketInvalidator:
+    """
+    基于本机 Unix 数据报套接字的失效通道
+
+    每个订阅者在 directory 下绑定一个套接字文件，发布时发送给目录中的全部套接字。
+    不需要 Redis，适合单机多进程部署和测试
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: 套接字文件所在目录，同一组工作进程使用同一个目录
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        # 订阅时按当前进程号生成
+        self._path = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver = None
+        self._thread = None
+
+    def publish(self, message: bytes) -> None:
+        for name in os.listdir(self.directory):
+            if not name.endswith(".sock"):
+                continue
+            path = os.path.join(self.directory, name)
+            if path == self._path:
+                continue
+            try:
+                self._sender.sendto(message, path)
+            except ConnectionRefusedError:
+                # 订阅者已退出但没有删除套接字文件
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+
+    def subscribe(self, callback: Callable[[bytes], None]) -> None:
+        """在后台线程中接收消息，每条消息调用一次 callback"""
+        self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._receiver.bind(self._path)
+
+        def run(receiver):
+            while True:
+                try:
+                    data = receiver.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                callback(data)
+
+        self._thread = threading.Thread(target=run, args=(self._receiver,), daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._receiver is not None:
+            receiver, self._receiver = self._receiver, None
+            try:
+                # 唤醒阻塞在 recv 上的线程
+                self._sender.sendto(b"", self._path)
+            except OSError:
+                pass
+            self._thread.join(1)
+            receiver.close()
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+        self._sender.close()
+
+    def _after_fork(self):
+        """fork 出的子进程不使用父进程的套接字和接收线程"""
+        # 只关闭继承的描述符，套接字文件仍属于父进程
+        for sock in (self._receiver, self._sender):
+            if sock is not None:
+                sock.close()
+        self._receiver = None
+        self._thread = None
+        self._path = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+
+class TieredCache:
+    """
+    两级缓存
+
+    L1 的过期时间决定了其他工作进程最多读到多久之前的值：失效消息丢失，
+    或者与并发的 L2 读取交错时，旧值最多在 L1 中保留 l1_expiration_time 秒。
+    L1 直接返回缓存的对象，调用方不要修改取得的值
+    """
+
+    def __init__(
+        self,
+        l2,
+        l1: Optional[MemoryCache] = None,
+        l1_max_size: int = 1000,
+        l1_expiration_time: float = 5,
+        invalidator=None
+    ):
+        """
+        初始化两级缓存
+
+        Args:
+            l2: 共享缓存（RedisCache、MemcacheCache、DatabaseCache 等）
+            l1: 进程内缓存，默认按 l1_max_size 和 l1_expiration_time 创建 MemoryCache
+            l1_max_size: L1 最大条目数
+            l1_expiration_time: L1 过期时间（秒）
+            invalidator: 失效通道（RedisInvalidator 或 SocketInvalidator），
+                None 时只依靠 L1 过期
+        """
+        self.l2 = l2
+        self.l1 = l1 if l1 is not None else MemoryCache(
+            max_size=l1_max_size,
+            expiration_time=l1_expiration_time,
+        )
+        self.invalidator = invalidator
+        # 区分自己发出的失效消息
+        self._origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._l1_hits = 0
+        self._l2_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        if invalidator is not None:
+            invalidator.subscribe(self._on_invalidate)
+            _caches.add(self)
+
+    def put(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
+        """
+        存储值到两级缓存，并通知其他工作进程
+
+        Args:
+            key: 缓存键
+            val: 缓存值
+            expiration: L2 过期时间（秒），None 使用 L2 的默认过期时间
+        """
+        if expiration is None:
+            self.l2.put(key, val)
+        else:
+            self.l2.put(key, val, expiration)
+        self.l1.put(key, val)
+        self._publish(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取值，L1 未命中时从 L2 读取并写入 L1
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，如果不存在则返回 None
+        """
+        val = self.l1.get(key)
+        if val is not None:
+            with self._lock:
+                self._l1_hits += 1
+            return val
+
+        val = self.l2.get(key)
+        with self._lock:
+            if val is None:
+                self._misses += 1
+            else:
+                self._l2_hits += 1
+        if val is not None:
+            self.l1.put(key, val)
+        return val
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """异步版本的 get，L1 命中时不切换到 L2 的异步接口"""
+        val = self.l1.get(key)
+        if val is not None:
+            with self._lock:
+                self._l1_hits += 1
+            return val
+
+        val = await acall(self.l2, "get", key)
+        with self._lock:
+            if val is None:
+                self._misses += 1
+            else:
+                self._l2_hits += 1
+        if val is not None:
+            self.l1.put(key, val)
+        return val
+
+    async def aget_many(self, keys: list) -> dict:
+        """异步版本的批量读取，只从 L2 读取 L1 未命中的键"""
+        result = {}
+        missing = []
+        for key in keys:
+            val = self.l1.get(key)
+            if val is None:
+                missing.append(key)
+            else:
+                result[key] = val
+        if missing:
+            found = await acall(self.l2, "get_many", missing)
+            for key, val in found.items():
+                self.l1.put(key, val)
+            result.update(found)
+        with self._lock:
+            self._l1_hits += len(keys) - len(missing)
+            self._l2_hits += len(result) - (len(keys) - len(missing))
+            self._misses += len(keys) - len(result)
+        return result
+
+    async def aput(self, key: str, val: Any, expiration: Optional[int] = None) -> None:
+        """异步版本的 put"""
+        if expiration is None:
+            await acall(self.l2, "put", key, val)
+        else:
+            await acall(self.l2, "put", key, val, expiration)
+        self.l1.put(key, val)
+        await self._apublish(key)
+
+    async def adelete(self, key: str) -> None:
+        """异步版本的 delete"""
+        await acall(self.l2, "delete", key)
+        self.l1.delete(key)
+        await self._apublish(key)
+
+    def delete(self, key: str) -> None:
+        """从两级缓存删除值，并通知其他工作进程"""
+        self.l2.delete(key)
+        self.l1.delete(key)
+        self._publish(key)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """
+        删除 L2 中匹配模式的键，并清空所有工作进程的 L1
+
+        Returns:
+            删除的键数量
+        """
+        count = self.l2.delete_pattern(pattern)
+        self.l1.clear()
+        self._publish(None)
+        return count
+
+    def clear(self) -> None:
+        """清空两级缓存，并通知其他工作进程"""
+        self.l2.clear()
+        self.l1.clear()
+        self._publish(None)
+
+    def __len__(self) -> int:
+        return len(self.l2)
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典：l1_hits、l2_hits、misses、near_hit_rate（L1 命中占全部读取的比例）、
+            invalidations（收到的失效消息数）和 l1（L1 的统计信息）
+        """
+        with self._lock:
+            stats = {
+                "l1_hits": self._l1_hits,
+                "l2_hits": self._l2_hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["near_hit_rate"] = stats["l1_hits"] / lookups if lookups else 0.0
+        stats["l1"] = self.l1.get_stats()
+        return stats
+
+    def close(self) -> None:
+        """停止接收失效消息"""
+        _caches.discard(self)
+        if self.invalidator is not None:
+            self.invalidator.close()
+
+    def __enter__(self):
+        """支持上下文管理器"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """支持上下文管理器"""
+        self.close()
+
+    def _publish(self, key: Optional[str]) -> None:
+        if self.invalidator is None:
+            return
+        # key 为 None 表示清空 L1
+        self.invalidator.publish(json.dumps_bytes({"origin": self._origin, "key": key}))
+
+    async def _apublish(self, key: Optional[str]) -> None:
+        if self.invalidator is not None:
+            await run_sync(self._publish, key)
+
+    def _on_invalidate(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get("origin") == self._origin:
+            return
+        with self._lock:
+            self._invalidations += 1
+        key = message.get("key")
+        if key is None:
+            self.l1.clear()
+        else:
+            self.l1.delete(key)
+
+    def _after_fork(self):
+        """fork 出的子进程使用新的来源标识，重新订阅失效消息"""
+        self._origin = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        if not hasattr(self.invalidator, "_after_fork"):
+            # 无法重置的自定义失效通道只能依靠 L1 过期
+            return
+        self.invalidator._after_fork()
+        self.invalidator.subscribe(self._on_invalidate)
+
+
+# 订阅了失效通道的实例，fork 后在子进程中重新订阅
+_caches = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    for cache in list(_caches):
+        cache._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+__all__ = [
+    "RedisInvalidator",
+    "SocketInvalidator",
+    "TieredCache",
+]
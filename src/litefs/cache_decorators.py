@@ -4,17 +4,34 @@
 """
 增强的缓存装饰器
 
-提供灵活的缓存机制，支持函数缓存、响应缓存等
+提供灵活的缓存机制，支持函数缓存、响应缓存等。
+
+``cached`` 和 ``cache_response`` 防止缓存击穿：同一个键同一时刻只有一个调用方
+计算（single-flight），可以在过期后继续返回旧值并在后台刷新（stale-while-revalidate），
+也可以在过期前按概率提前刷新（XFetch）。缓存存储支持 ``add`` 时（如 RedisCache），
+还用锁键保证多个进程中只有一个在计算。
+
+进程内的缓存存储（MemoryCacheStore、MemoryCache）直接用参数组成的元组作为键，
+只有跨进程共享的缓存后端才序列化参数并计算摘要
 """
 
+import asyncio
 import hashlib
+import logging
+import math
 import pickle
+import random
 import threading
 import time
 from typing import Any, Callable, Optional, Dict, Union
 from functools import wraps
 from datetime import timedelta
 
+from .cache import MemoryCache
+from .utils.aio import acall, run_sync
+
+logger = logging.getLogger(__name__)
+
 
 class CacheEntry:
     """缓存条目"""
@@ -59,17 +76,19 @@ class MemoryCacheStore:
         Returns:
             缓存值，如果不存在或已过期则返回 None
         """
-        with self._lock:
-            entry = self._cache.get(key)
-            
-            if entry is None:
-                return None
-            
-            if entry.is_expired():
-                del self._cache[key]
-                return None
-            
-            return entry.value
+        # 字典读取在 GIL 下是原子的，命中时不加锁
+        entry = self._cache.get(key)
+        
+        if entry is None:
+            return None
+        
+        if entry.is_expired():
+            with self._lock:
+                if self._cache.get(key) is entry:
+                    del self._cache[key]
+            return None
+        
+        return entry.value
     
     def set(self, key: str, value: Any, ttl: int):
         """
@@ -88,6 +107,25 @@ class MemoryCacheStore:
             expires_at = time.time() + ttl
             self._cache[key] = CacheEntry(value, expires_at)
     
+    def add(self, key: str, value: Any, ttl: int) -> bool:
+        """
+        键不存在或已过期时设置值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒）
+
+        Returns:
+            是否设置成功
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and not entry.is_expired():
+                return False
+            self._cache[key] = CacheEntry(value, time.time() + ttl)
+            return True
+
     def delete(self, key: str):
         """
         删除缓存值
@@ -165,16 +203,17 @@ def _generate_cache_key(
         缓存键字符串
     """
     # 基础键：函数名
-    key_parts = [func.__module__, func.__name__]
+    key_parts = [func.__module__, func.__qualname__]
     
     # 添加前缀
     if key_prefix:
         key_parts.insert(0, key_prefix)
     
-    # 序列化参数
+    # 序列化参数：固定协议版本、关键字参数排序，不同进程和 Python 版本得到相同的键
     try:
-        args_hash = hashlib.md5(
-            pickle.dumps((args, kwargs))
+        args_hash = hashlib.blake2b(
+            pickle.dumps((args, sorted(kwargs.items())), protocol=_PICKLE_PROTOCOL),
+            digest_size=16
         ).hexdigest()
         key_parts.append(args_hash)
     except Exception:
@@ -184,78 +223,538 @@ def _generate_cache_key(
     return ':'.join(key_parts)
 
 
+# 分隔位置参数和关键字参数
+_KWD_MARK = object()
+
+
+def _make_local_key(token: Any, args: tuple, kwargs: dict) -> Optional[tuple]:
+    """
+    生成进程内缓存存储使用的键
+
+    直接由函数标识、参数和参数类型组成元组，1、1.0 和 True 是不同的键。
+    只有一个字符串参数时不附带类型
+
+    Args:
+        token: 函数标识
+        args: 位置参数
+        kwargs: 关键字参数
+
+    Returns:
+        缓存键，参数不可哈希时返回 None
+    """
+    if kwargs:
+        key = (token, *args, _KWD_MARK, *kwargs.items(), *map(type, args), *map(type, kwargs.values()))
+    elif len(args) == 1 and type(args[0]) is str:
+        return (token, args[0])
+    else:
+        key = (token, *args, *map(type, args))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+# 只在当前进程内使用的缓存存储，可以用任意可哈希对象作为键
+_LOCAL_STORES = (MemoryCacheStore, MemoryCache)
+
+
+def _function_key_builder(func: Callable, key_prefix: Optional[str], token: Any) -> Callable:
+    """
+    生成函数的缓存键函数
+
+    进程内存储使用 _make_local_key，参数不可哈希或跨进程共享的存储使用
+    _generate_cache_key。token 区分每次装饰，同名的函数（如工厂函数中定义的函数）
+    在进程内存储中不共享缓存
+    """
+    def make_key(store, args: tuple, kwargs: dict):
+        if isinstance(store, _LOCAL_STORES):
+            key = _make_local_key(token, args, kwargs)
+            if key is not None:
+                return key
+        return _generate_cache_key(func, args, kwargs, key_prefix)
+    return make_key
+
+
+class _Flight:
+    """一次正在进行的计算"""
+
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    合并对同一个键的并发计算
+
+    同一时刻只有一个调用方执行计算，其余调用方等待并共享它的结果（或异常）。
+    线程之间用 threading.Event 等待，在 gevent monkey patch 之后同样适用于 greenlet；
+    协程使用 ado/astart，在同一个事件循环内合并
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Any, _Flight] = {}
+        self._futures: Dict[Any, asyncio.Future] = {}
+        self._tasks = set()
+
+    def do(self, key: Any, func: Callable[[], Any]) -> Any:
+        """
+        执行 func，同一个键正在计算时等待其结果
+
+        Args:
+            key: 键
+            func: 无参数的计算函数
+
+        Returns:
+            func 的返回值
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if leader:
+            self._run(key, flight, func)
+        else:
+            flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def start(self, key: Any, func: Callable[[], Any]) -> bool:
+        """
+        在后台线程中执行 func
+
+        Returns:
+            是否启动；同一个键正在计算时不启动
+        """
+        with self._lock:
+            if key in self._flights:
+                return False
+            flight = self._flights[key] = _Flight()
+        threading.Thread(target=self._run, args=(key, flight, func), daemon=True).start()
+        return True
+
+    def _run(self, key, flight, func):
+        try:
+            flight.value = func()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+
+    async def ado(self, key: Any, func: Callable[[], Any]) -> Any:
+        """
+        执行协程函数 func，同一个键正在计算时等待其结果
+
+        Args:
+            key: 键
+            func: 无参数的协程函数
+
+        Returns:
+            func 的返回值
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            future = self._futures.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._futures[flight_key] = loop.create_future()
+        if not leader:
+            # 等待方被取消时不影响正在计算的调用方
+            return await asyncio.shield(future)
+
+        try:
+            value = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待方时不输出 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._futures[flight_key]
+
+    def astart(self, key: Any, func: Callable[[], Any]) -> bool:
+        """
+        在当前事件循环中创建任务执行协程函数 func
+
+        Returns:
+            是否启动；同一个键正在计算时不启动
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if (id(loop), key) in self._futures:
+                return False
+        task = loop.create_task(self.ado(key, func))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+
+# 装饰器共用，不同函数的缓存键不同，不会互相等待
+_single_flight = SingleFlight()
+
+_FRESH, _STALE, _MISS = range(3)
+
+# 等待其他进程计算时检查缓存的间隔（秒）
+_LOCK_POLL_INTERVAL = 0.05
+
+# 跨进程缓存键使用的 pickle 协议版本
+_PICKLE_PROTOCOL = 4
+
+# 记录的缓存键超过该数量时才清理已过期的记录
+_MIN_PRUNE_SIZE = 1024
+
+
+def _store_set(store, key: str, value: Any, ttl: float):
+    """写入 MemoryCacheStore（set）或 litefs.cache 中的缓存后端（put）"""
+    ttl = max(1, math.ceil(ttl))
+    if hasattr(store, 'set'):
+        store.set(key, value, ttl)
+    else:
+        store.put(key, value, ttl)
+
+
+async def _astore_set(store, key: str, value: Any, ttl: float):
+    """_store_set 的异步版本，缓存后端有 aput 时不阻塞事件循环"""
+    ttl = max(1, math.ceil(ttl))
+    if hasattr(store, 'set'):
+        store.set(key, value, ttl)
+    else:
+        await acall(store, 'put', key, value, ttl)
+
+
+class _CachePolicy:
+    """
+    缓存条目的过期、提前刷新和分布式锁
+
+    缓存中保存 {'value', 'expires', 'delta'}：expires 为逻辑过期时间戳，
+    delta 为上次计算耗时。存储中的过期时间为 ttl + stale_ttl，
+    逻辑过期后的 stale_ttl 秒内返回旧值并在后台刷新。
+
+    每个被装饰的函数有一个实例，同时记录写入过的键（到存储中过期为止）和命中次数，
+    用于 cache_clear 和 cache_info
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0, beta: float = 0, lock_timeout: float = 10):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.hits = 0
+        self.misses = 0
+        self._keys: Dict[Any, float] = {}
+        self._prune_at = _MIN_PRUNE_SIZE
+        self._lock = threading.Lock()
+
+    # 命中路径上不加锁，并发时统计值可能略小于实际次数
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+    def state(self, entry) -> int:
+        if not isinstance(entry, dict) or 'expires' not in entry:
+            return _MISS
+        now = time.time()
+        expires = entry['expires']
+        if now >= expires:
+            return _STALE if now < expires + self.stale_ttl else _MISS
+        # XFetch：计算越慢、越接近过期，越可能提前刷新
+        if self.beta and now - entry['delta'] * self.beta * math.log(1.0 - random.random()) >= expires:
+            return _STALE
+        return _FRESH
+
+    def save(self, store, key: Any, value: Any, delta: float):
+        now = time.time()
+        entry = {'value': value, 'expires': now + self.ttl, 'delta': delta}
+        _store_set(store, key, entry, self.ttl + self.stale_ttl)
+        self._record(key, now)
+
+    async def asave(self, store, key: Any, value: Any, delta: float):
+        now = time.time()
+        entry = {'value': value, 'expires': now + self.ttl, 'delta': delta}
+        await _astore_set(store, key, entry, self.ttl + self.stale_ttl)
+        self._record(key, now)
+
+    def _record(self, key: Any, now: float):
+        with self._lock:
+            self._keys[key] = now + self.ttl + self.stale_ttl
+            if len(self._keys) > self._prune_at:
+                self._keys = {k: v for k, v in self._keys.items() if v > now}
+                self._prune_at = max(_MIN_PRUNE_SIZE, 2 * len(self._keys))
+
+    def clear(self, store):
+        """删除写入过的全部键"""
+        with self._lock:
+            keys, self._keys = self._keys, {}
+            self._prune_at = _MIN_PRUNE_SIZE
+            self.hits = self.misses = 0
+        for key in keys:
+            store.delete(key)
+
+    def info(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': sum(1 for expires in self._keys.values() if expires > now),
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+            }
+
+    def acquire(self, store, key: str) -> Optional[bool]:
+        """
+        获取分布式锁
+
+        Returns:
+            是否获取成功；存储不支持 add 或是进程内存储（键不是字符串）时返回 None
+        """
+        add = getattr(store, 'add', None)
+        if add is None or not isinstance(key, str):
+            return None
+        return bool(add(key + ':lock', 1, max(1, math.ceil(self.lock_timeout))))
+
+    def release(self, store, key: str):
+        store.delete(key + ':lock')
+
+    async def aacquire(self, store, key: str) -> Optional[bool]:
+        """acquire 的异步版本，缓存后端的 add 在线程池中执行"""
+        if getattr(store, 'add', None) is None or not isinstance(key, str):
+            return None
+        return await run_sync(self.acquire, store, key)
+
+    async def arelease(self, store, key: str):
+        await acall(store, 'delete', key + ':lock')
+
+
+def _get_or_compute(store, key: Any, policy: _CachePolicy, compute: Callable[[], Any]) -> Any:
+    entry = store.get(key)
+    state = policy.state(entry)
+    if state == _FRESH:
+        policy.hit()
+        return entry['value']
+    if state == _STALE:
+        policy.hit()
+        _single_flight.start(key, lambda: _refresh(store, key, policy, compute))
+        return entry['value']
+    policy.miss()
+    return _single_flight.do(key, lambda: _load(store, key, policy, compute))
+
+
+def _load(store, key: Any, policy: _CachePolicy, compute: Callable[[], Any]) -> Any:
+    # 等待锁期间其他线程可能已经写入
+    entry = store.get(key)
+    if policy.state(entry) != _MISS:
+        return entry['value']
+
+    acquired = policy.acquire(store, key)
+    if acquired is False:
+        # 其他进程正在计算，等待它写入结果，超时后自己计算
+        deadline = time.time() + policy.lock_timeout
+        while time.time() < deadline:
+            time.sleep(_LOCK_POLL_INTERVAL)
+            entry = store.get(key)
+            if policy.state(entry) != _MISS:
+                return entry['value']
+    try:
+        start = time.time()
+        value = compute()
+        policy.save(store, key, value, time.time() - start)
+        return value
+    finally:
+        if acquired:
+            policy.release(store, key)
+
+
+def _refresh(store, key: Any, policy: _CachePolicy, compute: Callable[[], Any]):
+    acquired = policy.acquire(store, key)
+    if acquired is False:
+        # 其他进程正在刷新
+        return
+    try:
+        start = time.time()
+        value = compute()
+        policy.save(store, key, value, time.time() - start)
+    except Exception:
+        logger.exception('后台刷新缓存失败: %s', key)
+    finally:
+        if acquired:
+            policy.release(store, key)
+
+
+async def _aget_or_compute(store, key: Any, policy: _CachePolicy, compute: Callable[[], Any]) -> Any:
+    # 缓存后端有异步接口时使用异步接口，避免读取 Redis、SQLite 时阻塞事件循环
+    entry = await acall(store, 'get', key)
+    state = policy.state(entry)
+    if state == _FRESH:
+        policy.hit()
+        return entry['value']
+    if state == _STALE:
+        policy.hit()
+        _single_flight.astart(key, lambda: _arefresh(store, key, policy, compute))
+        return entry['value']
+    policy.miss()
+    return await _single_flight.ado(key, lambda: _aload(store, key, policy, compute))
+
+
+async def _aload(store, key: Any, policy: _CachePolicy, compute: Callable[[], Any]) -> Any:
+    entry = await acall(store, 'get', key)
+    if policy.state(entry) != _MISS:
+        return entry['value']
+
+    acquired = await policy.aacquire(store, key)
+    if acquired is False:
+        deadline = time.time() + policy.lock_timeout
+        while time.time() < deadline:
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            entry = await acall(store, 'get', key)
+            if policy.state(entry) != _MISS:
+                return entry['value']
+    try:
+        start = time.time()
+        value = await compute()
+        await policy.asave(store, key, value, time.time() - start)
+        return value
+    finally:
+        if acquired:
+            await policy.arelease(store, key)
+
+
+async def _arefresh(store, key: Any, policy: _CachePolicy, compute: Callable[[], Any]):
+    acquired = await policy.aacquire(store, key)
+    if acquired is False:
+        return
+    try:
+        start = time.time()
+        value = await compute()
+        await policy.asave(store, key, value, time.time() - start)
+    except Exception:
+        logger.exception('后台刷新缓存失败: %s', key)
+    finally:
+        if acquired:
+            await policy.arelease(store, key)
+
+
+def _wrap(func: Callable, make_key: Callable, get_store: Callable, policy: _CachePolicy,
+          skip_cache_func: Optional[Callable] = None) -> Callable:
+    """
+    生成同步或协程版本的缓存包装函数
+
+    make_key(store, args, kwargs) 生成缓存键。包装函数带有 cache_clear（删除该函数
+    写入过的全部缓存）和 cache_info（返回命中次数等统计信息）
+    """
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if skip_cache_func and skip_cache_func(*args, **kwargs):
+                return await func(*args, **kwargs)
+            store = get_store()
+            return await _aget_or_compute(
+                store, make_key(store, args, kwargs), policy, lambda: func(*args, **kwargs)
+            )
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if skip_cache_func and skip_cache_func(*args, **kwargs):
+                return func(*args, **kwargs)
+            store = get_store()
+            return _get_or_compute(
+                store, make_key(store, args, kwargs), policy, lambda: func(*args, **kwargs)
+            )
+
+    wrapper.cache_clear = lambda: policy.clear(get_store())
+    wrapper.cache_info = policy.info
+    return wrapper
+
+
 def cached(
     ttl: int = 300,
     key_prefix: Optional[str] = None,
     cache_store: Optional[MemoryCacheStore] = None,
-    skip_cache_func: Optional[Callable] = None
+    skip_cache_func: Optional[Callable] = None,
+    stale_ttl: int = 0,
+    beta: float = 0,
+    lock_timeout: float = 10
 ):
     """
     函数缓存装饰器
+
+    支持普通函数和协程函数。同一个键同一时刻只有一个调用方计算，其余调用方等待其结果
     
     Args:
         ttl: 缓存过期时间（秒）
         key_prefix: 缓存键前缀
-        cache_store: 缓存存储实例
+        cache_store: 缓存存储实例，也可以是 litefs.cache 中的缓存后端（如 RedisCache）
         skip_cache_func: 判断是否跳过缓存的函数
+        stale_ttl: 过期后继续返回旧值的时间（秒），期间在后台刷新，0 表示不返回旧值
+        beta: XFetch 提前刷新系数，越大越早刷新，0 表示不提前刷新，通常取 1
+        lock_timeout: 其他进程正在计算时最多等待的时间（秒），也是锁键的过期时间，
+            仅在缓存存储支持 add 时使用
         
     Returns:
-        装饰器函数
+        装饰器函数。被装饰的函数带有 cache_clear() 和 cache_info()
         
     使用示例:
         @cached(ttl=60, key_prefix='user')
         def get_user(user_id):
             return db.query(User).get(user_id)
+
+        @cached(ttl=60, stale_ttl=30, beta=1, cache_store=redis_cache)
+        def get_ranking():
+            return db.query(...).all()
     """
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # 检查是否跳过缓存
-            if skip_cache_func and skip_cache_func(*args, **kwargs):
-                return func(*args, **kwargs)
-            
-            # 获取缓存存储
-            store = cache_store or get_cache_store()
-            
-            # 生成缓存键
-            cache_key = _generate_cache_key(func, args, kwargs, key_prefix)
-            
-            # 尝试从缓存获取
-            cached_value = store.get(cache_key)
-            if cached_value is not None:
-                return cached_value
-            
-            # 执行函数
-            result = func(*args, **kwargs)
-            
-            # 存入缓存
-            store.set(cache_key, result, ttl)
-            
-            return result
-        
-        # 添加缓存控制方法
-        wrapper.cache_clear = lambda: (store or get_cache_store()).delete(
-            _generate_cache_key(func, (), {}, key_prefix)
+        policy = _CachePolicy(ttl, stale_ttl, beta, lock_timeout)
+        return _wrap(
+            func,
+            _function_key_builder(func, key_prefix, policy),
+            lambda: cache_store if cache_store is not None else get_cache_store(),
+            policy,
+            skip_cache_func,
         )
-        
-        return wrapper
     return decorator
 
 
 def cache_response(
     ttl: int = 300,
     vary_on: Optional[list] = None,
-    key_prefix: str = 'response'
+    key_prefix: str = 'response',
+    cache_store: Optional[MemoryCacheStore] = None,
+    stale_ttl: int = 0,
+    beta: float = 0,
+    lock_timeout: float = 10
 ):
     """
     响应缓存装饰器
     
-    用于缓存视图函数的响应
+    用于缓存视图函数的响应，防止缓存击穿的参数与 cached 相同
     
     Args:
         ttl: 缓存过期时间（秒）
         vary_on: 响应变化的请求头列表
         key_prefix: 缓存键前缀
+        cache_store: 缓存存储实例
+        stale_ttl: 过期后继续返回旧值的时间（秒）
+        beta: XFetch 提前刷新系数
+        lock_timeout: 其他进程正在计算时最多等待的时间（秒）
         
     Returns:
         装饰器函数
@@ -265,40 +764,25 @@ def cache_response(
         def api_endpoint(request):
             return {'data': 'value'}
     """
-    def decorator(func):
-        @wraps(func)
-        def wrapper(request_handler, *args, **kwargs):
-            store = get_cache_store()
-            
-            # 生成缓存键
-            cache_key_parts = [
-                key_prefix,
-                request_handler.environ.get('PATH_INFO', '/'),
-                request_handler.environ.get('REQUEST_METHOD', 'GET')
-            ]
-            
-            # 添加变化的请求头
-            if vary_on:
-                for header in vary_on:
-                    header_value = request_handler.environ.get(f'HTTP_{header.upper().replace("-", "_")}', '')
-                    cache_key_parts.append(f"{header}={header_value}")
-            
-            cache_key = ':'.join(cache_key_parts)
-            
-            # 尝试从缓存获取
-            cached_response = store.get(cache_key)
-            if cached_response is not None:
-                return cached_response
-            
-            # 执行函数
-            response = func(request_handler, *args, **kwargs)
-            
-            # 存入缓存
-            store.set(cache_key, response, ttl)
-            
-            return response
+    def make_key(store, args, kwargs):
+        request_handler = args[0]
+        cache_key_parts = [
+            key_prefix,
+            request_handler.environ.get('PATH_INFO', '/'),
+            request_handler.environ.get('REQUEST_METHOD', 'GET')
+        ]
         
-        return wrapper
+        # 添加变化的请求头
+        if vary_on:
+            for header in vary_on:
+                header_value = request_handler.environ.get(f'HTTP_{header.upper().replace("-", "_")}', '')
+                cache_key_parts.append(f"{header}={header_value}")
+        
+        return ':'.join(cache_key_parts)
+
+    def decorator(func):
+        policy = _CachePolicy(ttl, stale_ttl, beta, lock_timeout)
+        return _wrap(func, make_key, lambda: cache_store if cache_store is not None else get_cache_store(), policy)
     return decorator
 
 
@@ -321,18 +805,22 @@ def cache_method(ttl: int = 300):
                 return db.query(User).get(user_id)
     """
     def decorator(method):
+        token = f'{method.__name__}:{method.__module__}:{method.__qualname__}'
+
         @wraps(method)
         def wrapper(self, *args, **kwargs):
             # 获取缓存存储
             store = get_cache_store()
             
             # 生成缓存键（包含 self）
-            cache_key = _generate_cache_key(
-                method,
-                (id(self),) + args,
-                kwargs,
-                key_prefix=method.__name__
-            )
+            cache_key = _make_local_key(token, (id(self),) + args, kwargs)
+            if cache_key is None:
+                cache_key = _generate_cache_key(
+                    method,
+                    (id(self),) + args,
+                    kwargs,
+                    key_prefix=method.__name__
+                )
             
             # 尝试从缓存获取
             cached_value = store.get(cache_key)
@@ -379,6 +379,34 @@ def routes():
         sys.exit(1)
 
 
+def compress_static(directory: str, encodings: str = 'br,zstd,gzip', min_size: int = 1024, force: bool = False):
+    """
+    为静态目录生成 .br/.zst/.gz 预压缩文件
+    
+    Args:
+        directory: 静态文件目录
+        encodings: 逗号分隔的编码名
+        min_size: 最小压缩大小（字节）
+        force: 重新生成已是最新的预压缩文件
+    """
+    from litefs.static_compress import available_encodings, compress_directory
+    
+    if not os.path.isdir(directory):
+        print(f"错误: 目录 '{directory}' 不存在")
+        sys.exit(1)
+    
+    requested = tuple(e.strip() for e in encodings.split(',') if e.strip())
+    available = available_encodings(requested)
+    for encoding in requested:
+        if encoding not in available:
+            print(f"跳过 {encoding}: 未安装对应的压缩库")
+    
+    stats = compress_directory(directory, available, min_size=min_size, force=force)
+    print(f"处理 {stats['files']} 个文件，原始大小 {stats['original']} 字节")
+    for encoding, size in stats['compressed'].items():
+        print(f"  {encoding:5} 新生成 {size} 字节")
+
+
 def version():
     """显示版本信息"""
     try:
@@ -405,6 +433,7 @@ def main():
         db_init,
         db_migrate,
         routes,
+        compress_static,
         version
     ])
     parser.dispatch()
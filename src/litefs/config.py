@@ -31,16 +31,26 @@ class Config:
         'listen': 1024,                   # 最大监听连接数
         'max_request_size': 10485760,     # 最大请求大小（10MB）
         'max_upload_size': 52428800,      # 最大上传大小（50MB）
+        'upload_spool_size': 1048576,     # 上传文件超过该大小（1MB）后转存到临时文件
         'config_file': None,              # 配置文件路径
         'error_pages_dir': None,          # 错误页面目录
         'config_env': None,               # 环境名称（如 development, production）
         'default_page': 'index,index.html', # 默认页面
+        'json_backend': 'auto',           # JSON 实现（auto, orjson, ujson, json）
+        'template_dir': 'templates',      # 模板目录
+        'template_module_dir': None,      # Mako 编译模块目录，多个工作进程共用
+        'precompile_templates': False,    # 启动时预编译全部模板
+        'template_cache_timeout': 300,    # 模板片段和页面缓存的默认过期时间（秒）
         
         # 缓存配置
-        'cache_backend': 'tree',          # 缓存后端类型（memory, tree, redis, database, memcache）
+        'cache_backend': 'tree',          # 缓存后端类型（memory, tree, redis, database, memcache, tiered, shm）
         'cache_max_size': 10000,          # 内存缓存最大容量
+        'cache_max_bytes': 0,             # 内存缓存值的最大总字节数，0 表示不限制
         'cache_clean_period': 60,         # 缓存清理周期（秒）
         'cache_expiration_time': 3600,    # 缓存过期时间（秒）
+        'cache_serializer': 'json',       # Redis/Memcache 缓存值的序列化方式（json, pickle, msgpack）
+        'cache_compression': None,        # Redis/Memcache 缓存值的压缩算法（None, zlib, lz4, zstd）
+        'cache_compress_threshold': 1024, # 序列化后达到该字节数才压缩
         'file_cache_clean_period': 60,    # 文件缓存清理周期（秒）
         'file_cache_expiration_time': 3600, # 文件缓存过期时间（秒）
         
@@ -65,6 +75,8 @@ class Config:
         'database_url': None,             # 数据库连接 URL
         'database_session_table': 'sessions', # 会话表名
         'database_cache_table': 'cache',  # 缓存表名
+        'database_write_behind': True,    # SQLite 缓存和会话后端是否在后台批量写入
+        'database_flush_interval': 0.05,  # 批量写入最多等待的时间（秒）
         'database_pool_size': 10,         # 连接池大小
         'database_max_overflow': 20,      # 连接池最大溢出数
         'database_pool_timeout': 30,      # 连接池超时时间（秒）
@@ -201,7 +213,7 @@ class Config:
         验证配置的有效性
         """
         # 验证缓存后端
-        valid_cache_backends = ['memory', 'tree', 'redis', 'database', 'memcache']
+        valid_cache_backends = ['memory', 'tree', 'redis', 'database', 'memcache', 'tiered', 'shm']
         if self._config.get('cache_backend') not in valid_cache_backends:
             raise ValueError(f"无效的缓存后端: {self._config.get('cache_backend')}")
         
@@ -215,6 +227,17 @@ class Config:
         if self._config.get('session_same_site') not in valid_same_site:
             raise ValueError(f"无效的 SameSite 策略: {self._config.get('session_same_site')}")
         
+        # 验证缓存值的序列化方式和压缩算法
+        if self._config.get('cache_serializer') not in ['json', 'pickle', 'msgpack']:
+            raise ValueError(f"无效的缓存序列化方式: {self._config.get('cache_serializer')}")
+        if self._config.get('cache_compression') not in [None, 'zlib', 'lz4', 'zstd']:
+            raise ValueError(f"无效的缓存压缩算法: {self._config.get('cache_compression')}")
+        
+        # 验证 JSON 实现
+        valid_json_backends = ['auto', 'orjson', 'ujson', 'json']
+        if self._config.get('json_backend') not in valid_json_backends:
+            raise ValueError(f"无效的 JSON 后端: {self._config.get('json_backend')}")
+
         # 验证端口
         port = self._config.get('port')
         if not isinstance(port, int) or port < 1 or port > 65535:
@@ -8,7 +8,7 @@ import socket
 import time
 from datetime import datetime
 from posixpath import abspath as path_abspath
-from typing import Dict, List, Optional, Callable, Any, Union, Iterable, Type, TypeVar, Tuple, cast
+from typing import Dict, List, Optional, Callable, Any, Union, Type, TypeVar, Tuple, cast
 
 from watchdog.observers import Observer
 
@@ -23,9 +23,14 @@ from .cache import (
 from .config import Config, load_config
 from .database import DatabaseManager
 from .error_pages import ErrorPageRenderer
+from . import json
 from .handlers import RequestHandler, WSGIRequestHandler, ASGIRequestHandler
+from .handlers.response import Response
+from .handlers.response_encoder import encode_response
 from .middleware import MiddlewareManager
 from .routing import Router
+from .template_cache import TemplateCache
+from .template_engine import TemplateEngine
 from .server import (
     DEFAULT_BUFFER_SIZE,
     BufferedRWPair,
@@ -110,6 +115,9 @@ class Litefs(object):
         
         self.host: str = config.host
         self.port: int = config.port
+
+        # JSON 实现是进程级的，缓存、会话等没有应用引用的模块同样生效
+        json.set_backend(getattr(config, 'json_backend', 'auto'))
         self.server: Optional[Union[HTTPServer, ProcessHTTPServer]] = None
 
         # 使用全局 Session 管理器，确保 Session 对象常驻内存
@@ -133,6 +141,8 @@ class Litefs(object):
                 "db_path": getattr(config, "database_path", ":memory:"),
                 "table_name": getattr(config, "database_session_table", "sessions"),
                 "expiration_time": getattr(config, "session_expiration_time", 3600),
+                "write_behind": getattr(config, "database_write_behind", True),
+                "flush_interval": getattr(config, "database_flush_interval", 0.05),
             }
         elif session_backend == SessionBackend.MEMCACHE:
             session_config = {
@@ -154,6 +164,7 @@ class Litefs(object):
             backend=getattr(config, 'cache_backend', CacheBackend.TREE),
             cache_key='app_cache',
             max_size=getattr(config, 'cache_max_size', 10000),
+            max_bytes=getattr(config, 'cache_max_bytes', 0) or None,
             clean_period=getattr(config, 'cache_clean_period', 60),
             expiration_time=getattr(config, 'cache_expiration_time', 3600),
         )
@@ -166,6 +177,9 @@ class Litefs(object):
         
         error_pages_dir = getattr(config, "error_pages_dir", None)
         self.error_page_renderer = ErrorPageRenderer(error_pages_dir)
+
+        # 模板引擎在首次渲染时创建，整个应用共用
+        self._template_engine = None
         
         # 初始化路由管理器
         self.router = Router()
@@ -189,6 +203,47 @@ class Litefs(object):
             from .debug.middleware import DebugMiddleware
             self.add_middleware(DebugMiddleware)
 
+    @property
+    def templates(self) -> TemplateEngine:
+        """
+        应用级 Mako 模板引擎
+
+        由 template_dir 和 template_module_dir 配置创建，所有请求共用。
+        片段和页面缓存存入 app.caches，通过 app.templates.cache.invalidate_tags 失效
+        """
+        if self._template_engine is None:
+            config = self.config
+            cache = TemplateCache(
+                self.caches,
+                default_timeout=getattr(config, 'template_cache_timeout', 300),
+            )
+            self._template_engine = TemplateEngine(
+                [getattr(config, 'template_dir', 'templates')],
+                module_directory=getattr(config, 'template_module_dir', None),
+                debug=config.debug,
+                cache=cache,
+            )
+        return self._template_engine
+
+    def precompile_templates(self) -> int:
+        """
+        预编译模板目录下的全部模板
+
+        precompile_templates 配置为 True 时在启动服务器或创建
+        WSGI/ASGI application 时自动调用；使用 gunicorn --preload 等方式时，
+        在 fork 工作进程前调用可以让工作进程直接共用编译结果
+
+        Returns:
+            编译的模板数量
+        """
+        count = self.templates.precompile()
+        log_info(self.logger, "Precompiled %d templates" % count)
+        return count
+
+    def _maybe_precompile_templates(self):
+        if getattr(self.config, 'precompile_templates', False):
+            self.precompile_templates()
+
     def database(self, name: str = 'default') -> Any:
         """
         获取数据库实例
@@ -260,6 +315,7 @@ class Litefs(object):
         在 uWSGI 中使用:
             uwsgi --http :8000 --wsgi-file wsgi_example.py
         """
+        self._maybe_precompile_templates()
 
         def application(environ, start_response):
             """
@@ -272,158 +328,26 @@ class Litefs(object):
             Returns:
                 可迭代的 bytes
             """
+            request_handler = None
+            middlewares = self._get_middleware_instances()
             try:
-                request_handler = WSGIRequestHandler(self, environ)
-
-                middleware_result = self.middleware_manager.process_request(request_handler)
-                if middleware_result is not None:
-                    if isinstance(middleware_result, (list, tuple)) and len(middleware_result) == 3:
-                        status, headers, content = middleware_result
-                        start_response(status, headers)
-                    else:
-                        content = middleware_result
-                        if isinstance(content, (dict, list, tuple)):
-                            status, headers = "200 OK", [("Content-Type", "application/json; charset=utf-8")]
-                        elif isinstance(content, str) and content.startswith('<'):
-                            status, headers = "200 OK", [("Content-Type", "text/html; charset=utf-8")]
-                        elif isinstance(content, bytes):
-                            status, headers = "200 OK", [("Content-Type", "application/octet-stream")]
-                        else:
-                            status, headers = "200 OK", [("Content-Type", "text/html; charset=utf-8")]
-                        start_response(status, headers)
-
-                    if isinstance(content, (str, bytes, dict, list, tuple, type(None))):
-                        if isinstance(content, str):
-                            return [content.encode("utf-8")]
-                        elif isinstance(content, bytes):
-                            return [content]
-                        elif isinstance(content, dict):
-                            import json
-
-                            content = json.dumps(content, ensure_ascii=False)
-                            return [content.encode("utf-8")]
-                        elif isinstance(content, (list, tuple)):
-                            import json
-
-                            content = json.dumps(content, ensure_ascii=False, default=str)
-                            return [content.encode("utf-8")]
-                        else:
-                            return [b""]
-                    else:
-                        return [str(content).encode("utf-8")]
-
-                handler_result = request_handler.handler()
-
-                if (
-                    isinstance(handler_result, (list, tuple))
-                    and len(handler_result) == 3
-                    and isinstance(handler_result[0], str)
-                    and isinstance(handler_result[1], list)
-                ):
-                    status, headers, content = handler_result
-                    start_response(status, headers)
-                else:
-                    content = handler_result
-                    if isinstance(content, (dict, list, tuple)):
-                        status, headers = "200 OK", [("Content-Type", "application/json; charset=utf-8")]
-                    elif isinstance(content, str) and content.startswith('<'):
-                        status, headers = "200 OK", [("Content-Type", "text/html; charset=utf-8")]
-                    elif isinstance(content, bytes):
-                        status, headers = "200 OK", [("Content-Type", "application/octet-stream")]
-                    else:
-                        status, headers = "200 OK", [("Content-Type", "text/html; charset=utf-8")]
-                    start_response(status, headers)
-
-                headers_dict = dict(headers)
-                content_type = headers_dict.get("Content-Type", "")
-                is_json = "application/json" in content_type
-
-                from collections.abc import Iterable
-
-                if not isinstance(
-                    content, (str, bytes, dict, list, tuple, type(None))
-                ) and isinstance(content, Iterable):
-
-                    def content_generator():
-                        for item in content:
-                            if isinstance(item, str):
-                                yield item.encode("utf-8")
-                            elif isinstance(item, bytes):
-                                yield item
-                            else:
-                                yield str(item).encode("utf-8")
-
-                    return content_generator()
-                elif isinstance(content, dict):
-                    import json
-
-                    content = json.dumps(content, ensure_ascii=False)
-                    return [content.encode("utf-8")]
-                elif isinstance(content, (list, tuple)):
-                    if is_json:
-                        import json
-
-                        content = json.dumps(content, ensure_ascii=False, default=str)
-                        return [content.encode("utf-8")]
-                    else:
-                        result = []
-                        for item in content:
-                            if isinstance(item, str):
-                                result.append(item.encode("utf-8"))
-                            elif isinstance(item, bytes):
-                                result.append(item)
-                            else:
-                                result.append(str(item).encode("utf-8"))
-                        return result
-                elif isinstance(content, str):
-                    if is_json:
-                        import json
-
-                        content = json.dumps(content, ensure_ascii=False)
-                        return [content.encode("utf-8")]
-                    return [content.encode("utf-8")]
-                elif isinstance(content, bytes):
-                    return [content]
-                else:
-                    return [str(content).encode("utf-8")]
+                # 响应缓存等中间件可以在加载会话、匹配路由之前直接返回
+                result = self.middleware_manager.process_environ(middlewares, environ)
+                if result is None:
+                    request_handler = WSGIRequestHandler(self, environ)
+                    result = request_handler.handler()
             except Exception as e:
-                middleware_result = self.middleware_manager.process_exception(request_handler, e)
-                if middleware_result is not None:
-                    if isinstance(middleware_result, (list, tuple)) and len(middleware_result) == 3:
-                        status, headers, content = middleware_result
-                        start_response(status, headers)
-                    else:
-                        content = middleware_result
-                        if isinstance(content, (dict, list, tuple)):
-                            status, headers = "200 OK", [("Content-Type", "application/json; charset=utf-8")]
-                        elif isinstance(content, str) and content.startswith('<'):
-                            status, headers = "200 OK", [("Content-Type", "text/html; charset=utf-8")]
-                        elif isinstance(content, bytes):
-                            status, headers = "200 OK", [("Content-Type", "application/octet-stream")]
-                        else:
-                            status, headers = "200 OK", [("Content-Type", "text/html; charset=utf-8")]
-                        start_response(status, headers)
-
-                    if isinstance(content, str):
-                        return [content.encode("utf-8")]
-                    elif isinstance(content, bytes):
-                        return [content]
-                    else:
-                        return [str(content).encode("utf-8")]
-
-                from .exceptions import HttpError
-
-                if isinstance(e, HttpError):
-                    status = f"{e.status_code} {e.message}"
-                    headers = [("Content-Type", "text/html; charset=utf-8")]
-                    start_response(status, headers)
-                    return [e.message.encode("utf-8")]
-                else:
-                    log_error(self.logger, str(e))
-                    status = "500 Internal Server Error"
-                    headers = [("Content-Type", "text/html; charset=utf-8")]
-                    start_response(status, headers)
-                    return [b"500 Internal Server Error"]
+                result = None
+                if request_handler is not None:
+                    result = self.middleware_manager.process_exception(request_handler, e)
+                if result is None:
+                    result = self._error_result(e, "text/html; charset=utf-8")
+
+            response = self.middleware_manager.process_encoded_response(
+                middlewares, environ, encode_response(result)
+            )
+            start_response(response.status, response.headers.to_list())
+            return response.body
 
         return application
 
@@ -442,6 +366,7 @@ class Litefs(object):
         在 daphne 中使用:
             daphne asgi_example:application
         """
+        self._maybe_precompile_templates()
 
         async def application(scope, receive, send):
             """
@@ -457,257 +382,68 @@ class Litefs(object):
                 return
 
             request_handler = None
+            middlewares = self._get_middleware_instances()
             try:
                 request_handler = ASGIRequestHandler(self, scope, receive, send)
-
-                middleware_result = self.middleware_manager.process_request(request_handler)
-                if middleware_result is not None:
-                    if isinstance(middleware_result, (list, tuple)) and len(middleware_result) == 3:
-                        status, headers, content = middleware_result
-                    else:
-                        content = middleware_result
-                        status, headers = "200 OK", [("Content-Type", "text/plain; charset=utf-8")]
-
-                    # 解析状态码
-                    status_code = int(status.split()[0])
-                    
-                    # 转换 headers 为 ASGI 格式（移除 Content-Length，由 ASGI 服务器处理）
-                    asgi_headers = []
-                    for k, v in headers:
-                        if k.lower() != 'content-length':
-                            asgi_headers.append((k.encode('utf-8'), v.encode('utf-8')))
-                    
-                    # 处理 content
-                    if isinstance(content, (str, bytes, dict, list, tuple, type(None))):
-                        if isinstance(content, str):
-                            content_bytes = content.encode("utf-8")
-                        elif isinstance(content, bytes):
-                            content_bytes = content
-                        elif isinstance(content, dict):
-                            import json
-                            content_bytes = json.dumps(content, ensure_ascii=False).encode("utf-8")
-                        elif isinstance(content, (list, tuple)):
-                            import json
-                            content_bytes = json.dumps(content, ensure_ascii=False, default=str).encode("utf-8")
-                        else:
-                            content_bytes = b""
-                        
-                        # 发送响应
-                        await send({
-                            'type': 'http.response.start',
-                            'status': status_code,
-                            'headers': asgi_headers,
-                        })
-                        await send({
-                            'type': 'http.response.body',
-                            'body': content_bytes,
-                        })
-                    else:
-                        # 处理可迭代对象
-                        await send({
-                            'type': 'http.response.start',
-                            'status': status_code,
-                            'headers': asgi_headers,
-                        })
-                        
-                        from collections.abc import Iterable
-                        if isinstance(content, Iterable):
-                            for item in content:
-                                if isinstance(item, str):
-                                    await send({
-                                        'type': 'http.response.body',
-                                        'body': item.encode("utf-8"),
-                                        'more_body': True,
-                                    })
-                                elif isinstance(item, bytes):
-                                    await send({
-                                        'type': 'http.response.body',
-                                        'body': item,
-                                        'more_body': True,
-                                    })
-                                else:
-                                    await send({
-                                        'type': 'http.response.body',
-                                        'body': str(item).encode("utf-8"),
-                                        'more_body': True,
-                                    })
-                        
-                        # 发送结束消息
-                        await send({
-                            'type': 'http.response.body',
-                            'body': b'',
-                        })
-
-                handler_result = await request_handler.handler()
-
-                if (
-                    isinstance(handler_result, (list, tuple))
-                    and len(handler_result) == 3
-                    and isinstance(handler_result[0], str)
-                    and isinstance(handler_result[1], list)
-                ):
-                    status, headers, content = handler_result
-                else:
-                    content = handler_result
-                    status, headers = "200 OK", [("Content-Type", "text/plain; charset=utf-8")]
-
-                # 解析状态码
-                status_code = int(status.split()[0])
-                
-                # 转换 headers 为 ASGI 格式（移除 Content-Length，由 ASGI 服务器处理）
-                asgi_headers = []
-                for k, v in headers:
-                    if k.lower() != 'content-length':
-                        asgi_headers.append((k.encode('utf-8'), v.encode('utf-8')))
-                
-                # 处理 content
-                from collections.abc import Iterable
-                if not isinstance(
-                    content, (str, bytes, dict, list, tuple, type(None))
-                ) and isinstance(content, Iterable):
-                    # 流式响应
-                    await send({
-                        'type': 'http.response.start',
-                        'status': status_code,
-                        'headers': asgi_headers,
-                    })
-                    
-                    for item in content:
-                        if isinstance(item, str):
-                            await send({
-                                'type': 'http.response.body',
-                                'body': item.encode("utf-8"),
-                                'more_body': True,
-                            })
-                        elif isinstance(item, bytes):
-                            await send({
-                                'type': 'http.response.body',
-                                'body': item,
-                                'more_body': True,
-                            })
-                        else:
-                            await send({
-                                'type': 'http.response.body',
-                                'body': str(item).encode("utf-8"),
-                                'more_body': True,
-                            })
-                    
-                    # 发送结束消息
-                    await send({
-                        'type': 'http.response.body',
-                        'body': b'',
-                    })
-                else:
-                    # 普通响应
-                    if isinstance(content, dict):
-                        import json
-                        content_bytes = json.dumps(content, ensure_ascii=False).encode("utf-8")
-                    elif isinstance(content, (list, tuple)):
-                        headers_dict = dict(headers)
-                        content_type = headers_dict.get("Content-Type", "")
-                        is_json = "application/json" in content_type
-                        if is_json:
-                            import json
-                            content_bytes = json.dumps(content, ensure_ascii=False, default=str).encode("utf-8")
-                        else:
-                            result = []
-                            for item in content:
-                                if isinstance(item, str):
-                                    result.append(item.encode("utf-8"))
-                                elif isinstance(item, bytes):
-                                    result.append(item)
-                                else:
-                                    result.append(str(item).encode("utf-8"))
-                            content_bytes = b''.join(result)
-                    elif isinstance(content, str):
-                        headers_dict = dict(headers)
-                        content_type = headers_dict.get("Content-Type", "")
-                        is_json = "application/json" in content_type
-                        if is_json:
-                            import json
-                            content_bytes = json.dumps(content, ensure_ascii=False).encode("utf-8")
-                        else:
-                            content_bytes = content.encode("utf-8")
-                    elif isinstance(content, bytes):
-                        content_bytes = content
-                    else:
-                        content_bytes = str(content).encode("utf-8")
-                    
-                    # 发送响应
-                    await send({
-                        'type': 'http.response.start',
-                        'status': status_code,
-                        'headers': asgi_headers,
-                    })
+                # 响应缓存等中间件可以在读取请求体、加载会话、匹配路由之前直接返回
+                result = self.middleware_manager.process_environ(middlewares, request_handler.environ)
+                if result is None:
+                    result = await request_handler.handler()
+            except Exception as e:
+                result = None
+                if request_handler is not None:
+                    result = self.middleware_manager.process_exception(request_handler, e)
+                if result is None:
+                    result = self._error_result(e, "text/plain; charset=utf-8")
+
+            response = encode_response(result)
+            if request_handler is not None:
+                response = self.middleware_manager.process_encoded_response(
+                    middlewares, request_handler.environ, response
+                )
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': response.headers.encode_asgi(),
+            })
+            if response.length is None:
+                # 流式响应逐块发送
+                for chunk in response.body:
                     await send({
                         'type': 'http.response.body',
-                        'body': content_bytes,
+                        'body': chunk,
+                        'more_body': True,
                     })
-            except Exception as e:
-                # 确保 request_handler 存在
-                if request_handler:
-                    middleware_result = self.middleware_manager.process_exception(request_handler, e)
-                    if middleware_result is not None:
-                        if isinstance(middleware_result, (list, tuple)) and len(middleware_result) == 3:
-                            status, headers, content = middleware_result
-                        else:
-                            content = middleware_result
-                            status, headers = "200 OK", [("Content-Type", "text/plain; charset=utf-8")]
-
-                        # 解析状态码
-                        status_code = int(status.split()[0])
-                        
-                        # 转换 headers 为 ASGI 格式（移除 Content-Length）
-                        asgi_headers = []
-                        for k, v in headers:
-                            if k.lower() != 'content-length':
-                                asgi_headers.append((k.encode('utf-8'), v.encode('utf-8')))
-                        
-                        # 处理 content
-                        if isinstance(content, str):
-                            content_bytes = content.encode("utf-8")
-                        elif isinstance(content, bytes):
-                            content_bytes = content
-                        else:
-                            content_bytes = str(content).encode("utf-8")
-                        
-                        # 发送响应
-                        await send({
-                            'type': 'http.response.start',
-                            'status': status_code,
-                            'headers': asgi_headers,
-                        })
-                        await send({
-                            'type': 'http.response.body',
-                            'body': content_bytes,
-                        })
-                        return
-
-                from .exceptions import HttpError
-
-                if isinstance(e, HttpError):
-                    status_code = e.status_code
-                    message = e.message
-                else:
-                    log_error(self.logger, str(e))
-                    status_code = 500
-                    message = "Internal Server Error"
-                
-                # 发送错误响应
                 await send({
-                    'type': 'http.response.start',
-                    'status': status_code,
-                    'headers': [
-                        (b'content-type', b'text/plain; charset=utf-8'),
-                    ],
+                    'type': 'http.response.body',
+                    'body': b'',
                 })
+            else:
                 await send({
                     'type': 'http.response.body',
-                    'body': message.encode('utf-8'),
+                    'body': b''.join(response.body),
                 })
 
         return application
 
+    def _error_result(self, error, content_type):
+        """
+        把未被中间件处理的异常转换为错误响应
+
+        Args:
+            error: 异常对象
+            content_type: 错误响应的 Content-Type
+
+        Returns:
+            Response 对象
+        """
+        from .exceptions import HttpError
+
+        if isinstance(error, HttpError):
+            return Response(error.message, error.status_code, [("Content-Type", content_type)])
+        log_error(self.logger, str(error))
+        return Response("Internal Server Error", 500, [("Content-Type", content_type)])
+
     def add_middleware(self, middleware_class, **kwargs):
         """
         添加中间件
@@ -1095,7 +831,9 @@ class Litefs(object):
 
     def handler(self, request, rw, environ, server):
         request_handler = RequestHandler(self, rw, environ, request)
-        result = request_handler.handler()
+        result = self.middleware_manager.process_environ(request_handler._middlewares, request_handler.environ)
+        if result is None:
+            result = request_handler.handler()
         return request_handler.finish(result)
 
     def run(self, poll_interval=0.2, processes=1, reload=False):
@@ -1125,6 +863,8 @@ class Litefs(object):
             signal.signal(signal.SIGTERM, signal_handler)
             
             self.load_plugins()
+            # 在 fork 工作进程前编译，子进程直接继承编译好的模板
+            self._maybe_precompile_templates()
             
             ws_instance = self.get_websocket()
             if ws_instance:
@@ -1134,13 +874,14 @@ class Litefs(object):
             log_info(self.logger, "Starting server on %s:%d (processes=%d)" % (self.host, self.port, processes))
             
             try:
+                # 服务器只按所有路由中最宽松的限制拦截，各路由的限制在路由匹配后检查
                 if processes > 1:
                     self.server = ProcessHTTPServer((self.host, self.port), self.handler, processes=processes)
-                    self.server.max_request_size = self.config.max_request_size
+                    self.server.max_request_size = self.router.max_body_size(self.config.max_request_size)
                     self.server.server_forever(poll_interval=poll_interval)
                 else:
                     self.server = HTTPServer((self.host, self.port), self.handler)
-                    self.server.max_request_size = self.config.max_request_size
+                    self.server.max_request_size = self.router.max_body_size(self.config.max_request_size)
                     self.server.start()
                     mainloop(poll_interval=poll_interval)
             except KeyboardInterrupt:
@@ -15,10 +15,14 @@ from .request import (
     http_status_codes,
 )
 from .form_parser import (
+    MultipartParser,
     parse_multipart_wsgi,
     parse_multipart_asgi,
     parse_multipart_stream,
+    parse_multipart_receive,
 )
+from .request_headers import RequestHeaders, parse_cookie
+from .response_encoder import ResponseHeaders, encode_response
 from .socket_handler import SocketRequestHandler
 from .request_enhanced import EnhancedRequestHandler
 
@@ -30,15 +34,21 @@ __all__ = [
     "BaseRequestHandler",
     "SocketRequestHandler",
     "EnhancedRequestHandler",
+    "RequestHeaders",
     
     # 响应
     "Response",
+    "ResponseHeaders",
+    "encode_response",
     
     # 工具函数
     "parse_form",
     "parse_header",
+    "parse_cookie",
     "parse_multipart_wsgi",
     "parse_multipart_asgi",
+    "parse_multipart_receive",
+    "MultipartParser",
     "is_bytes",
     "imap",
     
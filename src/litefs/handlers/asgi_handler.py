@@ -10,18 +10,20 @@ ASGI 请求处理器
 
 import asyncio
 import io
-import json
-from hashlib import sha256
 from http.cookies import SimpleCookie
-from os import urandom
 from tempfile import TemporaryFile
 
+from .. import json
 from ..exceptions import HttpError
-from ..session import Session
+from ..session import Session, generate_session_id
 from ..utils import gmt_date, log_debug, log_error, render_error
+from ..utils.aio import acall
 from .base_handler import BaseRequestHandler
-from .form_parser import parse_form, parse_header, parse_multipart_asgi
-from .response import server_info
+from .body_stream import DEFAULT_MAX_LINE_SIZE, aiter_csv, aiter_json_lines, aiter_lines, aiter_receive
+from .form_parser import parse_form, parse_header
+from .multipart import DEFAULT_SPOOL_SIZE, parse_multipart_receive
+from .request_headers import RequestHeaders
+from .response_encoder import status_line
 
 
 class ASGIRequestHandler(BaseRequestHandler):
@@ -47,15 +49,16 @@ class ASGIRequestHandler(BaseRequestHandler):
             'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
         }
 
-        # 处理 headers
-        headers = scope.get('headers', [])
-        for name, value in headers:
-            name = name.decode('utf-8').upper().replace('-', '_')
+        # 处理 headers，重复出现的头部合并为一个值
+        request_headers = RequestHeaders.from_asgi(scope.get('headers', []))
+        for name, value in request_headers.items():
+            name = name.upper().replace('-', '_')
             if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
                 name = f'HTTP_{name}'
-            environ[name] = value.decode('utf-8')
+            environ[name] = value
 
         super(ASGIRequestHandler, self).__init__(app, environ)
+        self._request_headers = request_headers
         self._scope = scope
         self._receive = receive
         self._send = send
@@ -64,6 +67,7 @@ class ASGIRequestHandler(BaseRequestHandler):
         self._body = None
         self._post = None
         self._files = None
+        self._body_consumed = False
 
         # 延迟处理请求体，在需要时异步处理
         self._content_type = self._environ.get("CONTENT_TYPE", "")
@@ -88,97 +92,133 @@ class ASGIRequestHandler(BaseRequestHandler):
             return
 
         # 检查是否已经处理过请求体
-        if self._body is not None or self._post is not None:
+        if self._body_consumed:
             return
+        self._body_consumed = True
 
-        # 异步读取请求体
-        body = await self._read_body()
-
-        if not body:
-            return
-
-        content_length = len(body)
-        max_request_size = getattr(self._app.config, "max_request_size", 10485760)
-        if content_length > max_request_size:
+        max_request_size = self._body_limit()
+        content_length = self._environ.get("CONTENT_LENGTH")
+        if content_length and int(content_length) > max_request_size:
             raise HttpError(
                 413, f"Request body too large. Maximum size is {max_request_size} bytes"
             )
 
+        boundary = self._params.get("boundary")
+        if self._content_type_raw.startswith("multipart/form-data") and boundary:
+            # multipart 直接消费 receive() 消息边读边解析，不缓冲整个请求体
+            self._post, self._files = await parse_multipart_receive(
+                self._receive, boundary,
+                min(max_request_size, self._upload_limit()),
+                getattr(self._app.config, "upload_spool_size", DEFAULT_SPOOL_SIZE)
+            )
+            return
+
+        # 异步读取请求体，超过上限时立即停止读取
+        body = await self._read_body(max_request_size)
+
+        if not body:
+            return
+
         if self._content_type_raw == "application/x-www-form-urlencoded":
             post_content = body.decode("utf-8")
             self._post = parse_form(post_content)
-        elif self._content_type_raw.startswith("multipart/form-data"):
-            boundary = self._params.get("boundary")
-            if boundary:
-                self._post, self._files = parse_multipart_asgi(
-                    body, boundary,
-                    getattr(self._app.config, "max_upload_size", 52428800)
-                )
-        else:
+        elif not self._content_type_raw.startswith("multipart/form-data"):
             self._body = body.decode("utf-8")
 
-    async def _read_body(self):
+    def stream(self, chunk_size=None):
+        """
+        逐条读取 ASGI 请求体消息
+
+        chunked 编码已由 ASGI 服务器解码。框架默认在调用处理器前读取请求体，
+        需要流式读取的路由应使用 request_body(stream=True) 装饰。
+        与 body、form、files、json 互斥，只能调用一次
+
+        Args:
+            chunk_size: 为与同步版本保持一致而保留，块大小由 ASGI 服务器决定
+
+        Returns:
+            bytes 数据块的异步迭代器
+
+        Raises:
+            RuntimeError: 请求体已被读取
+        """
+        if self._body_consumed:
+            raise RuntimeError("Request body has already been read")
+        self._body_consumed = True
+        return aiter_receive(self._receive, self._body_limit())
+
+    def stream_lines(self, keepends=False, max_line_size=DEFAULT_MAX_LINE_SIZE):
+        """按行读取请求体，返回异步迭代器"""
+        return aiter_lines(self.stream(), keepends, max_line_size)
+
+    def stream_json_lines(self, max_line_size=DEFAULT_MAX_LINE_SIZE):
+        """增量解析 JSON Lines（NDJSON）请求体，返回异步迭代器"""
+        return aiter_json_lines(self.stream(), max_line_size)
+
+    def stream_csv(self, encoding="utf-8", max_line_size=DEFAULT_MAX_LINE_SIZE, **fmtparams):
+        """增量解析 CSV 请求体，返回异步迭代器"""
+        return aiter_csv(self.stream(), encoding, max_line_size, **fmtparams)
+
+    async def _read_body(self, limit=None):
         """
         异步读取请求体
+
+        Args:
+            limit: 最大字节数，None 表示不限制
+
+        Raises:
+            HttpError: 累计读取的字节数超过 limit 时为 413，不等读完整个请求体
         """
         # 使用字节缓冲区，减少字符串拼接开销
         body_buffer = io.BytesIO()
-
-        while True:
-            message = await self._receive()
-            if message['type'] == 'http.request':
-                body = message.get('body', b'')
-                if body:
-                    body_buffer.write(body)
-                if not message.get('more_body', False):
-                    break
-
+        async for body in aiter_receive(self._receive, limit):
+            body_buffer.write(body)
         return body_buffer.getvalue()
 
-    def _get_session(self):
+    async def _load_session(self):
+        """
+        加载或创建会话
+
+        只有请求带有会话 cookie 时才读取存储，使用存储后端的 aget，不阻塞事件循环；
+        新会话只创建在内存中，直到处理器写入数据才会保存并下发 cookie
+        """
         app = self._app
         sessions = app.sessions
-        session_name = app.config.session_name
+        self._session_loaded = True
+        session_id = self.cookies.get(app.config.session_name)
+        if session_id:
+            session = await acall(sessions, 'get', session_id)
+            if session is not None:
+                # 设置存储后端实例，确保数据修改时自动保存
+                session.store = sessions
+                # 从存储中反序列化会设置修改标记，这里重置为未修改
+                session.modified = False
+                self._session_id, self._session = session_id, session
+                return
+        self._session = Session(self._new_session_id(), store=sessions)
+
+    async def _save_session(self):
+        """
+        会话被处理器修改过时使用存储后端的 aput 回写
 
-        # 从 headers 中获取 cookie
-        cookie_str = ""
-        headers = self._scope.get('headers', [])
-        for name, value in headers:
-            if name.decode('utf-8').lower() == 'cookie':
-                cookie_str = value.decode('utf-8')
-                break
-
-        # 尝试从 cookie 中获取会话
-        if cookie_str:
-            cookie = SimpleCookie(cookie_str)
-            morsel = cookie.get(session_name)
-            if morsel is not None:
-                session_id = morsel.value
-                # 尝试从会话存储中获取会话
-                session = sessions.get(session_id)
-                if session is not None:
-                    # 设置存储后端实例，确保数据修改时自动保存
-                    session.store = sessions
-                    return session_id, session
-
-        # 生成新的会话 ID
-        session_id = self._new_session_id()
-        # 创建 Session 对象时传入存储后端实例
-        session = Session(session_id, store=sessions)
-        # 只在需要时才保存会话
-        self._session_modified = False
-        return None, session
+        Returns:
+            新会话首次保存时需要下发 cookie 的会话 ID，否则为 None
+        """
+        session = self._session
+        if not self._session_loaded or not session.modified:
+            return None
+        await acall(self._app.sessions, 'put', session.id, session)
+        session.modified = False
+        return session.id if self._session_id is None else None
 
     def _new_session_id(self):
-        app = self._app
-        sessions = app.sessions
-        while True:
-            token = urandom(32)
-            session_id = sha256(token).hexdigest()
-            session = sessions.get(session_id)
-            if session is None:
-                break
-        return session_id
+        return generate_session_id()
+
+    def _process_session_response(self, response_headers):
+        """
+        会话已由 _save_session 异步回写，新会话的 cookie 也已在处理器中下发，
+        这里不再保存会话或添加 Set-Cookie
+        """
 
     @property
     def config(self):
@@ -270,36 +310,6 @@ class ASGIRequestHandler(BaseRequestHandler):
     def referer(self):
         return self._environ.get("HTTP_REFERER")
 
-    @property
-    def headers(self):
-        """
-        获取所有请求头
-
-        Returns:
-            包含所有请求头的字典
-        """
-        headers = {}
-        for key, value in self._environ.items():
-            if key.startswith('HTTP_'):
-                header_name = key[5:].replace('_', '-').lower()
-                headers[header_name] = value
-            elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
-                header_name = key.replace('_', '-').lower()
-                headers[header_name] = value
-        return headers
-
-    @property
-    def cookie(self):
-        cookie_str = ""
-        headers = self._scope.get('headers', [])
-        for name, value in headers:
-            if name.decode('utf-8').lower() == 'cookie':
-                cookie_str = value.decode('utf-8')
-                break
-        cookie = SimpleCookie()
-        cookie.load(cookie_str)
-        return cookie
-
     def _add_header(self, key, value):
         self._headers.append((key, value))
 
@@ -313,7 +323,7 @@ class ASGIRequestHandler(BaseRequestHandler):
             if not v:
                 continue
             cookie[key][k] = v
-        self._headers.append(("Set-Cookie", str(cookie[key])))
+        self._headers.append(("Set-Cookie", cookie[key].OutputString()))
 
     def _redirect(self, url):
         url = "/" if url is None else url
@@ -347,30 +357,36 @@ class ASGIRequestHandler(BaseRequestHandler):
             cookie_header[session_name]['httponly'] = True
         if session_same_site:
             cookie_header[session_name]['samesite'] = session_same_site
-        return str(cookie_header[session_name])
+        return cookie_header[session_name].OutputString()
 
     async def handler(self):
         """
         异步处理请求
         """
         from .response import Response
-        from http.client import responses as http_status_codes
         app = self._app
 
-        # 处理请求体
-        await self._process_request_body()
+        # 先匹配路由，请求体按路由的选项处理
+        environ = self._environ
+        route_match = app.router.match(
+            environ.get("PATH_INFO", "/"), environ.get("REQUEST_METHOD", "GET")
+        )
+        stream_body = False
+        if route_match:
+            self._apply_route_options(route_match[0])
+            stream_body = getattr(route_match[0], "_stream_body", False)
+
+        # 处理请求体，流式路由由处理器通过 request.stream() 自行读取
+        if not stream_body:
+            await self._process_request_body()
+
+        await self._load_session()
 
         middleware_result = app.middleware_manager.process_request(self)
         if middleware_result is not None:
             return middleware_result
 
         try:
-            environ = self._environ
-            path_info = environ.get("PATH_INFO", "/")
-            request_method = environ.get("REQUEST_METHOD", "GET")
-
-            # 尝试使用路由系统处理请求
-            route_match = app.router.match(path_info, request_method)
             if route_match:
                 handler, params = route_match
                 try:
@@ -386,42 +402,18 @@ class ASGIRequestHandler(BaseRequestHandler):
 
                     # 处理 Response 对象
                     if isinstance(result, Response):
-                        # 确保会话已加载
-                        session_key = None
-                        if self._session_loaded:
-                            # 保存 Session 数据到 Session 存储（只有在会话被修改时）
-                            if self._session_modified:
-                                session_key = self._session_id or self.session.id
-                                app.sessions.put(session_key, self.session)
-                            else:
-                                session_key = self._session_id or self.session.id
-                        else:
-                            # 会话未加载，不需要设置 cookie
-                            pass
-
-                        # 设置 session cookie（只有在会话已加载时）
+                        # 会话只在被处理器修改过时才回写，新会话在首次写入时才下发 cookie
+                        session_key = await self._save_session()
                         if session_key:
                             result.headers.append(("Set-Cookie", self._build_session_cookie_header(session_key)))
 
-                        status_code = result.status_code
-                        status_text = http_status_codes.get(status_code, "Unknown")
-                        status = "%d %s" % (status_code, status_text)
+                        status = status_line(result.status_code)
                         return app.middleware_manager.process_response(
                             self, (status, result.headers, result.content)
                         )
 
                     if self._headers_responsed:
-                        # 确保会话已加载
-                        session_key = None
-                        if self._session_loaded:
-                            # 保存 Session 数据到 Session 存储（只有在会话被修改时）
-                            if self._session_modified:
-                                session_key = self._session_id or self.session.id
-                                app.sessions.put(session_key, self.session)
-                            else:
-                                session_key = self._session_id or self.session.id
-
-                        # 设置 session cookie（只有在会话已加载时）
+                        session_key = await self._save_session()
                         if session_key:
                             self.set_cookie(
                                 app.config.session_name, session_key,
@@ -431,28 +423,15 @@ class ASGIRequestHandler(BaseRequestHandler):
                                 samesite=app.config.session_same_site
                             )
 
-                        status_code = int(self._status_code)
-                        status_text = http_status_codes.get(status_code, "Unknown")
-                        status = "%d %s" % (status_code, status_text)
-
-                        response_headers = [("Server", server_info)]
-                        response_headers.extend(self._headers)
+                        status = status_line(int(self._status_code))
+                        # 默认头部由响应编码器补齐
+                        response_headers = list(self._headers)
 
                         return app.middleware_manager.process_response(
                             self, (status, response_headers, result)
                         )
 
-                    # 确保会话已加载
-                    session_key = None
-                    if self._session_loaded:
-                        # 保存 Session 数据到 Session 存储（只有在会话被修改时）
-                        if self._session_modified:
-                            session_key = self._session_id or self.session.id
-                            app.sessions.put(session_key, self.session)
-                        else:
-                            session_key = self._session_id or self.session.id
-
-                    # 设置 session cookie（只有在会话已加载时）
+                    session_key = await self._save_session()
                     if session_key:
                         self.set_cookie(
                             app.config.session_name, session_key,
@@ -465,6 +444,9 @@ class ASGIRequestHandler(BaseRequestHandler):
                     return app.middleware_manager.process_response(
                         self, self._response(self._status_code, content=result)
                     )
+                except HttpError:
+                    # 请求体过大等 HTTP 错误按对应状态码响应
+                    raise
                 except Exception:
                     log_error(app.logger)
                     if app.config.debug:
@@ -9,15 +9,14 @@
 
 import json
 from http.cookies import SimpleCookie
-from http.client import responses as http_status_codes
-
-from .response import (
-    DEFAULT_STATUS_MESSAGE,
-    default_content_type,
-    json_content_type,
-    server_info,
-)
+
+from ..exceptions import HttpError
+from .body_stream import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_LINE_SIZE, iter_csv, iter_json_lines, iter_lines
+from ..template_engine import DEFAULT_STREAM_CHUNK_SIZE
+from .response import DEFAULT_STATUS_MESSAGE, Response
+from .response_encoder import ResponseHeaders, infer_content_type, status_line
 from .form_parser import parse_form
+from .request_headers import RequestHeaders, parse_cookie
 
 
 class BaseRequestHandler:
@@ -37,9 +36,14 @@ class BaseRequestHandler:
         self._session_id = None
         self._session = None
         self._session_modified = False
-        self._template_lookup = None
         # 初始化 _headers 属性，用于存储响应头
         self._headers = []
+        # 请求头和 Cookie 在首次访问时解析，整个请求内共用
+        self._request_headers = None
+        self._request_cookies = None
+        self._simple_cookie = None
+        # 路由通过 request_body(max_size=...) 设置的请求体上限，None 表示使用全局配置
+        self._max_body_size = None
 
     def render_template(self, template_name, **kwargs):
         """
@@ -52,32 +56,50 @@ class BaseRequestHandler:
         Returns:
             渲染后的 HTML 字符串
         """
-        import os
-
-        # 延迟初始化模板查找器
-        if self._template_lookup is None:
-            # 获取模板目录路径
-            template_dir = getattr(self._app.config, 'template_dir', 'templates')
-            if not os.path.isabs(template_dir):
-                # 如果是相对路径，相对于当前工作目录
-                template_dir = os.path.join(os.getcwd(), template_dir)
-
-            # 创建模板查找器
-            # 在开发模式下禁用缓存，确保模板修改后立即生效
-            debug_mode = getattr(self._app, 'debug', False) if self._app else False
-            from mako.lookup import TemplateLookup
-            self._template_lookup = TemplateLookup(
-                directories=[template_dir],
-                input_encoding='utf-8',
-                encoding_errors='replace',
-                cache_enabled=not debug_mode
-            )
+        # 使用应用级模板引擎，编译后的模板在请求之间共用
+        return self._render_template(self._app.templates.render, template_name, kwargs)
+
+    def render_template_cached(self, template_name, cache_vary=(), cache_timeout=None,
+                               cache_tags=(), **kwargs):
+        """
+        渲染模板并缓存整页输出
+
+        Args:
+            template_name: 模板文件名
+            cache_vary: 参与缓存键的变量名，如 ('lang', 'page')
+            cache_timeout: 过期时间（秒），None 使用 template_cache_timeout 配置
+            cache_tags: 标签，app.templates.cache.invalidate_tags 按标签失效
+            **kwargs: 模板变量
+
+        Returns:
+            渲染后的 HTML 字符串
+        """
+        kwargs.update(cache_vary=cache_vary, cache_timeout=cache_timeout, cache_tags=cache_tags)
+        return self._render_template(self._app.templates.render_cached, template_name, kwargs)
+
+    def stream_template(self, template_name, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, **kwargs):
+        """
+        流式渲染模板
+
+        返回的响应没有 Content-Length，内置服务器按 chunked 编码边渲染边发送，
+        页面头部不必等整页渲染完成，单个请求的内存占用不超过一个块。
+        模板中调用 ${flush()} 可以立即发送已渲染的部分
+
+        Args:
+            template_name: 模板文件名
+            chunk_size: 每个输出块的目标大小（字节）
+            **kwargs: 模板变量
+
+        Returns:
+            Response 对象，content 为字节块迭代器
+        """
+        return Response.html(
+            self._app.templates.stream(template_name, chunk_size=chunk_size, **kwargs)
+        )
 
+    def _render_template(self, render, template_name, kwargs):
         try:
-            # 获取模板
-            template = self._template_lookup.get_template(template_name)
-            # 渲染模板
-            content = template.render(**kwargs)
+            content = render(template_name, **kwargs)
 
             # 直接返回渲染后的内容，不设置 Content-Type
             # Content-Type 会在 _response 方法中设置
@@ -112,7 +134,9 @@ class BaseRequestHandler:
 
     def _build_response_headers(self, status_code, extra_headers=None, content=None):
         """
-        构建响应头列表
+        构建响应头
+
+        Content-Length 和 Transfer-Encoding 在响应体编码时才确定，这里不做处理
 
         Args:
             status_code: HTTP 状态码
@@ -120,68 +144,13 @@ class BaseRequestHandler:
             content: 响应内容
 
         Returns:
-            响应头列表
+            ResponseHeaders 响应头集合
         """
-        # 创建响应头列表
-        response_headers = []
-        response_headers.append(("Server", server_info))
-        response_headers.append(("X-Content-Type-Options", "nosniff"))
-        response_headers.append(("X-Frame-Options", "SAMEORIGIN"))
-        response_headers.append(("X-XSS-Protection", "1; mode=block"))
-
-        # 添加 self._headers 中的内容
-        if hasattr(self, '_headers'):
-            response_headers.extend(self._headers)
-
-        # 添加传入的 headers 参数
+        response_headers = ResponseHeaders(self._headers, defaults=True)
         if extra_headers:
-            response_headers.extend(extra_headers)
-
-        # 检查是否已经有 Content-Type 响应头
-        has_content_type = any(h[0].lower() == 'content-type' for h in response_headers)
-
-        # 如果没有 Content-Type 响应头，根据状态码和内容类型设置默认的 Content-Type
-        if not has_content_type:
-            if status_code >= 400:
-                response_headers.append(("Content-Type", "text/html; charset=utf-8"))
-            else:
-                from collections.abc import Iterable
-
-                # dict、list、tuple 类型设置为 application/json
-                if isinstance(content, (dict, list, tuple)):
-                    response_headers.append(("Content-Type", json_content_type))
-                # HTML 字符串设置为 text/html
-                elif isinstance(content, str) and content.lstrip().startswith('<'):
-                    response_headers.append(("Content-Type", "text/html; charset=utf-8"))
-                # 字节类型设置为 application/octet-stream
-                elif isinstance(content, bytes):
-                    response_headers.append(("Content-Type", "application/octet-stream"))
-                # 其他可迭代对象设置为 text/plain
-                elif not isinstance(content, (str, bytes, type(None))) and isinstance(content, Iterable):
-                    response_headers.append(("Content-Type", "text/plain; charset=utf-8"))
-                # 其他类型使用默认的 text/html
-                else:
-                    response_headers.append(("Content-Type", default_content_type))
-
-        # 检查是否已经有 Content-Length 或 Transfer-Encoding 头
-        has_content_length = any(h[0].lower() == 'content-length' for h in response_headers)
-        has_transfer_encoding = any(h[0].lower() == 'transfer-encoding' for h in response_headers)
-
-        # 处理不同类型的 content
-        from collections.abc import Iterable
-        if not has_content_length and not has_transfer_encoding:
-            if isinstance(content, (str, bytes)):
-                # 对于字符串或字节，计算长度并添加 Content-Length 头
-                if isinstance(content, str):
-                    content_bytes = content.encode('utf-8')
-                    content_length = len(content_bytes)
-                else:
-                    content_length = len(content)
-                response_headers.append(("Content-Length", str(content_length)))
-            elif not isinstance(content, (dict, list, tuple, type(None))) and isinstance(content, Iterable):
-                # 对于生成器等可迭代对象，使用 Transfer-Encoding: chunked
-                response_headers.append(("Transfer-Encoding", "chunked"))
-
+            response_headers.update(extra_headers)
+        if "Content-Type" not in response_headers:
+            response_headers.set("Content-Type", infer_content_type(content, status_code))
         return response_headers
 
     def _prepare_response(self, status_code, extra_headers=None, content=None):
@@ -197,8 +166,7 @@ class BaseRequestHandler:
             (status, response_headers, content): 状态行、响应头和内容
         """
         status_code = int(status_code)
-        status_text = http_status_codes.get(status_code, "Unknown")
-        status = "%d %s" % (status_code, status_text)
+        status = status_line(status_code)
 
         # 构建响应头
         response_headers = self._build_response_headers(status_code, extra_headers, content)
@@ -211,6 +179,7 @@ class BaseRequestHandler:
 
         # 如果 content 为 None，设置默认的错误信息
         if content is None:
+            status_text = status.split(" ", 1)[1]
             content = DEFAULT_STATUS_MESSAGE % {
                 "code": status_code,
                 "message": status_text,
@@ -255,7 +224,7 @@ class BaseRequestHandler:
                 cookie_header[session_name]['httponly'] = True
             if session_same_site:
                 cookie_header[session_name]['samesite'] = session_same_site
-            response_headers.append(("Set-Cookie", str(cookie_header[session_name])))
+            response_headers.append(("Set-Cookie", cookie_header[session_name].OutputString()))
 
     def _response(self, status_code, headers=None, content=None):
         """
@@ -271,12 +240,135 @@ class BaseRequestHandler:
         """
         return self._prepare_response(status_code, headers, content)
 
+    def _body_limit(self):
+        """
+        当前请求允许的最大请求体字节数
+
+        Returns:
+            路由设置的上限，未设置时为 max_request_size
+        """
+        if self._max_body_size is not None:
+            return self._max_body_size
+        return getattr(self._app.config, "max_request_size", 10485760)
+
+    def _upload_limit(self):
+        """
+        当前请求允许的最大 multipart 上传字节数
+
+        Returns:
+            路由设置的上限，未设置时为 max_upload_size
+        """
+        if self._max_body_size is not None:
+            return self._max_body_size
+        return getattr(self._app.config, "max_upload_size", 52428800)
+
+    def _is_chunked(self):
+        """请求体是否使用 chunked 传输编码"""
+        return "chunked" in self._environ.get("HTTP_TRANSFER_ENCODING", "").lower()
+
+    def _apply_route_options(self, handler):
+        """
+        路由匹配后应用路由的请求体选项，并按 Content-Length 提前拒绝过大的请求
+
+        Args:
+            handler: 匹配到的路由处理函数
+
+        Raises:
+            HttpError: 请求体超过路由允许的大小
+        """
+        self._max_body_size = getattr(handler, "_max_body_size", None)
+        content_length = self._environ.get("CONTENT_LENGTH")
+        if content_length:
+            limit = self._body_limit()
+            if int(content_length) > limit:
+                raise HttpError(413, f"Request body too large. Maximum size is {limit} bytes")
+
+    def stream(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        raise NotImplementedError("Subclasses must implement stream")
+
+    def stream_lines(self, keepends=False, max_line_size=DEFAULT_MAX_LINE_SIZE):
+        """
+        按行读取请求体
+
+        Args:
+            keepends: 是否保留行尾换行符
+            max_line_size: 一行的最大字节数，超过时为 413，None 表示不限制
+
+        Returns:
+            bytes 行的迭代器
+        """
+        return iter_lines(self.stream(), keepends, max_line_size)
+
+    def stream_json_lines(self, max_line_size=DEFAULT_MAX_LINE_SIZE):
+        """
+        增量解析 JSON Lines（NDJSON）请求体
+
+        Args:
+            max_line_size: 一行的最大字节数，超过时为 413，None 表示不限制
+
+        Returns:
+            每行解析出的对象的迭代器
+        """
+        return iter_json_lines(self.stream(), max_line_size)
+
+    def stream_csv(self, encoding="utf-8", max_line_size=DEFAULT_MAX_LINE_SIZE, **fmtparams):
+        """
+        增量解析 CSV 请求体
+
+        Args:
+            encoding: 文本编码
+            max_line_size: 一行的最大字节数，超过时为 413，None 表示不限制
+            **fmtparams: 传给 csv.reader 的格式参数
+
+        Returns:
+            csv.reader，每次迭代返回一行字段列表
+        """
+        return iter_csv(self.stream(), encoding, max_line_size, **fmtparams)
+
     def _add_response_headers(self, headers):
         raise NotImplementedError("Subclasses must implement _add_response_headers")
 
     def set_cookie(self, key, value, **kwargs):
         raise NotImplementedError("Subclasses must implement set_cookie")
 
+    @property
+    def headers(self):
+        """
+        获取所有请求头
+
+        Returns:
+            RequestHeaders 实例，名称不区分大小写
+        """
+        if self._request_headers is None:
+            self._request_headers = RequestHeaders.from_environ(self._environ)
+        return self._request_headers
+
+    @property
+    def cookies(self):
+        """
+        获取请求携带的 Cookie
+
+        Returns:
+            {name: value} 字典
+        """
+        if self._request_cookies is None:
+            self._request_cookies = parse_cookie(self._environ.get("HTTP_COOKIE"))
+        return self._request_cookies
+
+    @property
+    def cookie(self):
+        """
+        获取请求携带的 Cookie
+
+        Returns:
+            SimpleCookie 实例，需要 Morsel 时使用，否则优先使用 cookies
+        """
+        if self._simple_cookie is None:
+            cookie = SimpleCookie()
+            cookie.load(self._environ.get("HTTP_COOKIE") or "")
+            self._simple_cookie = cookie
+        return self._simple_cookie
+
     @property
     def session_id(self):
         return self._session_id
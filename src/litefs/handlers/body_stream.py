@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+请求体流式读取模块
+
+request.stream() 的底层实现：按 Content-Length 或 chunked 编码逐块读取
+请求体，并提供按行、JSON Lines 和 CSV 增量解析的辅助函数。
+同步版本用于内置服务器和 WSGI，a 开头的异步版本用于 ASGI
+"""
+
+import csv
+
+from .. import json
+from ..exceptions import HttpError
+
+# 每次从输入流读取的字节数
+DEFAULT_CHUNK_SIZE = 65536
+
+# chunked 编码中块大小行和尾部头部行的最大长度
+MAX_CHUNK_LINE = 4096
+
+# 按行读取请求体时一行的默认最大字节数
+DEFAULT_MAX_LINE_SIZE = 1048576
+
+
+def _too_large(limit):
+    return HttpError(413, f"Request body too large. Maximum size is {limit} bytes")
+
+
+def iter_body(read, length, limit=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    按 Content-Length 逐块读取请求体
+
+    Args:
+        read: 输入流的 read 方法
+        length: 请求体长度
+        limit: 最大字节数，None 表示不限制
+        chunk_size: 每次读取的字节数
+
+    Yields:
+        bytes 数据块
+
+    Raises:
+        HttpError: 超过 limit 时为 413，请求体不完整时为 400
+    """
+    if limit is not None and length > limit:
+        raise _too_large(limit)
+    remaining = length
+    while remaining > 0:
+        chunk = read(min(remaining, chunk_size))
+        if not chunk:
+            raise HttpError(400, "Incomplete request body")
+        remaining -= len(chunk)
+        yield chunk
+
+
+def iter_until_eof(read, limit=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    读取到输入流结束，用于服务器已解码 chunked 编码的 WSGI 输入
+
+    Args:
+        read: 输入流的 read 方法
+        limit: 最大字节数，None 表示不限制
+        chunk_size: 每次读取的字节数
+
+    Yields:
+        bytes 数据块
+    """
+    total = 0
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if limit is not None and total > limit:
+            raise _too_large(limit)
+        yield chunk
+
+
+def iter_chunked_body(rw, limit=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    解码 Transfer-Encoding: chunked 的请求体
+
+    Args:
+        rw: 支持 readline 和 read 的输入流
+        limit: 解码后的最大字节数，None 表示不限制
+        chunk_size: 每次读取的字节数
+
+    Yields:
+        解码后的 bytes 数据块
+    """
+    readline, read = rw.readline, rw.read
+    total = 0
+    while True:
+        line = readline(MAX_CHUNK_LINE)
+        if not line.endswith(b"\n"):
+            raise HttpError(400, "Invalid chunk size line")
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise HttpError(400, "Invalid chunk size line")
+        if size == 0:
+            # 跳过尾部头部，直到空行
+            while True:
+                line = readline(MAX_CHUNK_LINE)
+                if not line.strip():
+                    return
+        total += size
+        if limit is not None and total > limit:
+            raise _too_large(limit)
+        remaining = size
+        while remaining > 0:
+            chunk = read(min(remaining, chunk_size))
+            if not chunk:
+                raise HttpError(400, "Incomplete request body")
+            remaining -= len(chunk)
+            yield chunk
+        if readline(MAX_CHUNK_LINE).strip():
+            raise HttpError(400, "Invalid chunk terminator")
+
+
+async def aiter_receive(receive, limit=None):
+    """
+    逐条消费 ASGI receive() 消息
+
+    Args:
+        receive: ASGI receive 可调用对象
+        limit: 最大字节数，None 表示不限制
+
+    Yields:
+        bytes 数据块
+    """
+    total = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise HttpError(400, "Client disconnected")
+        if message["type"] != "http.request":
+            continue
+        body = message.get("body", b"")
+        if body:
+            total += len(body)
+            if limit is not None and total > limit:
+                raise _too_large(limit)
+            yield body
+        if not message.get("more_body", False):
+            return
+
+
+class _LineBuffer:
+    """
+    把字节块切分为行
+
+    未结束的行保存为数据块列表，行结束时才拼接一次，每个字节只复制一次；
+    超长的行立即报错，内存占用受 max_line_size 而不是请求体大小限制
+    """
+
+    def __init__(self, keepends=False, max_line_size=DEFAULT_MAX_LINE_SIZE):
+        self.keepends = keepends
+        self.max_line_size = max_line_size
+        self._pending = []
+        self._pending_size = 0
+
+    def feed(self, chunk):
+        """
+        追加一个数据块
+
+        Returns:
+            已结束的行
+
+        Raises:
+            HttpError: 一行超过 max_line_size 时为 413
+        """
+        if b"\n" not in chunk:
+            if chunk:
+                self._pending.append(chunk)
+                self._pending_size += len(chunk)
+                self._check(self._pending_size)
+            return []
+        if self._pending:
+            self._pending.append(chunk)
+            chunk = b"".join(self._pending)
+        lines = chunk.split(b"\n")
+        pending = lines.pop()
+        self._pending = [pending] if pending else []
+        self._pending_size = len(pending)
+        if self.max_line_size is not None:
+            # 换行符计入行长度；数据块不超过上限时只有包含之前剩余部分的第一行可能超长
+            longest = max(map(len, lines)) if len(chunk) > self.max_line_size else len(lines[0])
+            self._check(longest + 1)
+            self._check(self._pending_size)
+        if self.keepends:
+            return [line + b"\n" for line in lines]
+        return [line[:-1] if line.endswith(b"\r") else line for line in lines]
+
+    def finish(self):
+        """返回最后一行（没有换行符结尾时），没有时返回 None"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return None
+        line = b"".join(pending)
+        if not self.keepends and line.endswith(b"\r"):
+            line = line[:-1]
+        return line
+
+    def _check(self, size):
+        if self.max_line_size is not None and size > self.max_line_size:
+            raise HttpError(413, f"Line too long. Maximum size is {self.max_line_size} bytes")
+
+
+def iter_lines(chunks, keepends=False, max_line_size=DEFAULT_MAX_LINE_SIZE):
+    """
+    把字节块拆分为行
+
+    Args:
+        chunks: bytes 数据块的可迭代对象
+        keepends: 是否保留行尾换行符
+        max_line_size: 一行的最大字节数（含换行符），None 表示不限制
+
+    Yields:
+        bytes 行
+
+    Raises:
+        HttpError: 一行超过 max_line_size 时为 413
+    """
+    buffer = _LineBuffer(keepends, max_line_size)
+    for chunk in chunks:
+        yield from buffer.feed(chunk)
+    line = buffer.finish()
+    if line is not None:
+        yield line
+
+
+def iter_json_lines(chunks, max_line_size=DEFAULT_MAX_LINE_SIZE):
+    """
+    增量解析 JSON Lines（NDJSON），跳过空行
+
+    Args:
+        chunks: bytes 数据块的可迭代对象
+        max_line_size: 一行的最大字节数，None 表示不限制
+
+    Yields:
+        每行解析出的 Python 对象
+    """
+    loads = json.loads
+    for line in iter_lines(chunks, max_line_size=max_line_size):
+        if line.strip():
+            yield loads(line)
+
+
+def iter_csv(chunks, encoding="utf-8", max_line_size=DEFAULT_MAX_LINE_SIZE, **fmtparams):
+    """
+    增量解析 CSV
+
+    Args:
+        chunks: bytes 数据块的可迭代对象
+        encoding: 文本编码
+        max_line_size: 一行的最大字节数，None 表示不限制
+        **fmtparams: 传给 csv.reader 的格式参数
+
+    Returns:
+        csv.reader，每次迭代返回一行字段列表
+    """
+    lines = (line.decode(encoding) for line in iter_lines(chunks, True, max_line_size))
+    return csv.reader(lines, **fmtparams)
+
+
+async def aiter_lines(chunks, keepends=False, max_line_size=DEFAULT_MAX_LINE_SIZE):
+    """iter_lines 的异步版本，chunks 为异步可迭代对象"""
+    buffer = _LineBuffer(keepends, max_line_size)
+    async for chunk in chunks:
+        for line in buffer.feed(chunk):
+            yield line
+    line = buffer.finish()
+    if line is not None:
+        yield line
+
+
+async def aiter_json_lines(chunks, max_line_size=DEFAULT_MAX_LINE_SIZE):
+    """iter_json_lines 的异步版本，chunks 为异步可迭代对象"""
+    loads = json.loads
+    async for line in aiter_lines(chunks, max_line_size=max_line_size):
+        if line.strip():
+            yield loads(line)
+
+
+async def aiter_csv(chunks, encoding="utf-8", max_line_size=DEFAULT_MAX_LINE_SIZE, **fmtparams):
+    """
+    iter_csv 的异步版本，chunks 为异步可迭代对象
+
+    引号内包含换行的字段会跨多行，引号成对后才交给 csv 解析
+    """
+    quotechar = fmtparams.get("quotechar", '"')
+    record = []
+    quotes = 0
+    async for line in aiter_lines(chunks, True, max_line_size):
+        line = line.decode(encoding)
+        record.append(line)
+        if quotechar:
+            quotes += line.count(quotechar)
+            if quotes % 2:
+                continue
+        for row in csv.reader(["".join(record)], **fmtparams):
+            yield row
+        record = []
+        quotes = 0
+    if record:
+        for row in csv.reader(["".join(record)], **fmtparams):
+            yield row
+
+
+__all__ = [
+    'DEFAULT_CHUNK_SIZE',
+    'DEFAULT_MAX_LINE_SIZE',
+    'iter_body',
+    'iter_until_eof',
+    'iter_chunked_body',
+    'aiter_receive',
+    'iter_lines',
+    'iter_json_lines',
+    'iter_csv',
+    'aiter_lines',
+    'aiter_json_lines',
+    'aiter_csv',
+]
@@ -4,19 +4,32 @@
 """
 表单数据解析模块
 
-提供表单数据解析功能，支持 URL 编码表单和 multipart 表单
+提供表单数据解析功能，支持 URL 编码表单和 multipart 表单，
+multipart 解析的实现见 multipart 模块
 """
 
 import re
-from tempfile import TemporaryFile
 from urllib.parse import unquote_plus
 
-from ..cache import FormCache
 from email.message import Message
+from .multipart import (
+    MultipartParser,
+    parse_multipart_asgi,
+    parse_multipart_receive,
+    parse_multipart_stream,
+    parse_multipart_wsgi,
+)
 
 
-# 创建表单数据缓存实例
-_form_cache = FormCache(max_size=1000, default_ttl=300)
+# 解析结果备忘录，hash(query_string) -> (query_string, form)
+# 只记录短查询字符串，命中时返回副本，处理器修改结果不会影响后续请求
+_form_cache = {}
+
+# 备忘录最大条目数，超过后淘汰最早写入的条目
+FORM_MEMO_SIZE = 1024
+
+# 参与备忘的查询字符串最大长度，更长的字符串大多是一次性的，直接解析
+FORM_MEMO_MAX_LENGTH = 256
 
 # 正则表达式
 form_dict_match = re.compile(r"(.+)\[([^\[\]]+)\]").match
@@ -39,264 +52,110 @@ def parse_header(line):
 
 def parse_form(query_string):
     """
-    解析表单数据，支持缓存
+    解析表单数据，短查询字符串的结果会被备忘
+
+    先按 & 和 = 切分再逐个解码，已编码的 & 和 = 不会被误当作分隔符
 
     Args:
         query_string: 查询字符串
 
     Returns:
-        解析后的表单数据字典
+        解析后的表单数据字典，每次调用都返回新的对象
     """
-    # 生成缓存键
-    cache_key = f"form:{query_string}"
-
-    # 尝试从缓存获取
-    cached = _form_cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # 解析表单数据
-    form = {}
-    # 处理 bytes 类型输入
     if isinstance(query_string, bytes):
         query_string = query_string.decode('utf-8')
-    query_string = unquote_plus(query_string)
+    if not query_string:
+        return {}
+    if len(query_string) > FORM_MEMO_MAX_LENGTH:
+        return _parse_form(query_string)
+
+    key = hash(query_string)
+    cached = _form_cache.get(key)
+    if cached is not None and cached[0] == query_string:
+        return _copy_form(cached[1])
+
+    form = _parse_form(query_string)
+    if len(_form_cache) >= FORM_MEMO_SIZE:
+        try:
+            del _form_cache[next(iter(_form_cache))]
+        except (KeyError, RuntimeError, StopIteration):
+            # 其他线程同时修改了备忘录，本次不淘汰
+            pass
+    _form_cache[key] = (query_string, form)
+    return _copy_form(form)
+
+
+def _unquote(value):
+    """解码单个键或值，不含转义字符时直接返回"""
+    if "%" in value or "+" in value:
+        return unquote_plus(value)
+    return value
+
+
+def _append(form, key, value, query_string):
+    """同名字段出现多次时合并为列表"""
+    result = form[key]
+    if isinstance(result, dict):
+        raise ValueError("invalid form data %s" % query_string)
+    if isinstance(result, list):
+        result.append(value)
+    else:
+        form[key] = [result, value]
+
+
+def _parse_form(query_string):
+    form = {}
+    # 整个字符串都不含转义字符时跳过逐个解码
+    encoded = "%" in query_string or "+" in query_string
     for s in query_string.split("&"):
         if not s:
             continue
-        kv = s.split("=", 1)
-        if 2 == len(kv):
-            k, v = kv
-        else:
-            k, v = kv[0], ""
-        k, v = unquote_plus(k), unquote_plus(v)
+        k, _, v = s.partition("=")
+        if encoded:
+            k, v = _unquote(k), _unquote(v)
+        if k[-1:] != "]":
+            if k in form:
+                _append(form, k, v, query_string)
+            else:
+                form[k] = v
+            continue
         if k.endswith("[]"):
             k = k[:-2]
             if k in form:
-                result = form[k]
-                if isinstance(result, dict):
-                    raise ValueError("invalid form data %s" % query_string)
-                if isinstance(result, list):
-                    form[k].append(v)
-                else:
-                    form[k] = [result, v]
+                _append(form, k, v, query_string)
             else:
                 form[k] = [v]
             continue
         matched = form_dict_match(k)
         if matched is None:
             if k in form:
-                result = form[k]
-                if isinstance(result, dict):
-                    raise ValueError("invalid form data %s" % query_string)
-                if isinstance(result, list):
-                    form[k].append(v)
-                else:
-                    form[k] = [result, v]
+                _append(form, k, v, query_string)
             else:
                 form[k] = v
         else:
             key, prefix = matched.groups()
-            if key in form:
-                result = form[key]
-                if not isinstance(result, dict):
-                    raise ValueError("invalid form data %s" % query_string)
-                if prefix in result:
-                    result[prefix] = [result[prefix], v]
-                else:
-                    result[prefix] = v
-            else:
+            result = form.get(key)
+            if result is None:
                 form[key] = {prefix: v}
-
-    # 存入缓存
-    _form_cache.set(cache_key, form)
-
+            elif not isinstance(result, dict):
+                raise ValueError("invalid form data %s" % query_string)
+            elif prefix in result:
+                _append(result, prefix, v, query_string)
+            else:
+                result[prefix] = v
     return form
 
 
-def parse_multipart_wsgi(wsgi_input, boundary, content_length, max_upload_size=52428800):
-    """
-    解析 WSGI 环境下的 multipart 表单数据
-
-    Args:
-        wsgi_input: WSGI 输入流
-        boundary: multipart boundary
-        content_length: 内容长度
-        max_upload_size: 最大上传大小
-
-    Returns:
-        (posts, files): 表单字段字典和上传文件字典
-    """
-    if content_length > max_upload_size:
-        from ..exceptions import HttpError
-        raise HttpError(413, f"Request body too large. Maximum size is {max_upload_size} bytes")
-
-    boundary = boundary.encode("utf-8")
-    begin_boundary = b"--" + boundary
-    end_boundary = b"--" + boundary + b"--"
-
-    posts = {}
-    files = {}
-
-    data = wsgi_input.read(content_length)
-
-    parts = data.split(begin_boundary)
-
-    for part in parts[1:]:
-        if part.strip() == end_boundary:
-            break
-
-        header_end = part.find(b"\r\n\r\n")
-        if header_end == -1:
-            continue
-
-        headers_part = part[:header_end]
-        content = part[header_end + 4:]
-
-        headers = {}
-        for line in headers_part.split(b"\r\n"):
-            if b":" in line:
-                k, v = line.split(b":", 1)
-                k = k.strip().upper()
-                v = v.strip()
-                k = k.decode("utf-8")
-                v = v.decode("utf-8")
-                headers[k] = v
-
-        disposition = headers.get("CONTENT-DISPOSITION", "")
-        disposition, params = parse_header(disposition)
-        name = params.get("name", "")
-
-        filename = params.get("filename")
-        if filename:
-            fp = TemporaryFile(mode="w+b")
-            fp.write(content)
-            fp.seek(0)
-            files[name] = fp
-        else:
-            content = content.decode("utf-8")
-            posts[name] = content.strip()
-
-    return posts, files
-
-
-def parse_multipart_asgi(body, boundary, max_upload_size=52428800):
-    """
-    解析 ASGI 环境下的 multipart 表单数据
-
-    Args:
-        body: 请求体字节数据
-        boundary: multipart boundary
-        max_upload_size: 最大上传大小
-
-    Returns:
-        (posts, files): 表单字段字典和上传文件字典
-    """
-    if len(body) > max_upload_size:
-        from ..exceptions import HttpError
-        raise HttpError(413, f"Request body too large. Maximum size is {max_upload_size} bytes")
-
-    boundary = boundary.encode("utf-8")
-    begin_boundary = b"--" + boundary
-    end_boundary = b"--" + boundary + b"--"
-
-    posts = {}
-    files = {}
-
-    parts = body.split(begin_boundary)
-
-    for part in parts[1:]:
-        if part.strip() == end_boundary:
-            break
-
-        header_end = part.find(b"\r\n\r\n")
-        if header_end == -1:
-            continue
-
-        headers_part = part[:header_end]
-        content = part[header_end + 4:]
-
-        headers = {}
-        for line in headers_part.split(b"\r\n"):
-            if b":" in line:
-                k, v = line.split(b":", 1)
-                k = k.strip().upper()
-                v = v.strip()
-                k = k.decode("utf-8")
-                v = v.decode("utf-8")
-                headers[k] = v
-
-        disposition = headers.get("CONTENT-DISPOSITION", "")
-        disposition, params = parse_header(disposition)
-        name = params.get("name", "")
-
-        filename = params.get("filename")
-        if filename:
-            fp = TemporaryFile(mode="w+b")
-            fp.write(content)
-            fp.seek(0)
-            files[name] = fp
-        else:
-            content = content.decode("utf-8")
-            posts[name] = content.strip()
-
-    return posts, files
-
-
-def parse_multipart_stream(rw, boundary, max_upload_size=52428800, DEFAULT_BUFFER_SIZE=8192):
-    """
-    解析流式环境下的 multipart 表单数据
-
-    Args:
-        rw: 读写流对象
-        boundary: multipart boundary
-        max_upload_size: 最大上传大小
-        DEFAULT_BUFFER_SIZE: 默认缓冲区大小
-
-    Returns:
-        (posts, files): 表单字段字典和上传文件字典
-    """
-    from io import DEFAULT_BUFFER_SIZE as _DEFAULT_BUFFER_SIZE
-    from io import StringIO
-
-    boundary = boundary.encode("utf-8")
-    begin_boundary = b"--%s" % boundary
-    end_boundary = b"--%s--" % boundary
-    posts = {}
-    files = {}
-    s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE).strip()
-    while True:
-        if s.strip() != begin_boundary:
-            assert s.strip() == end_boundary
-            break
-        headers = {}
-        s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE).strip()
-        while s:
-            s = s.decode("utf-8")
-            k, v = s.split(":", 1)
-            headers[k.strip().upper()] = v.strip()
-            s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE).strip()
-        disposition = headers["CONTENT-DISPOSITION"]
-        disposition, params = parse_header(disposition)
-        name = params["name"]
-        filename = params.get("filename")
-        if filename:
-            fp = TemporaryFile(mode="w+b")
-            s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE)
-            while s.strip() != begin_boundary and s.strip() != end_boundary:
-                fp.write(s)
-                s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE)
-            fp.seek(0)
-            files[name] = fp
-        else:
-            fp = StringIO()
-            s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE)
-            while s.strip() != begin_boundary and s.strip() != end_boundary:
-                fp.write(s)
-                s = rw.readline(DEFAULT_BUFFER_SIZE or _DEFAULT_BUFFER_SIZE)
-            fp.seek(0)
-            posts[name] = fp.getvalue().strip().decode("utf-8")
-    return posts, files
+def _copy_form(form):
+    """复制备忘的解析结果，列表和嵌套字典也一并复制"""
+    copy = {}
+    for k, v in form.items():
+        if isinstance(v, list):
+            v = v[:]
+        elif isinstance(v, dict):
+            v = {pk: pv[:] if isinstance(pv, list) else pv for pk, pv in v.items()}
+        copy[k] = v
+    return copy
 
 
 __all__ = [
@@ -305,6 +164,10 @@ __all__ = [
     'parse_multipart_wsgi',
     'parse_multipart_asgi',
     'parse_multipart_stream',
+    'parse_multipart_receive',
+    'MultipartParser',
     '_form_cache',
+    'FORM_MEMO_SIZE',
+    'FORM_MEMO_MAX_LENGTH',
     'form_dict_match',
 ]
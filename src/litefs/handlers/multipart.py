@@ -0,0 +1,378 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+multipart/form-data 流式解析模块
+
+MultipartParser 是按块喂入数据的边界扫描状态机，WSGI、ASGI 和内置
+Socket 服务器共用。文件分段写入 SpooledTemporaryFile，超过 spool_size
+才落盘，解析过程中的内存占用只与块大小和 spool_size 有关，与上传大小无关
+"""
+
+import re
+from email.utils import unquote
+from tempfile import SpooledTemporaryFile
+
+from ..exceptions import HttpError
+
+# 文件分段保留在内存中的最大字节数，超过后转存到临时文件
+DEFAULT_SPOOL_SIZE = 1048576
+
+# 从输入流读取请求体时每次读取的字节数
+READ_CHUNK_SIZE = 65536
+
+# 单个分段头部的最大字节数，防止畸形请求让缓冲区无限增长
+MAX_PART_HEADER_SIZE = 16384
+
+# 解析状态
+_PREAMBLE, _HEADERS, _BODY, _DONE = range(4)
+
+_param_match = re.compile(r';\s*([^\s=;]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)').findall
+
+
+def parse_content_disposition(value):
+    """
+    解析分段的 Content-Disposition 头部
+
+    Args:
+        value: 头部值，如 'form-data; name="file"; filename="a.txt"'
+
+    Returns:
+        (disposition, params): 类型和参数字典，参数名为小写
+    """
+    disposition, sep, rest = value.partition(";")
+    params = {}
+    for key, val in _param_match(sep + rest):
+        params[key.lower()] = unquote(val.strip())
+    return disposition.strip().lower(), params
+
+
+def _too_large(max_size):
+    return HttpError(413, f"Request body too large. Maximum size is {max_size} bytes")
+
+
+class MultipartParser:
+    """
+    multipart/form-data 增量解析器
+
+    数据可以按任意大小分块喂入，边界跨块也能正确识别。
+    普通字段解码为 str 存入 posts，文件分段存入 files
+
+    用法:
+        parser = MultipartParser(boundary)
+        for chunk in chunks:
+            parser.feed(chunk)
+        posts, files = parser.close()
+    """
+
+    def __init__(self, boundary, max_size=52428800, spool_size=DEFAULT_SPOOL_SIZE):
+        """
+        初始化解析器
+
+        Args:
+            boundary: Content-Type 中的 boundary 参数
+            max_size: 请求体最大字节数，None 表示不限制
+            spool_size: 文件分段保留在内存中的最大字节数
+        """
+        if isinstance(boundary, str):
+            boundary = boundary.encode("latin-1")
+        if not boundary:
+            raise HttpError(400, "Missing multipart boundary")
+        # 首个边界前没有 CRLF，预置一个使所有边界都形如 CRLF--boundary
+        self._delimiter = b"\r\n--" + boundary
+        self._buffer = bytearray(b"\r\n")
+        self._state = _PREAMBLE
+        self._max_size = max_size
+        self._spool_size = spool_size
+        self._size = 0
+        self._name = None
+        self._file = None
+        self._chunks = None
+        self.posts = {}
+        self.files = {}
+
+    @property
+    def done(self):
+        """是否已读到结束边界"""
+        return self._state == _DONE
+
+    def feed(self, data):
+        """
+        喂入一块请求体数据
+
+        Args:
+            data: bytes 数据块，结束边界之后的数据会被忽略
+
+        Raises:
+            HttpError: 请求体超过 max_size 或格式错误
+        """
+        if not data or self._state == _DONE:
+            return
+        self._size += len(data)
+        if self._max_size is not None and self._size > self._max_size:
+            self._abort()
+            raise _too_large(self._max_size)
+        self._buffer += data
+        try:
+            self._parse()
+        except HttpError:
+            self._abort()
+            raise
+
+    def close(self):
+        """
+        结束解析
+
+        Returns:
+            (posts, files): 表单字段字典和上传文件字典
+
+        Raises:
+            HttpError: 请求体在分段中途截断
+        """
+        if self._state in (_HEADERS, _BODY):
+            self._abort()
+            raise HttpError(400, "Incomplete multipart body")
+        self._state = _DONE
+        self._buffer = bytearray()
+        return self.posts, self.files
+
+    def _parse(self):
+        buf = self._buffer
+        delimiter = self._delimiter
+        keep = len(delimiter) - 1
+        while True:
+            state = self._state
+            if state == _BODY:
+                idx = buf.find(delimiter)
+                if idx < 0:
+                    # 末尾可能是被截断的边界，保留 keep 字节等待下一块
+                    safe = len(buf) - keep
+                    if safe > 0:
+                        self._write(buf[:safe])
+                        del buf[:safe]
+                    return
+                if idx:
+                    self._write(buf[:idx])
+                    del buf[:idx]
+                self._end_part()
+                self._state = _PREAMBLE
+            elif state == _PREAMBLE:
+                idx = buf.find(delimiter)
+                if idx < 0:
+                    # 丢弃前导内容，只保留可能是边界开头的部分
+                    if len(buf) > keep:
+                        del buf[:len(buf) - keep]
+                    return
+                if idx:
+                    del buf[:idx]
+                end = len(delimiter)
+                if len(buf) < end + 2:
+                    return
+                if buf[end:end + 2] == b"--":
+                    self._state = _DONE
+                    del buf[:]
+                    return
+                # 边界行可能带有空白填充，以 CRLF 结束
+                eol = buf.find(b"\r\n", end)
+                if eol < 0:
+                    if len(buf) > MAX_PART_HEADER_SIZE:
+                        raise HttpError(400, "Invalid multipart boundary line")
+                    return
+                del buf[:eol + 2]
+                self._state = _HEADERS
+            elif state == _HEADERS:
+                if buf[:2] == b"\r\n":
+                    # 没有任何头部的分段
+                    end, header_block = 2, b""
+                else:
+                    idx = buf.find(b"\r\n\r\n")
+                    if idx < 0:
+                        if len(buf) > MAX_PART_HEADER_SIZE:
+                            raise HttpError(400, "Multipart part headers too large")
+                        return
+                    end, header_block = idx + 4, bytes(buf[:idx])
+                del buf[:end]
+                self._start_part(header_block)
+                self._state = _BODY
+            else:
+                return
+
+    def _start_part(self, header_block):
+        headers = {}
+        for line in header_block.split(b"\r\n"):
+            key, sep, value = line.partition(b":")
+            if sep:
+                headers[key.strip().decode("latin-1").upper()] = value.strip().decode("utf-8")
+        _, params = parse_content_disposition(headers.get("CONTENT-DISPOSITION", ""))
+        self._name = params.get("name", "")
+        if params.get("filename"):
+            self._file = SpooledTemporaryFile(max_size=self._spool_size, mode="w+b")
+        else:
+            self._chunks = []
+
+    def _write(self, data):
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._chunks.append(data)
+
+    def _end_part(self):
+        if self._file is not None:
+            self._file.seek(0)
+            self.files[self._name] = self._file
+            self._file = None
+        else:
+            self.posts[self._name] = b"".join(self._chunks).decode("utf-8")
+            self._chunks = None
+
+    def _abort(self):
+        """出错时关闭已创建的临时文件"""
+        self._state = _DONE
+        self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for fp in self.files.values():
+            fp.close()
+        self.files = {}
+
+
+def parse_multipart_wsgi(wsgi_input, boundary, content_length, max_upload_size=52428800,
+                         spool_size=DEFAULT_SPOOL_SIZE):
+    """
+    解析 WSGI 环境下的 multipart 表单数据
+
+    Args:
+        wsgi_input: WSGI 输入流
+        boundary: multipart boundary
+        content_length: 内容长度
+        max_upload_size: 最大上传大小
+        spool_size: 文件分段保留在内存中的最大字节数
+
+    Returns:
+        (posts, files): 表单字段字典和上传文件字典
+    """
+    if content_length > max_upload_size:
+        raise _too_large(max_upload_size)
+    parser = MultipartParser(boundary, max_upload_size, spool_size)
+    _feed_from(parser, wsgi_input.read, content_length)
+    return parser.close()
+
+
+def parse_multipart_asgi(body, boundary, max_upload_size=52428800,
+                         spool_size=DEFAULT_SPOOL_SIZE):
+    """
+    解析已读取完整的 multipart 请求体
+
+    Args:
+        body: 请求体字节数据
+        boundary: multipart boundary
+        max_upload_size: 最大上传大小
+        spool_size: 文件分段保留在内存中的最大字节数
+
+    Returns:
+        (posts, files): 表单字段字典和上传文件字典
+    """
+    parser = MultipartParser(boundary, max_upload_size, spool_size)
+    parser.feed(body)
+    return parser.close()
+
+
+def parse_multipart_chunks(chunks, boundary, max_upload_size=52428800,
+                           spool_size=DEFAULT_SPOOL_SIZE):
+    """
+    解析 bytes 数据块序列中的 multipart 表单数据，如解码后的 chunked 请求体
+
+    Args:
+        chunks: bytes 数据块的可迭代对象
+        boundary: multipart boundary
+        max_upload_size: 最大上传大小
+        spool_size: 文件分段保留在内存中的最大字节数
+
+    Returns:
+        (posts, files): 表单字段字典和上传文件字典
+    """
+    parser = MultipartParser(boundary, max_upload_size, spool_size)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+async def parse_multipart_receive(receive, boundary, max_upload_size=52428800,
+                                  spool_size=DEFAULT_SPOOL_SIZE):
+    """
+    直接消费 ASGI receive() 消息解析 multipart 表单数据，不缓冲整个请求体
+
+    Args:
+        receive: ASGI receive 可调用对象
+        boundary: multipart boundary
+        max_upload_size: 最大上传大小
+        spool_size: 文件分段保留在内存中的最大字节数
+
+    Returns:
+        (posts, files): 表单字段字典和上传文件字典
+    """
+    parser = MultipartParser(boundary, max_upload_size, spool_size)
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        if message["type"] != "http.request":
+            continue
+        parser.feed(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return parser.close()
+
+
+def parse_multipart_stream(rw, boundary, max_upload_size=52428800, DEFAULT_BUFFER_SIZE=8192,
+                           content_length=None, spool_size=DEFAULT_SPOOL_SIZE):
+    """
+    解析流式环境下的 multipart 表单数据
+
+    Args:
+        rw: 读写流对象
+        boundary: multipart boundary
+        max_upload_size: 最大上传大小
+        DEFAULT_BUFFER_SIZE: 未知长度时按行读取的最大字节数
+        content_length: 请求体长度，给出时恰好读取这么多字节，
+            否则按行读取直到结束边界，避免读入同一连接上的下一个请求
+        spool_size: 文件分段保留在内存中的最大字节数
+
+    Returns:
+        (posts, files): 表单字段字典和上传文件字典
+    """
+    parser = MultipartParser(boundary, max_upload_size, spool_size)
+    if content_length is not None:
+        _feed_from(parser, rw.read, content_length)
+    else:
+        readline = rw.readline
+        while not parser.done:
+            line = readline(DEFAULT_BUFFER_SIZE)
+            if not line:
+                break
+            parser.feed(line)
+    return parser.close()
+
+
+def _feed_from(parser, read, length):
+    """从 read 读取恰好 length 字节喂给解析器"""
+    remaining = length
+    while remaining > 0:
+        chunk = read(min(remaining, READ_CHUNK_SIZE))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        parser.feed(chunk)
+
+
+__all__ = [
+    'DEFAULT_SPOOL_SIZE',
+    'MultipartParser',
+    'parse_content_disposition',
+    'parse_multipart_wsgi',
+    'parse_multipart_asgi',
+    'parse_multipart_chunks',
+    'parse_multipart_receive',
+    'parse_multipart_stream',
+]
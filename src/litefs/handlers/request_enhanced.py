@@ -188,6 +188,26 @@ class EnhancedRequestHandler:
         """
         return self._request.cookie
 
+    @property
+    def cookies(self):
+        """
+        获取 Cookie
+        
+        Returns:
+            {name: value} 字典
+        """
+        return self._request.cookies
+
+    @property
+    def headers(self):
+        """
+        获取所有请求头
+        
+        Returns:
+            RequestHeaders 实例
+        """
+        return self._request.headers
+
     @property
     def config(self):
         """
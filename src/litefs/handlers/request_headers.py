@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+请求头与 Cookie 解析
+
+RequestHeaders 和 parse_cookie 的结果由请求处理器按请求缓存，
+处理器、中间件和会话查找共用同一份，不再各自重复解析
+"""
+
+from http.cookies import _unquote
+
+# 重复出现时用 "; " 而不是 ", " 合并的头部
+_SEMICOLON_JOINED = frozenset(("cookie",))
+
+# environ 中不带 HTTP_ 前缀的请求头
+_CGI_HEADERS = {
+    "CONTENT_TYPE": "content-type",
+    "CONTENT_LENGTH": "content-length",
+}
+
+
+class RequestHeaders(dict):
+    """
+    请求头集合
+
+    名称统一以小写存储，get、[] 和 in 均不区分大小写。
+    作为 dict 使用时每个名称对应合并后的值，重复出现的头部按
+    HTTP 约定以 ", "（Cookie 为 "; "）合并，get_all 返回各个原始值
+    """
+
+    __slots__ = ("_multi",)
+
+    def __init__(self, pairs=()):
+        super(RequestHeaders, self).__init__()
+        # 仅记录重复出现的头部，name -> [value, ...]
+        self._multi = None
+        for name, value in pairs:
+            self.add(name, value)
+
+    @classmethod
+    def from_environ(cls, environ):
+        """
+        从 WSGI environ 构建
+
+        Args:
+            environ: WSGI environ 字典
+
+        Returns:
+            RequestHeaders 实例
+        """
+        headers = cls()
+        setitem = dict.__setitem__
+        for key, value in environ.items():
+            if key.startswith("HTTP_"):
+                setitem(headers, key[5:].replace("_", "-").lower(), value)
+            elif key in _CGI_HEADERS:
+                setitem(headers, _CGI_HEADERS[key], value)
+        return headers
+
+    @classmethod
+    def from_asgi(cls, raw_headers):
+        """
+        从 ASGI scope 的 headers 构建
+
+        Args:
+            raw_headers: [(name_bytes, value_bytes), ...]
+
+        Returns:
+            RequestHeaders 实例
+        """
+        headers = cls()
+        add = headers.add
+        for name, value in raw_headers:
+            add(name.decode("latin-1"), value.decode("utf-8"))
+        return headers
+
+    def add(self, name, value):
+        """
+        添加一个请求头，名称已存在时保留全部值
+
+        Args:
+            name: 头部名称
+            value: 头部值
+        """
+        name = name.lower()
+        if not dict.__contains__(self, name):
+            dict.__setitem__(self, name, value)
+            return
+        if self._multi is None:
+            self._multi = {}
+        values = self._multi.get(name)
+        if values is None:
+            values = self._multi[name] = [dict.__getitem__(self, name)]
+        values.append(value)
+        sep = "; " if name in _SEMICOLON_JOINED else ", "
+        dict.__setitem__(self, name, sep.join(values))
+
+    def get_all(self, name):
+        """
+        获取某个请求头的全部值
+
+        Args:
+            name: 头部名称
+
+        Returns:
+            值列表，不存在时为空列表
+        """
+        name = name.lower()
+        if self._multi is not None and name in self._multi:
+            return list(self._multi[name])
+        value = dict.get(self, name)
+        return [] if value is None else [value]
+
+    def get(self, name, default=None):
+        return dict.get(self, name.lower(), default)
+
+    def __getitem__(self, name):
+        return dict.__getitem__(self, name.lower())
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name.lower())
+
+
+def parse_cookie(cookie_str):
+    """
+    解析 Cookie 请求头
+
+    只做一次分割，不构建 Morsel；遇到不合法的片段跳过，
+    而不是像 SimpleCookie 那样丢弃之后的全部 Cookie。
+    同名 Cookie 以最后出现的为准，与 SimpleCookie 一致
+
+    Args:
+        cookie_str: Cookie 请求头的值
+
+    Returns:
+        {name: value} 字典
+    """
+    cookies = {}
+    if not cookie_str:
+        return cookies
+    for chunk in cookie_str.split(";"):
+        name, sep, value = chunk.partition("=")
+        if not sep:
+            continue
+        name = name.strip()
+        if not name:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+            value = _unquote(value)
+        cookies[name] = value
+    return cookies
@@ -7,11 +7,11 @@ HTTP 响应对象和响应构建工具
 提供 Response 类和相关的响应构建方法
 """
 
-import json
 import os
 import sys
 from http.client import responses as http_status_codes
 
+from .. import json
 from .._version import __version__
 
 # 默认配置
@@ -51,8 +51,10 @@ class Response:
     def json(cls, data, status_code=200, headers=None):
         """
         返回 JSON 响应
+
+        内容直接序列化为 UTF-8 字节串，响应编码时不再重复处理
         """
-        content = json.dumps(data, ensure_ascii=False)
+        content = json.dumps_bytes(data)
         headers = headers or []
         # 确保设置正确的 Content-Type
         has_content_type = any(h[0].lower() == 'content-type' for h in headers)
@@ -0,0 +1,505 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+响应编码模块
+
+把处理器的返回值一次性规范化为 (状态码, 响应头, 响应体迭代器)，
+socket、WSGI、ASGI 三种运行方式共用同一套内容类型推断和响应体编码规则
+"""
+
+from collections.abc import Iterable
+from http.client import responses as http_status_codes
+
+from .. import json
+from .response import (
+    Response,
+    default_content_type,
+    json_content_type,
+    server_info,
+)
+
+text_content_type = "text/plain; charset=utf-8"
+binary_content_type = "application/octet-stream"
+
+# 每个响应默认携带的头部
+DEFAULT_HEADERS = (
+    ("Server", server_info),
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "SAMEORIGIN"),
+    ("X-XSS-Protection", "1; mode=block"),
+)
+
+# 默认头部预先编码好的字节块，socket 服务器直接整块写出
+DEFAULT_HEADERS_BLOCK = "".join("%s: %s\r\n" % h for h in DEFAULT_HEADERS).encode("utf-8")
+
+_DEFAULT_HEADERS_INDEX = {name.lower(): i for i, (name, _) in enumerate(DEFAULT_HEADERS)}
+_DEFAULT_HEADERS_COUNT = len(DEFAULT_HEADERS)
+
+# 允许重复出现的响应头，其余同名头部后写入的覆盖先写入的
+MULTI_VALUE_HEADERS = frozenset(
+    ("set-cookie", "link", "vary", "via", "warning", "www-authenticate")
+)
+
+# 不允许携带响应体的状态码
+BODYLESS_STATUS_CODES = frozenset((204, 304))
+
+# JSON 响应中以这些字符开头的字符串视为已序列化的 JSON 文档，原样输出
+_JSON_DOCUMENT_STARTS = frozenset(("{", "[", '"'))
+
+_status_lines = {}
+_http_status_lines = {}
+
+
+def status_line(status_code):
+    """
+    返回形如 "200 OK" 的状态行，按状态码缓存
+
+    Args:
+        status_code: HTTP 状态码
+
+    Returns:
+        状态行字符串
+    """
+    line = _status_lines.get(status_code)
+    if line is None:
+        line = "%d %s" % (status_code, http_status_codes.get(status_code, "Unknown"))
+        _status_lines[status_code] = line
+    return line
+
+
+def http_status_line(status_code):
+    """
+    返回形如 b"HTTP/1.1 200 OK\\r\\n" 的响应首行，按状态码缓存
+
+    Args:
+        status_code: HTTP 状态码
+
+    Returns:
+        响应首行字节串
+    """
+    line = _http_status_lines.get(status_code)
+    if line is None:
+        line = ("HTTP/1.1 %s\r\n" % status_line(status_code)).encode("utf-8")
+        _http_status_lines[status_code] = line
+    return line
+
+
+class ResponseHeaders:
+    """
+    大小写不敏感、保持写入顺序的响应头集合
+
+    同名头部后写入的覆盖先写入的，MULTI_VALUE_HEADERS 中的头部（如 Set-Cookie）
+    允许重复出现。迭代时产生 (name, value) 二元组，可直接交给 WSGI 的 start_response
+    """
+
+    __slots__ = ("_items", "_index", "_defaults")
+
+    def __init__(self, headers=None, defaults=False):
+        """
+        Args:
+            headers: 初始响应头，可以是二元组列表、字典或 ResponseHeaders
+            defaults: 是否预置 DEFAULT_HEADERS
+        """
+        if defaults:
+            self._items = list(DEFAULT_HEADERS)
+            self._index = dict(_DEFAULT_HEADERS_INDEX)
+        else:
+            self._items = []
+            self._index = {}
+        # 默认头部未被改写时，编码时可以直接复用 DEFAULT_HEADERS_BLOCK
+        self._defaults = defaults
+        if headers:
+            self.update(headers)
+
+    def add(self, name, value):
+        """添加响应头，非多值头部会覆盖已有的同名头部"""
+        key = name.lower()
+        if key in MULTI_VALUE_HEADERS:
+            self._index.setdefault(key, len(self._items))
+            self._items.append((name, value))
+        else:
+            self._set(key, name, value)
+
+    def set(self, name, value):
+        """设置响应头，移除所有已有的同名头部"""
+        key = name.lower()
+        if key in MULTI_VALUE_HEADERS and key in self._index:
+            self.remove(name)
+        self._set(key, name, value)
+
+    def _set(self, key, name, value):
+        index = self._index.get(key)
+        if index is None:
+            self._index[key] = len(self._items)
+            self._items.append((name, value))
+            return
+        if self._items[index] == (name, value):
+            return
+        if self._defaults and index < _DEFAULT_HEADERS_COUNT:
+            self._defaults = False
+        self._items[index] = (name, value)
+
+    def setdefault(self, name, value):
+        """响应头不存在时才设置，返回最终的值"""
+        index = self._index.get(name.lower())
+        if index is not None:
+            return self._items[index][1]
+        self._index[name.lower()] = len(self._items)
+        self._items.append((name, value))
+        return value
+
+    def ensure_defaults(self):
+        """补齐缺失的 DEFAULT_HEADERS"""
+        if self._defaults:
+            return
+        for name, value in DEFAULT_HEADERS:
+            self.setdefault(name, value)
+
+    def get(self, name, default=None):
+        index = self._index.get(name.lower())
+        if index is None:
+            return default
+        return self._items[index][1]
+
+    def get_all(self, name):
+        """返回同名头部的全部值"""
+        key = name.lower()
+        if key not in self._index:
+            return []
+        return [v for k, v in self._items if k.lower() == key]
+
+    def remove(self, name):
+        """移除所有同名头部"""
+        key = name.lower()
+        if key not in self._index:
+            return
+        if self._defaults and key in _DEFAULT_HEADERS_INDEX:
+            self._defaults = False
+        self._items = [item for item in self._items if item[0].lower() != key]
+        index = {}
+        for i, (k, _) in enumerate(self._items):
+            index.setdefault(k.lower(), i)
+        self._index = index
+
+    def update(self, headers):
+        """
+        合并响应头
+
+        Args:
+            headers: 二元组列表、字典或 ResponseHeaders
+        """
+        if isinstance(headers, dict):
+            headers = headers.items()
+        for name, value in headers:
+            self.add(name, value)
+
+    def append(self, header):
+        """兼容 list.append 的写法，header 为 (name, value) 二元组"""
+        self.add(header[0], header[1])
+
+    extend = update
+
+    def items(self):
+        return list(self._items)
+
+    def to_list(self):
+        """返回内部的二元组列表，调用方不应再修改本对象"""
+        return self._items
+
+    def copy(self):
+        headers = ResponseHeaders.__new__(ResponseHeaders)
+        headers._items = list(self._items)
+        headers._index = dict(self._index)
+        headers._defaults = self._defaults
+        return headers
+
+    def encode(self):
+        """
+        编码为 HTTP/1.1 响应头字节块（不含结尾空行）
+
+        Returns:
+            响应头字节串
+        """
+        if self._defaults:
+            rest = self._items[_DEFAULT_HEADERS_COUNT:]
+            if not rest:
+                return DEFAULT_HEADERS_BLOCK
+            return DEFAULT_HEADERS_BLOCK + "".join(
+                ["%s: %s\r\n" % item for item in rest]
+            ).encode("utf-8")
+        return "".join(["%s: %s\r\n" % item for item in self._items]).encode("utf-8")
+
+    def encode_asgi(self):
+        """编码为 ASGI 要求的 [(bytes, bytes)] 列表"""
+        return [(k.encode("utf-8"), str(v).encode("utf-8")) for k, v in self._items]
+
+    def __contains__(self, name):
+        return name.lower() in self._index
+
+    def __getitem__(self, name):
+        index = self._index.get(name.lower())
+        if index is None:
+            raise KeyError(name)
+        return self._items[index][1]
+
+    __setitem__ = set
+
+    def __delitem__(self, name):
+        if name.lower() not in self._index:
+            raise KeyError(name)
+        self.remove(name)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __eq__(self, other):
+        if isinstance(other, ResponseHeaders):
+            return self._items == other._items
+        return self._items == other
+
+    def __repr__(self):
+        return "ResponseHeaders(%r)" % (self._items,)
+
+
+def is_json_content_type(content_type):
+    """判断 Content-Type 是否为 JSON"""
+    return bool(content_type) and "application/json" in content_type
+
+
+def infer_content_type(content, status_code=200):
+    """
+    根据状态码和内容推断 Content-Type
+
+    Args:
+        content: 响应内容
+        status_code: HTTP 状态码
+
+    Returns:
+        Content-Type 字符串
+    """
+    if status_code >= 400 or isinstance(content, str) or content is None:
+        return default_content_type
+    if isinstance(content, (dict, list, tuple)):
+        return json_content_type
+    if isinstance(content, bytes):
+        return binary_content_type
+    if isinstance(content, Iterable):
+        return text_content_type
+    return default_content_type
+
+
+def _dump_json(content):
+    return json.dumps_bytes(content, default=str)
+
+
+def _encode_item(item):
+    if isinstance(item, bytes):
+        return item
+    if isinstance(item, str):
+        return item.encode("utf-8")
+    return str(item).encode("utf-8")
+
+
+def _iter_chunks(content):
+    for item in content:
+        chunk = _encode_item(item)
+        # 空块会被 chunked 编码当作结束标记，直接跳过
+        if chunk:
+            yield chunk
+
+
+def encode_body(content, content_type=None):
+    """
+    把响应内容编码为字节串
+
+    规则：
+        - bytes 原样输出，str 按 UTF-8 编码
+        - JSON 响应中的 str 若不是以 {、[、" 开头的 JSON 文档，会被序列化为 JSON 字符串
+        - dict 总是序列化为 JSON；list、tuple 在 JSON 响应中序列化，否则逐项拼接
+        - 生成器等其他可迭代对象逐项编码，作为流式响应体
+        - 其他对象在 JSON 响应中序列化，否则转换为 str
+
+    Args:
+        content: 响应内容
+        content_type: 响应的 Content-Type
+
+    Returns:
+        (chunks, length): 定长内容返回字节串列表和总长度，
+        流式内容返回字节串迭代器，长度为 None
+    """
+    if isinstance(content, bytes):
+        return [content], len(content)
+    if isinstance(content, str):
+        if (
+            is_json_content_type(content_type)
+            and content.lstrip()[:1] not in _JSON_DOCUMENT_STARTS
+        ):
+            content = json.dumps(content)
+        data = content.encode("utf-8")
+        return [data], len(data)
+    if content is None:
+        return [], 0
+    if isinstance(content, dict):
+        data = _dump_json(content)
+    elif isinstance(content, (list, tuple)):
+        if is_json_content_type(content_type):
+            data = _dump_json(content)
+        else:
+            data = b"".join([_encode_item(item) for item in content])
+    elif isinstance(content, (bytearray, memoryview)):
+        data = bytes(content)
+    elif isinstance(content, Iterable):
+        return _iter_chunks(content), None
+    elif is_json_content_type(content_type):
+        data = _dump_json(content)
+    else:
+        data = str(content).encode("utf-8")
+    return [data], len(data)
+
+
+def iter_chunked(chunks):
+    """
+    按 HTTP/1.1 chunked 编码输出响应体
+
+    Args:
+        chunks: 字节串可迭代对象
+
+    Yields:
+        带长度前缀的分块，最后输出结束块
+    """
+    for chunk in chunks:
+        if chunk:
+            yield b"%x\r\n%s\r\n" % (len(chunk), chunk)
+    yield b"0\r\n\r\n"
+
+
+def normalize_result(result):
+    """
+    识别处理器返回值的形态
+
+    支持 Response 对象、(status, headers, content) 三元组和裸内容。
+    三元组中的 status 可以是 "200 OK" 形式的字符串，也可以是整数
+
+    Args:
+        result: 处理器或中间件的返回值
+
+    Returns:
+        (status_code, headers, content)，裸内容的 status_code 和 headers 为 None
+    """
+    if isinstance(result, Response):
+        return result.status_code, result.headers, result.content
+    if (
+        isinstance(result, (tuple, list))
+        and len(result) == 3
+        and isinstance(result[0], (str, int))
+        and isinstance(result[1], (list, ResponseHeaders))
+    ):
+        status, headers, content = result
+        if isinstance(status, str):
+            status = int(status.split(None, 1)[0])
+        return status, headers, content
+    return None, None, result
+
+
+class EncodedResponse:
+    """
+    编码完成的响应
+
+    Attributes:
+        status_code: HTTP 状态码
+        headers: ResponseHeaders 响应头
+        body: 字节串列表或迭代器
+        length: 响应体长度，流式响应为 None
+    """
+
+    __slots__ = ("status_code", "headers", "body", "length")
+
+    def __init__(self, status_code, headers, body, length):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.length = length
+
+    @property
+    def status(self):
+        return status_line(self.status_code)
+
+    @property
+    def chunked(self):
+        """响应体是否需要按 chunked 编码写出"""
+        return self.headers.get("Transfer-Encoding", "").lower() == "chunked"
+
+
+def encode_response(result, status_code=200, headers=None, defaults=True, chunked=False):
+    """
+    把处理器返回值编码为 EncodedResponse
+
+    Args:
+        result: 处理器返回值，Response 对象、三元组或裸内容
+        status_code: 返回值未携带状态码时使用的状态码
+        headers: 处理器上已设置的响应头，返回值中的同名头部会覆盖它们；
+            传入 ResponseHeaders 时会被直接修改并复用
+        defaults: 是否添加 DEFAULT_HEADERS
+        chunked: 流式响应是否自动添加 Transfer-Encoding: chunked，
+            只有自行写出响应体的服务器需要，WSGI/ASGI 交给服务器处理
+
+    Returns:
+        EncodedResponse 对象
+    """
+    result_status, result_headers, content = normalize_result(result)
+    if result_status is not None:
+        status_code = int(result_status)
+
+    # 已经是 ResponseHeaders 的响应头直接复用，避免逐项复制
+    if isinstance(result_headers, ResponseHeaders) and not headers:
+        response_headers = result_headers
+        if defaults:
+            response_headers.ensure_defaults()
+    elif isinstance(headers, ResponseHeaders):
+        response_headers = headers
+        if defaults:
+            response_headers.ensure_defaults()
+        if result_headers:
+            response_headers.update(result_headers)
+    else:
+        response_headers = ResponseHeaders(headers, defaults=defaults)
+        if result_headers:
+            response_headers.update(result_headers)
+
+    content_type = response_headers.get("Content-Type")
+    if content_type is None:
+        content_type = infer_content_type(content, status_code)
+        response_headers.set("Content-Type", content_type)
+
+    if status_code in BODYLESS_STATUS_CODES or status_code < 200:
+        return EncodedResponse(status_code, response_headers, [], 0)
+
+    body, length = encode_body(content, content_type)
+    if "Content-Length" not in response_headers and "Transfer-Encoding" not in response_headers:
+        if length is not None:
+            response_headers.set("Content-Length", str(length))
+        elif chunked:
+            response_headers.set("Transfer-Encoding", "chunked")
+    return EncodedResponse(status_code, response_headers, body, length)
+
+
+__all__ = [
+    'DEFAULT_HEADERS',
+    'DEFAULT_HEADERS_BLOCK',
+    'MULTI_VALUE_HEADERS',
+    'BODYLESS_STATUS_CODES',
+    'ResponseHeaders',
+    'EncodedResponse',
+    'status_line',
+    'http_status_line',
+    'is_json_content_type',
+    'infer_content_type',
+    'encode_body',
+    'iter_chunked',
+    'normalize_result',
+    'encode_response',
+]
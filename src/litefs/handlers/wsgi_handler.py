@@ -8,18 +8,19 @@ WSGI 请求处理器
 符合 PEP 3333 规范
 """
 
-import json
-from hashlib import sha256
 from http.cookies import SimpleCookie
-from os import urandom
 from tempfile import TemporaryFile
 from urllib.parse import unquote_plus
 
+from .. import json
 from ..exceptions import HttpError
-from ..session import Session
+from ..session import Session, generate_session_id
 from ..utils import gmt_date, log_debug, log_error, render_error
 from .base_handler import BaseRequestHandler
+from .body_stream import DEFAULT_CHUNK_SIZE, iter_body, iter_until_eof
 from .form_parser import parse_form, parse_header, parse_multipart_wsgi
+from .multipart import DEFAULT_SPOOL_SIZE, parse_multipart_chunks
+from .response_encoder import status_line
 
 
 class WSGIRequestHandler(BaseRequestHandler):
@@ -35,51 +36,91 @@ class WSGIRequestHandler(BaseRequestHandler):
         self._headers = []
         self._get = parse_form(self._environ.get("QUERY_STRING", ""))
 
-        content_type = self._environ.get("CONTENT_TYPE", "")
-        if content_type:
-            content_type_raw = content_type
-            content_type, params = parse_header(content_type)
-            content_length_str = self._environ.get("CONTENT_LENGTH") or "0"
-            content_length = int(content_length_str) if content_length_str.strip() else 0
-
-            if content_length > 0:
-                max_request_size = getattr(app.config, "max_request_size", 10485760)
-                if content_length > max_request_size:
-                    raise HttpError(
-                        413, f"Request body too large. Maximum size is {max_request_size} bytes"
-                    )
-
-            if content_type_raw == "application/x-www-form-urlencoded":
-                if content_length > 0:
-                    wsgi_input = self._environ.get("wsgi.input")
-                    if wsgi_input:
-                        post_content = wsgi_input.read(content_length)
-                        post_content = post_content.decode("utf-8")
-                        self._post = parse_form(post_content)
-            elif content_type_raw.startswith("multipart/form-data"):
-                boundary = params.get("boundary")
-                if boundary:
-                    wsgi_input = self._environ.get("wsgi.input")
-                    if wsgi_input:
-                        content_length_str = self._environ.get("CONTENT_LENGTH") or "0"
-                        content_length = (
-                            int(content_length_str) if content_length_str.strip() else 0
-                        )
-                        if content_length > 0:
-                            self._post, self._files = parse_multipart_wsgi(
-                                wsgi_input, boundary, content_length,
-                                getattr(app.config, "max_upload_size", 52428800)
-                            )
-            else:
-                if content_length > 0:
-                    wsgi_input = self._environ.get("wsgi.input")
-                    if wsgi_input:
-                        self._body = wsgi_input.read(content_length)
-                        self._body = self._body.decode("utf-8")
+        # 请求体在首次访问 post、files、body、json 或调用 stream() 时才读取
+        self._body_loaded = False
 
         self._session_id, self._session = self._get_session()
         self._middlewares = app._get_middleware_instances()
 
+    def _load_body(self):
+        """
+        首次访问时从 wsgi.input 读取并解析请求体，结果缓存在实例上
+        """
+        if self._body_loaded:
+            return
+        self._body_loaded = True
+        environ = self._environ
+        content_type_raw = environ.get("CONTENT_TYPE", "")
+        if not content_type_raw:
+            return
+        wsgi_input = environ.get("wsgi.input")
+        if not wsgi_input:
+            return
+        content_length_str = environ.get("CONTENT_LENGTH") or "0"
+        content_length = int(content_length_str) if content_length_str.strip() else 0
+        chunked = self._is_chunked()
+        if content_length <= 0 and not chunked:
+            return
+
+        if content_type_raw.startswith("multipart/form-data"):
+            _, params = parse_header(content_type_raw)
+            boundary = params.get("boundary")
+            if not boundary:
+                return
+            spool_size = getattr(self._app.config, "upload_spool_size", DEFAULT_SPOOL_SIZE)
+            if chunked:
+                chunks = iter_until_eof(wsgi_input.read, self._upload_limit())
+                self._post, self._files = parse_multipart_chunks(
+                    chunks, boundary, self._upload_limit(), spool_size
+                )
+            else:
+                self._post, self._files = parse_multipart_wsgi(
+                    wsgi_input, boundary, content_length,
+                    self._upload_limit(), spool_size
+                )
+            return
+
+        if chunked:
+            post_content = b"".join(iter_until_eof(wsgi_input.read, self._body_limit()))
+        else:
+            limit = self._body_limit()
+            if content_length > limit:
+                raise HttpError(413, f"Request body too large. Maximum size is {limit} bytes")
+            post_content = wsgi_input.read(content_length)
+        if content_type_raw == "application/x-www-form-urlencoded":
+            self._post = parse_form(post_content.decode("utf-8"))
+        else:
+            self._body = post_content.decode("utf-8")
+
+    def stream(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        逐块读取请求体
+
+        有 Content-Length 时恰好读取这么多字节；chunked 请求由 WSGI 服务器解码，
+        读取到输入流结束。与 body、form、files、json 互斥，只能调用一次
+
+        Args:
+            chunk_size: 每次读取的字节数
+
+        Returns:
+            bytes 数据块的迭代器
+
+        Raises:
+            RuntimeError: 请求体已被读取
+        """
+        if self._body_loaded:
+            raise RuntimeError("Request body has already been read")
+        self._body_loaded = True
+        environ = self._environ
+        wsgi_input = environ.get("wsgi.input")
+        if wsgi_input is None:
+            return iter(())
+        if self._is_chunked():
+            return iter_until_eof(wsgi_input.read, self._body_limit(), chunk_size)
+        content_length_str = environ.get("CONTENT_LENGTH") or "0"
+        content_length = int(content_length_str) if content_length_str.strip() else 0
+        return iter_body(wsgi_input.read, content_length, self._body_limit(), chunk_size)
+
     def _normalize_environ(self, environ):
         normalized = dict(environ)
 
@@ -116,11 +157,8 @@ class WSGIRequestHandler(BaseRequestHandler):
         app = self._app
         sessions = app.sessions
         session_name = app.config.session_name
-        cookie_str = self._environ.get("HTTP_COOKIE", "")
-        cookie = SimpleCookie(cookie_str)
-        morsel = cookie.get(session_name)
-        if morsel is not None:
-            session_id = morsel.value
+        session_id = self.cookies.get(session_name)
+        if session_id:
             session = sessions.get(session_id)
             if session is not None:
                 # 设置存储后端实例，确保数据修改时自动保存
@@ -134,31 +172,32 @@ class WSGIRequestHandler(BaseRequestHandler):
         return None, session
 
     def _new_session_id(self):
-        app = self._app
-        sessions = app.sessions
-        while True:
-            token = urandom(32)
-            session_id = sha256(token).hexdigest()
-            session = sessions.get(session_id)
-            if session is None:
-                break
-        return session_id
+        return generate_session_id()
 
     @property
     def config(self):
         return self._app.config
 
+    @property
+    def post(self):
+        self._load_body()
+        return self._post
+
+    form = post
+
     @property
     def files(self):
+        self._load_body()
         return self._files or {}
 
     @property
     def body(self):
+        self._load_body()
         return self._body
 
     @property
     def json(self):
-        body = self._body
+        body = self.body
         if not body:
             return {}
         content_type = self._environ.get("CONTENT_TYPE", "")
@@ -178,6 +217,7 @@ class WSGIRequestHandler(BaseRequestHandler):
 
     @property
     def data(self):
+        self._load_body()
         return self._post
 
     @property
@@ -234,31 +274,6 @@ class WSGIRequestHandler(BaseRequestHandler):
     def referer(self):
         return self._environ.get("HTTP_REFERER")
 
-    @property
-    def headers(self):
-        """
-        获取所有请求头
-
-        Returns:
-            包含所有请求头的字典
-        """
-        headers = {}
-        for key, value in self._environ.items():
-            if key.startswith('HTTP_'):
-                header_name = key[5:].replace('_', '-').lower()
-                headers[header_name] = value
-            elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
-                header_name = key.replace('_', '-').lower()
-                headers[header_name] = value
-        return headers
-
-    @property
-    def cookie(self):
-        cookie_str = self._environ.get("HTTP_COOKIE", "")
-        cookie = SimpleCookie()
-        cookie.load(cookie_str)
-        return cookie
-
     def _add_header(self, key, value):
         self._headers.append((key, value))
 
@@ -272,7 +287,7 @@ class WSGIRequestHandler(BaseRequestHandler):
             if not v:
                 continue
             cookie[key][k] = v
-        self._headers.append(("Set-Cookie", str(cookie[key])))
+        self._headers.append(("Set-Cookie", cookie[key].OutputString()))
 
     def _redirect(self, url):
         url = "/" if url is None else url
@@ -306,17 +321,15 @@ class WSGIRequestHandler(BaseRequestHandler):
             cookie_header[session_name]['httponly'] = True
         if session_same_site:
             cookie_header[session_name]['samesite'] = session_same_site
-        return str(cookie_header[session_name])
+        return cookie_header[session_name].OutputString()
 
     def handler(self):
         from .response import Response
-        from http.client import responses as http_status_codes
         app = self._app
 
         middleware_result = app.middleware_manager.process_request(self)
         if middleware_result is not None:
-            if isinstance(middleware_result, Response):
-                return self.handle_response(middleware_result)
+            # Response 对象由响应编码器统一处理
             return middleware_result
 
         try:
@@ -328,6 +341,7 @@ class WSGIRequestHandler(BaseRequestHandler):
             route_match = app.router.match(path_info, request_method)
             if route_match:
                 handler, params = route_match
+                self._apply_route_options(handler)
                 try:
                     # 将路由参数添加到请求对象
                     setattr(self, 'route_params', params)
@@ -345,9 +359,7 @@ class WSGIRequestHandler(BaseRequestHandler):
                         # 设置 session cookie（每次都设置，确保 cookie 不会丢失）
                         result.headers.append(("Set-Cookie", self._build_session_cookie_header(session_key)))
 
-                        status_code = result.status_code
-                        status_text = http_status_codes.get(status_code, "Unknown")
-                        status = "%d %s" % (status_code, status_text)
+                        status = status_line(result.status_code)
                         return app.middleware_manager.process_response(
                             self, (status, result.headers, result.content)
                         )
@@ -367,12 +379,9 @@ class WSGIRequestHandler(BaseRequestHandler):
                             samesite=app.config.session_same_site
                         )
 
-                        status_code = int(self._status_code)
-                        status_text = http_status_codes.get(status_code, "Unknown")
-                        status = "%d %s" % (status_code, status_text)
-
-                        response_headers = [("Server", "litefs/0.8.0")]
-                        response_headers.extend(self._headers)
+                        status = status_line(int(self._status_code))
+                        # 默认头部由响应编码器补齐
+                        response_headers = list(self._headers)
 
                         return app.middleware_manager.process_response(
                             self, (status, response_headers, result)
@@ -380,6 +389,9 @@ class WSGIRequestHandler(BaseRequestHandler):
                     return app.middleware_manager.process_response(
                         self, self._response(self._status_code, content=result)
                     )
+                except HttpError:
+                    # 请求体过大等 HTTP 错误按对应状态码响应
+                    raise
                 except Exception:
                     log_error(app.logger)
                     if app.config.debug:
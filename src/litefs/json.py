@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+JSON 编解码模块
+
+框架内的 JSON 序列化统一经过这里，按 json_backend 配置选择实现：
+auto 时依次尝试 orjson、ujson，都未安装则回退到标准库 json。
+
+用法:
+    from litefs import json
+
+    data = json.dumps_bytes({"name": "tom"})
+    obj = json.loads(data)
+"""
+
+import dataclasses
+import datetime
+import decimal
+import enum
+import json as _json
+import uuid
+
+__all__ = [
+    'BACKENDS',
+    'JSONBackend',
+    'default',
+    'dumps',
+    'dumps_bytes',
+    'loads',
+    'get_backend',
+    'set_backend',
+]
+
+
+def default(obj):
+    """
+    标准库无法直接序列化的类型的默认转换
+
+    支持 datetime/date/time、Decimal、UUID、Enum、dataclass、set、bytes，
+    以及 SQLAlchemy 的查询结果行和 ORM 模型实例
+
+    Args:
+        obj: 待转换的对象
+
+    Returns:
+        可 JSON 序列化的对象
+
+    Raises:
+        TypeError: 不支持的类型
+    """
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8")
+    # SQLAlchemy 查询结果行（Row）
+    mapping = getattr(obj, "_mapping", None)
+    if mapping is not None:
+        return dict(mapping)
+    # SQLAlchemy ORM 模型实例
+    table = getattr(obj, "__table__", None)
+    if table is not None:
+        return {column.name: getattr(obj, column.key) for column in table.columns}
+    raise TypeError(
+        "Object of type %s is not JSON serializable" % type(obj).__name__
+    )
+
+
+def _chain_default(hook):
+    """组合调用方提供的 default 和模块默认的 default"""
+    if hook is None:
+        return default
+
+    def chained(obj):
+        try:
+            return default(obj)
+        except TypeError:
+            return hook(obj)
+
+    return chained
+
+
+class JSONBackend:
+    """
+    JSON 实现的统一接口
+
+    Attributes:
+        name: 实现名称
+    """
+
+    name = "json"
+
+    def dumps(self, obj, default=None):
+        return _json.dumps(obj, ensure_ascii=False, default=_chain_default(default))
+
+    def dumps_bytes(self, obj, default=None):
+        return self.dumps(obj, default).encode("utf-8")
+
+    def loads(self, s):
+        return _json.loads(s)
+
+
+class OrjsonBackend(JSONBackend):
+    """orjson 实现，直接输出 bytes"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, default=None):
+        return self.dumps_bytes(obj, default).decode("utf-8")
+
+    def dumps_bytes(self, obj, default=None):
+        return self._orjson.dumps(obj, default=_chain_default(default), option=self._option)
+
+    def loads(self, s):
+        return self._orjson.loads(s)
+
+
+class UjsonBackend(JSONBackend):
+    """ujson 实现"""
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+
+        self._ujson = ujson
+
+    def dumps(self, obj, default=None):
+        return self._ujson.dumps(
+            obj,
+            ensure_ascii=False,
+            escape_forward_slashes=False,
+            default=_chain_default(default),
+        )
+
+    def loads(self, s):
+        return self._ujson.loads(s)
+
+
+BACKENDS = {
+    "orjson": OrjsonBackend,
+    "ujson": UjsonBackend,
+    "json": JSONBackend,
+}
+
+# auto 模式下的尝试顺序
+_AUTO_ORDER = ("orjson", "ujson", "json")
+
+_backend = JSONBackend()
+
+
+def set_backend(name="auto"):
+    """
+    切换 JSON 实现
+
+    Args:
+        name: auto、orjson、ujson 或 json，auto 时选择已安装的最快实现
+
+    Returns:
+        生效的 JSONBackend 实例
+
+    Raises:
+        ValueError: 未知的实现名称
+        ImportError: 指定的实现未安装
+    """
+    global _backend
+    if name == "auto":
+        for candidate in _AUTO_ORDER:
+            try:
+                _backend = BACKENDS[candidate]()
+                break
+            except ImportError:
+                continue
+        return _backend
+    if name not in BACKENDS:
+        raise ValueError(f"无效的 JSON 后端: {name}")
+    _backend = BACKENDS[name]()
+    return _backend
+
+
+def get_backend():
+    """返回当前生效的 JSONBackend 实例"""
+    return _backend
+
+
+def dumps(obj, default=None):
+    """
+    序列化为 str
+
+    Args:
+        obj: 待序列化的对象
+        default: 额外的类型转换函数，在模块默认转换失败后调用
+
+    Returns:
+        JSON 字符串
+    """
+    return _backend.dumps(obj, default)
+
+
+def dumps_bytes(obj, default=None):
+    """
+    序列化为 UTF-8 编码的 bytes，省去一次 encode
+
+    Args:
+        obj: 待序列化的对象
+        default: 额外的类型转换函数，在模块默认转换失败后调用
+
+    Returns:
+        JSON 字节串
+    """
+    return _backend.dumps_bytes(obj, default)
+
+
+def loads(s):
+    """
+    反序列化 JSON
+
+    Args:
+        s: str、bytes 或 bytearray
+
+    Returns:
+        Python 对象
+    """
+    return _backend.loads(s)
+
+
+set_backend("auto")
@@ -60,6 +60,32 @@ class Middleware:
         """
         return None
 
+    def process_environ(self, environ):
+        """
+        在创建请求处理器（加载会话、解析参数、匹配路由）之前执行，只能使用 environ
+
+        Args:
+            environ: WSGI 环境变量字典
+
+        Returns:
+            None: 继续处理请求
+            其他值: 直接返回该值作为响应，跳过后续全部处理
+        """
+        return None
+
+    def process_encoded_response(self, environ, response):
+        """
+        处理编码完成的响应，在写出之前执行
+
+        Args:
+            environ: WSGI 环境变量字典
+            response: EncodedResponse 对象
+
+        Returns:
+            EncodedResponse 对象
+        """
+        return response
+
 
 class MiddlewareManager:
     """
@@ -166,3 +192,37 @@ class MiddlewareManager:
             if result is not None:
                 return result
         return None
+
+    def process_environ(self, middlewares, environ):
+        """
+        按顺序执行所有中间件的 process_environ 方法
+
+        Args:
+            middlewares: 中间件实例列表
+            environ: WSGI 环境变量字典
+
+        Returns:
+            None: 继续处理请求
+            其他值: 直接返回该值作为响应
+        """
+        for middleware in middlewares:
+            result = middleware.process_environ(environ)
+            if result is not None:
+                return result
+        return None
+
+    def process_encoded_response(self, middlewares, environ, response):
+        """
+        按逆序执行所有中间件的 process_encoded_response 方法
+
+        Args:
+            middlewares: 中间件实例列表
+            environ: WSGI 环境变量字典
+            response: EncodedResponse 对象
+
+        Returns:
+            处理后的 EncodedResponse 对象
+        """
+        for middleware in reversed(middlewares):
+            response = middleware.process_encoded_response(environ, response)
+        return response
@@ -135,12 +135,7 @@ class CSRFMiddleware(Middleware):
             CSRF 令牌
         """
         # 从 cookie 中获取现有令牌
-        cookie = request_handler.cookie
-        csrf_token = None
-        if cookie:
-            cookie_item = cookie.get(self.cookie_name)
-            if cookie_item:
-                csrf_token = cookie_item.value
+        csrf_token = self._get_cookie_token(request_handler)
         
         # 如果没有现有令牌，生成新的
         if not csrf_token:
@@ -172,14 +167,32 @@ class CSRFMiddleware(Middleware):
                 return form_token
         
         # 从 cookie 中获取
+        cookie_token = self._get_cookie_token(request_handler)
+        if cookie_token:
+            return cookie_token
+        
+        return None
+    
+    def _get_cookie_token(self, request_handler):
+        """
+        从请求 cookie 中读取令牌
+        
+        优先使用处理器缓存的 cookies 字典，避免每次构建 SimpleCookie
+        
+        Args:
+            request_handler: 请求处理器实例
+            
+        Returns:
+            CSRF 令牌，不存在时返回 None
+        """
+        cookies = getattr(request_handler, "cookies", None)
+        if isinstance(cookies, dict):
+            return cookies.get(self.cookie_name)
         cookie = request_handler.cookie
         if cookie:
             cookie_item = cookie.get(self.cookie_name)
             if cookie_item:
-                cookie_token = cookie_item.value
-                if cookie_token:
-                    return cookie_token
-        
+                return cookie_item.value
         return None
     
     def _validate_csrf_token(self, token, request_handler):
@@ -223,7 +236,7 @@ class CSRFMiddleware(Middleware):
         if self.cookie_same_site:
             cookie[self.cookie_name]['samesite'] = self.cookie_same_site
         
-        return str(cookie[self.cookie_name])
+        return cookie[self.cookie_name].OutputString()
     
     def _create_forbidden_response(self, message):
         """
@@ -17,7 +17,13 @@ class HealthCheck(Middleware):
     提供 /health 和 /health/ready 端点用于健康检查
     """
 
-    def __init__(self, app, path: str = '/health', ready_path: str = '/health/ready'):
+    def __init__(
+        self,
+        app,
+        path: str = '/health',
+        ready_path: str = '/health/ready',
+        metrics: Optional[Dict[str, Callable[[], Dict[str, Any]]]] = None
+    ):
         """
         初始化健康检查中间件
 
@@ -25,12 +31,14 @@ class HealthCheck(Middleware):
             app: Litefs 应用实例
             path: 健康检查端点路径，默认为 /health
             ready_path: 就绪检查端点路径，默认为 /health/ready
+            metrics: 指标名称 -> 返回指标字典的函数，见 add_metrics
         """
         super().__init__(app)
         self.path = path
         self.ready_path = ready_path
         self._checks: Dict[str, Callable] = {}
         self._ready_checks: Dict[str, Callable] = {}
+        self._metrics: Dict[str, Callable] = dict(metrics or {})
 
     def add_check(self, name: str, check_func: Callable[[], bool]):
         """
@@ -52,6 +60,16 @@ class HealthCheck(Middleware):
         """
         self._ready_checks[name] = check_func
 
+    def add_metrics(self, name: str, metrics_func: Callable[[], Dict[str, Any]]):
+        """
+        添加指标，随健康检查响应一起返回
+
+        Args:
+            name: 指标名称
+            metrics_func: 返回指标字典的函数，如 CacheManager.get_stats
+        """
+        self._metrics[name] = metrics_func
+
     def process_request(self, request_handler):
         """
         处理请求，检查是否为健康检查端点
@@ -112,6 +130,15 @@ class HealthCheck(Middleware):
             'checks': checks
         }
 
+        if self._metrics:
+            metrics = {}
+            for name, metrics_func in self._metrics.items():
+                try:
+                    metrics[name] = metrics_func()
+                except Exception as e:
+                    metrics[name] = {'error': str(e)}
+            response_data['metrics'] = metrics
+
         return Response.json(response_data, status_code=status_code)
 
     def _handle_ready_check(self, request_handler):
@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+HTTP 响应缓存中间件
+
+缓存编码完成的整个响应（状态码、响应头、响应体和压缩版本），在创建请求处理器之前
+查找缓存，命中的请求不加载会话、不匹配路由、不执行处理器。
+请求带有匹配的 If-None-Match 时直接返回 304
+"""
+
+import hashlib
+import time
+from typing import Dict, Iterable, Optional
+
+from ..handlers.response_encoder import ResponseHeaders, encode_response
+from ..static_compress import (
+    DEFAULT_MIN_COMPRESS_SIZE,
+    accepts_encoding,
+    available_encodings,
+    compress,
+    is_compressible,
+    parse_accept_encoding,
+)
+from .base import Middleware
+
+# 共享缓存默认可以缓存的状态码（RFC 9111 4.2.2）
+CACHEABLE_STATUS_CODES = frozenset((200, 203, 300, 301, 308, 404, 410))
+
+# 缓存条目中不保存、由命中时重新生成的响应头
+_GENERATED_HEADERS = frozenset(('content-length', 'content-encoding', 'etag', 'age', 'set-cookie'))
+
+# environ 中记录本次请求的缓存键和是否命中
+_KEY = 'litefs.response_cache.key'
+_HIT = 'litefs.response_cache.hit'
+
+
+def parse_cache_control(header: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    解析 Cache-Control 头部
+
+    Args:
+        header: 头部的值，如 "public, max-age=60"
+
+    Returns:
+        指令名（小写）-> 参数，没有参数的指令为 None
+    """
+    directives = {}
+    if not header:
+        return directives
+    for item in header.split(','):
+        name, _, value = item.partition('=')
+        name = name.strip().lower()
+        if name:
+            directives[name] = value.strip().strip('"') if value else None
+    return directives
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """判断 If-None-Match 是否匹配，比较时忽略弱 ETag 前缀"""
+    header = header.strip()
+    if header == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _environ_key(name: str) -> str:
+    return 'HTTP_' + name.upper().replace('-', '_')
+
+
+class ResponseCacheMiddleware(Middleware):
+    """
+    HTTP 响应缓存中间件
+
+    只缓存 GET 请求中响应头允许共享缓存的响应：Cache-Control 带有 s-maxage、max-age
+    或 public（此时使用 default_ttl），且没有 private、no-store、no-cache；
+    带有 Authorization 的请求只缓存 public 或 s-maxage 的响应。
+    除会话 cookie 之外还设置了其他 cookie 的响应不缓存，会话 cookie 不存入缓存。
+
+    Vary 中列出的请求头是缓存键的一部分；Vary: * 的响应不缓存。
+    可压缩的响应在存入时生成 encodings 中的压缩版本，命中时按 Accept-Encoding 选择。
+
+    应该最先添加，使其 process_encoded_response 最后执行，缓存其他中间件处理后的响应。
+    请求头中的 Cache-Control: no-cache 不会绕过缓存
+    """
+
+    def __init__(
+        self,
+        app,
+        cache=None,
+        default_ttl: Optional[int] = None,
+        max_body_size: int = 1024 * 1024,
+        encodings: Iterable[str] = ('gzip',),
+        min_compress_size: int = DEFAULT_MIN_COMPRESS_SIZE,
+        key_prefix: str = 'response:'
+    ):
+        """
+        初始化响应缓存中间件
+
+        Args:
+            app: Litefs 应用实例
+            cache: 缓存实例，默认为 app.caches；需要能保存 bytes
+            default_ttl: Cache-Control 只有 public 或没有 Cache-Control 时的缓存时间（秒），
+                None 表示这些响应不缓存
+            max_body_size: 可以缓存的最大响应体（字节）
+            encodings: 生成的压缩版本，顺序即协商时的优先顺序，未安装的编码被跳过
+            min_compress_size: 小于该大小的响应不压缩
+            key_prefix: 缓存键前缀
+        """
+        super().__init__(app)
+        self.cache = cache if cache is not None else app.caches
+        self.default_ttl = default_ttl
+        self.max_body_size = max_body_size
+        self.encodings = available_encodings(encodings)
+        self.min_compress_size = min_compress_size
+        self.key_prefix = key_prefix
+        self._session_cookie = f'{app.config.session_name}='
+
+    def process_environ(self, environ):
+        """
+        查找缓存，命中时直接返回缓存的响应
+
+        Args:
+            environ: WSGI 环境变量字典
+
+        Returns:
+            None: 未命中，继续处理请求
+            (status, headers, body): 缓存的响应或 304
+        """
+        if environ.get('REQUEST_METHOD', 'GET') not in ('GET', 'HEAD'):
+            return None
+        key = self._base_key(environ.get('PATH_INFO', '/'), environ.get('QUERY_STRING', ''))
+        environ[_KEY] = key
+
+        # 后端只需提供 get、put 和 delete，过期时间记录在缓存的值中
+        record = self.cache.get(key)
+        if record is None or record[0] <= time.time():
+            return None
+        entry = self.cache.get(self._variant_key(key, record[1], environ))
+        if entry is None or entry['expires'] <= time.time():
+            return None
+        environ[_HIT] = True
+        return self._respond(entry, environ)
+
+    def process_encoded_response(self, environ, response):
+        """
+        缓存可以共享的响应，并按 Accept-Encoding 和 If-None-Match 返回
+
+        Args:
+            environ: WSGI 环境变量字典
+            response: EncodedResponse 对象
+
+        Returns:
+            EncodedResponse 对象
+        """
+        key = environ.get(_KEY)
+        if key is None or environ.get(_HIT) or environ.get('REQUEST_METHOD', 'GET') != 'GET':
+            return response
+        if response.length is None or response.length > self.max_body_size:
+            return response
+        if response.status_code not in CACHEABLE_STATUS_CODES:
+            return response
+
+        headers = response.headers
+        ttl = self._ttl(headers.get('Cache-Control'), environ)
+        if ttl is None:
+            return response
+        vary = [name.strip().lower() for name in ','.join(headers.get_all('Vary')).split(',') if name.strip()]
+        if '*' in vary:
+            return response
+        cookies = headers.get_all('Set-Cookie')
+        if any(not cookie.startswith(self._session_cookie) for cookie in cookies):
+            return response
+
+        entry = self._make_entry(response, b''.join(response.body), ttl)
+        if len(entry['variants']) > 1:
+            # 压缩版本由中间件协商，Accept-Encoding 不计入缓存键
+            vary = [name for name in vary if name != 'accept-encoding']
+        vary = tuple(vary)
+        self.cache.put(key, (entry['expires'], vary))
+        self.cache.put(self._variant_key(key, vary, environ), entry)
+
+        status_code, result_headers, body = self._respond(entry, environ)
+        for cookie in cookies:
+            result_headers.add('Set-Cookie', cookie)
+        return encode_response((status_code, result_headers, body))
+
+    def invalidate(self, path: str, query_string: str = '') -> None:
+        """
+        使某个 URL 的缓存失效（包括按 Vary 区分的全部版本）
+
+        Args:
+            path: 请求路径
+            query_string: 查询字符串
+        """
+        self.cache.delete(self._base_key(path, query_string))
+
+    def _base_key(self, path: str, query_string: str) -> str:
+        if query_string:
+            return f'{self.key_prefix}{path}?{query_string}'
+        return f'{self.key_prefix}{path}'
+
+    def _variant_key(self, key: str, vary, environ) -> str:
+        if not vary:
+            return key + '|'
+        return key + '|' + '|'.join(environ.get(_environ_key(name), '') for name in vary)
+
+    def _ttl(self, cache_control: Optional[str], environ) -> Optional[int]:
+        """
+        根据 Cache-Control 计算缓存时间
+
+        Returns:
+            缓存时间（秒），None 表示不缓存
+        """
+        directives = parse_cache_control(cache_control)
+        if 'no-store' in directives or 'private' in directives or 'no-cache' in directives:
+            return None
+        shared = 'public' in directives or 's-maxage' in directives
+        if environ.get('HTTP_AUTHORIZATION') and not shared:
+            return None
+        for name in ('s-maxage', 'max-age'):
+            value = directives.get(name)
+            if value is not None:
+                try:
+                    ttl = int(value)
+                except ValueError:
+                    return None
+                return ttl if ttl > 0 else None
+        if self.default_ttl and (shared or cache_control is None):
+            return self.default_ttl
+        return None
+
+    def _make_entry(self, response, body: bytes, ttl: int) -> dict:
+        """
+        生成缓存条目
+
+        Returns:
+            {'status', 'headers', 'variants': 编码名 -> (响应体, ETag), 'created', 'expires'}
+        """
+        headers = response.headers
+        etag = headers.get('ETag')
+        if etag is None:
+            etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        variants = {'identity': (body, etag)}
+
+        stored = [
+            (name, value) for name, value in headers.items()
+            if name.lower() not in _GENERATED_HEADERS
+        ]
+        content_encoding = headers.get('Content-Encoding')
+        if content_encoding:
+            # 处理器已经压缩过的响应原样缓存
+            stored.append(('Content-Encoding', content_encoding))
+        else:
+            content_type = headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+            if len(body) >= self.min_compress_size and is_compressible(content_type):
+                for encoding in self.encodings:
+                    variants[encoding] = (compress(body, encoding), f'{etag[:-1]}-{encoding}"')
+                if len(variants) > 1 and 'accept-encoding' not in headers.get('Vary', '').lower():
+                    stored.append(('Vary', 'Accept-Encoding'))
+        now = time.time()
+        return {
+            'status': response.status_code,
+            'headers': stored,
+            'variants': variants,
+            'created': now,
+            'expires': now + ttl,
+        }
+
+    def _respond(self, entry: dict, environ) -> tuple:
+        """
+        按 Accept-Encoding 选择版本，If-None-Match 匹配时返回 304
+
+        Returns:
+            (status, ResponseHeaders, body)
+        """
+        variants = entry['variants']
+        encoding = 'identity'
+        if len(variants) > 1:
+            accepted = parse_accept_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+            for name in self.encodings:
+                if name in variants and accepts_encoding(accepted, name):
+                    encoding = name
+                    break
+        body, etag = variants[encoding]
+
+        headers = ResponseHeaders(entry['headers'])
+        headers.set('ETag', etag)
+        if encoding != 'identity':
+            headers.set('Content-Encoding', encoding)
+        age = int(time.time() - entry['created'])
+        if age > 0:
+            headers.set('Age', str(age))
+
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return 304, headers, b''
+        headers.set('Content-Length', str(len(body)))
+        return entry['status'], headers, body
+
+
+__all__ = [
+    'CACHEABLE_STATUS_CODES',
+    'ResponseCacheMiddleware',
+    'parse_cache_control',
+]
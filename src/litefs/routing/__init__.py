@@ -1,11 +1,11 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-from .router import Router, Route, route, get, post, put, delete, patch, options, head
+from .router import Router, Route, route, request_body, get, post, put, delete, patch, options, head
 from .radix_tree import RadixTree, RadixNode
 from litefs.exceptions import RouteNotFound
 
 __all__ = [
-    'Router', 'Route', 'route', 'get', 'post', 'put', 'delete',
+    'Router', 'Route', 'route', 'request_body', 'get', 'post', 'put', 'delete',
     'patch', 'options', 'head', 'RouteNotFound', 'RadixTree', 'RadixNode'
 ]
@@ -310,6 +310,19 @@ class Router:
         
         self._tree_dirty = False
     
+    def max_body_size(self, default: int) -> int:
+        """
+        获取所有路由允许的最大请求体字节数
+
+        Args:
+            default: 全局的 max_request_size
+
+        Returns:
+            default 与各路由 request_body(max_size=...) 中的最大值
+        """
+        sizes = [getattr(route.handler, '_max_body_size', None) for route in self.routes]
+        return max([default] + [size for size in sizes if size is not None])
+
     def url_for(self, name: str, **kwargs) -> str:
         """
         根据路由名称生成 URL
@@ -363,6 +376,33 @@ def route(path: str, methods: List[str] = None, name: Optional[str] = None):
     return decorator
 
 
+def request_body(max_size: Optional[int] = None, stream: bool = False):
+    """
+    设置路由的请求体选项
+
+    Args:
+        max_size: 该路由允许的最大请求体字节数，覆盖全局 max_request_size
+        stream: 处理器通过 request.stream() 自行读取请求体，
+            ASGI 下框架不再预先读取并解析请求体
+
+    Returns:
+        装饰器函数
+
+    用法:
+        @app.add_post('/ingest')
+        @request_body(max_size=500 * 1024 * 1024, stream=True)
+        def ingest(request):
+            for row in request.stream_json_lines():
+                ...
+    """
+    def decorator(handler: Callable) -> Callable:
+        handler._max_body_size = max_size
+        handler._stream_body = stream
+        return handler
+
+    return decorator
+
+
 def get(path: str, name: Optional[str] = None):
     """
     GET 方法路由装饰器
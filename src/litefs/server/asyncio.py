@@ -19,6 +19,7 @@ import time
 
 from ..exceptions import HttpError
 from ..handlers.request import ASGIRequestHandler
+from ..handlers.response_encoder import encode_response, http_status_line, iter_chunked
 from ..utils import log_error
 
 
@@ -65,50 +66,35 @@ class AsyncHTTPRequestHandler:
                     result = await handler.handler()
                     
                     # 处理返回值 (status, headers, content)
-                    if result and isinstance(result, (list, tuple)) and len(result) == 3:
-                        status, headers, content = result
-                        
-                        # 发送响应头
-                        status_code = int(status.split()[0])
-                        status_text = ' '.join(status.split()[1:])
-                        
-                        status_line = f"HTTP/1.1 {status_code} {status_text}\r\n"
-                        self.writer.write(status_line.encode('utf-8'))
-                        
-                        # 发送响应头
-                        for key, value in headers:
-                            header_line = f"{key}: {value}\r\n"
-                            self.writer.write(header_line.encode('utf-8'))
-                        
+                    if result is not None:
+                        response = encode_response(result, chunked=self.keep_alive)
+                        response.headers.remove("Connection")
+
                         # 添加 Connection 头
                         if self.keep_alive:
-                            self.writer.write(b"Connection: keep-alive\r\n")
-                            self.writer.write(f"Keep-Alive: timeout={int(self.keep_alive_timeout)}\r\n".encode('utf-8'))
+                            connection = (
+                                b"Connection: keep-alive\r\nKeep-Alive: timeout=%d\r\n"
+                                % int(self.keep_alive_timeout)
+                            )
                         else:
-                            self.writer.write(b"Connection: close\r\n")
-                        
-                        self.writer.write(b"\r\n")
-                        
+                            connection = b"Connection: close\r\n"
+                        self.writer.write(
+                            http_status_line(response.status_code)
+                            + response.headers.encode()
+                            + connection
+                            + b"\r\n"
+                        )
+
                         # 发送响应体
-                        if isinstance(content, str):
-                            content = content.encode('utf-8')
-                        elif isinstance(content, (list, tuple)):
-                            content = b''.join(
-                                chunk.encode('utf-8') if isinstance(chunk, str) else chunk
-                                for chunk in content
-                            )
-                        elif isinstance(content, dict):
-                            import json
-                            content = json.dumps(content).encode('utf-8')
-                        elif not isinstance(content, bytes):
-                            content = str(content).encode('utf-8')
-                        
-                        if content:
-                            self.writer.write(content)
-                        
+                        body = response.body
+                        if response.chunked:
+                            body = iter_chunked(body)
+                        for chunk in body:
+                            self.writer.write(chunk)
+
                         # 确保响应完全发送
                         await self.writer.drain()
-                        
+
                         # 如果不支持 keep-alive，退出循环
                         if not self.keep_alive:
                             break
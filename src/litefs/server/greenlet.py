@@ -70,6 +70,9 @@ def make_headers(rw: Any) -> Dict[str, str]:
             break
         k, v = s.split(":", 1)
         k, v = k.lower().strip(), v.strip()
+        if k in headers:
+            # 重复的请求头按 HTTP 约定合并，Cookie 使用 "; " 分隔
+            v = headers[k] + ("; " if k == "cookie" else ", ") + v
         headers[k] = v
         s = rw.readline(DEFAULT_BUFFER_SIZE)
         s = s.decode("utf-8")
@@ -99,7 +102,7 @@ def make_environ(server: Any, rw: Any, client_address: Tuple[str, int]) -> Dict[
     if "" == script_name:
         script_name = "index.html"
     environ["REQUEST_METHOD"] = request_method.upper()
-    environ["QUERY_STRING"] = unquote_plus(query_string)
+    environ["QUERY_STRING"] = query_string
     environ["SERVER_PROTOCOL"] = protocol
     environ["SCRIPT_NAME"] = script_name
     environ["PATH_INFO"] = path_info
@@ -1,4 +1,4 @@
-from .session import Session
+from .session import Session, generate_session_id
 from .db import DatabaseSession
 from .redis import RedisSession
 from .memcache import MemcacheSession
@@ -7,6 +7,7 @@ from .cache_session import CachedSessionStore
 
 __all__ = [
     "Session",
+    "generate_session_id",
     "DatabaseSession",
     "RedisSession",
     "MemcacheSession",
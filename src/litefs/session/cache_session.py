@@ -7,8 +7,9 @@
 为 DatabaseSession 添加缓存层，提高 Session 查找性能
 """
 
-from typing import Optional
+from typing import Dict, Optional
 
+from ..utils.aio import acall
 from .session import Session
 
 
@@ -73,6 +74,46 @@ class CachedSessionStore:
         
         return session
 
+    async def aput(self, session_id: str, session: Session) -> None:
+        """异步版本的 put"""
+        await acall(self.store, "put", session_id, session)
+        await acall(self.cache, "put", f"{self.cache_key_prefix}{session_id}", session)
+
+    async def aget(self, session_id: str) -> Optional[Session]:
+        """异步版本的 get"""
+        cache_key = f"{self.cache_key_prefix}{session_id}"
+        session = await acall(self.cache, "get", cache_key)
+        if session is not None:
+            return session
+
+        session = await acall(self.store, "get", session_id)
+        if session is not None:
+            await acall(self.cache, "put", cache_key, session)
+        return session
+
+    async def adelete(self, session_id: str) -> None:
+        """异步版本的 delete"""
+        await acall(self.store, "delete", session_id)
+        await acall(self.cache, "delete", f"{self.cache_key_prefix}{session_id}")
+
+    async def aget_many(self, session_ids: list) -> Dict[str, Session]:
+        """
+        批量获取 Session，只从底层存储读取缓存未命中的 Session
+
+        Returns:
+            Session ID -> Session，不包含不存在的 Session
+        """
+        cache_keys = {f"{self.cache_key_prefix}{session_id}": session_id for session_id in session_ids}
+        cached = await acall(self.cache, "get_many", list(cache_keys))
+        result = {cache_keys[key]: session for key, session in cached.items()}
+        missing = [session_id for session_id in session_ids if session_id not in result]
+        if missing:
+            found = await acall(self.store, "get_many", missing)
+            for session_id, session in found.items():
+                await acall(self.cache, "put", f"{self.cache_key_prefix}{session_id}", session)
+            result.update(found)
+        return result
+
     def delete(self, session_id: str) -> None:
         """
         删除 Session
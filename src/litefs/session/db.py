@@ -7,20 +7,25 @@ Database Session 后端
 提供基于 SQLite 数据库的 Session 实现
 """
 
-from multiprocessing import current_process
-import sqlite3
 import time
-import json
-from typing import Any, Optional
+from .. import json
+from typing import Any, Dict, Optional
 
+from ..utils.sqlite import DELETED, SQLiteAsyncMixin, SQLiteStore
 from .session import Session
 
+# 批量查询时每条语句的最大参数数量
+_MAX_VARIABLES = 500
 
-class DatabaseSession:
+
+class DatabaseSession(SQLiteAsyncMixin):
     """
     数据库 Session 实现
     
-    使用 SQLite 数据库作为 Session 存储，支持持久化存储
+    使用 SQLite 数据库作为 Session 存储，支持持久化存储。
+
+    保存和删除默认由后台线程合并后在一个事务中提交（见 SQLiteStore），
+    当前进程总能读到自己的写入，其他工作进程最多在 flush_interval 秒后读到
     """
 
     def __init__(
@@ -28,6 +33,9 @@ class DatabaseSession:
         db_path: str = ":memory:",
         table_name: str = "sessions",
         expiration_time: int = 3600,
+        write_behind: bool = True,
+        flush_interval: float = 0.05,
+        batch_size: int = 256,
         **kwargs
     ):
         """
@@ -37,28 +45,28 @@ class DatabaseSession:
             db_path: 数据库文件路径，默认为内存数据库
             table_name: Session 表名
             expiration_time: 默认过期时间（秒）
+            write_behind: 是否在后台批量写入，False 时每次写入立即提交
+            flush_interval: 批量写入最多等待的时间（秒）
+            batch_size: 等待写入的 Session 达到该数量时立即写入
             **kwargs: 其他配置参数
         """
         self._db_path = db_path
         self._table_name = table_name
         self._expiration_time = expiration_time
-        self._conn = None
+        self._store = SQLiteStore(
+            db_path,
+            f"INSERT OR REPLACE INTO {table_name} (session_id, data, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            f"DELETE FROM {table_name} WHERE session_id = ?",
+            write_behind=write_behind,
+            flush_interval=flush_interval,
+            batch_size=batch_size,
+        )
         self._create_table()
-        print(f"调试：数据库路径: {self._db_path}")
-
-    def _connect(self):
-        """连接数据库"""
-        if self._conn is None:
-            self._conn = sqlite3.connect(self._db_path)
-            self._conn.row_factory = sqlite3.Row
-        return self._conn
 
     def _create_table(self):
         """创建 Session 表"""
-        conn = self._connect()
-        cursor = conn.cursor()
         # 只在表不存在时创建表
-        cursor.execute(f"""
+        self._store.execute(f"""
             CREATE TABLE IF NOT EXISTS {self._table_name} (
                 session_id TEXT PRIMARY KEY,
                 data TEXT NOT NULL,
@@ -66,30 +74,12 @@ class DatabaseSession:
                 expires_at INTEGER NOT NULL
             )
         """)
-        conn.commit()
-        # 调试：打印表结构
-        cursor.execute(f"PRAGMA table_info({self._table_name})")
-        columns = cursor.fetchall()
-        print(f"调试：表 {self._table_name} 的结构：")
-        for column in columns:
-            print(f"  {column[1]}: {column[2]}")
 
     def _make_key(self, key: str) -> str:
         """生成键"""
         return key
 
-    def put(self, session_id: str, session: Session) -> None:
-        """
-        存储 Session
-        
-        Args:
-            session_id: Session ID
-            session: Session 对象
-        """
-        conn = self._connect()
-        cursor = conn.cursor()
-        print(f"调试：存储 Session: {session_id} {session.data}")
-        
+    def _row(self, session_id: str, session: Session) -> tuple:
         # 序列化 Session 数据
         try:
             data = json.dumps(dict(session))
@@ -98,22 +88,33 @@ class DatabaseSession:
         
         created_at = int(time.time())
         expires_at = created_at + self._expiration_time
+        return (session_id, data, created_at, expires_at)
+
+    def _load(self, session_id: str, data: str, expires_at: int) -> Optional[Session]:
+        """检查过期时间并反序列化，过期或损坏的 Session 在下一次批量写入时删除"""
+        if int(time.time()) > expires_at:
+            self.delete(session_id)
+            return None
         
-        # 插入或更新 Session
-        cursor.execute(f"""
-            INSERT OR REPLACE INTO {self._table_name} 
-            (session_id, data, created_at, expires_at) 
-            VALUES (?, ?, ?, ?)
-        """, (session_id, data, created_at, expires_at))
-        conn.commit()
-        cursor = conn.cursor()
-        ret = cursor.execute(f"""
-            SELECT * FROM {self._table_name} 
-            WHERE session_id = ?
-        """, (session_id,))
-        row = cursor.fetchone()
-        print(row.keys())
-        print(f"调试：查询 Session: {session_id} 结果: {row if row else '无'}")
+        try:
+            data = json.loads(data)
+        except Exception:
+            self.delete(session_id)
+            return None
+        
+        session = Session(session_id)
+        session.update(data)
+        return session
+
+    def put(self, session_id: str, session: Session) -> None:
+        """
+        存储 Session
+        
+        Args:
+            session_id: Session ID
+            session: Session 对象
+        """
+        self._store.put(session_id, self._row(session_id, session))
 
     def get(self, session_id: str) -> Optional[Session]:
         """
@@ -125,37 +126,65 @@ class DatabaseSession:
         Returns:
             Session 对象，如果不存在或已过期则返回 None
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        # 查询 Session
-        cursor.execute(f"""
+        pending = self._store.pending(session_id)
+        if pending is DELETED:
+            return None
+        if pending is not None:
+            return self._load(session_id, pending[1], pending[3])
+        
+        rows = self._store.query(f"""
             SELECT data, expires_at FROM {self._table_name} 
             WHERE session_id = ?
         """, (session_id,))
-        row = cursor.fetchone()
-        
-        if row is None:
+        if not rows:
             return None
+        return self._load(session_id, *rows[0])
+
+    def get_many(self, session_ids: list) -> Dict[str, Session]:
+        """
+        批量获取 Session
         
-        # 检查是否过期
-        expires_at = row['expires_at']
-        if int(time.time()) > expires_at:
-            # 删除过期 Session
-            self.delete(session_id)
-            return None
+        Args:
+            session_ids: Session ID 列表
         
-        # 反序列化 Session 数据
-        try:
-            data = json.loads(row['data'])
-        except Exception as e:
-            # 如果反序列化失败，删除损坏的 Session
-            self.delete(session_id)
-            return None
+        Returns:
+            Session ID -> Session，不存在或已过期的不包含在内
+        """
+        result = {}
+        rows = []
+        missing = []
+        for session_id in session_ids:
+            pending = self._store.pending(session_id)
+            if pending is None:
+                missing.append(session_id)
+            elif pending is not DELETED:
+                rows.append((session_id, pending[1], pending[3]))
         
-        # 创建 Session 对象
-        session = Session(session_id)
-        session.update(data)
-        return session
+        for i in range(0, len(missing), _MAX_VARIABLES):
+            chunk = missing[i:i + _MAX_VARIABLES]
+            placeholders = ','.join('?' * len(chunk))
+            rows.extend(self._store.query(
+                f"SELECT session_id, data, expires_at FROM {self._table_name} "
+                f"WHERE session_id IN ({placeholders})",
+                chunk
+            ))
+        
+        for session_id, data, expires_at in rows:
+            session = self._load(session_id, data, expires_at)
+            if session is not None:
+                result[session_id] = session
+        return result
+
+    def set_many(self, sessions: Dict[str, Session]) -> None:
+        """
+        批量存储 Session
+        
+        Args:
+            sessions: Session ID -> Session
+        """
+        self._store.put_many(
+            (session_id, self._row(session_id, session)) for session_id, session in sessions.items()
+        )
 
     def delete(self, session_id: str) -> None:
         """
@@ -164,13 +193,7 @@ class DatabaseSession:
         Args:
             session_id: Session ID
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            DELETE FROM {self._table_name} 
-            WHERE session_id = ?
-        """, (session_id,))
-        conn.commit()
+        self._store.delete(session_id)
 
     def exists(self, session_id: str) -> bool:
         """
@@ -182,21 +205,21 @@ class DatabaseSession:
         Returns:
             Session 是否存在且未过期
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        
-        # 查询 Session
-        cursor.execute(f"""
-            SELECT expires_at FROM {self._table_name} 
-            WHERE session_id = ?
-        """, (session_id,))
-        row = cursor.fetchone()
-        
-        if row is None:
+        pending = self._store.pending(session_id)
+        if pending is DELETED:
             return False
+        if pending is not None:
+            expires_at = pending[3]
+        else:
+            rows = self._store.query(f"""
+                SELECT expires_at FROM {self._table_name} 
+                WHERE session_id = ?
+            """, (session_id,))
+            if not rows:
+                return False
+            expires_at = rows[0][0]
         
         # 检查是否过期
-        expires_at = row['expires_at']
         return int(time.time()) <= expires_at
 
     def expire(self, session_id: str, expiration: int) -> bool:
@@ -210,22 +233,13 @@ class DatabaseSession:
         Returns:
             是否设置成功
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        
-        # 检查 Session 是否存在
-        if not self.exists(session_id):
-            return False
-        
-        # 更新过期时间
-        expires_at = int(time.time()) + expiration
-        cursor.execute(f"""
+        # 更新未过期 Session 的过期时间
+        now = int(time.time())
+        return self._store.execute(f"""
             UPDATE {self._table_name} 
             SET expires_at = ? 
-            WHERE session_id = ?
-        """, (expires_at, session_id))
-        conn.commit()
-        return True
+            WHERE session_id = ? AND expires_at >= ?
+        """, (now + expiration, session_id, now)) > 0
 
     def ttl(self, session_id: str) -> int:
         """
@@ -237,23 +251,22 @@ class DatabaseSession:
         Returns:
             剩余过期时间（秒），如果 Session 不存在则返回 -2，已过期则返回 -1
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        
-        # 查询 Session
-        cursor.execute(f"""
-            SELECT expires_at FROM {self._table_name} 
-            WHERE session_id = ?
-        """, (session_id,))
-        row = cursor.fetchone()
-        
-        if row is None:
+        pending = self._store.pending(session_id)
+        if pending is DELETED:
             return -2
+        if pending is not None:
+            expires_at = pending[3]
+        else:
+            rows = self._store.query(f"""
+                SELECT expires_at FROM {self._table_name} 
+                WHERE session_id = ?
+            """, (session_id,))
+            if not rows:
+                return -2
+            expires_at = rows[0][0]
         
         # 计算剩余过期时间
-        expires_at = row['expires_at']
-        current_time = int(time.time())
-        ttl = expires_at - current_time
+        ttl = expires_at - int(time.time())
         
         if ttl <= 0:
             # 删除过期 Session
@@ -266,10 +279,8 @@ class DatabaseSession:
         """
         清空所有 Session
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(f"DELETE FROM {self._table_name}")
-        conn.commit()
+        self._store.discard()
+        self._store.execute(f"DELETE FROM {self._table_name}")
 
     def __len__(self) -> int:
         """
@@ -278,21 +289,18 @@ class DatabaseSession:
         Returns:
             Session 数量
         """
-        conn = self._connect()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT COUNT(*) FROM {self._table_name}")
-        return cursor.fetchone()[0]
+        self._store.flush()
+        return self._store.query(f"SELECT COUNT(*) FROM {self._table_name}")[0][0]
+
+    def flush(self) -> None:
+        """立即写入等待中的保存和删除"""
+        self._store.flush()
 
     def close(self) -> None:
         """
-        关闭数据库连接
+        写入等待中的操作并关闭数据库连接
         """
-        if self._conn is not None:
-            try:
-                self._conn.close()
-            except Exception:
-                pass
-            self._conn = None
+        self._store.close()
 
     def __enter__(self):
         """支持上下文管理器"""
@@ -140,6 +140,8 @@ class SessionFactory:
                 "db_path": getattr(config, "database_path", ":memory:"),
                 "table_name": getattr(config, "database_session_table", "sessions"),
                 "expiration_time": getattr(config, "session_expiration_time", 3600),
+                "write_behind": getattr(config, "database_write_behind", True),
+                "flush_interval": getattr(config, "database_flush_interval", 0.05),
             }
         elif backend == SessionBackend.MEMCACHE:
             session_config = {
@@ -8,9 +8,11 @@ Memcache Session 后端
 """
 
 import time
-import json
+from .. import json
 from typing import Any, Optional
 
+from ..utils.aio import LoopLocal, run_sync
+from ..utils.aio_memcache import async_memcache_factory
 from .session import Session
 
 
@@ -18,7 +20,8 @@ class MemcacheSession:
     """
     Memcache Session 实现
     
-    使用 Memcache 作为 Session 存储，提供高性能的分布式缓存支持
+    使用 Memcache 作为 Session 存储，提供高性能的分布式缓存支持。
+    异步接口使用 AsyncMemcacheClient，见 MemcacheCache
     """
 
     def __init__(
@@ -61,6 +64,8 @@ class MemcacheSession:
             self._mc = Client(servers[0] if isinstance(servers, list) else servers, **kwargs)
 
         self._test_connection()
+        factory = async_memcache_factory(self._mc)
+        self._async_clients = LoopLocal(factory) if factory is not None else None
 
     def _test_connection(self):
         """测试 Memcache 连接"""
@@ -87,12 +92,7 @@ class MemcacheSession:
         """
         memcache_key = self._make_key(session_id)
         expiration = self._expiration_time
-
-        # 序列化 Session 数据
-        try:
-            data = json.dumps(dict(session))
-        except Exception as e:
-            raise ValueError(f"无法序列化 Session 数据: {e}")
+        data = self._dumps(session)
 
         if self._use_pymemcache:
             self._mc.set(memcache_key, data, expire=expiration if expiration > 0 else 0)
@@ -115,15 +115,27 @@ class MemcacheSession:
         if data_str is None:
             return None
         
-        # 反序列化 Session 数据
-        try:
-            data = json.loads(data_str)
-        except Exception as e:
+        session = self._loads(session_id, data_str)
+        if session is None:
             # 如果反序列化失败，删除损坏的 Session
             self.delete(session_id)
+        return session
+
+    @staticmethod
+    def _dumps(session: Session) -> bytes:
+        """序列化 Session 数据"""
+        try:
+            return json.dumps_bytes(dict(session))
+        except Exception as e:
+            raise ValueError(f"无法序列化 Session 数据: {e}")
+
+    @staticmethod
+    def _loads(session_id: str, data_str) -> Optional[Session]:
+        """反序列化 Session 数据，数据损坏时返回 None"""
+        try:
+            data = json.loads(data_str)
+        except Exception:
             return None
-        
-        # 创建 Session 对象
         session = Session(session_id)
         session.update(data)
         return session
@@ -221,6 +233,68 @@ class MemcacheSession:
         """
         return 0
 
+    def _async_client(self):
+        """当前事件循环的 AsyncMemcacheClient，无法创建时返回 None"""
+        if self._async_clients is None:
+            return None
+        return self._async_clients.get()
+
+    async def aget(self, session_id: str) -> Optional[Session]:
+        """异步版本的 get"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.get, session_id)
+        data_str = await client.get(self._make_key(session_id))
+        if data_str is None:
+            return None
+        session = self._loads(session_id, data_str)
+        if session is None:
+            await client.delete(self._make_key(session_id))
+        return session
+
+    async def aput(self, session_id: str, session: Session) -> None:
+        """异步版本的 put"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.put, session_id, session)
+        expiration = self._expiration_time
+        await client.set(self._make_key(session_id), self._dumps(session), expiration if expiration > 0 else 0)
+
+    async def adelete(self, session_id: str) -> None:
+        """异步版本的 delete"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.delete, session_id)
+        await client.delete(self._make_key(session_id))
+
+    async def aget_many(self, session_ids: list) -> dict:
+        """
+        批量获取 Session
+
+        Returns:
+            Session ID -> Session，不包含不存在的 Session
+        """
+        client = self._async_client()
+        if client is None:
+            sessions = [(sid, await run_sync(self.get, sid)) for sid in session_ids]
+            return {sid: session for sid, session in sessions if session is not None}
+        memcache_keys = {self._make_key(sid).encode('utf-8'): sid for sid in session_ids}
+        values = await client.get_many(memcache_keys)
+        result = {}
+        for memcache_key, data_str in values.items():
+            session_id = memcache_keys[memcache_key]
+            session = self._loads(session_id, data_str)
+            if session is not None:
+                result[session_id] = session
+        return result
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的 AsyncMemcacheClient"""
+        if self._async_clients is not None:
+            client = self._async_clients.pop()
+            if client is not None:
+                await client.close()
+
     def close(self) -> None:
         """
         关闭 Memcache 连接
@@ -8,9 +8,10 @@ Redis Session 后端
 """
 
 import time
-import json
+from .. import json
 from typing import Any, Optional
 
+from ..utils.aio import LoopLocal, async_redis_factory, run_sync
 from .session import Session
 
 
@@ -18,7 +19,8 @@ class RedisSession:
     """
     Redis Session 实现
     
-    使用 Redis 作为 Session 存储，提供高性能的分布式缓存支持
+    使用 Redis 作为 Session 存储，提供高性能的分布式缓存支持。
+    异步接口使用 redis.asyncio 客户端，见 RedisCache
     """
 
     def __init__(
@@ -72,6 +74,8 @@ class RedisSession:
             self._redis = redis.Redis(**connection_params)
 
         self._test_connection()
+        factory = async_redis_factory(self._redis)
+        self._async_clients = LoopLocal(factory) if factory is not None else None
 
     def _test_connection(self):
         """测试 Redis 连接"""
@@ -94,11 +98,7 @@ class RedisSession:
         """
         redis_key = self._make_key(session_id)
         expiration = self._expiration_time
-        # 序列化 Session 数据
-        try:
-            data = json.dumps(dict(session))
-        except Exception as e:
-            raise ValueError(f"无法序列化 Session 数据: {e}")
+        data = self._dumps(session)
 
         if expiration > 0:
             self._redis.setex(redis_key, expiration, data)
@@ -121,15 +121,27 @@ class RedisSession:
         if data_str is None:
             return None
         
-        # 反序列化 Session 数据
-        try:
-            data = json.loads(data_str)
-        except Exception as e:
+        session = self._loads(session_id, data_str)
+        if session is None:
             # 如果反序列化失败，删除损坏的 Session
             self.delete(session_id)
+        return session
+
+    @staticmethod
+    def _dumps(session: Session) -> bytes:
+        """序列化 Session 数据"""
+        try:
+            return json.dumps_bytes(dict(session))
+        except Exception as e:
+            raise ValueError(f"无法序列化 Session 数据: {e}")
+
+    @staticmethod
+    def _loads(session_id: str, data_str) -> Optional[Session]:
+        """反序列化 Session 数据，数据损坏时返回 None"""
+        try:
+            data = json.loads(data_str)
+        except Exception:
             return None
-        
-        # 创建 Session 对象
         session = Session(session_id)
         session.update(data)
         return session
@@ -219,6 +231,68 @@ class RedisSession:
         keys = self._redis.keys(pattern)
         return len(keys) if keys else 0
 
+    def _async_client(self):
+        """当前事件循环的 redis.asyncio 客户端，无法创建时返回 None"""
+        if self._async_clients is None:
+            return None
+        return self._async_clients.get()
+
+    async def aget(self, session_id: str) -> Optional[Session]:
+        """异步版本的 get"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.get, session_id)
+        data_str = await client.get(self._make_key(session_id))
+        if data_str is None:
+            return None
+        session = self._loads(session_id, data_str)
+        if session is None:
+            await client.delete(self._make_key(session_id))
+        return session
+
+    async def aput(self, session_id: str, session: Session) -> None:
+        """异步版本的 put"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.put, session_id, session)
+        expiration = self._expiration_time
+        await client.set(self._make_key(session_id), self._dumps(session), ex=expiration if expiration > 0 else None)
+
+    async def adelete(self, session_id: str) -> None:
+        """异步版本的 delete"""
+        client = self._async_client()
+        if client is None:
+            return await run_sync(self.delete, session_id)
+        await client.delete(self._make_key(session_id))
+
+    async def aget_many(self, session_ids: list) -> dict:
+        """
+        批量获取 Session
+
+        Returns:
+            Session ID -> Session，不包含不存在的 Session
+        """
+        client = self._async_client()
+        if not session_ids:
+            return {}
+        if client is None:
+            values = await run_sync(self._redis.mget, [self._make_key(sid) for sid in session_ids])
+        else:
+            values = await client.mget([self._make_key(sid) for sid in session_ids])
+        result = {}
+        for session_id, data_str in zip(session_ids, values):
+            session = self._loads(session_id, data_str) if data_str is not None else None
+            if session is not None:
+                result[session_id] = session
+        return result
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的 redis.asyncio 客户端"""
+        if self._async_clients is not None:
+            client = self._async_clients.pop()
+            if client is not None:
+                await client.aclose()
+
     def close(self) -> None:
         """
         关闭 Redis 连接
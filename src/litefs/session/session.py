@@ -1,15 +1,31 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import secrets
 from collections import UserDict
 from typing import Any, Optional
 
+from ..utils.aio import InlineAsyncMixin
+
+
+def generate_session_id() -> str:
+    """
+    生成新的 Session ID
+
+    使用 secrets 生成 256 位随机令牌，冲突概率可以忽略，无需查询存储校验唯一性
+
+    Returns:
+        URL 安全的 Session ID 字符串
+    """
+    return secrets.token_urlsafe(32)
+
 
 class Session(UserDict):
     """
     Session 数据对象
     
-    继承自 UserDict，用于存储单个 Session 的数据
+    继承自 UserDict，用于存储单个 Session 的数据。
+    写入或删除键时会设置 modified 标记，请求结束时只回写被修改过的 Session
     """
 
     def __init__(self, session_id=None, store=None):
@@ -20,10 +36,18 @@ class Session(UserDict):
             session_id: Session ID（如果为 None，则会在创建时生成）
             store: Session 存储后端实例，用于手动保存数据
         """
-        import uuid
-        self.id = session_id or str(uuid.uuid4())
+        self.id = session_id or generate_session_id()
         self.data = {}
         self.store = store
+        self.modified = False
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
 
     def __str__(self):
         return "<Session Id=%s>" % self.id
@@ -34,11 +58,12 @@ class Session(UserDict):
         """
         if self.store is not None:
             self.store.put(self.id, self)
+            self.modified = False
             return True
         return False
 
 
-class MemorySessionStore:
+class MemorySessionStore(InlineAsyncMixin):
     """
     内存 Session 存储
     
@@ -170,6 +195,7 @@ class MemorySessionStore:
 
 
 __all__ = [
+    'generate_session_id',
     'Session',
     'MemorySessionStore',
 ]
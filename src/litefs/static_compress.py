@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+静态资源预压缩
+
+构建时把静态目录中可压缩的文件以最高压缩级别压缩为同名的 .gz、.br、.zst 文件，
+StaticFileHandler 根据 Accept-Encoding 直接返回预压缩的版本，请求时不再压缩:
+
+    litefs compress-static static/
+
+brotli 和 zstd 分别需要安装 brotli、zstandard 包，未安装时跳过对应格式
+"""
+
+import gzip
+import mimetypes
+import os
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# 编码名 -> 预压缩文件后缀
+ENCODING_SUFFIXES = {
+    'br': '.br',
+    'zstd': '.zst',
+    'gzip': '.gz',
+}
+
+# 默认编码，顺序即协商时服务器的优先顺序
+DEFAULT_ENCODINGS = ('br', 'zstd', 'gzip')
+
+# 支持压缩的 MIME 类型
+COMPRESSIBLE_TYPES = frozenset((
+    'text/html', 'text/css', 'text/javascript', 'text/xml',
+    'text/plain', 'text/json', 'application/json', 'application/javascript',
+    'application/xml', 'application/xhtml+xml', 'image/svg+xml',
+))
+
+# 小于该大小的文件压缩收益太小，不压缩
+DEFAULT_MIN_COMPRESS_SIZE = 1024
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 使同一文件每次压缩的结果相同
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    import brotli
+    return brotli.compress(data, quality=11)
+
+
+def _zstd(data: bytes) -> bytes:
+    import zstandard
+    # 19 是不需要 --ultra 的最高级别，解压时不需要额外的窗口内存
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+
+_COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    'br': _brotli,
+    'zstd': _zstd,
+    'gzip': _gzip,
+}
+
+_MODULES = {
+    'br': 'brotli',
+    'zstd': 'zstandard',
+}
+
+
+@lru_cache(maxsize=None)
+def _is_available(encoding: str) -> bool:
+    module = _MODULES.get(encoding)
+    if module is None:
+        return encoding in _COMPRESSORS
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+def available_encodings(encodings: Iterable[str] = DEFAULT_ENCODINGS) -> Tuple[str, ...]:
+    """
+    过滤出当前环境可以压缩的编码
+
+    Args:
+        encodings: 编码名
+
+    Returns:
+        可用的编码，保持原有顺序
+    """
+    return tuple(e for e in encodings if _is_available(e))
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    以最高压缩级别压缩数据
+
+    Args:
+        data: 原始数据
+        encoding: 编码名（br、zstd 或 gzip）
+
+    Returns:
+        压缩后的数据
+    """
+    try:
+        compressor = _COMPRESSORS[encoding]
+    except KeyError:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    return compressor(data)
+
+
+def is_compressible(mime_type: Optional[str]) -> bool:
+    """判断 MIME 类型是否值得压缩"""
+    return mime_type in COMPRESSIBLE_TYPES
+
+
+@lru_cache(maxsize=256)
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    解析 Accept-Encoding 请求头
+
+    同一个请求头的解析结果会被缓存，返回的字典不要修改
+
+    Args:
+        header: 请求头的值，如 "gzip, br;q=0.9, *;q=0.1"
+
+    Returns:
+        编码名 -> q 值，x-gzip 视为 gzip
+    """
+    result = {}
+    if not header:
+        return result
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == 'x-gzip':
+            name = 'gzip'
+        result[name] = q
+    return result
+
+
+def accepts_encoding(accepted: Dict[str, float], encoding: str) -> bool:
+    """
+    判断客户端是否接受某个编码
+
+    Args:
+        accepted: parse_accept_encoding 的结果
+        encoding: 编码名
+
+    Returns:
+        编码的 q 值（未列出时取 * 的 q 值）大于 0 时返回 True
+    """
+    q = accepted.get(encoding)
+    if q is None:
+        q = accepted.get('*', 0.0)
+    return q > 0
+
+
+def read_precompressed(path: str, st) -> Optional[bytes]:
+    """
+    读取预压缩文件
+
+    Args:
+        path: 预压缩文件路径
+        st: 原文件状态
+
+    Returns:
+        预压缩内容，不存在或比原文件旧时返回 None
+    """
+    try:
+        if os.stat(path).st_mtime_ns < st.st_mtime_ns:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def compress_file(
+    path: str,
+    encodings: Iterable[str] = DEFAULT_ENCODINGS,
+    force: bool = False
+) -> Dict[str, int]:
+    """
+    为文件生成预压缩的同名文件
+
+    预压缩文件的修改时间设为与原文件相同，原文件更新后旧的预压缩文件不再使用。
+    压缩后不比原文件小时不生成，并删除已有的预压缩文件
+
+    Args:
+        path: 文件路径
+        encodings: 编码名，不可用的编码会被跳过
+        force: 预压缩文件已是最新时是否仍重新生成
+
+    Returns:
+        编码名 -> 生成的文件大小，跳过的编码不在其中
+    """
+    st = os.stat(path)
+    data = None
+    written = {}
+    for encoding in available_encodings(encodings):
+        target = path + ENCODING_SUFFIXES[encoding]
+        if not force:
+            try:
+                if os.stat(target).st_mtime_ns >= st.st_mtime_ns:
+                    continue
+            except OSError:
+                pass
+
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        compressed = compress(data, encoding)
+        if len(compressed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+
+        tmp = f'{target}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(compressed)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+        written[encoding] = len(compressed)
+    return written
+
+
+def compress_directory(
+    directory: str,
+    encodings: Iterable[str] = DEFAULT_ENCODINGS,
+    min_size: int = DEFAULT_MIN_COMPRESS_SIZE,
+    force: bool = False
+) -> dict:
+    """
+    为目录下全部可压缩的文件生成预压缩文件，跳过隐藏目录
+
+    Args:
+        directory: 静态文件目录
+        encodings: 编码名
+        min_size: 最小压缩大小
+        force: 是否重新生成已是最新的预压缩文件
+
+    Returns:
+        统计信息：files（处理的文件数）、original（原文件总大小）、
+        compressed（编码名 -> 新生成的文件总大小）
+    """
+    encodings = available_encodings(encodings)
+    suffixes = tuple(ENCODING_SUFFIXES.values())
+    stats = {'files': 0, 'original': 0, 'compressed': {e: 0 for e in encodings}}
+
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in files:
+            if filename.startswith('.') or filename.endswith(suffixes):
+                continue
+            path = os.path.join(root, filename)
+            if not is_compressible(mimetypes.guess_type(filename)[0]):
+                continue
+            size = os.path.getsize(path)
+            if size < min_size:
+                continue
+
+            written = compress_file(path, encodings, force)
+            stats['files'] += 1
+            stats['original'] += size
+            for encoding, length in written.items():
+                stats['compressed'][encoding] += length
+    return stats
+
+
+__all__ = [
+    'COMPRESSIBLE_TYPES',
+    'DEFAULT_ENCODINGS',
+    'DEFAULT_MIN_COMPRESS_SIZE',
+    'ENCODING_SUFFIXES',
+    'accepts_encoding',
+    'available_encodings',
+    'compress',
+    'compress_directory',
+    'compress_file',
+    'is_compressible',
+    'parse_accept_encoding',
+    'read_precompressed',
+]
@@ -5,45 +5,208 @@
 优化的静态文件服务
 
 提供高性能的静态文件服务，支持缓存、压缩、范围请求等
+
+文件内容、stat 信息、ETag、MIME 类型、压缩结果和响应头一起缓存在
+按总字节数限制的 LRU 缓存中。watchdog 监控静态目录，文件被修改、删除或移动时
+使对应条目失效，因此命中缓存的请求不需要任何系统调用
+
+压缩版本优先使用 litefs compress-static 生成的 .br/.zst/.gz 预压缩文件，
+没有预压缩文件时在后台线程中压缩，压缩完成前返回未压缩的内容
+
+超过缓存大小限制的文件只缓存元数据，Range 请求只从磁盘读取请求的部分
+
+多进程部署时可以传入 SharedStaticStore，文件内容由所有工作进程共用一份 mmap 映射
 """
 
-import os
-import gzip
 import hashlib
+import logging
 import mimetypes
+import os
+import stat as stat_module
+import threading
+import time
+import uuid
+import weakref
+from calendar import timegm
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate
 from pathlib import Path
-from typing import Optional, Dict, Tuple, Any
-from datetime import datetime, timedelta
-from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from watchdog.events import FileSystemEventHandler
+
+from .static_compress import (
+    COMPRESSIBLE_TYPES,
+    DEFAULT_ENCODINGS,
+    ENCODING_SUFFIXES,
+    accepts_encoding,
+    available_encodings,
+    compress,
+    parse_accept_encoding,
+    read_precompressed,
+)
+from .static_store import SharedStaticStore
+from .utils import gmt_date
+
+logger = logging.getLogger(__name__)
+
+# 不改变文件内容的 watchdog 事件，读取文件本身就会产生这些事件
+_IGNORED_EVENTS = frozenset(('opened', 'closed_no_write'))
+
+# 一个请求最多的范围数，超过时忽略 Range 返回完整内容，避免大量小范围的请求
+MAX_RANGES = 16
+
+
+class _StaticEntry:
+    """
+    静态文件缓存条目
+
+    保存命中时生成响应所需的全部数据，不需要再访问文件系统。
+    超过缓存大小限制的文件 variants 中的响应体为 None，内容从磁盘读取；
+    来自共享存储的响应体是 mmap 映射区域的 memoryview，不计入缓存字节数
+    """
+
+    __slots__ = (
+        'path', 'size', 'mtime', 'mtime_ns', 'etag', 'last_modified',
+        'mime_type', 'compressible', 'variants', 'nbytes',
+    )
+
+    def __init__(self, path: str, st, mime_type: str):
+        self.path = path
+        self.size = st.st_size
+        self.mtime = int(st.st_mtime)
+        self.mtime_ns = st.st_mtime_ns
+        self.last_modified = gmt_date(st.st_mtime)
+        self.mime_type = mime_type
+        self.etag = None
+        self.compressible = False
+        # 编码名（identity 表示未压缩）-> (响应体, 响应头, ETag)
+        self.variants = {}
+        self.nbytes = 0
+
+
+class _StaticEventHandler(FileSystemEventHandler):
+    """把静态目录中的文件变化转为缓存失效"""
+
+    def __init__(self, handler):
+        FileSystemEventHandler.__init__(self)
+        self._handler = weakref.proxy(handler)
+
+    def on_any_event(self, event):
+        if event.event_type in _IGNORED_EVENTS:
+            return
+        try:
+            self._invalidate(event.src_path)
+            dest_path = getattr(event, 'dest_path', '')
+            if dest_path:
+                self._invalidate(dest_path)
+        except ReferenceError:
+            pass
+
+    def _invalidate(self, path):
+        self._handler.invalidate(path)
+        # 预压缩文件变化时原文件的缓存条目也要失效
+        for suffix in ENCODING_SUFFIXES.values():
+            if path.endswith(suffix):
+                self._handler.invalidate(path[:-len(suffix)])
+
+
+def _stop_observer(observer):
+    observer.stop()
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    解析 Range 请求头
+
+    Args:
+        header: 请求头的值，如 "bytes=0-99,200-"
+        size: 内容长度
+
+    Returns:
+        按起始位置排序并合并了重叠部分的 (start, end) 列表（end 包含在内），
+        没有可满足的范围时返回空列表；格式错误或不是 bytes 单位时返回 None，此时应忽略 Range
+    """
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs:
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        first, sep, last = spec.partition('-')
+        first, last = first.strip(), last.strip()
+        if not sep or not (first.isdigit() or (not first and last.isdigit())):
+            return None
+        if last and not last.isdigit():
+            return None
+
+        if not first:
+            # 后缀范围：最后 N 个字节
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            end = min(int(last), size - 1) if last else size - 1
+        if start < size:
+            ranges.append((start, end))
+
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """判断 If-None-Match 是否匹配，支持 * 、多个 ETag 和弱 ETag"""
+    header = header.strip()
+    if header == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
 
 
 class StaticFileHandler:
     """
     优化的静态文件处理器
-    
+
     功能特性：
-    - 文件缓存：内存缓存小文件，减少磁盘 I/O
-    - Gzip 压缩：自动压缩文本文件，减少传输大小
+    - 文件缓存：按总字节数限制的 LRU 缓存，文件变化时自动失效
+    - 压缩：根据 Accept-Encoding 返回 br/zstd/gzip 预压缩版本，没有时后台压缩
     - ETag 支持：生成文件指纹，支持条件请求
     - Last-Modified：记录文件修改时间，支持缓存验证
     - Range 请求：支持断点续传
     - MIME 类型：自动识别文件类型
     - 安全检查：防止路径遍历攻击
     """
-    
+
     # 支持压缩的 MIME 类型
-    COMPRESSIBLE_TYPES = {
-        'text/html', 'text/css', 'text/javascript', 'text/xml',
-        'text/plain', 'text/json', 'application/json', 'application/javascript',
-        'application/xml', 'application/xhtml+xml'
-    }
-    
+    COMPRESSIBLE_TYPES = COMPRESSIBLE_TYPES
+
     # 默认缓存配置
     DEFAULT_MAX_AGE = 3600  # 1 小时
-    DEFAULT_CACHE_SIZE = 100  # 缓存文件数量
+    DEFAULT_CACHE_SIZE = 10000  # 缓存文件数量上限
+    DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 缓存总大小：64MB
     DEFAULT_MIN_COMPRESS_SIZE = 1024  # 最小压缩大小：1KB
     DEFAULT_MAX_FILE_SIZE = 10 * 1024 * 1024  # 最大文件大小：10MB
-    
+
     def __init__(
         self,
         directory: str,
@@ -53,239 +216,703 @@ class StaticFileHandler:
         enable_etag: bool = True,
         enable_range: bool = True,
         min_compress_size: int = None,
-        max_file_size: int = None
+        max_file_size: int = None,
+        cache_max_bytes: int = None,
+        watch: bool = True,
+        encodings: tuple = DEFAULT_ENCODINGS,
+        lazy_compress: bool = True,
+        store: Optional[SharedStaticStore] = None
     ):
         """
         初始化静态文件处理器
-        
+
         Args:
             directory: 静态文件目录
             max_age: 缓存时间（秒）
-            cache_size: 缓存文件数量
-            enable_gzip: 是否启用 Gzip 压缩
+            cache_size: 缓存文件数量上限
+            enable_gzip: 是否启用压缩（包括 br、zstd 和 gzip）
             enable_etag: 是否启用 ETag
             enable_range: 是否支持范围请求
             min_compress_size: 最小压缩大小
             max_file_size: 最大文件大小
+            cache_max_bytes: 缓存的文件内容和压缩结果的总字节数上限
+            watch: 是否监控目录变化使缓存失效；不监控时每次命中都 stat 一次文件
+            encodings: 支持的压缩编码，顺序即客户端都接受时的优先顺序
+            lazy_compress: 没有预压缩文件时是否在后台压缩
+            store: 多进程共享的静态资源存储，由 SharedStaticStore.build 在 fork 前生成
         """
         self.directory = Path(directory).resolve()
         self.max_age = max_age or self.DEFAULT_MAX_AGE
         self.cache_size = cache_size or self.DEFAULT_CACHE_SIZE
+        self.cache_max_bytes = cache_max_bytes or self.DEFAULT_CACHE_MAX_BYTES
         self.enable_gzip = enable_gzip
         self.enable_etag = enable_etag
         self.enable_range = enable_range
         self.min_compress_size = min_compress_size or self.DEFAULT_MIN_COMPRESS_SIZE
         self.max_file_size = max_file_size or self.DEFAULT_MAX_FILE_SIZE
-        
-        # 文件缓存
-        self._cache: Dict[str, Tuple[bytes, dict]] = {}
-        
+        self.encodings = tuple(encodings)
+        self.lazy_compress = lazy_compress
+        self.store = store
+        # 后台压缩只使用已安装压缩库的编码
+        self._lazy_encodings = available_encodings(self.encodings) if lazy_compress else ()
+
         # 确保目录存在
         if not self.directory.exists():
             raise ValueError(f"Directory does not exist: {directory}")
-    
+
+        # 文件缓存：请求路径 -> _StaticEntry，按最近使用排序
+        self._cache: 'OrderedDict[str, _StaticEntry]' = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        # 每次失效加一，读取文件期间发生失效时不缓存读到的内容
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._executor = None
+        self._observer = None
+        self._finalizer = None
+        if watch:
+            self.watch()
+
+    def watch(self) -> bool:
+        """
+        开始监控静态目录，文件变化时使缓存失效
+
+        Returns:
+            是否成功启动监控，失败时（如 inotify 数量达到上限）退回到命中时 stat 检查
+        """
+        if self._observer is not None:
+            return True
+
+        from watchdog.observers import Observer
+
+        observer = Observer()
+        try:
+            observer.schedule(_StaticEventHandler(self), str(self.directory), recursive=True)
+            observer.daemon = True
+            observer.start()
+        except Exception as e:
+            logger.warning('Failed to watch static directory %s: %s', self.directory, e)
+            return False
+
+        # 启动监控前缓存的内容可能已经过期
+        self.invalidate()
+        self._observer = observer
+        self._finalizer = weakref.finalize(self, _stop_observer, observer)
+        return True
+
+    def close(self):
+        """停止监控静态目录，等待后台压缩结束"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._finalizer is not None:
+            self._finalizer()
+            self._observer.join(timeout=1)
+            self._finalizer = None
+            self._observer = None
+
     def serve(self, file_path: str, request_headers: dict = None) -> Tuple[int, list, bytes]:
         """
         服务静态文件
-        
+
         Args:
             file_path: 文件路径（相对于静态目录）
             request_headers: 请求头
-            
+
         Returns:
-            (status_code, headers, content)
-        """
-        # 安全检查：防止路径遍历攻击
-        full_path = self._secure_path_join(file_path)
-        
-        if full_path is None:
-            return 403, [('Content-Type', 'text/plain; charset=utf-8')], b'Forbidden'
-        
-        # 检查文件是否存在
-        if not full_path.exists():
-            return 404, [('Content-Type', 'text/plain; charset=utf-8')], b'Not Found'
-        
-        # 检查是否为文件
-        if not full_path.is_file():
-            return 403, [('Content-Type', 'text/plain; charset=utf-8')], b'Forbidden'
-        
-        # 检查文件大小
-        file_size = full_path.stat().st_size
-        if file_size > self.max_file_size:
-            return 413, [('Content-Type', 'text/plain; charset=utf-8')], b'Payload Too Large'
-        
-        # 获取文件信息
-        stat = full_path.stat()
-        last_modified = datetime.fromtimestamp(stat.st_mtime, tz=None)
-        
-        # 生成 ETag
-        etag = None
-        if self.enable_etag:
-            etag = self._generate_etag(full_path, stat)
-        
+            (status_code, headers, content)，使用共享存储时 content 可能是 memoryview
+        """
+        return self._serve(file_path, request_headers, True)
+
+    def _serve(self, file_path: str, request_headers: Optional[dict], retry: bool) -> Tuple[int, list, bytes]:
+        key = file_path.lstrip('/')
+        entry = self._get_entry(key)
+
+        if entry is None:
+            # 安全检查：防止路径遍历攻击
+            full_path = self._secure_path_join(file_path)
+
+            if full_path is None:
+                return 403, [('Content-Type', 'text/plain; charset=utf-8')], b'Forbidden'
+
+            # 检查文件是否存在
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                return 404, [('Content-Type', 'text/plain; charset=utf-8')], b'Not Found'
+
+            # 检查是否为文件
+            if not stat_module.S_ISREG(st.st_mode):
+                return 403, [('Content-Type', 'text/plain; charset=utf-8')], b'Forbidden'
+
+            # 共享存储被重新生成时，已缓存的条目还引用着旧的映射
+            if self.store is not None and self.store.maybe_refresh():
+                self.invalidate()
+
+            generation = self._generation
+            try:
+                entry = self._load_entry(full_path, st)
+            except Exception as e:
+                return 500, [('Content-Type', 'text/plain; charset=utf-8')], f'Internal Server Error: {str(e)}'.encode()
+            if self._put_entry(key, entry, generation) and entry.compressible:
+                self._compress_later(key, entry)
+
+        body, headers, etag = self._select_variant(entry, request_headers)
+
         # 检查条件请求
-        if request_headers:
-            # If-None-Match (ETag)
-            if etag and request_headers.get('If-None-Match') == etag:
-                return 304, [], b''
-            
-            # If-Modified-Since
-            if_modified_since = request_headers.get('If-Modified-Since')
-            if if_modified_since:
-                try:
-                    if_modified_since_dt = datetime.strptime(
-                        if_modified_since, '%a, %d %b %Y %H:%M:%S GMT'
-                    )
-                    if last_modified <= if_modified_since_dt:
-                        return 304, [], b''
-                except ValueError:
-                    pass
-        
-        # 尝试从缓存获取
-        cache_key = str(full_path)
-        if cache_key in self._cache:
-            content, cached_headers = self._cache[cache_key]
-            headers = self._build_headers(full_path, cached_headers, etag, last_modified)
-            return 200, headers, content
-        
-        # 读取文件内容
+        if request_headers and self._not_modified(entry, etag, request_headers):
+            headers = []
+            if etag:
+                headers.append(('ETag', etag))
+            if entry.compressible:
+                headers.append(('Vary', 'Accept-Encoding'))
+            headers.append(('Last-Modified', entry.last_modified))
+            return 304, headers, b''
+
+        # 所选版本的完整长度，超过缓存大小限制的文件 body 为 None，从磁盘读取
+        size = entry.size if body is None else len(body)
+        ranges = None
+        if self.enable_range and request_headers:
+            ranges = self._requested_ranges(entry, etag, size, request_headers)
+            if ranges == []:
+                return 416, [
+                    ('Content-Type', 'text/plain; charset=utf-8'),
+                    ('Content-Range', f'bytes */{size}'),
+                ], b'Range Not Satisfiable'
+
+        if body is None:
+            if ranges is None:
+                if size > self.max_file_size:
+                    return 413, [('Content-Type', 'text/plain; charset=utf-8')], b'Payload Too Large'
+                ranges_to_read = [(0, size - 1)] if size else []
+            else:
+                ranges = self._limit_ranges(ranges)
+                if ranges is None:
+                    return 413, [('Content-Type', 'text/plain; charset=utf-8')], b'Payload Too Large'
+                ranges_to_read = ranges
+            try:
+                parts = self._read_ranges(entry, ranges_to_read)
+            except OSError:
+                parts = None
+            if parts is None:
+                # 文件在缓存元数据之后发生了变化
+                self._remove_entry(key, entry)
+                if retry:
+                    return self._serve(file_path, request_headers, False)
+                return 500, [('Content-Type', 'text/plain; charset=utf-8')], b'Internal Server Error'
+            if ranges is None:
+                body = b''.join(parts)
+        elif ranges is not None:
+            parts = [body[start:end + 1] for start, end in ranges]
+
+        status = 200
+        headers = list(headers)
+        if ranges is not None:
+            status = 206
+            headers, body = self._partial_response(entry, headers, ranges, parts, size)
+        if self.max_age > 0:
+            headers.append(('Expires', gmt_date(time.time() + self.max_age)))
+        return status, headers, body
+
+    def _requested_ranges(self, entry: _StaticEntry, etag: Optional[str], size: int,
+                          request_headers: dict) -> Optional[List[Tuple[int, int]]]:
+        """
+        获取请求的范围
+
+        Args:
+            entry: 缓存条目
+            etag: 所选版本的 ETag
+            size: 所选版本的完整长度
+            request_headers: 请求头
+
+        Returns:
+            范围列表，空列表表示无法满足；None 表示返回完整内容
+        """
+        range_header = request_headers.get('Range')
+        if not range_header:
+            return None
+
+        # If-Range 与当前版本不一致时忽略 Range，返回完整内容
+        if_range = request_headers.get('If-Range')
+        if if_range:
+            if_range = if_range.strip()
+            if if_range.startswith('"') or if_range.startswith('W/'):
+                # If-Range 只能使用强比较
+                if if_range != etag:
+                    return None
+            else:
+                parsed = parsedate(if_range)
+                if parsed is None or timegm(parsed) != entry.mtime:
+                    return None
+
+        ranges = parse_range(range_header, size)
+        if ranges is not None and len(ranges) > MAX_RANGES:
+            return None
+        return ranges
+
+    def _limit_ranges(self, ranges: List[Tuple[int, int]]) -> Optional[List[Tuple[int, int]]]:
+        """
+        限制从磁盘读取的范围总大小不超过 max_file_size
+
+        只有一个范围时截短（如播放器常用的 bytes=0-），客户端会继续请求剩余部分
+
+        Returns:
+            限制后的范围，多个范围总大小超过限制时返回 None
+        """
+        total = sum(end - start + 1 for start, end in ranges)
+        if total <= self.max_file_size:
+            return ranges
+        if len(ranges) == 1:
+            start, _ = ranges[0]
+            return [(start, start + self.max_file_size - 1)]
+        return None
+
+    def _read_ranges(self, entry: _StaticEntry, ranges: List[Tuple[int, int]]) -> Optional[List[bytes]]:
+        """
+        从磁盘读取指定范围，只读取请求的部分
+
+        Args:
+            entry: 缓存条目
+            ranges: 范围列表
+
+        Returns:
+            各范围的内容，文件已变化时返回 None
+        """
+        fd = os.open(entry.path, os.O_RDONLY)
         try:
-            with open(full_path, 'rb') as f:
-                content = f.read()
-        except Exception as e:
-            return 500, [('Content-Type', 'text/plain; charset=utf-8')], f'Internal Server Error: {str(e)}'.encode()
-        
+            st = os.fstat(fd)
+            if st.st_mtime_ns != entry.mtime_ns or st.st_size != entry.size:
+                return None
+            parts = []
+            for start, end in ranges:
+                length = end - start + 1
+                data = os.pread(fd, length, start)
+                if len(data) != length:
+                    return None
+                parts.append(data)
+            return parts
+        finally:
+            os.close(fd)
+
+    def _partial_response(self, entry: _StaticEntry, headers: list, ranges: List[Tuple[int, int]],
+                          parts: List[bytes], size: int) -> Tuple[list, bytes]:
+        """
+        生成 206 响应的响应头和响应体
+
+        Args:
+            entry: 缓存条目
+            headers: 所选版本的响应头
+            ranges: 范围列表
+            parts: 各范围的内容
+            size: 所选版本的完整长度
+
+        Returns:
+            (响应头, 响应体)，多个范围时响应体为 multipart/byteranges
+        """
+        headers = [h for h in headers if h[0] not in ('Content-Type', 'Content-Length')]
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            body = parts[0]
+            headers.append(('Content-Type', entry.mime_type))
+            headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+        else:
+            boundary = uuid.uuid4().hex
+            chunks = []
+            for (start, end), part in zip(ranges, parts):
+                chunks.append((
+                    f'\r\n--{boundary}\r\n'
+                    f'Content-Type: {entry.mime_type}\r\n'
+                    f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+                ).encode('latin-1'))
+                chunks.append(part)
+            chunks.append(f'\r\n--{boundary}--\r\n'.encode('latin-1'))
+            body = b''.join(chunks)
+            headers.append(('Content-Type', f'multipart/byteranges; boundary={boundary}'))
+        headers.append(('Content-Length', str(len(body))))
+        return headers, body
+
+    def _select_variant(self, entry: _StaticEntry, request_headers: Optional[dict]) -> tuple:
+        """
+        根据 Accept-Encoding 选择返回的版本
+
+        Args:
+            entry: 缓存条目
+            request_headers: 请求头
+
+        Returns:
+            (响应体, 响应头, ETag)
+        """
+        variants = entry.variants
+        if len(variants) > 1 and request_headers:
+            accept_encoding = request_headers.get('Accept-Encoding')
+            if accept_encoding:
+                accepted = parse_accept_encoding(accept_encoding)
+                for encoding in self.encodings:
+                    if encoding in variants and accepts_encoding(accepted, encoding):
+                        return variants[encoding]
+        return variants['identity']
+
+    def _get_entry(self, key: str) -> Optional[_StaticEntry]:
+        """
+        从缓存获取条目
+
+        Args:
+            key: 请求路径
+
+        Returns:
+            缓存条目，不存在或文件已变化时返回 None
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            watching = self._observer is not None
+            if watching:
+                self._hits += 1
+                return entry
+
+        # 没有监控目录时通过 stat 确认文件没有变化
+        try:
+            st = os.stat(entry.path)
+        except OSError:
+            st = None
+        if st is None or st.st_mtime_ns != entry.mtime_ns or st.st_size != entry.size:
+            self._remove_entry(key, entry)
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return entry
+
+    def _remove_entry(self, key: str, entry: _StaticEntry):
+        """从缓存中删除条目，条目已被替换时不删除"""
+        with self._lock:
+            if self._cache.get(key) is entry:
+                del self._cache[key]
+                self._cache_bytes -= entry.nbytes
+
+    def _put_entry(self, key: str, entry: _StaticEntry, generation: int) -> bool:
+        """
+        缓存条目，超出数量或字节数上限时淘汰最久未使用的条目
+
+        超过缓存总大小四分之一的条目不缓存，避免一个大文件挤掉全部热点文件；
+        _load_entry 对这样的文件只生成不含内容的条目
+
+        Args:
+            key: 请求路径
+            entry: 缓存条目
+            generation: 开始读取文件时的失效计数
+
+        Returns:
+            是否已缓存
+        """
+        if entry.nbytes > self.cache_max_bytes // 4:
+            return False
+
+        with self._lock:
+            # 读取文件期间目录发生了变化，读到的内容可能已经过期
+            if generation != self._generation:
+                return False
+
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cache_bytes -= old.nbytes
+
+            self._evict_locked(entry.nbytes, 1)
+            self._cache[key] = entry
+            self._cache_bytes += entry.nbytes
+        return True
+
+    def _evict_locked(self, extra_bytes: int, extra_count: int):
+        """淘汰最久未使用的条目，直到能再放入 extra_count 个共 extra_bytes 字节的条目"""
+        while self._cache and (
+            len(self._cache) + extra_count > self.cache_size or
+            self._cache_bytes + extra_bytes > self.cache_max_bytes
+        ):
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted.nbytes
+            self._evictions += 1
+
+    def _compress_later(self, key: str, entry: _StaticEntry):
+        """为缺少预压缩文件的编码安排后台压缩"""
+        encodings = [e for e in self._lazy_encodings if e not in entry.variants]
+        if not encodings:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='litefs-static-compress'
+                )
+            executor = self._executor
+        executor.submit(self._compress_entry, key, entry, encodings)
+
+    def _compress_entry(self, key: str, entry: _StaticEntry, encodings: list):
+        """
+        在后台线程中压缩文件内容并加入缓存条目
+
+        Args:
+            key: 请求路径
+            entry: 缓存条目
+            encodings: 需要压缩的编码
+        """
+        content = entry.variants['identity'][0]
+        variants = {}
+        for encoding in encodings:
+            try:
+                body = compress(content, encoding)
+            except Exception as e:
+                logger.warning('Failed to compress %s with %s: %s', entry.path, encoding, e)
+                continue
+            if len(body) < len(content):
+                variants[encoding] = self._make_variant(entry, encoding, body)
+        if not variants:
+            return
+
+        with self._lock:
+            # 压缩期间条目已失效或被淘汰
+            if self._cache.get(key) is not entry:
+                return
+            merged = dict(entry.variants)
+            merged.update(variants)
+            added = sum(len(variant[0]) for variant in variants.values())
+            # 整体替换字典，请求线程读取 variants 时不需要加锁
+            entry.variants = merged
+            entry.nbytes += added
+            self._cache_bytes += added
+            self._evict_locked(0, 0)
+
+    def _load_entry(self, full_path: Path, st) -> _StaticEntry:
+        """
+        读取文件并生成缓存条目
+
+        超过缓存总大小四分之一或 max_file_size 的文件不读取内容，
+        只缓存元数据，响应时从磁盘读取
+
+        Args:
+            full_path: 文件完整路径
+            st: 文件状态
+
+        Returns:
+            缓存条目
+        """
         # 获取 MIME 类型
         mime_type, encoding = mimetypes.guess_type(str(full_path))
         if mime_type is None:
             mime_type = 'application/octet-stream'
-        
-        # 准备响应头
-        headers_dict = {
-            'Content-Type': mime_type,
-            'Content-Length': len(content)
-        }
-        
-        # Gzip 压缩
-        should_compress = (
+
+        path = str(full_path)
+        entry = _StaticEntry(path, st, mime_type)
+
+        # 生成 ETag
+        if self.enable_etag:
+            entry.etag = self._generate_etag(full_path, st)
+
+        entry.compressible = (
             self.enable_gzip and
-            len(content) >= self.min_compress_size and
+            st.st_size >= self.min_compress_size and
             mime_type in self.COMPRESSIBLE_TYPES
         )
-        
-        if should_compress:
-            content = gzip.compress(content)
-            headers_dict['Content-Encoding'] = 'gzip'
-            headers_dict['Content-Length'] = len(content)
-        
-        # 缓存小文件
-        if len(content) < self.DEFAULT_MAX_FILE_SIZE and len(self._cache) < self.cache_size:
-            self._cache[cache_key] = (content, headers_dict)
-        
-        # 构建响应头
-        headers = self._build_headers(full_path, headers_dict, etag, last_modified)
-        
-        return 200, headers, content
-    
+
+        if self.store is not None:
+            asset = self.store.get(full_path.relative_to(self.directory).as_posix())
+            # 存储生成之后文件被修改过时不使用存储中的内容
+            if asset is not None and asset.mtime_ns == st.st_mtime_ns and asset.size == st.st_size:
+                variants = {'identity': self._make_variant(entry, 'identity', asset.variants['identity'])}
+                if entry.compressible:
+                    for encoding in self.encodings:
+                        if encoding in asset.variants:
+                            variants[encoding] = self._make_variant(entry, encoding, asset.variants[encoding])
+                entry.variants = variants
+                return entry
+
+        if st.st_size > self.max_file_size or st.st_size > self.cache_max_bytes // 4:
+            entry.compressible = False
+            entry.variants = {'identity': self._make_variant(entry, 'identity', None)}
+            return entry
+
+        with open(full_path, 'rb') as f:
+            content = f.read()
+
+        variants = {'identity': self._make_variant(entry, 'identity', content)}
+        if entry.compressible:
+            for encoding in self.encodings:
+                body = read_precompressed(path + ENCODING_SUFFIXES[encoding], st)
+                if body is not None:
+                    variants[encoding] = self._make_variant(entry, encoding, body)
+
+        entry.variants = variants
+        entry.nbytes = sum(len(variant[0]) for variant in variants.values())
+        return entry
+
+    def _make_variant(self, entry: _StaticEntry, encoding: str, body: bytes) -> tuple:
+        """
+        生成一个编码版本
+
+        Args:
+            entry: 缓存条目
+            encoding: 编码名，identity 表示未压缩
+            body: 响应体，None 表示从磁盘读取
+
+        Returns:
+            (响应体, 响应头, ETag)，压缩版本的 ETag 带有编码名后缀
+        """
+        etag = entry.etag
+        if etag and encoding != 'identity':
+            etag = f'{etag[:-1]}-{encoding}"'
+        return body, self._build_headers(entry, encoding, body, etag), etag
+
+    def _not_modified(self, entry: _StaticEntry, etag: Optional[str], request_headers: dict) -> bool:
+        """
+        检查条件请求，有 If-None-Match 时忽略 If-Modified-Since
+
+        Args:
+            entry: 缓存条目
+            etag: 所选版本的 ETag
+            request_headers: 请求头
+
+        Returns:
+            是否可以返回 304
+        """
+        if_none_match = request_headers.get('If-None-Match')
+        if if_none_match:
+            return etag is not None and _etag_matches(if_none_match, etag)
+
+        if_modified_since = request_headers.get('If-Modified-Since')
+        if if_modified_since:
+            parsed = parsedate(if_modified_since)
+            if parsed is not None:
+                return entry.mtime <= timegm(parsed)
+        return False
+
+    def invalidate(self, path: str = None):
+        """
+        使缓存失效
+
+        Args:
+            path: 文件或目录的绝对路径，目录使其下的全部文件失效；None 清空缓存
+        """
+        with self._lock:
+            self._generation += 1
+            if path is None:
+                self._cache.clear()
+                self._cache_bytes = 0
+                return
+
+            prefix = path.rstrip(os.sep) + os.sep
+            for key, entry in list(self._cache.items()):
+                if entry.path == path or entry.path.startswith(prefix):
+                    del self._cache[key]
+                    self._cache_bytes -= entry.nbytes
+
     def _secure_path_join(self, file_path: str) -> Optional[Path]:
         """
         安全的路径拼接，防止路径遍历攻击
-        
+
         Args:
             file_path: 文件路径
-            
+
         Returns:
             安全的完整路径，如果不安全则返回 None
         """
         # 移除开头的斜杠
         file_path = file_path.lstrip('/')
-        
+
         # 拼接路径
         full_path = (self.directory / file_path).resolve()
-        
+
         # 检查路径是否在静态目录内
         try:
             full_path.relative_to(self.directory)
         except ValueError:
             return None
-        
+
         return full_path
-    
+
     def _generate_etag(self, file_path: Path, stat) -> str:
         """
         生成 ETag
-        
+
         Args:
             file_path: 文件路径
             stat: 文件状态
-            
+
         Returns:
-            ETag 字符串
+            带引号的 ETag 字符串
         """
         # 使用文件路径、大小和修改时间生成 ETag
-        etag_str = f"{file_path}-{stat.st_size}-{stat.st_mtime}"
-        return hashlib.md5(etag_str.encode()).hexdigest()
-    
-    def _build_headers(
-        self,
-        file_path: Path,
-        headers_dict: dict,
-        etag: Optional[str],
-        last_modified: datetime
-    ) -> list:
-        """
-        构建响应头列表
-        
+        etag_str = f"{file_path}-{stat.st_size}-{stat.st_mtime_ns}"
+        return f'"{hashlib.md5(etag_str.encode()).hexdigest()}"'
+
+    def _build_headers(self, entry: _StaticEntry, encoding: str, body: Optional[bytes], etag: Optional[str]) -> list:
+        """
+        构建响应头列表，Expires 与请求时间有关，在响应时添加
+
         Args:
-            file_path: 文件路径
-            headers_dict: 响应头字典
+            entry: 缓存条目
+            encoding: 编码名
+            body: 响应体，None 表示从磁盘读取
             etag: ETag
-            last_modified: 最后修改时间
-            
+
         Returns:
             响应头列表
         """
-        headers = []
-        
         # 添加基本响应头
-        for key, value in headers_dict.items():
-            headers.append((key, str(value)))
-        
+        headers = [
+            ('Content-Type', entry.mime_type),
+            ('Content-Length', str(entry.size if body is None else len(body))),
+        ]
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        if entry.compressible:
+            headers.append(('Vary', 'Accept-Encoding'))
+
         # 添加缓存控制
         if self.max_age > 0:
             headers.append(('Cache-Control', f'public, max-age={self.max_age}'))
-            expires = datetime.utcnow() + timedelta(seconds=self.max_age)
-            headers.append(('Expires', expires.strftime('%a, %d %b %Y %H:%M:%S GMT')))
-        
+
         # 添加 ETag
         if etag:
             headers.append(('ETag', etag))
-        
+
         # 添加 Last-Modified
-        headers.append(('Last-Modified', last_modified.strftime('%a, %d %b %Y %H:%M:%S GMT')))
-        
+        headers.append(('Last-Modified', entry.last_modified))
+
         # 添加 Accept-Ranges
         if self.enable_range:
             headers.append(('Accept-Ranges', 'bytes'))
-        
+
         return headers
-    
+
     def clear_cache(self):
         """清空文件缓存"""
-        self._cache.clear()
-    
+        self.invalidate()
+
     def get_cache_info(self) -> dict:
         """
         获取缓存信息
-        
+
         Returns:
             缓存信息字典
         """
-        return {
-            'cache_size': len(self._cache),
-            'max_cache_size': self.cache_size,
-            'cached_files': list(self._cache.keys())
-        }
+        with self._lock:
+            return {
+                'cache_size': len(self._cache),
+                'max_cache_size': self.cache_size,
+                'cache_bytes': self._cache_bytes,
+                'max_cache_bytes': self.cache_max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'watching': self._observer is not None,
+                'store_files': len(self.store) if self.store is not None else 0,
+                'cached_files': list(self._cache.keys())
+            }
 
 
 # 便捷函数
@@ -297,13 +924,13 @@ def create_static_handler(
 ) -> StaticFileHandler:
     """
     创建静态文件处理器
-    
+
     Args:
         directory: 静态文件目录
         max_age: 缓存时间（秒）
-        enable_gzip: 是否启用 Gzip 压缩
+        enable_gzip: 是否启用压缩（包括 br、zstd 和 gzip）
         **kwargs: 其他参数
-        
+
     Returns:
         StaticFileHandler 实例
     """
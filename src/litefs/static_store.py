@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+多进程共享的静态资源存储
+
+在主进程启动（fork 工作进程之前）时把静态目录中的文件和压缩版本写入一个存储文件，
+再以只读方式 mmap 映射。所有工作进程共用同一份物理内存，StaticFileHandler
+直接返回映射区域的 memoryview 切片，不复制内容:
+
+    store = SharedStaticStore.build('static', '/var/run/myapp/static.store')
+    static = StaticFileHandler('static', store=store)
+
+资源更新后重新调用 build 生成新文件（原子替换同一路径），工作进程在下一次
+缓存未命中时（最多每 refresh_interval 秒检查一次）映射新文件。
+存储中与磁盘上修改时间或大小不一致的文件不使用，从磁盘读取
+"""
+
+import json
+import mmap
+import mimetypes
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, Optional
+
+from .static_compress import (
+    DEFAULT_ENCODINGS,
+    DEFAULT_MIN_COMPRESS_SIZE,
+    ENCODING_SUFFIXES,
+    available_encodings,
+    compress,
+    is_compressible,
+    read_precompressed,
+)
+
+# 文件头：魔数、格式版本、索引长度
+_MAGIC = b'LFSS'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBQ')
+
+# 默认只存储不超过该大小的文件，更大的文件由 StaticFileHandler 从磁盘按范围读取
+DEFAULT_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+# 存储中的一个文件：variants 为编码名（identity 表示未压缩）-> memoryview
+StoredAsset = namedtuple('StoredAsset', ['mtime_ns', 'size', 'mime_type', 'variants'])
+
+
+class SharedStaticStore:
+    """
+    mmap 映射的只读静态资源存储
+
+    索引以 JSON 保存在文件头之后，每个文件记录修改时间、大小、MIME 类型
+    以及各编码版本在数据区中的偏移和长度
+    """
+
+    def __init__(self, path: str, refresh_interval: float = 1.0):
+        """
+        打开已生成的存储文件
+
+        Args:
+            path: 存储文件路径
+            refresh_interval: maybe_refresh 检查存储文件是否被替换的最小间隔（秒）
+        """
+        self.path = os.path.abspath(path)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._mapping = None
+        self._index: Dict[str, dict] = {}
+        self._view = None
+        self._identity = None
+        self._next_check = 0.0
+        self._open()
+
+    def _open(self):
+        """映射存储文件并读取索引"""
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, index_length = _HEADER.unpack_from(mapping, 0)
+        if magic != _MAGIC or version != _VERSION:
+            mapping.close()
+            raise ValueError(f"Not a litefs static store: {self.path}")
+        start = _HEADER.size
+        index = json.loads(mapping[start:start + index_length].decode('utf-8'))
+        view = memoryview(mapping)[start + index_length:]
+
+        # 整体替换，请求线程读取时不需要加锁；旧的映射在不再被引用后释放
+        self._mapping = mapping
+        self._index = index
+        self._view = view
+        self._identity = (st.st_ino, st.st_mtime_ns)
+
+    @classmethod
+    def build(
+        cls,
+        directory: str,
+        path: str,
+        encodings: Iterable[str] = DEFAULT_ENCODINGS,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        min_compress_size: int = DEFAULT_MIN_COMPRESS_SIZE,
+        compress_missing: bool = True,
+        refresh_interval: float = 1.0
+    ) -> 'SharedStaticStore':
+        """
+        把静态目录写入存储文件并打开
+
+        可压缩的文件优先使用 .br/.zst/.gz 预压缩文件，没有时（compress_missing 为 True）
+        以最高压缩级别压缩。先写入临时文件再原子替换，正在使用旧文件的进程不受影响
+
+        Args:
+            directory: 静态文件目录
+            path: 存储文件路径
+            encodings: 存储的压缩编码
+            max_file_size: 只存储不超过该大小的文件
+            min_compress_size: 最小压缩大小
+            compress_missing: 没有预压缩文件时是否压缩
+            refresh_interval: 见 __init__
+
+        Returns:
+            打开的存储
+        """
+        directory = os.path.realpath(directory)
+        encodings = tuple(encodings)
+        compressors = available_encodings(encodings) if compress_missing else ()
+        suffixes = tuple(ENCODING_SUFFIXES.values())
+        tmp = f'{path}.{os.getpid()}.tmp'
+
+        try:
+            index = {}
+            offset = 0
+            with open(tmp + '.data', 'wb') as data_file:
+                def append(data):
+                    nonlocal offset
+                    data_file.write(data)
+                    record = [offset, len(data)]
+                    offset += len(data)
+                    return record
+
+                for root, dirs, files in os.walk(directory):
+                    dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                    for filename in sorted(files):
+                        if filename.startswith('.') or filename.endswith(suffixes):
+                            continue
+                        full_path = os.path.join(root, filename)
+                        st = os.stat(full_path)
+                        if st.st_size > max_file_size:
+                            continue
+                        with open(full_path, 'rb') as f:
+                            content = f.read()
+
+                        mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                        variants = {'identity': append(content)}
+                        if len(content) >= min_compress_size and is_compressible(mime_type):
+                            for encoding in encodings:
+                                body = read_precompressed(full_path + ENCODING_SUFFIXES[encoding], st)
+                                if body is None and encoding in compressors:
+                                    body = compress(content, encoding)
+                                if body is not None and len(body) < len(content):
+                                    variants[encoding] = append(body)
+
+                        name = os.path.relpath(full_path, directory).replace(os.sep, '/')
+                        index[name] = {
+                            'mtime_ns': st.st_mtime_ns,
+                            'size': st.st_size,
+                            'mime_type': mime_type,
+                            'variants': variants,
+                        }
+
+            index_data = json.dumps(index, separators=(',', ':')).encode('utf-8')
+            with open(tmp, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION, len(index_data)))
+                f.write(index_data)
+                with open(tmp + '.data', 'rb') as data_file:
+                    while True:
+                        chunk = data_file.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+            os.replace(tmp, path)
+        finally:
+            for leftover in (tmp, tmp + '.data'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        return cls(path, refresh_interval)
+
+    def get(self, name: str) -> Optional[StoredAsset]:
+        """
+        获取存储的文件
+
+        Args:
+            name: 相对于静态目录、以 / 分隔的路径
+
+        Returns:
+            StoredAsset，各版本为映射区域的 memoryview 切片；不存在时返回 None
+        """
+        index, view = self._index, self._view
+        record = index.get(name)
+        if record is None:
+            return None
+        variants = {
+            encoding: view[start:start + length]
+            for encoding, (start, length) in record['variants'].items()
+        }
+        return StoredAsset(record['mtime_ns'], record['size'], record['mime_type'], variants)
+
+    def refresh(self) -> bool:
+        """
+        存储文件被替换（重新 build）时映射新文件
+
+        Returns:
+            是否映射了新文件
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.refresh_interval
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                return False
+            if (st.st_ino, st.st_mtime_ns) == self._identity:
+                return False
+            self._open()
+            return True
+
+    def maybe_refresh(self) -> bool:
+        """距离上次检查超过 refresh_interval 时调用 refresh"""
+        if time.monotonic() < self._next_check:
+            return False
+        return self.refresh()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+
+__all__ = [
+    'SharedStaticStore',
+    'StoredAsset',
+]
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+模板片段和页面输出缓存
+
+TemplateCache 把渲染结果存入应用的缓存后端（app.caches），
+支持过期时间和按标签失效。标签失效通过版本号实现：每个标签在后端
+保存一个版本令牌，缓存条目记录写入时的令牌，令牌变化后条目即视为失效，
+因此 Redis、Memcache 等共享后端上的失效对所有进程同时生效。
+
+模板中通过 Mako 的缓存插件使用:
+
+    <%block name="nav" cached="True" cache_key="nav:${lang}"
+            cache_timeout="300" cache_tags="nav">
+        ...
+    </%block>
+"""
+
+import hashlib
+import time
+import uuid
+from typing import Any, Callable, Iterable, Optional
+
+from mako.cache import CacheImpl, register_plugin
+
+# 缓存键前缀，与应用缓存中的其他数据区分
+DEFAULT_PREFIX = 'template:'
+
+# 未指定过期时间时的默认值（秒）
+DEFAULT_TIMEOUT = 300
+
+
+def _split_tags(tags) -> tuple:
+    """把 "a, b" 形式的标签字符串或可迭代对象转为元组"""
+    if not tags:
+        return ()
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    return tuple(t.strip() for t in tags if t and t.strip())
+
+
+class TemplateCache:
+    """
+    基于应用缓存后端的模板渲染结果缓存
+
+    后端只需提供 get(key)、put(key, val) 和 delete(key)，
+    过期时间由 TemplateCache 自己记录，不依赖后端的过期机制
+    """
+
+    def __init__(self, backend, default_timeout: int = DEFAULT_TIMEOUT,
+                 prefix: str = DEFAULT_PREFIX):
+        """
+        初始化模板缓存
+
+        Args:
+            backend: 缓存后端，通常为 app.caches
+            default_timeout: 默认过期时间（秒）
+            prefix: 缓存键前缀
+        """
+        self.backend = backend
+        self.default_timeout = default_timeout
+        self.prefix = prefix
+
+    def _tag_key(self, tag: str) -> str:
+        return f'{self.prefix}tag:{tag}'
+
+    def _tag_versions(self, tags: tuple) -> tuple:
+        """
+        获取标签当前的版本令牌
+
+        后端中不存在的标签（从未使用或已被后端淘汰）生成新令牌，
+        旧令牌写入的条目因此全部失效，不会因淘汰而"复活"
+        """
+        versions = []
+        for tag in tags:
+            key = self._tag_key(tag)
+            version = self.backend.get(key)
+            if version is None:
+                version = uuid.uuid4().hex
+                self.backend.put(key, version)
+            versions.append(version)
+        return tuple(versions)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取缓存的渲染结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存值，不存在、已过期或标签已失效时返回 None
+        """
+        entry = self.backend.get(self.prefix + key)
+        if entry is None:
+            return None
+        expires_at, tags, versions, value = entry
+        if expires_at < time.time():
+            return None
+        # JSON 序列化的后端（Redis、Memcache）把元组读回为列表
+        if tags and self._tag_versions(tuple(tags)) != tuple(versions):
+            return None
+        return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None,
+            tags: Iterable[str] = ()) -> None:
+        """
+        缓存渲染结果
+
+        Args:
+            key: 缓存键
+            value: 渲染结果
+            timeout: 过期时间（秒），None 使用默认值
+            tags: 标签，任一标签失效时该条目失效
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        tags = _split_tags(tags)
+        entry = (time.time() + int(timeout), tags, self._tag_versions(tags), value)
+        self.backend.put(self.prefix + key, entry)
+
+    def get_or_create(self, key: str, creator: Callable[[], Any],
+                      timeout: Optional[int] = None, tags: Iterable[str] = ()) -> Any:
+        """
+        获取缓存的渲染结果，不存在时调用 creator 生成并缓存
+
+        Args:
+            key: 缓存键
+            creator: 生成渲染结果的函数
+            timeout: 过期时间（秒）
+            tags: 标签
+
+        Returns:
+            渲染结果
+        """
+        value = self.get(key)
+        if value is None:
+            value = creator()
+            self.set(key, value, timeout, tags)
+        return value
+
+    def delete(self, key: str) -> None:
+        """删除一个缓存条目"""
+        self.backend.delete(self.prefix + key)
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """
+        使带有任一给定标签的缓存条目失效
+
+        Args:
+            *tags: 标签名
+        """
+        for tag in tags:
+            self.backend.put(self._tag_key(tag), uuid.uuid4().hex)
+
+
+def make_page_key(template_name: str, kwargs: dict, vary: Iterable[str] = ()) -> str:
+    """
+    生成页面缓存键
+
+    Args:
+        template_name: 模板名
+        kwargs: 模板变量
+        vary: 参与缓存键的变量名，其余变量不影响缓存
+
+    Returns:
+        缓存键
+    """
+    vary = tuple(vary)
+    if not vary:
+        return f'page:{template_name}'
+    parts = repr(tuple((name, kwargs.get(name)) for name in vary))
+    digest = hashlib.sha1(parts.encode('utf-8')).hexdigest()
+    return f'page:{template_name}:{digest}'
+
+
+class LitefsCacheImpl(CacheImpl):
+    """
+    Mako 缓存插件，把 cached="True" 的 block 和 def 存入 TemplateCache
+
+    TemplateEngine 通过 cache_args={'store': TemplateCache} 传入存储；
+    没有存储时直接渲染，不做缓存
+    """
+
+    def _key(self, key):
+        # 同一个 cache_key 在不同模板中互不影响
+        return f'fragment:{self.cache.id}:{key}'
+
+    def get_or_create(self, key, creation_function, **kw):
+        store = kw.get('store')
+        if store is None:
+            return creation_function()
+        return store.get_or_create(
+            self._key(key), creation_function, kw.get('timeout'), _split_tags(kw.get('tags')),
+        )
+
+    def set(self, key, value, **kw):
+        store = kw.get('store')
+        if store is not None:
+            store.set(self._key(key), value, kw.get('timeout'), _split_tags(kw.get('tags')))
+
+    def get(self, key, **kw):
+        store = kw.get('store')
+        if store is None:
+            return None
+        return store.get(self._key(key))
+
+    def invalidate(self, key, **kw):
+        store = kw.get('store')
+        if store is not None:
+            store.delete(self._key(key))
+
+
+register_plugin('litefs', __name__, 'LitefsCacheImpl')
+
+
+__all__ = [
+    'TemplateCache',
+    'LitefsCacheImpl',
+    'make_page_key',
+]
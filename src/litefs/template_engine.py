@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Mako 模板引擎
+
+每个应用只创建一个 TemplateEngine，所有请求共用同一个 TemplateLookup，
+编译后的模板在进程内常驻。配置 module_directory 后编译结果写入磁盘，
+多个工作进程和重启后都可以直接加载；只有调试模式才检查模板文件的修改时间。
+传入 TemplateCache 后支持片段缓存（cached="True" 的 block/def）和整页缓存
+"""
+
+import os
+from typing import Iterable, Iterator, List, Optional
+
+from greenlet import greenlet, getcurrent
+
+from .template_cache import TemplateCache, make_page_key
+
+# precompile 默认编译的模板文件扩展名
+DEFAULT_TEMPLATE_EXTENSIONS = ('.html', '.htm', '.mako', '.xml', '.txt')
+
+# 流式渲染时每个输出块的目标大小（字节）
+DEFAULT_STREAM_CHUNK_SIZE = 16384
+
+
+def _no_flush():
+    """非流式渲染时模板中的 flush() 不做任何事"""
+    return ''
+
+
+class _ChunkWriter:
+    """
+    Mako Context 的输出缓冲区
+
+    累积的输出达到 chunk_size 或模板调用 flush() 时，
+    把内容交给 emit 并清空，缓冲区大小因此不超过一个块
+    """
+
+    __slots__ = ('_parts', '_size', '_chunk_size', 'emit')
+
+    def __init__(self, chunk_size):
+        self._parts = []
+        self._size = 0
+        self._chunk_size = chunk_size
+        self.emit = None
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            data = ''.join(self._parts).encode('utf-8')
+            self._parts = []
+            self._size = 0
+            self.emit(data)
+        return ''
+
+
+class TemplateEngine:
+    """
+    应用级模板引擎
+
+    用法:
+        engine = TemplateEngine(['templates'], module_directory='/tmp/mako_modules')
+        engine.precompile()
+        html = engine.render('index.html', title='首页')
+    """
+
+    def __init__(
+        self,
+        directories: Iterable[str],
+        module_directory: Optional[str] = None,
+        debug: bool = False,
+        input_encoding: str = 'utf-8',
+        cache: Optional[TemplateCache] = None,
+    ):
+        """
+        初始化模板引擎
+
+        Args:
+            directories: 模板目录列表，相对路径相对于当前工作目录
+            module_directory: 编译模块目录，None 表示只在内存中编译
+            debug: 调试模式，开启后每次获取模板都检查文件修改时间
+            input_encoding: 模板文件编码
+            cache: 片段和页面缓存，None 表示不缓存渲染结果
+        """
+        from mako.lookup import TemplateLookup
+
+        self.directories: List[str] = [os.path.abspath(d) for d in directories]
+        self.module_directory = (
+            os.path.abspath(module_directory) if module_directory else None
+        )
+        self.debug = debug
+        self.cache = cache
+        # 调试模式下不缓存渲染结果，模板修改后立即生效
+        self.lookup = TemplateLookup(
+            directories=self.directories,
+            module_directory=self.module_directory,
+            filesystem_checks=debug,
+            input_encoding=input_encoding,
+            encoding_errors='replace',
+            cache_enabled=not debug,
+            cache_impl='litefs',
+            cache_args={'store': cache},
+        )
+
+    def get_template(self, name: str):
+        """
+        获取编译后的模板
+
+        Args:
+            name: 模板文件名，相对于模板目录
+
+        Returns:
+            mako Template 对象
+        """
+        # TemplateLookup 按原始名称缓存，去掉开头的 / 避免同一模板编译两次
+        return self.lookup.get_template(name.lstrip('/'))
+
+    def render(self, template_name: str, **kwargs) -> str:
+        """
+        渲染模板
+
+        Args:
+            template_name: 模板文件名
+            **kwargs: 模板变量
+
+        Returns:
+            渲染后的字符串
+        """
+        kwargs.setdefault('flush', _no_flush)
+        return self.get_template(template_name).render(**kwargs)
+
+    def stream(
+        self,
+        template_name: str,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+        **kwargs
+    ) -> Iterator[bytes]:
+        """
+        流式渲染模板
+
+        模板在独立的 greenlet 中渲染，输出每累积 chunk_size 字节就交给调用方，
+        模板中调用 ${flush()} 可以立即输出已渲染的部分（如 </head> 之后）。
+        模板找不到或有语法错误时在这里直接抛出，而不是在输出过程中
+
+        模板执行期间不应读写请求的 socket，例如读取尚未加载的请求体
+
+        Args:
+            template_name: 模板文件名
+            chunk_size: 每个输出块的目标大小（字节）
+            **kwargs: 模板变量
+
+        Returns:
+            UTF-8 编码的字节块迭代器
+        """
+        return _render_stream(self.get_template(template_name), chunk_size, kwargs)
+
+    def render_cached(
+        self,
+        template_name: str,
+        cache_vary: Iterable[str] = (),
+        cache_timeout: Optional[int] = None,
+        cache_tags: Iterable[str] = (),
+        **kwargs
+    ) -> str:
+        """
+        渲染模板并缓存整页输出
+
+        缓存键由模板名和 cache_vary 指定的变量值组成，
+        其余变量不影响缓存，因此只应把决定输出内容的变量列入 cache_vary
+
+        Args:
+            template_name: 模板文件名
+            cache_vary: 参与缓存键的变量名
+            cache_timeout: 过期时间（秒），None 使用 TemplateCache 的默认值
+            cache_tags: 标签，用于 cache.invalidate_tags 失效
+            **kwargs: 模板变量
+
+        Returns:
+            渲染后的字符串
+        """
+        if self.cache is None or self.debug:
+            return self.render(template_name, **kwargs)
+        key = make_page_key(template_name.lstrip('/'), kwargs, cache_vary)
+        return self.cache.get_or_create(
+            key, lambda: self.render(template_name, **kwargs), cache_timeout, cache_tags,
+        )
+
+    def list_templates(
+        self, extensions: Iterable[str] = DEFAULT_TEMPLATE_EXTENSIONS
+    ) -> List[str]:
+        """
+        列出模板目录下的模板文件名，跳过隐藏目录
+
+        Args:
+            extensions: 模板文件扩展名
+
+        Returns:
+            以 / 分隔的相对路径列表，可直接传给 get_template
+        """
+        extensions = tuple(extensions)
+        names = []
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = [d for d in dirs if not d.startswith('.') and d != '__pycache__']
+                for filename in files:
+                    if filename.endswith(extensions):
+                        path = os.path.relpath(os.path.join(root, filename), directory)
+                        names.append(path.replace(os.sep, '/'))
+        return names
+
+    def precompile(
+        self, extensions: Iterable[str] = DEFAULT_TEMPLATE_EXTENSIONS
+    ) -> int:
+        """
+        预编译模板目录下的全部模板
+
+        在启动时或 fork 工作进程前调用，模板语法错误会在这里直接抛出，
+        而不是等到第一次请求
+
+        Args:
+            extensions: 模板文件扩展名
+
+        Returns:
+            编译的模板数量
+        """
+        names = self.list_templates(extensions)
+        for name in names:
+            self.get_template(name)
+        return len(names)
+
+
+def _render_stream(template, chunk_size, kwargs):
+    from mako.runtime import Context
+
+    writer = _ChunkWriter(chunk_size)
+    kwargs['flush'] = writer.flush
+
+    def run():
+        context = Context(writer, **kwargs)
+        template.render_context(context, **kwargs)
+        writer.flush()
+
+    render = greenlet(run)
+    # 渲染 greenlet 每输出一块就切换回迭代它的 greenlet
+    writer.emit = lambda data: render.parent.switch(data)
+    try:
+        while True:
+            render.parent = getcurrent()
+            data = render.switch()
+            if render.dead:
+                return
+            yield data
+    finally:
+        if not render.dead:
+            # 调用方提前停止迭代（如客户端断开），结束渲染 greenlet
+            render.throw()
+
+
+__all__ = [
+    'DEFAULT_STREAM_CHUNK_SIZE',
+    'DEFAULT_TEMPLATE_EXTENSIONS',
+    'TemplateEngine',
+]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+缓存和 Session 后端的异步接口
+
+每个后端提供 aget、aput、adelete 和 aget_many，参数和返回值与同步方法相同：
+进程内后端直接调用同步方法；Redis 使用 redis.asyncio，Memcache 使用
+AsyncMemcacheClient；SQLite 和无法创建异步客户端的后端在线程池中执行同步方法
+"""
+
+import asyncio
+import functools
+import weakref
+from typing import Any, Callable, Optional
+
+
+async def run_sync(func: Callable, *args, **kwargs) -> Any:
+    """
+    在事件循环的默认线程池中执行同步函数
+
+    Returns:
+        函数的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def get_many(backend, keys) -> dict:
+    """
+    批量读取，后端没有 get_many 时逐个读取
+
+    Returns:
+        键 -> 值，不包含不存在的键
+    """
+    method = getattr(backend, 'get_many', None)
+    if method is not None:
+        return method(list(keys))
+    result = {}
+    for key in keys:
+        value = backend.get(key)
+        if value is not None:
+            result[key] = value
+    return result
+
+
+async def acall(backend, name: str, *args, **kwargs) -> Any:
+    """
+    调用后端的异步方法（'a' + name），后端没有异步方法时直接调用同步方法
+
+    用于可能由用户提供的存储，如 app.sessions
+    """
+    method = getattr(backend, 'a' + name, None)
+    if method is not None:
+        return await method(*args, **kwargs)
+    return getattr(backend, name)(*args, **kwargs)
+
+
+class InlineAsyncMixin:
+    """
+    直接调用同步方法的异步接口
+
+    用于只访问进程内数据的后端，这些操作比切换到线程池更快
+    """
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aput(self, *args, **kwargs):
+        return self.put(*args, **kwargs)
+
+    async def adelete(self, key):
+        return self.delete(key)
+
+    async def aget_many(self, keys) -> dict:
+        return get_many(self, keys)
+
+
+class ExecutorAsyncMixin:
+    """
+    在线程池中调用同步方法的异步接口
+
+    用于会阻塞的后端，如 SQLite
+    """
+
+    async def aget(self, key):
+        return await run_sync(self.get, key)
+
+    async def aput(self, *args, **kwargs):
+        return await run_sync(self.put, *args, **kwargs)
+
+    async def adelete(self, key):
+        return await run_sync(self.delete, key)
+
+    async def aget_many(self, keys) -> dict:
+        return await run_sync(get_many, self, keys)
+
+
+class LoopLocal:
+    """
+    每个事件循环一个实例
+
+    异步客户端的连接只能在创建它的事件循环中使用；事件循环被回收后其实例随之释放
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        """
+        Args:
+            factory: 在事件循环中第一次使用时调用，返回该事件循环的实例
+        """
+        self._factory = factory
+        self._values = weakref.WeakKeyDictionary()
+
+    def get(self) -> Any:
+        """
+        获取当前事件循环的实例，必须在协程中调用
+        """
+        loop = asyncio.get_running_loop()
+        value = self._values.get(loop)
+        if value is None:
+            value = self._values[loop] = self._factory()
+        return value
+
+    def pop(self) -> Optional[Any]:
+        """
+        移除并返回当前事件循环的实例，没有时返回 None
+        """
+        return self._values.pop(asyncio.get_running_loop(), None)
+
+
+# 可以从同步客户端复制到 redis.asyncio 客户端的连接参数
+_REDIS_CONNECTION_KEYS = (
+    'host', 'port', 'db', 'username', 'password', 'socket_timeout',
+    'socket_connect_timeout', 'encoding', 'encoding_errors', 'decode_responses', 'client_name',
+)
+
+
+def async_redis_factory(client) -> Optional[Callable[[], Any]]:
+    """
+    返回按同步客户端的连接参数创建 redis.asyncio 客户端的函数
+
+    Args:
+        client: redis.Redis 实例
+
+    Returns:
+        创建客户端的函数；未安装 redis.asyncio、client 不是 redis.Redis 或使用 SSL 连接时
+        返回 None，此时应在线程池中调用同步客户端
+    """
+    try:
+        import redis
+        import redis.asyncio as aioredis
+    except ImportError:
+        return None
+    if not isinstance(client, redis.Redis):
+        return None
+    pool = getattr(client, 'connection_pool', None)
+    if pool is None or issubclass(pool.connection_class, redis.SSLConnection):
+        return None
+
+    connection_kwargs = pool.connection_kwargs
+    params = {key: connection_kwargs[key] for key in _REDIS_CONNECTION_KEYS if key in connection_kwargs}
+    if 'path' in connection_kwargs:
+        params.pop('host', None)
+        params.pop('port', None)
+        params['unix_socket_path'] = connection_kwargs['path']
+    params['max_connections'] = pool.max_connections
+    return functools.partial(aioredis.Redis, **params)
+
+
+__all__ = [
+    'ExecutorAsyncMixin',
+    'InlineAsyncMixin',
+    'LoopLocal',
+    'acall',
+    'async_redis_factory',
+    'get_many',
+    'run_sync',
+]
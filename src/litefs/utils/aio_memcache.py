@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+asyncio Memcache 客户端
+
+只实现 MemcacheCache 和 MemcacheSession 需要的文本协议命令（get、set、add、delete）。
+值按原样保存为 bytes、flags 为 0，与 pymemcache 不带序列化器时写入的数据相同，
+同一个 Memcache 可以同时用同步和异步接口读写
+"""
+
+import asyncio
+import functools
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+class MemcacheError(Exception):
+    """服务器返回错误或无法解析的响应"""
+
+
+def parse_server(server) -> Tuple[str, int]:
+    """
+    解析服务器地址
+
+    Args:
+        server: "host:port"、"host" 或 (host, port)
+
+    Returns:
+        (host, port)
+    """
+    if isinstance(server, (tuple, list)):
+        return server[0], int(server[1])
+    host, _, port = str(server).rpartition(':')
+    if not host:
+        return port, 11211
+    return host, int(port)
+
+
+def async_memcache_factory(client=None, server=None) -> Optional[Callable[[], Any]]:
+    """
+    返回创建 AsyncMemcacheClient 的函数
+
+    Args:
+        client: 同步客户端，只支持 pymemcache 的 Client，使用其服务器地址和超时时间
+        server: 没有 client 时使用的服务器地址
+
+    Returns:
+        创建客户端的函数，无法确定服务器地址或使用 Unix 套接字时返回 None
+    """
+    timeout = None
+    if client is not None:
+        try:
+            from pymemcache.client.base import Client
+        except ImportError:
+            return None
+        if not isinstance(client, Client):
+            return None
+        server = client.server
+        timeout = client.timeout
+    if server is None or (isinstance(server, str) and server.startswith(('/', 'unix:'))):
+        return None
+    return functools.partial(AsyncMemcacheClient, server, timeout=timeout)
+
+
+def _encode_key(key: Union[str, bytes]) -> bytes:
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    if len(key) > 250 or any(c <= 32 or c == 127 for c in key):
+        raise ValueError(f'无效的 Memcache 键: {key!r}')
+    return key
+
+
+class AsyncMemcacheClient:
+    """
+    asyncio Memcache 客户端
+
+    连接池最多保持 max_connections 个连接，每个请求独占一个连接。
+    实例只能在一个事件循环中使用，需要跨事件循环时配合 LoopLocal
+    """
+
+    def __init__(self, server, max_connections: int = 16, timeout: Optional[float] = None):
+        """
+        Args:
+            server: 服务器地址，"host:port" 或 (host, port)
+            max_connections: 最大连接数
+            timeout: 单个请求的超时时间（秒），None 表示不超时
+        """
+        self.host, self.port = parse_server(server)
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _call(self, request: bytes, parse):
+        await self._slots.acquire()
+        try:
+            while True:
+                reused = bool(self._idle)
+                conn = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+                try:
+                    result = await self._send(conn, request, parse)
+                except ConnectionError:
+                    conn[1].close()
+                    if reused:
+                        # 空闲连接可能已被服务器关闭，换一个连接重试
+                        continue
+                    raise
+                except BaseException:
+                    # 连接上可能还有未读完的响应，不再复用
+                    conn[1].close()
+                    raise
+                self._idle.append(conn)
+                return result
+        finally:
+            self._slots.release()
+
+    async def _send(self, conn, request: bytes, parse):
+        reader, writer = conn
+        writer.write(request)
+        if self.timeout is None:
+            return await parse(reader)
+        return await asyncio.wait_for(parse(reader), self.timeout)
+
+    async def get(self, key) -> Optional[bytes]:
+        """
+        读取一个键
+
+        Returns:
+            值，不存在时返回 None
+        """
+        key = _encode_key(key)
+        return (await self._call(b'get %s\r\n' % key, _read_values)).get(key)
+
+    async def get_many(self, keys: Iterable) -> Dict[bytes, bytes]:
+        """
+        读取多个键
+
+        Returns:
+            键（bytes）-> 值，不包含不存在的键
+        """
+        keys = [_encode_key(key) for key in keys]
+        if not keys:
+            return {}
+        return await self._call(b'get %s\r\n' % b' '.join(keys), _read_values)
+
+    async def set(self, key, value: bytes, expire: int = 0) -> bool:
+        """
+        写入一个键
+
+        Args:
+            expire: 过期时间（秒），0 表示不过期
+        """
+        return await self._store(b'set', key, value, expire)
+
+    async def add(self, key, value: bytes, expire: int = 0) -> bool:
+        """
+        键不存在时写入
+
+        Returns:
+            是否写入
+        """
+        return await self._store(b'add', key, value, expire)
+
+    async def delete(self, key) -> bool:
+        """
+        删除一个键
+
+        Returns:
+            键是否存在
+        """
+        line = await self._call(b'delete %s\r\n' % _encode_key(key), _read_line)
+        if line == b'DELETED':
+            return True
+        if line == b'NOT_FOUND':
+            return False
+        raise MemcacheError(line.decode('utf-8', 'replace'))
+
+    async def _store(self, command: bytes, key, value: bytes, expire: int) -> bool:
+        request = b'%s %s 0 %d %d\r\n%s\r\n' % (command, _encode_key(key), max(int(expire), 0), len(value), value)
+        line = await self._call(request, _read_line)
+        if line == b'STORED':
+            return True
+        if line == b'NOT_STORED':
+            return False
+        raise MemcacheError(line.decode('utf-8', 'replace'))
+
+    async def close(self) -> None:
+        """关闭全部空闲连接"""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+        for _, writer in idle:
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    line = await reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Memcache 连接已关闭')
+    return line[:-2]
+
+
+async def _read_values(reader: asyncio.StreamReader) -> Dict[bytes, bytes]:
+    values = {}
+    while True:
+        line = await _read_line(reader)
+        if line == b'END':
+            return values
+        parts = line.split()
+        if len(parts) < 4 or parts[0] != b'VALUE':
+            raise MemcacheError(line.decode('utf-8', 'replace'))
+        data = await reader.readexactly(int(parts[3]) + 2)
+        values[parts[1]] = data[:-2]
+
+
+__all__ = [
+    'AsyncMemcacheClient',
+    'MemcacheError',
+    'async_memcache_factory',
+    'parse_server',
+]
@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+SQLite 连接和批量写入
+
+DatabaseCache 和 DatabaseSession 共用：每个线程保持一个连接，文件数据库使用
+WAL 日志和 synchronous=NORMAL；写入和删除先进入队列，同一个键只保留最后一次操作，
+由后台线程按时间或数量合并到一个事务中提交
+"""
+
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Iterable, List, Sequence, Tuple
+
+from .aio import ExecutorAsyncMixin
+
+logger = logging.getLogger(__name__)
+
+# 队列中表示删除的值
+DELETED = object()
+
+# 写入失败后重试的间隔（秒）
+_RETRY_INTERVAL = 1.0
+
+# 所有实例，用于退出时写入队列、fork 后重置连接
+_stores = weakref.WeakSet()
+
+
+class SQLiteStore:
+    """
+    SQLite 连接和写入队列
+
+    队列中的操作为 键 -> upsert 语句的参数，或 DELETED。读取时先用 pending 查找队列，
+    同一进程中总能读到自己的写入；其他进程最多在 flush_interval 秒后看到。
+    write_behind 为 False 时每次写入立即提交。
+
+    内存数据库（:memory:）只能有一个连接，所有线程共用该连接
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        upsert_sql: str,
+        delete_sql: str,
+        write_behind: bool = True,
+        flush_interval: float = 0.05,
+        batch_size: int = 256,
+        timeout: float = 5.0
+    ):
+        """
+        初始化
+
+        Args:
+            db_path: 数据库文件路径
+            upsert_sql: 写入一个键的语句，参数为队列中的值
+            delete_sql: 删除一个键的语句，参数为 (key,)
+            write_behind: 是否在后台批量写入
+            flush_interval: 写入进入队列后最多等待的时间（秒）
+            batch_size: 队列中的键达到该数量时立即写入
+            timeout: 等待其他连接释放锁的时间（秒）
+        """
+        self.db_path = db_path
+        self.upsert_sql = upsert_sql
+        self.delete_sql = delete_sql
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+        self._memory = db_path == ':memory:'
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # 内存数据库的唯一连接
+        self._shared = None
+        self._shared_lock = threading.RLock()
+
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._statements: List[Tuple[str, tuple]] = []
+        self._flushing = {}
+        self._first_pending_at = 0.0
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._pid = os.getpid()
+        _stores.add(self)
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        获取当前线程的连接
+
+        Returns:
+            sqlite3.Connection
+        """
+        if self._memory:
+            if self._shared is None:
+                self._shared = self._open()
+            return self._shared
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._open())
+            # 线程结束时 threading.local 释放 holder，随之关闭连接；
+            # 退出时不关闭，由 _flush_all 写入队列
+            finalizer = weakref.finalize(holder, _release_connection, weakref.ref(self), holder.conn, os.getpid())
+            finalizer.atexit = False
+        return holder.conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        if not self._memory:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def query(self, sql: str, params: Sequence = ()) -> list:
+        """
+        执行查询
+
+        Returns:
+            全部结果行
+        """
+        with self._shared_lock if self._memory else _NO_LOCK:
+            return self.connect().execute(sql, params).fetchall()
+
+    def execute(self, sql: str, params: Sequence = (), many: bool = False) -> int:
+        """
+        先写入队列，再在一个事务中执行语句
+
+        Args:
+            sql: SQL 语句
+            params: 参数，many 为 True 时为参数列表
+            many: 是否使用 executemany
+
+        Returns:
+            影响的行数
+        """
+        self.flush()
+        with self._shared_lock if self._memory else _NO_LOCK:
+            conn = self.connect()
+            with conn:
+                cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+                return cursor.rowcount
+
+    def pending(self, key: Any) -> Any:
+        """
+        查找队列中的操作
+
+        Returns:
+            upsert 参数、DELETED，或不在队列中时返回 None
+        """
+        with self._cond:
+            value = self._pending.get(key)
+            if value is None:
+                value = self._flushing.get(key)
+            return value
+
+    def put(self, key: Any, params: tuple) -> None:
+        """写入一个键"""
+        self.put_many(((key, params),))
+
+    def delete(self, key: Any) -> None:
+        """删除一个键"""
+        self.put_many(((key, DELETED),))
+
+    def put_many(self, items: Iterable[Tuple[Any, Any]]) -> None:
+        """
+        写入或删除多个键
+
+        Args:
+            items: (键, upsert 参数或 DELETED)
+        """
+        with self._cond:
+            first = not self._pending and not self._statements
+            if first:
+                self._first_pending_at = time.monotonic()
+            self._pending.update(items)
+            size = len(self._pending)
+        self._wake(first or size >= self.batch_size)
+
+    def schedule(self, sql: str, params: Sequence = ()) -> None:
+        """在下一次批量写入的事务中执行语句，如清理过期数据"""
+        with self._cond:
+            first = not self._pending and not self._statements
+            if first:
+                self._first_pending_at = time.monotonic()
+            self._statements.append((sql, tuple(params)))
+        self._wake(first)
+
+    def discard(self) -> None:
+        """丢弃队列中尚未写入的操作"""
+        with self._flush_lock:
+            with self._cond:
+                self._pending.clear()
+                self._statements.clear()
+
+    def _wake(self, notify: bool):
+        # 队列由空变为非空时唤醒写入线程开始计时 flush_interval，达到 batch_size 时立即写入
+        if not self.write_behind or self._closed:
+            self.flush()
+            return
+        if self._thread is None or self._pid != os.getpid():
+            self._start()
+        if notify:
+            with self._cond:
+                self._cond.notify()
+
+    def _start(self):
+        with self._cond:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=_run, args=(weakref.ref(self),), name='litefs-sqlite-writer', daemon=True
+            )
+            self._thread.start()
+
+    def flush(self) -> None:
+        """在一个事务中写入队列中的全部操作"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending and not self._statements:
+                    return
+                batch, self._pending = self._pending, {}
+                statements, self._statements = self._statements, []
+                self._flushing = batch
+            try:
+                self._write(batch, statements)
+            except BaseException:
+                # 保留写入失败的操作，之后的写入优先
+                with self._cond:
+                    for key, value in batch.items():
+                        self._pending.setdefault(key, value)
+                    self._statements[:0] = statements
+                    self._first_pending_at = time.monotonic()
+                raise
+            finally:
+                with self._cond:
+                    self._flushing = {}
+
+    def _write(self, batch: dict, statements: list):
+        rows = []
+        deletes = []
+        for key, value in batch.items():
+            if value is DELETED:
+                deletes.append((key,))
+            else:
+                rows.append(value)
+        with self._shared_lock if self._memory else _NO_LOCK:
+            conn = self.connect()
+            with conn:
+                if rows:
+                    conn.executemany(self.upsert_sql, rows)
+                if deletes:
+                    conn.executemany(self.delete_sql, deletes)
+                for sql, params in statements:
+                    conn.execute(sql, params)
+
+    def close(self) -> None:
+        """写入队列并关闭全部连接"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread() and self._pid == os.getpid():
+            thread.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('关闭时写入数据库失败: %s', self.db_path)
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+        self._shared = None
+        _stores.discard(self)
+
+    def _after_fork(self):
+        """fork 出的子进程不使用父进程的连接和写入线程"""
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._connections_lock = threading.Lock()
+        self._shared_lock = threading.RLock()
+        self._thread = None
+        if not self._memory:
+            # 父进程的队列由父进程写入
+            self._pending = {}
+            self._statements = []
+            self._flushing = {}
+            self._local = threading.local()
+            self._connections = []
+
+
+class SQLiteAsyncMixin(ExecutorAsyncMixin):
+    """
+    基于 SQLiteStore 的后端（实例的 _store）的异步接口
+
+    读取在线程池中执行；后台批量写入时写入和删除只是进入队列，直接执行
+    """
+
+    async def aput(self, *args, **kwargs):
+        if self._store is not None and self._store.write_behind:
+            return self.put(*args, **kwargs)
+        return await super().aput(*args, **kwargs)
+
+    async def adelete(self, key):
+        if self._store is not None and self._store.write_behind:
+            return self.delete(key)
+        return await super().adelete(key)
+
+
+class _NoLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NO_LOCK = _NoLock()
+
+
+def _run(ref):
+    """后台写入线程，只持有实例的弱引用"""
+    while True:
+        store = ref()
+        if store is None:
+            return
+        cond = store._cond
+        with cond:
+            if not store._pending and not store._statements and not store._closed:
+                # 定期醒来检查实例是否已被回收
+                cond.wait(1.0)
+                continue
+            if store._closed:
+                return
+            deadline = store._first_pending_at + store.flush_interval
+            while len(store._pending) < store.batch_size and not store._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                cond.wait(remaining)
+        try:
+            store.flush()
+        except Exception:
+            logger.exception('批量写入数据库失败: %s', store.db_path)
+            time.sleep(max(store.flush_interval, _RETRY_INTERVAL))
+        del store
+
+
+class _ThreadConnection:
+    """线程持有的连接"""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_connection(store_ref, conn: sqlite3.Connection, pid: int):
+    # fork 出的子进程不能关闭父进程的连接
+    if os.getpid() != pid:
+        return
+    store = store_ref()
+    if store is not None:
+        with store._connections_lock:
+            try:
+                store._connections.remove(conn)
+            except ValueError:
+                pass
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _flush_all():
+    for store in list(_stores):
+        try:
+            store.flush()
+        except Exception:
+            logger.exception('退出时写入数据库失败: %s', store.db_path)
+
+
+def _reset_after_fork():
+    for store in list(_stores):
+        store._after_fork()
+
+
+atexit.register(_flush_all)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+__all__ = [
+    'DELETED',
+    'SQLiteAsyncMixin',
+    'SQLiteStore',
+]
@@ -7,7 +7,7 @@ WebSocket 连接管理模块
 管理单个 WebSocket 连接的生命周期。
 """
 
-import json
+from .. import json
 import socket
 import time
 from typing import Any, Dict, List, Optional, Set, Callable, Iterator
@@ -88,7 +88,7 @@ class WebSocketConnection:
         
         try:
             if isinstance(data, (dict, list)):
-                payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                payload = json.dumps_bytes(data)
                 opcode = Opcode.TEXT
             elif isinstance(data, str):
                 payload = data.encode('utf-8')
@@ -225,8 +225,8 @@ class WebSocketConnection:
                 
                 if frame.opcode == Opcode.TEXT:
                     try:
-                        return json.loads(frame.payload.decode('utf-8'))
-                    except json.JSONDecodeError:
+                        return json.loads(frame.payload)
+                    except ValueError:
                         return frame.payload.decode('utf-8')
                 elif frame.opcode == Opcode.BINARY:
                     return frame.payload
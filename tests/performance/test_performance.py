@@ -8,10 +8,13 @@ import os
 import tempfile
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from litefs.cache import MemoryCache, TreeCache
 from litefs.session import Session
 from litefs.handlers.request import parse_form
+from litefs.handlers.response_encoder import encode_response
+from litefs.handlers.request_headers import RequestHeaders, parse_cookie
 
 
 class TestMemoryCachePerformance(unittest.TestCase):
@@ -91,6 +94,233 @@ class TestMemoryCachePerformance(unittest.TestCase):
         
         self.assertEqual(len(cache), 1000, '应该保留 1000 个缓存项')
 
+    def test_striped_concurrent_performance(self):
+        """对比单个锁和分段锁在多线程读写下的吞吐量"""
+        import threading
+
+        results = {}
+        for stripes in (1, 16):
+            cache = MemoryCache(max_size=32000, max_bytes=64 * 1024 * 1024, expiration_time=3600, stripes=stripes)
+            for i in range(16000):
+                cache.put(f'key{i}', f'value{i}')
+
+            def worker(n):
+                for i in range(20000):
+                    key = f'key{(i * 7 + n) % 16000}'
+                    if i % 10 == 0:
+                        cache.put(key, 'value')
+                    else:
+                        cache.get(key)
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+            start_time = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[stripes] = 8 * 20000 / (time.time() - start_time)
+            stats = cache.get_stats()
+            self.assertEqual(stats['hits'], 8 * 18000)
+
+        print(f'MemoryCache 8 threads (TTL + byte limit): 1 lock {results[1]:.0f} ops/s, 16 stripes {results[16]:.0f} ops/s')
+
+        self.assertGreater(results[16], results[1] * 0.7, '分段锁不应该明显慢于单个锁')
+        self.assertGreater(results[16], 100000, '多线程读写应该超过每秒 10 万次')
+
+
+class TestTieredCachePerformance(unittest.TestCase):
+    """测试两级缓存性能"""
+
+    def test_near_cache_performance(self):
+        """对比每次读取共享缓存（反序列化）和经过进程内 L1 的热点读取"""
+        from litefs.cache import DatabaseCache, TieredCache
+
+        l2 = DatabaseCache(db_path=':memory:')
+        value = {'id': 1, 'name': 'product', 'tags': ['a', 'b', 'c'], 'price': 9.99}
+        for i in range(100):
+            l2.put(f'product:{i}', value)
+        # 写入数据库后再计时，L2 的读取不能由写入队列直接返回
+        l2.flush()
+        tiered = TieredCache(l2, l1_max_size=1000, l1_expiration_time=5)
+
+        iterations = 20000
+        results = {}
+        for name, cache in (('l2', l2), ('tiered', tiered)):
+            start_time = time.time()
+            for i in range(iterations):
+                cache.get(f'product:{i % 100}')
+            results[name] = iterations / (time.time() - start_time)
+        stats = tiered.get_stats()
+        l2.close()
+
+        print(f'\nTieredCache hot reads: L2 only {results["l2"]:.0f} ops/s, L1 + L2 {results["tiered"]:.0f} ops/s '
+              f'(near hit rate {stats["near_hit_rate"]:.3f})')
+
+        self.assertEqual(stats['l2_hits'], 100)
+        self.assertGreater(results['tiered'], results['l2'] * 3, 'L1 命中应该远快于读取共享缓存')
+
+
+class TestSharedMemoryCachePerformance(unittest.TestCase):
+    """测试共享内存缓存性能"""
+
+    @staticmethod
+    def _latency(cache, iterations=10000):
+        value = {'id': 1, 'name': 'product', 'tags': ['a', 'b', 'c'], 'price': 9.99}
+        start_time = time.perf_counter()
+        for i in range(iterations):
+            cache.put(f'product:{i % 1000}', value)
+        put_us = (time.perf_counter() - start_time) / iterations * 1e6
+        start_time = time.perf_counter()
+        for i in range(iterations):
+            cache.get(f'product:{i % 1000}')
+        get_us = (time.perf_counter() - start_time) / iterations * 1e6
+        return put_us, get_us
+
+    @unittest.skipUnless(hasattr(os, 'fork'), '需要 fork')
+    def test_shm_vs_redis_latency(self):
+        """对比共享内存缓存和本机 Redis 的读写延迟"""
+        from litefs.cache import RedisCache, SharedMemoryCache
+
+        shm = SharedMemoryCache(max_size=4096, slot_size=512)
+        put_us, get_us = self._latency(shm)
+        print(f'\nSharedMemoryCache: put {put_us:.2f} us, get {get_us:.2f} us')
+
+        # fork 出的工作进程读取父进程写入的值，不经过网络
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if shm.get('product:999') is not None else 1)
+        self.assertEqual(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]), 0)
+        shm.close()
+
+        try:
+            import redis
+            client = redis.Redis(host='localhost', port=6379, socket_connect_timeout=0.2)
+            client.ping()
+        except Exception:
+            print('Redis on localhost: unavailable, skipped')
+        else:
+            cache = RedisCache(redis_client=client, key_prefix='litefs:perf:')
+            redis_put_us, redis_get_us = self._latency(cache)
+            cache.clear()
+            print(f'Redis on localhost: put {redis_put_us:.2f} us, get {redis_get_us:.2f} us')
+            self.assertLess(get_us, redis_get_us, '共享内存读取应该快于本机 Redis')
+
+        self.assertLess(get_us, 50, '共享内存读取应该在 50 微秒内完成')
+
+
+class TestCacheDecoratorPerformance(unittest.TestCase):
+    """测试缓存装饰器性能"""
+
+    def test_stampede_protection(self):
+        """热点键过期时并发请求的重新计算次数：不加保护与 single-flight、stale-while-revalidate 对比"""
+        import threading
+        from litefs.cache_decorators import MemoryCacheStore, cached
+
+        def herd(func, threads=50):
+            barrier = threading.Barrier(threads)
+
+            def request():
+                barrier.wait()
+                func()
+
+            workers = [threading.Thread(target=request) for _ in range(threads)]
+            start_time = time.time()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            return time.time() - start_time
+
+        def make(**kwargs):
+            calls = []
+
+            def query():
+                calls.append(1)
+                time.sleep(0.02)
+                return 'rows'
+            return cached(ttl=0.05, cache_store=MemoryCacheStore(), **kwargs)(query), calls
+
+        store = MemoryCacheStore()
+        naive_calls = []
+
+        def naive():
+            # 原来的实现：未命中后直接计算并写入
+            value = store.get('query')
+            if value is None:
+                naive_calls.append(1)
+                time.sleep(0.02)
+                store.set('query', 'rows', 1)
+
+        naive_elapsed = herd(naive)
+        single_flight, single_flight_calls = make()
+        single_flight_elapsed = herd(single_flight)
+
+        swr, swr_calls = make(stale_ttl=60)
+        swr()
+        time.sleep(0.1)
+        swr_elapsed = herd(swr)
+
+        print(f'\nHot key expiry with 50 concurrent requests: '
+              f'naive {len(naive_calls)} recomputes ({naive_elapsed * 1000:.1f} ms), '
+              f'single-flight {len(single_flight_calls)} ({single_flight_elapsed * 1000:.1f} ms), '
+              f'stale-while-revalidate {len(swr_calls) - 1} ({swr_elapsed * 1000:.1f} ms)')
+
+        self.assertGreater(len(naive_calls), 1)
+        self.assertEqual(len(single_flight_calls), 1)
+        self.assertLessEqual(len(swr_calls), 2)
+
+    def test_decorator_overhead(self):
+        """命中缓存时每次调用的开销：元组键与序列化摘要键、functools.lru_cache 对比"""
+        from functools import lru_cache
+        from litefs.cache_decorators import (
+            MemoryCacheStore, _generate_cache_key, _make_local_key, cached
+        )
+
+        class SharedStore:
+            # 跨进程共享的存储使用序列化摘要键，这里只替换键的生成方式
+            def __init__(self):
+                self.store = MemoryCacheStore()
+                self.get = self.store.get
+                self.set = self.store.set
+                self.delete = self.store.delete
+
+        def lookup(user_id, field='name'):
+            return user_id
+
+        iterations = 100000
+
+        def measure(func):
+            for i in range(100):
+                func(i, field='name')
+            start_time = time.perf_counter()
+            for i in range(iterations):
+                func(i % 100, field='name')
+            return (time.perf_counter() - start_time) / iterations * 1e6
+
+        local = cached(ttl=60, cache_store=MemoryCacheStore())(lookup)
+        results = {
+            'lru_cache': measure(lru_cache(maxsize=None)(lookup)),
+            'cached (digest key)': measure(cached(ttl=60, cache_store=SharedStore())(lookup)),
+            'cached (tuple key)': measure(local),
+        }
+        print('\nCache hit overhead per call: ' + ', '.join(
+            f'{name} {micros:.2f} us' for name, micros in results.items()
+        ))
+
+        start_time = time.perf_counter()
+        for i in range(iterations):
+            _generate_cache_key(lookup, (i % 100,), {'field': 'name'})
+        digest_key = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for i in range(iterations):
+            _make_local_key(lookup, (i % 100,), {'field': 'name'})
+        tuple_key = time.perf_counter() - start_time
+        print(f'Key generation: digest {digest_key / iterations * 1e6:.2f} us, '
+              f'tuple {tuple_key / iterations * 1e6:.2f} us')
+
+        self.assertEqual(local.cache_info()['entries'], 100)
+        self.assertLess(tuple_key, digest_key)
+
 
 class TestTreeCachePerformance(unittest.TestCase):
     """测试 TreeCache 性能"""
@@ -154,6 +384,57 @@ class TestTreeCachePerformance(unittest.TestCase):
         self.assertLess(elapsed, 6.0, 'delete 操作应该在 6 秒内完成')
 
 
+    def test_trie_vs_sqlite_index(self):
+        """对比前缀树实现和原来以 SQLite 表作为前缀索引的实现"""
+        import sqlite3
+
+        class SqliteIndexTreeCache(object):
+            """原实现：每次 put 写 SQLite 表，delete 用 LIKE 查找子键"""
+
+            def __init__(self):
+                self.data = {}
+                self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+                self.conn.execute('CREATE TABLE cache (key VARCHAR PRIMARY KEY, timestamp INTEGER)')
+
+            def put(self, key, val):
+                timestamp = int(time.time())
+                if key not in self.data:
+                    self.conn.execute('INSERT INTO cache (key, timestamp) VALUES (?, ?)', (key, timestamp))
+                else:
+                    self.conn.execute('UPDATE cache SET timestamp=? WHERE key=?', (timestamp, key))
+                self.data[key] = [val, timestamp]
+
+            def delete(self, key):
+                keys = self.conn.execute(
+                    'SELECT key FROM cache WHERE key=? OR key LIKE ?', (key, key + '/%')
+                ).fetchall()
+                self.conn.executemany('DELETE FROM cache WHERE key=?', keys)
+                for (item_key,) in keys:
+                    self.data.pop(item_key, None)
+
+        keys = [f'/page/{i % 200}/fragment{i}' for i in range(20000)]
+        results = {}
+        for name, cache in (('sqlite', SqliteIndexTreeCache()), ('trie', TreeCache(clean_period=60, expiration_time=3600))):
+            start_time = time.time()
+            for key in keys:
+                cache.put(key, 'value')
+            put_time = time.time() - start_time
+
+            start_time = time.time()
+            for i in range(200):
+                cache.delete(f'/page/{i}')
+            delete_time = time.time() - start_time
+            self.assertEqual(len(cache.data), 0)
+            results[name] = (put_time, delete_time)
+
+        print(f'\nTreeCache 20000 puts / 200 prefix deletes: sqlite index {results["sqlite"][0] * 1000:.1f}ms / '
+              f'{results["sqlite"][1] * 1000:.1f}ms, trie {results["trie"][0] * 1000:.1f}ms / {results["trie"][1] * 1000:.1f}ms')
+
+        # 两种实现的 put 耗时接近，只作为指标输出，不作断言
+        print(f'put time ratio trie / sqlite index: {results["trie"][0] / results["sqlite"][0]:.2f}')
+        self.assertLess(results['trie'][1], results['sqlite'][1], '前缀删除只应该遍历子树')
+
+
 class TestParseFormPerformance(unittest.TestCase):
     """测试 parse_form 性能"""
 
@@ -211,6 +492,124 @@ class TestParseFormPerformance(unittest.TestCase):
         
         self.assertLess(elapsed, 5.0, '大表单解析应该在 5 秒内完成')
 
+    def test_unique_query_performance(self):
+        """测试每次都不同的长查询字符串的解析性能"""
+        iterations = 10000
+        query_strings = [
+            f'id={i}&token={i:064x}&next=%2Fpath%3Fa%3D{i}&' + 'x=' + 'y' * 200
+            for i in range(iterations)
+        ]
+
+        start_time = time.time()
+        for query_string in query_strings:
+            parse_form(query_string)
+        elapsed = time.time() - start_time
+
+        print(f'parse_form (unique): {iterations} operations in {elapsed:.4f}s ({iterations / elapsed:.2f} ops/s)')
+
+        self.assertLess(elapsed, 1.0, '不重复的查询字符串解析应该在 1 秒内完成')
+
+
+class TestDatabaseBackendPerformance(unittest.TestCase):
+    """测试 SQLite 缓存和会话后端的写入吞吐量"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def test_cache_write_throughput(self):
+        """每次写入提交（原来的实现）与 WAL、后台批量写入对比"""
+        import pickle
+        import sqlite3
+        from litefs.cache import DatabaseCache
+
+        iterations = 2000
+
+        # 原来的实现：默认日志模式，每次写入后提交
+        conn = sqlite3.connect(self._path('commit.db'))
+        conn.execute('CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB, timestamp INTEGER, expiration INTEGER)')
+        start_time = time.time()
+        for i in range(iterations):
+            conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                         (f'key{i}', pickle.dumps({'id': i}), 0, 0))
+            conn.commit()
+        results = {'commit per write': iterations / (time.time() - start_time)}
+        conn.close()
+
+        for name, kwargs in (('WAL', {'write_behind': False}), ('write-behind', {})):
+            cache = DatabaseCache(db_path=self._path(f'{name}.db'), **kwargs)
+            start_time = time.time()
+            for i in range(iterations):
+                cache.put(f'key{i}', {'id': i})
+            cache.flush()
+            results[name] = iterations / (time.time() - start_time)
+            self.assertEqual(len(cache), iterations)
+            cache.close()
+
+        print('\nDatabaseCache writes: ' + ', '.join(
+            f'{name} {ops:.0f} ops/s' for name, ops in results.items()
+        ))
+        self.assertGreater(results['write-behind'], results['commit per write'])
+
+    def test_session_write_throughput(self):
+        """多个线程同时保存会话"""
+        import threading
+        from litefs.session import DatabaseSession
+
+        def run(store, threads=4, per_thread=250):
+            def worker(n):
+                for i in range(per_thread):
+                    session = Session(f'{n}-{i}')
+                    session['user_id'] = i
+                    store.put(session.id, session)
+
+            workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+            start_time = time.time()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            store.flush()
+            elapsed = time.time() - start_time
+            self.assertEqual(len(store), threads * per_thread)
+            store.close()
+            return threads * per_thread / elapsed
+
+        write_through = run(DatabaseSession(db_path=self._path('sync.db'), write_behind=False))
+        write_behind = run(DatabaseSession(db_path=self._path('batch.db')))
+
+        print(f'\nDatabaseSession saves from 4 threads: write-through {write_through:.0f} ops/s, '
+              f'write-behind {write_behind:.0f} ops/s')
+        self.assertGreater(write_behind, write_through)
+
+    def test_get_many(self):
+        """批量读取与逐个读取对比"""
+        from litefs.cache import DatabaseCache
+
+        cache = DatabaseCache(db_path=self._path('read.db'))
+        keys = [f'key{i}' for i in range(1000)]
+        cache.set_many({key: {'key': key} for key in keys})
+        cache.flush()
+
+        start_time = time.time()
+        single = [cache.get(key) for key in keys]
+        single_elapsed = time.time() - start_time
+        start_time = time.time()
+        many = cache.get_many(keys)
+        many_elapsed = time.time() - start_time
+        cache.close()
+
+        print(f'\nDatabaseCache read 1000 keys: get {single_elapsed * 1000:.1f} ms, '
+              f'get_many {many_elapsed * 1000:.1f} ms')
+        self.assertEqual(len(many), len(single))
+        self.assertLess(many_elapsed, single_elapsed)
+
 
 class TestSessionPerformance(unittest.TestCase):
     """测试 Session 性能"""
@@ -252,5 +651,634 @@ class TestSessionPerformance(unittest.TestCase):
         self.assertLess(elapsed, 0.1, '会话数据访问应该在 0.1 秒内完成')
 
 
+class TestResponseEncodingPerformance(unittest.TestCase):
+    """测试响应编码性能"""
+
+    def _create_environ(self, path):
+        from io import BytesIO
+
+        return {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '0',
+            'CONTENT_TYPE': '',
+            'wsgi.input': BytesIO(b''),
+        }
+
+    def test_encode_response_performance(self):
+        """测试 encode_response 性能"""
+        results = [
+            'Hello World',
+            {'name': 'tom', 'age': 25},
+            ('200 OK', [('Content-Type', 'text/plain; charset=utf-8')], b'Hello World'),
+        ]
+        iterations = 10000
+
+        start_time = time.time()
+        for i in range(iterations):
+            response = encode_response(results[i % 3])
+            response.headers.encode()
+        end_time = time.time()
+
+        elapsed = end_time - start_time
+        ops_per_second = iterations / elapsed
+
+        print(f'\nencode_response: {iterations} operations in {elapsed:.4f}s ({ops_per_second:.2f} ops/s)')
+
+        self.assertLess(elapsed, 1.0, '响应编码应该在 1 秒内完成')
+
+    def test_wsgi_response_performance(self):
+        """测试 WSGI 应用单次响应的整体开销"""
+        import litefs
+
+        app = litefs.Litefs()
+
+        @app.add_get('/json')
+        def json_handler(request):
+            return {'name': 'tom', 'age': 25}
+
+        application = app.wsgi()
+        environ = self._create_environ('/json')
+
+        def start_response(status, headers):
+            pass
+
+        iterations = 2000
+        start_time = time.time()
+        for i in range(iterations):
+            b''.join(application(dict(environ), start_response))
+        end_time = time.time()
+
+        elapsed = end_time - start_time
+        ops_per_second = iterations / elapsed
+
+        print(f'WSGI JSON response: {iterations} operations in {elapsed:.4f}s ({ops_per_second:.2f} ops/s)')
+
+        self.assertLess(elapsed, 2.0, 'WSGI 响应应该在 2 秒内完成')
+
+    def test_large_json_list_performance(self):
+        """测试大 JSON 列表响应在各 JSON 实现下的编码性能"""
+        import datetime
+        from litefs import json
+
+        rows = [
+            {'id': i, 'name': f'user{i}', 'active': i % 2 == 0,
+             'created': datetime.datetime(2024, 1, 1, 12, 0, i % 60)}
+            for i in range(10000)
+        ]
+        iterations = 20
+
+        try:
+            for name in json.BACKENDS:
+                try:
+                    json.set_backend(name)
+                except ImportError:
+                    continue
+
+                start_time = time.time()
+                for i in range(iterations):
+                    encode_response(rows)
+                end_time = time.time()
+
+                elapsed = end_time - start_time
+                ops_per_second = iterations / elapsed
+
+                print(f'JSON list response ({name}): {iterations} x 10000 rows in {elapsed:.4f}s ({ops_per_second:.2f} ops/s)')
+
+                self.assertLess(elapsed, 5.0, '大 JSON 列表编码应该在 5 秒内完成')
+        finally:
+            json.set_backend('auto')
+
+
+class TestResponseCachePerformance(unittest.TestCase):
+    """测试响应缓存中间件性能"""
+
+    def test_cached_response_performance(self):
+        """对比命中响应缓存与每次执行会话、路由和处理器的 WSGI 请求"""
+        from litefs import Litefs
+        from litefs.handlers.response import Response
+        from litefs.middleware import ResponseCacheMiddleware
+
+        def make_app(cached):
+            app = Litefs()
+            if cached:
+                app.add_middleware(ResponseCacheMiddleware)
+
+            @app.add_get('/products')
+            def products(request):
+                rows = [{'id': i, 'name': f'product {i}', 'price': i * 1.5} for i in range(50)]
+                return Response({'products': rows}, headers=[('Cache-Control', 'public, max-age=60')])
+            return app.wsgi()
+
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/products',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'HTTP_ACCEPT_ENCODING': 'gzip',
+        }
+        statuses = []
+
+        def start_response(status, headers):
+            statuses.append(status)
+
+        iterations = 3000
+        results = {}
+        for name in ('uncached', 'cached'):
+            application = make_app(name == 'cached')
+            start_time = time.time()
+            for _ in range(iterations):
+                b''.join(application(dict(environ), start_response))
+            results[name] = iterations / (time.time() - start_time)
+
+        print(f'\nWSGI GET /products: uncached {results["uncached"]:.0f} req/s, '
+              f'response cache hit {results["cached"]:.0f} req/s')
+
+        self.assertEqual(set(statuses), {'200 OK'})
+        self.assertGreater(results['cached'], results['uncached'] * 2, '命中响应缓存应该明显快于执行处理器')
+
+
+class TestAsyncBackendPerformance(unittest.TestCase):
+    """测试 ASGI 请求通过异步接口读写会话的并发性能"""
+
+    def test_concurrent_sessions_with_latency(self):
+        """每个命令有 1ms 延迟的 Memcache 上，对比在事件循环中调用同步客户端与使用异步客户端"""
+        import asyncio
+        from litefs import Litefs
+        from litefs.handlers.response import Response
+        from litefs.session import MemcacheSession
+        from unit.test_async_backends import MemcacheStandIn
+
+        class BlockingSessions:
+            """只提供同步接口的存储，ASGI 处理器在事件循环中直接调用"""
+
+            def __init__(self, store):
+                self.get = store.get
+                self.put = store.put
+
+        server = MemcacheStandIn(latency=0.001)
+        self.addCleanup(server.close)
+        # 关闭 Nagle 算法，避免 noreply 写入后的读取等待延迟确认
+        store = MemcacheSession(servers=[server.address], no_delay=True)
+        self.addCleanup(store.close)
+        app = Litefs()
+        concurrency = 200
+        cookies = []
+        for i in range(concurrency):
+            session = Session(f'sid{i}')
+            session['n'] = 0
+            store.put(session.id, session)
+            cookies.append(f'{app.config.session_name}=sid{i}'.encode())
+
+        @app.add_get('/count')
+        def count(request):
+            request.session['n'] += 1
+            return Response(str(request.session['n']))
+
+        application = app.asgi()
+
+        async def request(cookie):
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': '/count', 'query_string': b'',
+                'headers': [(b'cookie', cookie)], 'server': ('localhost', 8000), 'client': ('127.0.0.1', 1234),
+            }
+            await application(scope, receive, send)
+            return messages[1]['body']
+
+        async def run():
+            return await asyncio.gather(*(request(cookie) for cookie in cookies))
+
+        results = {}
+        for name, sessions in (('blocking', BlockingSessions(store)), ('async', store)):
+            app.sessions = sessions
+            start_time = time.time()
+            bodies = asyncio.run(run())
+            results[name] = concurrency / (time.time() - start_time)
+            self.assertEqual(len(set(bodies)), 1)
+
+        print(f'\nASGI session load + save, {concurrency} concurrent requests, 1ms backend latency: '
+              f'sync client {results["blocking"]:.0f} req/s, async client {results["async"]:.0f} req/s')
+
+        self.assertEqual(store.get('sid0')['n'], 2)
+        self.assertGreater(results['async'], results['blocking'] * 3, '异步客户端应该能并发等待后端')
+
+
+class TestCacheCodecPerformance(unittest.TestCase):
+    """测试 Redis/Memcache 缓存值的序列化和压缩"""
+
+    def test_codec_size_and_speed(self):
+        """对比各序列化方式和压缩算法的编码大小与编解码耗时"""
+        import importlib.util
+        from litefs.cache import CacheCodec
+
+        rows = [{'id': i, 'name': f'product {i}', 'price': i * 1.5, 'tags': ['new', 'sale']} for i in range(2000)]
+        configs = [('json', None), ('json', 'zlib'), ('pickle', None), ('pickle', 'zlib')]
+        if importlib.util.find_spec('msgpack'):
+            configs.append(('msgpack', None))
+        for compression, module in (('lz4', 'lz4'), ('zstd', 'zstandard')):
+            if importlib.util.find_spec(module):
+                configs.append(('json', compression))
+
+        iterations = 50
+        sizes = {}
+        print()
+        for serializer, compression in configs:
+            codec = CacheCodec(serializer, compression)
+            start_time = time.time()
+            for _ in range(iterations):
+                data = codec.dumps(rows)
+            encode_time = (time.time() - start_time) / iterations
+            start_time = time.time()
+            for _ in range(iterations):
+                value = codec.loads(data)
+            decode_time = (time.time() - start_time) / iterations
+            self.assertEqual(value, rows)
+            sizes[serializer, compression] = len(data)
+            print(f'{serializer}+{compression or "none"}: {len(data)} bytes, '
+                  f'encode {encode_time * 1000:.2f}ms, decode {decode_time * 1000:.2f}ms')
+
+        self.assertLess(sizes['json', 'zlib'] * 4, sizes['json', None], '压缩后的大小应该明显减小')
+        self.assertLess(sizes['pickle', 'zlib'] * 4, sizes['pickle', None], '压缩后的大小应该明显减小')
+
+
+class TestRequestHeadersPerformance(unittest.TestCase):
+    """测试请求头与 Cookie 解析性能"""
+
+    def setUp(self):
+        from http.cookies import SimpleCookie
+
+        self.SimpleCookie = SimpleCookie
+        self.cookie_str = '; '.join(f'cookie{i}=value{i}' for i in range(50))
+        self.environ = {f'HTTP_X_HEADER_{i}': f'value{i}' for i in range(30)}
+        self.environ['HTTP_COOKIE'] = self.cookie_str
+        self.environ['CONTENT_TYPE'] = 'text/plain'
+
+    def test_parse_cookie_performance(self):
+        """测试携带大量 Cookie 的请求的解析性能"""
+        iterations = 10000
+
+        start_time = time.time()
+        for i in range(iterations):
+            parse_cookie(self.cookie_str)
+        elapsed = time.time() - start_time
+
+        start_time = time.time()
+        for i in range(iterations // 10):
+            self.SimpleCookie(self.cookie_str)
+        simple_elapsed = (time.time() - start_time) * 10
+
+        print(f'\nparse_cookie (50 cookies): {iterations} operations in {elapsed:.4f}s ({iterations / elapsed:.2f} ops/s)')
+        print(f'SimpleCookie (50 cookies): {iterations} operations in {simple_elapsed:.4f}s ({iterations / simple_elapsed:.2f} ops/s)')
+
+        self.assertLess(elapsed, 1.0, 'Cookie 解析应该在 1 秒内完成')
+        self.assertLess(elapsed, simple_elapsed, 'parse_cookie 应该比 SimpleCookie 快')
+
+    def test_request_headers_performance(self):
+        """测试从 environ 构建请求头集合的性能"""
+        iterations = 10000
+
+        start_time = time.time()
+        for i in range(iterations):
+            headers = RequestHeaders.from_environ(self.environ)
+            headers.get('X-Header-1')
+        elapsed = time.time() - start_time
+
+        print(f'RequestHeaders.from_environ (32 headers): {iterations} operations in {elapsed:.4f}s ({iterations / elapsed:.2f} ops/s)')
+
+        self.assertLess(elapsed, 1.0, '请求头解析应该在 1 秒内完成')
+
+
+class TestMultipartPerformance(unittest.TestCase):
+    """测试 multipart 流式解析性能"""
+
+    def test_large_upload_performance(self):
+        """测试大文件上传的解析吞吐量和内存峰值"""
+        import tracemalloc
+        from io import BytesIO
+        from litefs.handlers.multipart import parse_multipart_wsgi
+
+        boundary = '----LitefsBoundary'
+        payload = os.urandom(1024) * 20 * 1024
+        body = (
+            f'--{boundary}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="big.bin"\r\n\r\n'
+        ).encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+
+        tracemalloc.start()
+        start_time = time.time()
+        posts, files = parse_multipart_wsgi(BytesIO(body), boundary, len(body))
+        elapsed = time.time() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        files['file'].close()
+        mb = len(body) / 1048576
+
+        print(f'\nmultipart upload: {mb:.1f} MB in {elapsed:.4f}s ({mb / elapsed:.2f} MB/s), peak memory {peak / 1024:.0f} KB')
+
+        self.assertLess(elapsed, 2.0, '20MB 上传应该在 2 秒内解析完成')
+        self.assertLess(peak, 4 * 1048576, '解析过程的内存峰值应该与上传大小无关')
+
+
+class TestBodyStreamPerformance(unittest.TestCase):
+    """测试请求体流式读取性能"""
+
+    def test_json_lines_ingest_performance(self):
+        """测试 chunked JSON Lines 请求体的吞吐量和内存峰值"""
+        import tracemalloc
+        from io import BytesIO
+        from litefs.handlers.body_stream import iter_chunked_body, iter_json_lines
+
+        line = b'{"id": 1, "name": "litefs", "tags": ["a", "b"]}\n'
+        chunk = line * 1000
+        block = b'%x\r\n%s\r\n' % (len(chunk), chunk)
+        body = block * 400 + b'0\r\n\r\n'
+        rw = BytesIO(body)
+
+        tracemalloc.start()
+        start_time = time.time()
+        count = 0
+        for _ in iter_json_lines(iter_chunked_body(rw)):
+            count += 1
+        elapsed = time.time() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        mb = len(body) / 1048576
+
+        print(f'\njson lines ingest: {count} rows, {mb:.1f} MB in {elapsed:.4f}s ({count / elapsed:.0f} rows/s), peak memory {peak / 1024:.0f} KB')
+
+        self.assertEqual(count, 400000)
+        self.assertLess(elapsed, 5.0, '40 万行 JSON Lines 应该在 5 秒内解析完成')
+        self.assertLess(peak, 2 * 1048576, '解析过程的内存峰值应该与请求体大小无关')
+
+    def test_long_line_performance(self):
+        """测试没有换行符的请求体：拼接次数与数据块数量无关，超过 max_line_size 时尽早停止"""
+        from litefs.exceptions import HttpError
+        from litefs.handlers.body_stream import iter_lines
+
+        chunks = [b'x' * 4096] * 4096
+
+        start_time = time.time()
+        lines = list(iter_lines(chunks, max_line_size=None))
+        elapsed = time.time() - start_time
+        self.assertEqual(len(lines[0]), 4096 * 4096)
+
+        start_time = time.time()
+        with self.assertRaises(HttpError):
+            list(iter_lines(chunks))
+        rejected = time.time() - start_time
+
+        print(f'\n16 MB line in 4 KB chunks: {elapsed * 1000:.1f}ms, rejected at 1 MB after {rejected * 1000:.2f}ms')
+        self.assertLess(elapsed, 1.0, '长行不应该在每个数据块上复制已读取的部分')
+
+
+class TestTemplateRenderPerformance(unittest.TestCase):
+    """测试模板渲染性能"""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.template_dir, 'base.html'), 'w', encoding='utf-8') as f:
+            f.write('<html><title>${title}</title><body>${self.body()}</body></html>')
+        with open(os.path.join(self.template_dir, 'list.html'), 'w', encoding='utf-8') as f:
+            f.write('<%inherit file="base.html"/>\n<ul>\n% for item in items:\n<li>${item | h}</li>\n% endfor\n</ul>\n')
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.template_dir)
+
+    def test_shared_engine_render_performance(self):
+        """对比每个请求新建 TemplateLookup 和应用共用模板引擎的渲染延迟"""
+        from mako.lookup import TemplateLookup
+        from litefs.template_engine import TemplateEngine
+
+        items = [f'item {i}' for i in range(20)]
+        iterations = 200
+
+        start_time = time.time()
+        for i in range(iterations):
+            lookup = TemplateLookup(directories=[self.template_dir], input_encoding='utf-8')
+            lookup.get_template('list.html').render(title='t', items=items)
+        per_request = (time.time() - start_time) / iterations
+
+        engine = TemplateEngine([self.template_dir])
+        engine.precompile()
+        start_time = time.time()
+        for i in range(iterations):
+            engine.render('list.html', title='t', items=items)
+        shared = (time.time() - start_time) / iterations
+
+        print(f'\ntemplate render: per-request lookup {per_request * 1000:.3f}ms, shared engine {shared * 1000:.3f}ms ({per_request / shared:.0f}x)')
+
+        self.assertLess(shared * 3, per_request, '共用模板引擎应该比每次新建 TemplateLookup 快 3 倍以上')
+
+    def test_fragment_cache_render_performance(self):
+        """对比缓存与不缓存商品列表片段时的渲染延迟"""
+        from litefs.cache import MemoryCache
+        from litefs.template_cache import TemplateCache
+        from litefs.template_engine import TemplateEngine
+
+        with open(os.path.join(self.template_dir, 'products.html'), 'w', encoding='utf-8') as f:
+            f.write(
+                '<%block name="tiles" cached="True" cache_tags="products">\n'
+                '% for p in products:\n'
+                '<div class="tile"><a href="/p/${p["id"]}">${p["name"] | h}</a> ${"%.2f" % p["price"]}</div>\n'
+                '% endfor\n'
+                '</%block>\n'
+                '<p>hello ${user | h}</p>\n'
+            )
+        products = [{'id': i, 'name': f'product <{i}>', 'price': i * 1.5} for i in range(200)]
+        iterations = 200
+
+        plain = TemplateEngine([self.template_dir])
+        cached = TemplateEngine([self.template_dir], cache=TemplateCache(MemoryCache()))
+        for engine in (plain, cached):
+            engine.render('products.html', products=products, user='tom')
+
+        start_time = time.time()
+        for i in range(iterations):
+            plain.render('products.html', products=products, user='tom')
+        uncached_time = (time.time() - start_time) / iterations
+
+        start_time = time.time()
+        for i in range(iterations):
+            cached.render('products.html', products=products, user='tom')
+        cached_time = (time.time() - start_time) / iterations
+
+        print(f'\nfragment cache: uncached {uncached_time * 1000:.3f}ms, cached {cached_time * 1000:.3f}ms ({uncached_time / cached_time:.0f}x)')
+
+        self.assertLess(cached_time * 5, uncached_time, '片段缓存命中时渲染应该快 5 倍以上')
+
+
+    def test_stream_render_performance(self):
+        """对比流式渲染大报表的首块延迟和内存峰值"""
+        import tracemalloc
+        from litefs.template_engine import TemplateEngine
+
+        with open(os.path.join(self.template_dir, 'report.html'), 'w', encoding='utf-8') as f:
+            f.write(
+                '<html><head><title>${title}</title></head>${flush()}\n<body><table>\n'
+                '% for i in range(rows):\n'
+                '<tr><td>${i}</td><td>row ${i}</td><td>${i * 1.5}</td></tr>\n'
+                '% endfor\n'
+                '</table></body></html>\n'
+            )
+        engine = TemplateEngine([self.template_dir])
+        engine.precompile()
+        rows = 50000
+
+        tracemalloc.start()
+        start_time = time.time()
+        html = engine.render('report.html', title='t', rows=rows)
+        render_time = time.time() - start_time
+        _, render_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = len(html)
+        del html
+
+        tracemalloc.start()
+        start_time = time.time()
+        stream = engine.stream('report.html', title='t', rows=rows)
+        next(stream)
+        first_chunk_time = time.time() - start_time
+        streamed = sum(len(chunk) for chunk in stream)
+        stream_time = time.time() - start_time
+        _, stream_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'\nstream render: {size / 1048576:.1f} MB, full render {render_time * 1000:.1f}ms peak {render_peak / 1024:.0f} KB, '
+              f'stream first chunk {first_chunk_time * 1000:.3f}ms total {stream_time * 1000:.1f}ms peak {stream_peak / 1024:.0f} KB')
+
+        self.assertGreater(streamed, 0)
+        self.assertLess(first_chunk_time * 20, render_time, '流式渲染的首块延迟应该远小于完整渲染时间')
+        self.assertLess(stream_peak * 5, render_peak, '流式渲染的内存峰值应该与页面大小无关')
+
+class TestStaticFilePerformance(unittest.TestCase):
+    """测试静态文件缓存性能"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for i in range(50):
+            with open(os.path.join(self.directory, f'asset{i}.js'), 'w', encoding='utf-8') as f:
+                f.write(f'console.log({i});\n' * 200)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.directory)
+
+    def test_static_cache_hit_performance(self):
+        """对比监控目录（命中无系统调用）和每次 stat 校验的缓存命中吞吐量"""
+        from litefs.static_handler import StaticFileHandler
+
+        iterations = 20000
+        names = [f'/asset{i % 50}.js' for i in range(iterations)]
+        results = {}
+        for watch in (False, True):
+            handler = StaticFileHandler(self.directory, watch=watch)
+            try:
+                request_headers = {'Accept-Encoding': 'gzip, deflate, br, zstd'}
+                for name in names[:50]:
+                    handler.serve(name, request_headers)
+                start_time = time.time()
+                for name in names:
+                    handler.serve(name, request_headers)
+                results[watch] = iterations / (time.time() - start_time)
+                self.assertEqual(handler.get_cache_info()['misses'], 50)
+            finally:
+                handler.close()
+
+        print(f'\nstatic cache hits: stat revalidation {results[False]:.0f} req/s, watched {results[True]:.0f} req/s')
+
+        self.assertGreater(results[True], results[False], '监控目录时命中缓存应该比每次 stat 更快')
+        self.assertGreater(results[True], 50000, '静态文件缓存命中应该超过每秒 5 万次')
+
+    def test_media_range_performance(self):
+        """测试大媒体文件随机拖动（64KB Range 请求）的吞吐量，对比每次读取整个文件"""
+        import random
+        from litefs.static_handler import StaticFileHandler
+
+        size = 32 * 1024 * 1024
+        path = os.path.join(self.directory, 'movie.mp4')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(1024 * 1024) * 32)
+
+        handler = StaticFileHandler(self.directory, watch=True)
+        try:
+            rng = random.Random(0)
+            iterations = 2000
+            chunk = 64 * 1024
+            offsets = [rng.randrange(0, size - chunk) for _ in range(iterations)]
+
+            start_time = time.time()
+            for offset in offsets:
+                status, _, body = handler.serve('movie.mp4', {'Range': f'bytes={offset}-{offset + chunk - 1}'})
+            range_time = (time.time() - start_time) / iterations
+            self.assertEqual((status, len(body)), (206, chunk))
+
+            full_iterations = 20
+            start_time = time.time()
+            for _ in range(full_iterations):
+                with open(path, 'rb') as f:
+                    f.read()
+            full_time = (time.time() - start_time) / full_iterations
+        finally:
+            handler.close()
+
+        print(f'\nmedia range: {1 / range_time:.0f} seeks/s ({range_time * 1000:.3f}ms per 64KB range), full 32MB read {full_time * 1000:.1f}ms')
+
+        self.assertLess(range_time * 20, full_time, 'Range 请求应该只读取请求的部分')
+
+    def test_shared_store_memory(self):
+        """对比每个工作进程私有缓存和共享 mmap 存储占用的进程内存"""
+        import tracemalloc
+        from litefs.static_handler import StaticFileHandler
+        from litefs.static_store import SharedStaticStore
+
+        store_path = os.path.join(tempfile.mkdtemp(), 'static.store')
+        store = SharedStaticStore.build(self.directory, store_path, encodings=['gzip'])
+        names = [f'asset{i}.js' for i in range(50)]
+        request_headers = {'Accept-Encoding': 'gzip'}
+        results = {}
+        try:
+            for shared in (False, True):
+                handler = StaticFileHandler(self.directory, watch=False, lazy_compress=False,
+                                            store=store if shared else None)
+                try:
+                    tracemalloc.start()
+                    for name in names:
+                        handler.serve(name)
+                        handler.serve(name, request_headers)
+                    results[shared] = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.stop()
+
+                    iterations = 20000
+                    start_time = time.time()
+                    for i in range(iterations):
+                        handler.serve(names[i % 50], request_headers)
+                    results[shared, 'rate'] = iterations / (time.time() - start_time)
+                finally:
+                    handler.close()
+        finally:
+            import shutil
+            shutil.rmtree(os.path.dirname(store_path))
+
+        print(f'\nshared static store: private cache {results[False] / 1024:.0f} KB per worker '
+              f'({results[False, "rate"]:.0f} req/s), mmap store {results[True] / 1024:.0f} KB per worker '
+              f'({results[True, "rate"]:.0f} req/s)')
+
+        self.assertLess(results[True] * 2, results[False], '共享存储的文件内容不应该占用工作进程的私有内存')
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+import redis
+
+from litefs import Litefs
+from litefs.cache import DatabaseCache, MemcacheCache, MemoryCache, RedisCache, TieredCache, TreeCache
+from litefs.handlers.response import Response
+from litefs.session import DatabaseSession, MemcacheSession, Session
+from litefs.session.cache_session import CachedSessionStore
+from litefs.session.session import MemorySessionStore
+from litefs.utils.aio import LoopLocal, async_redis_factory
+from litefs.utils.aio_memcache import AsyncMemcacheClient, parse_server
+
+
+class MemcacheStandIn:
+    """
+    在后台线程中运行的 Memcache 替身服务器
+
+    支持 get、set、add、delete 和 stats，忽略过期时间；latency 为每个命令的延迟（秒）
+    """
+
+    def __init__(self, latency=0.0):
+        self.data = {}
+        self.latency = latency
+        self.commands = []
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    @property
+    def address(self):
+        return f'127.0.0.1:{self.port}'
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._serve, '127.0.0.1', 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+        self.server.close()
+        tasks = asyncio.all_tasks(self.loop)
+        for task in tasks:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                parts = line.split()
+                command = parts[0]
+                self.commands.append(command)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if command == b'get':
+                    for key in parts[1:]:
+                        if key in self.data:
+                            flags, value = self.data[key]
+                            writer.write(b'VALUE %s %s %d\r\n%s\r\n' % (key, flags, len(value), value))
+                    writer.write(b'END\r\n')
+                elif command in (b'set', b'add'):
+                    key, flags, _, length = parts[1:5]
+                    value = (await reader.readexactly(int(length) + 2))[:-2]
+                    stored = command == b'set' or key not in self.data
+                    if stored:
+                        self.data[key] = (flags, value)
+                    if parts[-1] != b'noreply':
+                        writer.write(b'STORED\r\n' if stored else b'NOT_STORED\r\n')
+                elif command == b'delete':
+                    found = self.data.pop(parts[1], None) is not None
+                    if parts[-1] != b'noreply':
+                        writer.write(b'DELETED\r\n' if found else b'NOT_FOUND\r\n')
+                elif command == b'stats':
+                    writer.write(b'END\r\n')
+                else:
+                    writer.write(b'ERROR\r\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+class TestAsyncMemcacheClient(unittest.TestCase):
+    """测试 AsyncMemcacheClient"""
+
+    def setUp(self):
+        self.server = MemcacheStandIn()
+        self.addCleanup(self.server.close)
+
+    def test_commands(self):
+        """测试 get、set、add、delete 和连接复用"""
+        async def main():
+            client = AsyncMemcacheClient(self.server.address, max_connections=2)
+            self.assertTrue(await client.set('a', b'1'))
+            self.assertFalse(await client.add('a', b'2'))
+            self.assertTrue(await client.add('b', b'2 \r\n x'))
+            self.assertEqual(await client.get('a'), b'1')
+            self.assertEqual(await client.get_many(['a', 'b', 'c']), {b'a': b'1', b'b': b'2 \r\n x'})
+            self.assertTrue(await client.delete('a'))
+            self.assertFalse(await client.delete('a'))
+            self.assertIsNone(await client.get('a'))
+
+            # 并发请求不超过连接数
+            results = await asyncio.gather(*(client.get('b') for _ in range(20)))
+            self.assertEqual(results, [b'2 \r\n x'] * 20)
+            self.assertLessEqual(len(client._idle), 2)
+            await client.close()
+
+            with self.assertRaises(ValueError):
+                await client.get('has space')
+
+        asyncio.run(main())
+
+    def test_parse_server(self):
+        self.assertEqual(parse_server('cache:11212'), ('cache', 11212))
+        self.assertEqual(parse_server('cache'), ('cache', 11211))
+        self.assertEqual(parse_server(('cache', '11213')), ('cache', 11213))
+
+
+class TestMemcacheAsync(unittest.TestCase):
+    """测试 MemcacheCache 和 MemcacheSession 的异步接口与同步接口读写同一份数据"""
+
+    def setUp(self):
+        self.server = MemcacheStandIn()
+        self.addCleanup(self.server.close)
+
+    def test_cache(self):
+        cache = MemcacheCache(servers=[self.server.address])
+        self.addCleanup(cache.close)
+        cache.put('sync', {'a': 1})
+
+        async def main():
+            self.assertEqual(await cache.aget('sync'), {'a': 1})
+            await cache.aput('async', [1, 2])
+            self.assertEqual(await cache.aget_many(['sync', 'async', 'missing']), {'sync': {'a': 1}, 'async': [1, 2]})
+            await cache.adelete('sync')
+            self.assertIsNone(await cache.aget('sync'))
+            await cache.aclose()
+
+        asyncio.run(main())
+        self.assertEqual(cache.get('async'), [1, 2])
+
+    def test_session(self):
+        sessions = MemcacheSession(servers=[self.server.address])
+        self.addCleanup(sessions.close)
+        session = Session('sid1')
+        session['user'] = 'alice'
+        sessions.put('sid1', session)
+
+        async def main():
+            loaded = await sessions.aget('sid1')
+            self.assertEqual(dict(loaded), {'user': 'alice'})
+            loaded['user'] = 'bob'
+            await sessions.aput('sid1', loaded)
+            self.assertEqual(list(await sessions.aget_many(['sid1', 'sid2'])), ['sid1'])
+            await sessions.adelete('sid2')
+
+        asyncio.run(main())
+        self.assertEqual(sessions.get('sid1')['user'], 'bob')
+
+    def test_executor_fallback(self):
+        """测试无法确定服务器地址的客户端在线程池中调用同步方法"""
+        client = Mock()
+        client.get.return_value = b'{"a": 1}'
+        cache = MemcacheCache(memcache_client=client)
+        self.assertIsNone(cache._async_clients)
+        self.assertEqual(asyncio.run(cache.aget('key')), {'a': 1})
+        client.get.assert_called_with('litefs:key')
+
+
+class TestRedisAsync(unittest.TestCase):
+    """测试 RedisCache 的异步接口"""
+
+    def test_async_client_params(self):
+        """测试按同步客户端的连接参数创建 redis.asyncio 客户端"""
+        client = redis.Redis(host='cache', port=6380, db=2, password='secret', decode_responses=True)
+        async_client = async_redis_factory(client)()
+        kwargs = async_client.connection_pool.connection_kwargs
+        self.assertEqual(
+            (kwargs['host'], kwargs['port'], kwargs['db'], kwargs['password'], kwargs['decode_responses']),
+            ('cache', 6380, 2, 'secret', True),
+        )
+
+        unix = async_redis_factory(redis.Redis(unix_socket_path='/tmp/redis.sock'))()
+        self.assertEqual(unix.connection_pool.connection_kwargs['path'], '/tmp/redis.sock')
+        self.assertIsNone(async_redis_factory(Mock()))
+
+    def test_executor_fallback(self):
+        client = Mock()
+        client.get.return_value = '{"a": 1}'
+        client.mget.return_value = ['1', None]
+        cache = RedisCache(redis_client=client, key_prefix='app:')
+
+        async def main():
+            self.assertEqual(await cache.aget('key'), {'a': 1})
+            self.assertEqual(await cache.aget_many(['x', 'y']), {'x': 1})
+            await cache.aput('key', 1, 10)
+            await cache.adelete('key')
+
+        asyncio.run(main())
+        client.setex.assert_called_with('app:key', 10, b'1')
+        client.delete.assert_called_with('app:key')
+
+
+class TestLocalBackendsAsync(unittest.TestCase):
+    """测试进程内和 SQLite 后端的异步接口"""
+
+    def _check_cache(self, cache):
+        async def main():
+            await cache.aput('a', 1)
+            await cache.aput('b', 2)
+            self.assertEqual(await cache.aget('a'), 1)
+            self.assertEqual(await cache.aget_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+            await cache.adelete('a')
+            self.assertIsNone(await cache.aget('a'))
+
+        asyncio.run(main())
+
+    def test_memory_caches(self):
+        self._check_cache(MemoryCache(max_size=100))
+        self._check_cache(TreeCache())
+        self._check_cache(TieredCache(MemoryCache(max_size=100)))
+
+    def test_database(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for write_behind in (True, False):
+            cache = DatabaseCache(os.path.join(directory, f'cache{write_behind}.db'), write_behind=write_behind)
+            self._check_cache(cache)
+            cache.close()
+
+        sessions = DatabaseSession(os.path.join(directory, 'session.db'))
+        self.addCleanup(sessions.close)
+        session = Session('sid')
+        session['n'] = 1
+
+        async def main():
+            await sessions.aput('sid', session)
+            self.assertEqual((await sessions.aget('sid'))['n'], 1)
+            self.assertEqual(list(await sessions.aget_many(['sid', 'other'])), ['sid'])
+
+        asyncio.run(main())
+
+    def test_cached_session_store(self):
+        store = MemorySessionStore()
+        sessions = CachedSessionStore(store, MemoryCache(max_size=100))
+        session = Session('sid')
+
+        async def main():
+            await sessions.aput('sid', session)
+            self.assertIs(await sessions.aget('sid'), session)
+            store.put('other', Session('other'))
+            self.assertEqual(sorted(await sessions.aget_many(['sid', 'other', 'missing'])), ['other', 'sid'])
+            await sessions.adelete('sid')
+            self.assertIsNone(await sessions.aget('sid'))
+
+        asyncio.run(main())
+
+    def test_loop_local(self):
+        """测试每个事件循环使用各自的实例"""
+        local = LoopLocal(object)
+
+        async def get():
+            return local.get(), local.get()
+
+        first, second = asyncio.run(get()), asyncio.run(get())
+        self.assertIs(first[0], first[1])
+        self.assertIsNot(first[0], second[0])
+
+
+class TestASGISession(unittest.TestCase):
+    """测试 ASGI 请求通过异步接口加载和保存会话"""
+
+    def setUp(self):
+        self.server = MemcacheStandIn()
+        self.addCleanup(self.server.close)
+        self.app = Litefs()
+        self.app.sessions = MemcacheSession(servers=[self.server.address])
+
+        @self.app.add_get('/count')
+        def count(request):
+            request.session['n'] = request.session.get('n', 0) + 1
+            return Response(str(request.session['n']))
+
+        @self.app.add_get('/read')
+        def read(request):
+            return Response(str(request.session.get('n')))
+
+        @self.app.add_get('/plain')
+        def plain(request):
+            return 'ok'
+
+        @self.app.add_get('/plain_count')
+        def plain_count(request):
+            request.session['n'] = request.session.get('n', 0) + 1
+            return str(request.session['n'])
+
+        self.application = self.app.asgi()
+
+    def request(self, path, cookie=None):
+        async def call():
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            headers = [(b'cookie', cookie.encode())] if cookie else []
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                'headers': headers, 'server': ('localhost', 8000), 'client': ('127.0.0.1', 1234),
+            }
+            await self.application(scope, receive, send)
+            return messages
+
+        messages = asyncio.run(call())
+        headers = messages[0]['headers']
+        cookies = [v.decode() for k, v in headers if k.lower() == b'set-cookie']
+        return messages[1]['body'], cookies
+
+    def test_session_round_trip(self):
+        """测试新会话在首次写入时保存并下发 cookie，之后读取不再写入"""
+        body, cookies = self.request('/read')
+        self.assertEqual((body, cookies), (b'None', []))
+
+        body, cookies = self.request('/count')
+        self.assertEqual(body, b'1')
+        self.assertEqual(len(cookies), 1)
+        cookie = cookies[0].split(';', 1)[0]
+
+        self.assertEqual(self.request('/count', cookie), (b'2', []))
+        writes = self.server.commands.count(b'set')
+        self.assertEqual(self.request('/read', cookie), (b'2', []))
+        self.assertEqual(self.server.commands.count(b'set'), writes)
+
+    def test_plain_result_cookie(self):
+        """测试处理器返回字符串时，未使用的会话不下发 cookie，写入后只下发一个 cookie"""
+        body, cookies = self.request('/plain')
+        self.assertEqual((body, cookies), (b'ok', []))
+        self.assertNotIn(b'set', self.server.commands)
+
+        body, cookies = self.request('/plain_count')
+        self.assertEqual(body, b'1')
+        self.assertEqual(len(cookies), 1)
+        cookie = cookies[0].split(';', 1)[0]
+
+        self.assertEqual(self.request('/plain_count', cookie), (b'2', []))
+        self.assertEqual(self.request('/plain', cookie), (b'ok', []))
+
+
+if __name__ == '__main__':
+    unittest.main()
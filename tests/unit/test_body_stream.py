@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试请求体流式读取
+"""
+
+import asyncio
+import unittest
+from io import BytesIO
+
+from litefs import Litefs
+from litefs.exceptions import HttpError
+from litefs.handlers.body_stream import (
+    aiter_csv,
+    aiter_json_lines,
+    aiter_lines,
+    aiter_receive,
+    iter_body,
+    iter_chunked_body,
+    iter_csv,
+    iter_json_lines,
+    iter_lines,
+)
+from litefs.routing import request_body
+
+
+def chunked(*parts):
+    """构造 chunked 编码的请求体"""
+    body = b"".join(b"%x\r\n%s\r\n" % (len(part), part) for part in parts)
+    return body + b"0\r\n\r\n"
+
+
+def collect(aiterable):
+    """收集异步迭代器的全部结果"""
+    async def run():
+        return [item async for item in aiterable]
+    return asyncio.run(run())
+
+
+def make_receive(body, size=7):
+    """把请求体拆成多条 ASGI 消息"""
+    messages = [
+        {"type": "http.request", "body": body[i:i + size], "more_body": i + size < len(body)}
+        for i in range(0, len(body), size)
+    ] or [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        return messages.pop(0)
+    return receive
+
+
+class TestBodyReaders(unittest.TestCase):
+    """测试请求体读取函数"""
+
+    def test_iter_body(self):
+        """测试按 Content-Length 读取，不读取后续数据"""
+        rw = BytesIO(b"hello worldNEXT")
+        self.assertEqual(b"".join(iter_body(rw.read, 11, chunk_size=4)), b"hello world")
+        self.assertEqual(rw.read(), b"NEXT")
+
+    def test_iter_body_limits(self):
+        """测试超过限制和请求体不完整"""
+        with self.assertRaises(HttpError) as ctx:
+            list(iter_body(BytesIO(b"x" * 10).read, 10, limit=5))
+        self.assertEqual(ctx.exception.status_code, 413)
+        with self.assertRaises(HttpError) as ctx:
+            list(iter_body(BytesIO(b"short").read, 10))
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_iter_chunked_body(self):
+        """测试 chunked 解码"""
+        rw = BytesIO(chunked(b"hello ", b"world") + b"NEXT")
+        self.assertEqual(b"".join(iter_chunked_body(rw)), b"hello world")
+        self.assertEqual(rw.read(), b"NEXT")
+
+        rw = BytesIO(b"5;ext=1\r\nhello\r\n0\r\nX-Trailer: 1\r\n\r\n")
+        self.assertEqual(b"".join(iter_chunked_body(rw)), b"hello")
+
+    def test_iter_chunked_body_errors(self):
+        """测试 chunked 编码错误和大小限制"""
+        with self.assertRaises(HttpError) as ctx:
+            list(iter_chunked_body(BytesIO(b"zz\r\n")))
+        self.assertEqual(ctx.exception.status_code, 400)
+        with self.assertRaises(HttpError) as ctx:
+            list(iter_chunked_body(BytesIO(chunked(b"abc", b"def")), limit=4))
+        self.assertEqual(ctx.exception.status_code, 413)
+
+    def test_aiter_receive(self):
+        """测试消费 ASGI 消息"""
+        self.assertEqual(b"".join(collect(aiter_receive(make_receive(b"x" * 20)))), b"x" * 20)
+        with self.assertRaises(HttpError):
+            collect(aiter_receive(make_receive(b"x" * 20), limit=10))
+
+
+class TestIncrementalParsers(unittest.TestCase):
+    """测试按行、JSON Lines 和 CSV 增量解析"""
+
+    def test_iter_lines(self):
+        """测试跨块的行和 CRLF"""
+        chunks = [b"a\r\nb", b"c\n", b"\nd"]
+        self.assertEqual(list(iter_lines(chunks)), [b"a", b"bc", b"", b"d"])
+        self.assertEqual(list(iter_lines(chunks, keepends=True)), [b"a\r\n", b"bc\n", b"\n", b"d"])
+
+    def test_max_line_size(self):
+        """测试一行超过 max_line_size 时返回 413，换行符计入行长度"""
+        self.assertEqual(list(iter_lines([b"abc\n", b"de"], max_line_size=4)), [b"abc", b"de"])
+        with self.assertRaises(HttpError) as ctx:
+            list(iter_lines([b"abcd\n"], max_line_size=4))
+        self.assertEqual(ctx.exception.status_code, 413)
+        with self.assertRaises(HttpError):
+            list(iter_lines([b"ab", b"cd\n"], max_line_size=4))
+
+        # 没有换行符的请求体在超过上限时立即报错，不等读完
+        def chunks():
+            while True:
+                yield b"x" * 100
+        with self.assertRaises(HttpError):
+            list(iter_lines(chunks(), max_line_size=1000))
+
+        async def agen():
+            for chunk in (b"x" * 10, b"y" * 10):
+                yield chunk
+        with self.assertRaises(HttpError):
+            collect(aiter_lines(agen(), max_line_size=15))
+        self.assertEqual(collect(aiter_lines(agen(), max_line_size=None)), [b"x" * 10 + b"y" * 10])
+
+    def test_json_lines(self):
+        """测试 JSON Lines 解析并跳过空行"""
+        chunks = [b'{"id": 1}\n\n{"id"', b': 2}\n']
+        self.assertEqual(list(iter_json_lines(chunks)), [{"id": 1}, {"id": 2}])
+
+        async def agen():
+            for chunk in chunks:
+                yield chunk
+        self.assertEqual(collect(aiter_json_lines(agen())), [{"id": 1}, {"id": 2}])
+
+    def test_csv(self):
+        """测试 CSV 解析，包括引号内的换行"""
+        chunks = [b'id,name\r\n1,"tom\r\nand', b' jerry"\r\n2,', "张三\r\n".encode("utf-8")]
+        expected = [["id", "name"], ["1", "tom\r\nand jerry"], ["2", "张三"]]
+        self.assertEqual(list(iter_csv(chunks)), expected)
+
+        async def agen():
+            for chunk in chunks:
+                yield chunk
+        self.assertEqual(collect(aiter_csv(agen())), expected)
+
+
+class TestRequestStream(unittest.TestCase):
+    """测试处理器的 request.stream() 和路由请求体限制"""
+
+    def setUp(self):
+        self.app = Litefs(max_request_size=100)
+
+        @self.app.add_post('/ingest')
+        @request_body(max_size=1000, stream=True)
+        def ingest(request):
+            return {"ids": [row["id"] for row in request.stream_json_lines()]}
+
+        @self.app.add_post('/ingest_async')
+        @request_body(max_size=1000, stream=True)
+        async def ingest_async(request):
+            return {"ids": [row["id"] async for row in request.stream_json_lines()]}
+
+        @self.app.add_post('/small')
+        def small(request):
+            return request.body
+
+    def tearDown(self):
+        # WSGI 和 ASGI 请求会在共享的内存 Session 存储中创建会话
+        self.app.sessions.clear()
+
+    def _body(self, count):
+        return b"".join(b'{"id": %d}\n' % i for i in range(count))
+
+    def _wsgi(self, path, body):
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "CONTENT_TYPE": "application/x-ndjson",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+        }
+        result = {}
+
+        def start_response(status, headers):
+            result["status"] = status
+        content = b"".join(self.app.wsgi()(environ, start_response))
+        return result["status"], content
+
+    def _asgi(self, path, body):
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": path,
+            "query_string": b"",
+            "headers": [
+                (b"content-type", b"application/x-ndjson"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "server": ("localhost", 80),
+            "client": ("127.0.0.1", 1234),
+        }
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+        asyncio.run(self.app.asgi()(scope, make_receive(body), send))
+        return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+    def test_wsgi_stream(self):
+        """测试 WSGI 下流式读取，路由限制覆盖全局 max_request_size"""
+        status, content = self._wsgi('/ingest', self._body(30))
+        self.assertEqual(status, "200 OK")
+        self.assertIn(b'"ids"', content)
+
+        status, _ = self._wsgi('/ingest', self._body(200))
+        self.assertTrue(status.startswith("413"))
+
+        status, _ = self._wsgi('/small', self._body(30))
+        self.assertTrue(status.startswith("413"))
+
+    def test_asgi_stream(self):
+        """测试 ASGI 下流式读取不预先缓冲请求体"""
+        status, content = self._asgi('/ingest_async', self._body(30))
+        self.assertEqual(status, 200)
+        self.assertIn(b'"ids"', content)
+
+        status, _ = self._asgi('/small', self._body(30))
+        self.assertEqual(status, 413)
+
+    def test_asgi_limit_while_receiving(self):
+        """测试 ASGI 在累计大小超过上限时立即返回 413，不缓冲剩余的请求体"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/small",
+            "query_string": b"",
+            "headers": [(b"content-type", b"text/plain")],
+            "server": ("localhost", 80),
+            "client": ("127.0.0.1", 1234),
+        }
+        received = []
+
+        async def receive():
+            # 没有 Content-Length 的无限请求体
+            received.append(1)
+            return {"type": "http.request", "body": b"x" * 10, "more_body": True}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+        asyncio.run(self.app.asgi()(scope, receive, send))
+        self.assertEqual(messages[0]["status"], 413)
+        self.assertEqual(len(received), 11)
+
+    def test_stream_once(self):
+        """测试请求体只能读取一次"""
+        from litefs.handlers import WSGIRequestHandler
+
+        handler = WSGIRequestHandler(self.app, {
+            "REQUEST_METHOD": "POST",
+            "PATH_INFO": "/",
+            "CONTENT_TYPE": "text/plain",
+            "CONTENT_LENGTH": "5",
+            "wsgi.input": BytesIO(b"hello"),
+        })
+        self.assertEqual(b"".join(handler.stream()), b"hello")
+        with self.assertRaises(RuntimeError):
+            handler.stream()
+
+
+if __name__ == '__main__':
+    unittest.main()
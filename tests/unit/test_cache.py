@@ -25,8 +25,17 @@ class TestCacheFactory(unittest.TestCase):
 
     def test_create_memory_cache_with_config(self):
         """测试创建带配置的内存缓存"""
-        cache = CacheFactory.create_cache(CacheBackend.MEMORY, max_size=5000)
+        cache = CacheFactory.create_cache(
+            CacheBackend.MEMORY,
+            max_size=5000,
+            max_bytes=1024 * 1024,
+            expiration_time=60
+        )
         self.assertIsInstance(cache, MemoryCache)
+        stats = cache.get_stats()
+        self.assertEqual(stats['max_size'], 5000)
+        self.assertEqual(stats['max_bytes'], 1024 * 1024)
+        self.assertEqual(cache._expiration_time, 60)
 
     def test_create_tree_cache_with_config(self):
         """测试创建带配置的树缓存"""
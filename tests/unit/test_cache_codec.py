@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import importlib.util
+import os
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+import redis
+
+from litefs.cache import CacheCodec, CacheFactory, MemcacheCache, RedisCache
+
+
+def installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError:
+        return False
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+    def __eq__(self, other):
+        return (self.x, self.y) == (other.x, other.y)
+
+
+ROWS = [{'id': i, 'name': f'product {i}', 'tags': ['a', 'b']} for i in range(200)]
+
+
+class TestCacheCodec(unittest.TestCase):
+    """测试 CacheCodec"""
+
+    def test_json_without_header(self):
+        """测试不压缩的 JSON 不写格式字节，与旧数据兼容"""
+        codec = CacheCodec()
+        self.assertEqual(codec.dumps({'a': 1}), b'{"a":1}')
+        self.assertEqual(codec.loads(b'{"a":1}'), {'a': 1})
+        self.assertEqual(codec.loads('[1, 2]'), [1, 2])
+        # 不是 JSON 的值原样返回
+        self.assertEqual(codec.loads('plain text'), 'plain text')
+        self.assertFalse(codec.binary)
+
+    def test_pickle(self):
+        """测试 pickle 保存 JSON 无法还原的类型"""
+        codec = CacheCodec('pickle')
+        value = {'when': datetime.datetime(2024, 1, 2, 3, 4, 5), 'raw': b'\x00\xff', 'point': Point(1, 2)}
+        data = codec.dumps(value)
+        self.assertEqual(data[0], 0x14)
+        self.assertEqual(codec.loads(data), value)
+        self.assertTrue(codec.binary)
+
+    def test_compress_threshold(self):
+        """测试只压缩达到阈值且压缩后变小的值"""
+        codec = CacheCodec(compression='zlib', compress_threshold=100)
+        small = codec.dumps({'a': 1})
+        self.assertEqual(small, b'{"a":1}')
+
+        large = codec.dumps(ROWS)
+        self.assertEqual(large[0], 0x11)
+        self.assertLess(len(large), len(CacheCodec().dumps(ROWS)) / 4)
+        self.assertEqual(codec.loads(large), ROWS)
+
+        # 无法压缩的值保存原值
+        noise = os.urandom(4096)
+        self.assertEqual(CacheCodec('pickle', 'zlib', 100).dumps(noise)[0], 0x14)
+
+    def test_migration(self):
+        """测试按格式字节读取其他配置写入的值，不在 accept 中的格式被拒绝"""
+        old = CacheCodec('pickle', 'zlib', compress_threshold=0)
+        data = old.dumps(ROWS)
+
+        self.assertEqual(CacheCodec('json', accept=('json', 'pickle')).loads(data), ROWS)
+        self.assertEqual(CacheCodec('pickle').loads(CacheCodec().dumps(ROWS)), ROWS)
+        with self.assertRaises(ValueError):
+            CacheCodec('json').loads(data)
+        with self.assertRaises(ValueError):
+            CacheCodec('pickle').loads(b'\x14not a pickle')
+
+    def test_invalid_names(self):
+        with self.assertRaises(ValueError):
+            CacheCodec('yaml')
+        with self.assertRaises(ValueError):
+            CacheCodec(compression='gzip')
+
+    @unittest.skipIf(installed('msgpack'), 'msgpack 已安装')
+    def test_missing_package(self):
+        with self.assertRaises(ImportError):
+            CacheCodec('msgpack')
+
+    @unittest.skipUnless(installed('msgpack'), '需要 msgpack')
+    def test_msgpack(self):
+        codec = CacheCodec('msgpack')
+        data = codec.dumps({'a': [1, 2], 'b': b'\x00'})
+        self.assertEqual(data[0], 0x18)
+        self.assertEqual(codec.loads(data), {'a': [1, 2], 'b': b'\x00'})
+
+    def test_optional_compressions(self):
+        for compression, module in (('lz4', 'lz4'), ('zstd', 'zstandard')):
+            if not installed(module):
+                continue
+            with self.subTest(compression=compression):
+                codec = CacheCodec(compression=compression, compress_threshold=0)
+                self.assertEqual(codec.loads(codec.dumps(ROWS)), ROWS)
+
+
+class TestBackendCodec(unittest.TestCase):
+    """测试 Redis 和 Memcache 缓存使用 codec"""
+
+    def _store(self):
+        data = {}
+        client = Mock()
+        client.setex.side_effect = lambda key, ttl, value: data.__setitem__(key, value)
+        client.set.side_effect = lambda key, value, **kwargs: data.__setitem__(key, value)
+        client.get.side_effect = data.get
+        client.mget.side_effect = lambda keys: [data.get(key) for key in keys]
+        return client, data
+
+    def test_redis(self):
+        client, data = self._store()
+        cache = RedisCache(redis_client=client, codec=CacheCodec('pickle', 'zlib', compress_threshold=0))
+        when = [datetime.date(2024, 5, day) for day in range(1, 31)]
+        cache.put('day', when)
+        self.assertEqual(data['litefs:day'][0], 0x15)
+        self.assertEqual(cache.get('day'), when)
+
+        # 其他 codec 写入的 pickle 数据按未命中处理
+        json_cache = RedisCache(redis_client=client)
+        self.assertIsNone(json_cache.get('day'))
+        json_cache.put('plain', [1])
+        self.assertEqual(cache.get_many(['day', 'plain', 'missing']), {'day': when, 'plain': [1]})
+
+    def test_redis_decode_responses(self):
+        """测试二进制格式拒绝 decode_responses 的客户端"""
+        client = redis.Redis(decode_responses=True)
+        with self.assertRaises(ValueError):
+            RedisCache(redis_client=client, codec='pickle')
+
+    def test_redis_owned_client(self):
+        """测试自建客户端始终返回 bytes，json 读取 pickle 写入的值按未命中处理"""
+        with patch.object(redis.Redis, 'ping', return_value=True):
+            pickle_cache = RedisCache(codec='pickle')
+            json_cache = RedisCache()
+        for cache in (pickle_cache, json_cache):
+            self.assertFalse(cache._redis.connection_pool.connection_kwargs['decode_responses'])
+
+        data = {}
+        for cache in (pickle_cache, json_cache):
+            cache._redis = Mock()
+            cache._redis.setex.side_effect = lambda key, ttl, value: data.__setitem__(key, value)
+            cache._redis.get.side_effect = data.get
+        pickle_cache.put('day', datetime.date(2024, 5, 1))
+        self.assertIsNone(json_cache.get('day'))
+        json_cache.put('plain', {'a': 1})
+        self.assertEqual(json_cache.get('plain'), {'a': 1})
+        self.assertEqual(pickle_cache.get('plain'), {'a': 1})
+
+    def test_memcache(self):
+        data = {}
+        client = Mock()
+        client.set.side_effect = lambda key, value, **kwargs: data.__setitem__(key, value)
+        client.get.side_effect = data.get
+        cache = MemcacheCache(memcache_client=client, codec='pickle')
+        cache._use_pymemcache = True
+
+        cache.put('raw', b'\x00\x01')
+        self.assertEqual(cache.get('raw'), b'\x00\x01')
+
+    def test_factory_config(self):
+        class Config:
+            cache_serializer = 'pickle'
+            cache_compression = 'zlib'
+            cache_compress_threshold = 512
+
+        codec = CacheFactory._codec_config(Config())
+        self.assertEqual((codec.serializer, codec.compression, codec.compress_threshold), ('pickle', 'zlib', 512))
+
+
+if __name__ == '__main__':
+    unittest.main()
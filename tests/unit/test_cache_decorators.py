@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from litefs.cache import MemoryCache, RedisCache, TreeCache
+from litefs.cache_decorators import (
+    MemoryCacheStore,
+    SingleFlight,
+    _generate_cache_key,
+    cache_method,
+    cache_response,
+    cached,
+)
+
+
+class SharedStore:
+    """模拟跨进程共享的缓存存储：使用字符串键"""
+
+    def __init__(self):
+        self._store = MemoryCacheStore()
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+
+class AsyncOnlyStore:
+    """只能通过异步接口读写的共享存储，同步读写会阻塞事件循环"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        raise AssertionError('协程中不应该调用同步的 get')
+
+    def put(self, key, val, expiration=None):
+        raise AssertionError('协程中不应该调用同步的 put')
+
+    def delete(self, key):
+        raise AssertionError('协程中不应该调用同步的 delete')
+
+    def add(self, key, val, expiration=None):
+        # 在线程池中调用
+        return self.data.setdefault(key, val) is val
+
+    async def aget(self, key):
+        return self.data.get(key)
+
+    async def aput(self, key, val, expiration=None):
+        self.data[key] = val
+
+    async def adelete(self, key):
+        self.data.pop(key, None)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def run_threads(func, count):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(func())) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+    """测试 SingleFlight"""
+
+    def test_concurrent_calls_share_result(self):
+        """测试并发调用只执行一次"""
+        flight = SingleFlight()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = run_threads(lambda: flight.do('key', compute), 10)
+        self.assertEqual(results, ['value'] * 10)
+        self.assertEqual(len(calls), 1)
+
+        # 计算结束后再次调用重新执行
+        flight.do('key', compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_error_shared(self):
+        """测试计算失败时等待方收到同一个异常"""
+        flight = SingleFlight()
+        started = threading.Event()
+        errors = []
+
+        def compute():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                flight.do('key', compute)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        call()
+        leader.join()
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+
+
+class TestCachedStampede(unittest.TestCase):
+    """测试 cached 的防击穿"""
+
+    def setUp(self):
+        self.store = MemoryCacheStore()
+        self.calls = []
+
+    def _loader(self, delay=0.0, **kwargs):
+        @cached(cache_store=self.store, **kwargs)
+        def load():
+            self.calls.append(1)
+            time.sleep(delay)
+            return len(self.calls)
+        return load
+
+    def test_single_flight_on_miss(self):
+        """测试缓存未命中时并发请求只计算一次"""
+        load = self._loader(delay=0.05, ttl=60)
+
+        self.assertEqual(run_threads(load, 10), [1] * 10)
+        self.assertEqual(load(), 1)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_stale_while_revalidate(self):
+        """测试过期后返回旧值并在后台刷新"""
+        load = self._loader(ttl=0.05, stale_ttl=60)
+
+        self.assertEqual(load(), 1)
+        time.sleep(0.1)
+        self.assertEqual(load(), 1)
+        self.assertTrue(wait_for(lambda: len(self.calls) == 2))
+        self.assertTrue(wait_for(lambda: load() == 2))
+
+    def test_expired_without_stale(self):
+        """测试没有 stale_ttl 时过期后同步重新计算"""
+        load = self._loader(ttl=0.05)
+
+        self.assertEqual(load(), 1)
+        time.sleep(0.1)
+        self.assertEqual(load(), 2)
+
+    def test_xfetch_early_refresh(self):
+        """测试 XFetch 在过期前提前刷新"""
+        load = self._loader(delay=0.01, ttl=60, beta=1e6)
+
+        self.assertEqual(load(), 1)
+        self.assertEqual(load(), 1)
+        self.assertTrue(wait_for(lambda: len(self.calls) >= 2))
+
+        # 不设置 beta 时过期前不刷新
+        load = self._loader(delay=0.01, ttl=60, key_prefix='plain')
+        calls = len(self.calls)
+        load()
+        load()
+        time.sleep(0.05)
+        self.assertEqual(len(self.calls), calls + 1)
+
+    def test_distributed_lock(self):
+        """测试其他进程持有锁时等待其写入结果"""
+        self.store = SharedStore()
+        load = self._loader(ttl=60, lock_timeout=2)
+        key = _generate_cache_key(load.__wrapped__, (), {}, None)
+        self.assertTrue(self.store.add(key + ':lock', 1, 10))
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(load()))
+        thread.start()
+        time.sleep(0.1)
+        self.store.set(key, {'value': 'other', 'expires': time.time() + 60, 'delta': 0}, 60)
+        thread.join()
+
+        self.assertEqual(results, ['other'])
+        self.assertEqual(self.calls, [])
+
+    def test_lock_released(self):
+        """测试计算结束后释放锁"""
+        self.store = SharedStore()
+        load = self._loader(ttl=60)
+        key = _generate_cache_key(load.__wrapped__, (), {}, None)
+
+        load()
+        self.assertIsNone(self.store.get(key + ':lock'))
+
+    def test_error_not_cached(self):
+        """测试计算失败时不缓存"""
+        @cached(ttl=60, cache_store=self.store)
+        def fail():
+            self.calls.append(1)
+            raise ValueError('boom')
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                fail()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_coroutine(self):
+        """测试协程函数的并发调用只计算一次"""
+        @cached(ttl=60, cache_store=self.store)
+        async def load(user_id):
+            self.calls.append(user_id)
+            await asyncio.sleep(0.02)
+            return {'id': user_id}
+
+        async def main():
+            return await asyncio.gather(*(load(1) for _ in range(10)), load(2))
+
+        results = asyncio.run(main())
+        self.assertEqual(results[0], {'id': 1})
+        self.assertEqual(results[-1], {'id': 2})
+        self.assertEqual(sorted(self.calls), [1, 2])
+        self.assertEqual(asyncio.run(load(1)), {'id': 1})
+        self.assertEqual(len(self.calls), 2)
+
+    def test_cache_response(self):
+        """测试响应缓存按请求头区分，并发请求只执行一次"""
+        @cache_response(ttl=60, vary_on=['Accept-Language'], cache_store=self.store)
+        def view(request):
+            self.calls.append(1)
+            time.sleep(0.02)
+            return request.environ.get('HTTP_ACCEPT_LANGUAGE')
+
+        zh = Mock(environ={'PATH_INFO': '/', 'HTTP_ACCEPT_LANGUAGE': 'zh'})
+        en = Mock(environ={'PATH_INFO': '/', 'HTTP_ACCEPT_LANGUAGE': 'en'})
+        self.assertEqual(run_threads(lambda: view(zh), 5), ['zh'] * 5)
+        self.assertEqual(view(en), 'en')
+        self.assertEqual(len(self.calls), 2)
+
+
+class TestCacheKeys(unittest.TestCase):
+    """测试缓存键和按函数清除缓存"""
+
+    def setUp(self):
+        self.calls = []
+
+    def _identity(self, store):
+        @cached(ttl=60, cache_store=store)
+        def identity(*args, **kwargs):
+            self.calls.append((args, kwargs))
+            return len(self.calls)
+        return identity
+
+    def test_local_keys(self):
+        """测试进程内存储按参数和参数类型区分缓存"""
+        for store in (MemoryCacheStore(), MemoryCache(max_size=100)):
+            self.calls = []
+            identity = self._identity(store)
+            for args in ((1,), (1.0,), (True,), ('1',), (), (1, 2)):
+                identity(*args)
+                identity(*args)
+            identity(a=1)
+            identity(a=1)
+            identity(1, a=1)
+            self.assertEqual(len(self.calls), 8)
+
+    def test_unhashable_args(self):
+        """测试不可哈希的参数使用序列化后的摘要"""
+        identity = self._identity(MemoryCacheStore())
+        self.assertEqual(identity([1, 2], {'a': 1}), 1)
+        self.assertEqual(identity([1, 2], {'a': 1}), 1)
+        self.assertEqual(identity([1, 3], {'a': 1}), 2)
+
+    def test_shared_store_keys(self):
+        """测试跨进程存储使用稳定的字符串键，关键字参数的顺序不影响键"""
+        store = SharedStore()
+        identity = self._identity(store)
+        identity(1, a=1, b=2)
+        identity(1, b=2, a=1)
+        self.assertEqual(len(self.calls), 1)
+
+        key = _generate_cache_key(identity.__wrapped__, (1,), {'b': 2, 'a': 1})
+        self.assertIsInstance(key, str)
+        self.assertIsNotNone(store.get(key))
+
+    def test_cache_clear_and_info(self):
+        """测试 cache_clear 删除该函数的全部缓存，不影响其他函数"""
+        store = MemoryCacheStore()
+        identity = self._identity(store)
+        other = self._identity(store)
+        for i in range(5):
+            identity(i)
+            identity(i)
+        other(1)
+
+        info = identity.cache_info()
+        self.assertEqual((info['hits'], info['misses'], info['entries']), (5, 5, 5))
+
+        identity.cache_clear()
+        self.assertEqual(identity.cache_info()['entries'], 0)
+        self.assertEqual(store.get_stats()['total_entries'], 1)
+        identity(1)
+        self.assertEqual(identity.cache_info()['misses'], 1)
+
+    def test_empty_backend_store(self):
+        """测试空的 litefs.cache 后端（len 为 0）也作为存储使用，不退回全局存储"""
+        for store in (MemoryCache(max_size=100), TreeCache()):
+            self.calls = []
+            identity = self._identity(store)
+            self.assertEqual(len(store), 0)
+            identity('a')
+            identity('a')
+            self.assertEqual(len(self.calls), 1)
+            self.assertEqual(len(store), 1)
+
+    def test_tree_cache_expiration(self):
+        """测试 TreeCache 作为存储时使用装饰器的过期时间"""
+        store = TreeCache(expiration_time=3600)
+        identity = self._identity(store)
+        identity('a')
+        (_, expires), = store.data.values()
+        self.assertLess(expires, time.time() + 61)
+
+    def test_coroutine_uses_async_store(self):
+        """测试协程函数通过 aget、aput 和 adelete 访问缓存后端"""
+        store = AsyncOnlyStore()
+
+        @cached(ttl=60, cache_store=store)
+        async def load(user_id):
+            self.calls.append(user_id)
+            return {'id': user_id}
+
+        async def main():
+            return [await load(1), await load(1)]
+
+        self.assertEqual(asyncio.run(main()), [{'id': 1}, {'id': 1}])
+        self.assertEqual(self.calls, [1])
+        # 锁键已通过 adelete 删除
+        self.assertEqual(len(store.data), 1)
+
+    def test_cache_method(self):
+        """测试方法缓存按实例和参数区分"""
+        calls = []
+
+        class Service:
+            @cache_method(ttl=60)
+            def double(self, value):
+                calls.append(value)
+                return value * 2
+
+        first, second = Service(), Service()
+        self.assertEqual(first.double(2), 4)
+        self.assertEqual(first.double(2), 4)
+        self.assertEqual(second.double(2), 4)
+        self.assertEqual(first.double([1]), [1, 1])
+        self.assertEqual(calls, [2, 2, [1]])
+
+
+class TestRedisAdd(unittest.TestCase):
+    """测试 RedisCache.add"""
+
+    def test_add(self):
+        client = Mock()
+        client.set.return_value = None
+        cache = RedisCache(redis_client=client, key_prefix='app:')
+
+        self.assertFalse(cache.add('lock', 1, 10))
+        client.set.assert_called_with('app:lock', b'1', nx=True, ex=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -136,6 +136,21 @@ class TestCacheManager(unittest.TestCase):
         self.assertIn('cache_a', caches)
         self.assertIn('cache_b', caches)
 
+    def test_get_stats(self):
+        """测试汇总各缓存的统计信息"""
+        CacheManager.reset_cache()
+
+        cache = CacheManager.get_cache(backend=CacheBackend.MEMORY, cache_key='stats_cache')
+        CacheManager.get_cache(backend=CacheBackend.TREE, cache_key='tree_cache')
+        cache.put('key', 'value')
+        cache.get('key')
+        cache.get('missing')
+
+        stats = CacheManager.get_stats()
+        self.assertNotIn('tree_cache', stats)
+        self.assertEqual(stats['stats_cache']['hits'], 1)
+        self.assertEqual(stats['stats_cache']['misses'], 1)
+
     def test_get_global_cache_convenience(self):
         """测试便捷函数 get_global_cache"""
         cache1 = get_global_cache(backend=CacheBackend.MEMORY)
@@ -3,7 +3,11 @@
 
 import unittest
 import os
+import shutil
+import sqlite3
 import tempfile
+import threading
+import time
 from litefs.cache import DatabaseCache
 
 
@@ -134,5 +138,155 @@ class TestDatabaseCache(unittest.TestCase):
             self.assertEqual(result["dict"], {"a": 1, "b": 2})
 
 
+class TestDatabaseCacheWriteBehind(unittest.TestCase):
+    """测试 DatabaseCache 的批量写入"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_cache.db")
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+
+    def _cache(self, **kwargs):
+        cache = DatabaseCache(db_path=self.db_path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def _rows(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT key FROM cache ORDER BY key").fetchall()
+        finally:
+            conn.close()
+
+    def test_read_own_writes(self):
+        """测试写入前当前进程能读到队列中的操作，其他连接在写入后才能读到"""
+        cache = self._cache(flush_interval=60)
+        cache.put("key1", "value1")
+        cache.put("key2", "value2")
+        cache.delete("key2")
+        cache.set_many({"key3": 3, "key4": 4})
+        cache.delete_many(["key4"])
+
+        self.assertEqual(cache.get("key1"), "value1")
+        self.assertIsNone(cache.get("key2"))
+        self.assertEqual(cache.get_many(["key1", "key2", "key3", "key4"]), {"key1": "value1", "key3": 3})
+        self.assertTrue(cache.exists("key3"))
+        self.assertEqual(self._rows(), [])
+
+        cache.flush()
+        self.assertEqual(self._rows(), [("key1",), ("key3",)])
+
+    def test_background_flush(self):
+        """测试后台线程在 flush_interval 后写入，同一个键只写入最后一次"""
+        cache = self._cache(flush_interval=0.05)
+        for i in range(100):
+            cache.put("counter", i)
+
+        deadline = time.time() + 2
+        while not self._rows() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._rows(), [("counter",)])
+
+        other = self._cache()
+        self.assertEqual(other.get("counter"), 99)
+
+    def test_flush_interval_when_idle(self):
+        """测试写入线程空闲等待时，新的写入在 flush_interval 左右对其他连接可见"""
+        cache = self._cache(flush_interval=0.05)
+        for i in range(3):
+            start = time.time()
+            cache.put(f"key{i}", i)
+            while len(self._rows()) <= i and time.time() - start < 2:
+                time.sleep(0.005)
+            self.assertLess(time.time() - start, 0.5)
+
+    def test_batch_size(self):
+        """测试等待写入的键达到 batch_size 时立即写入"""
+        cache = self._cache(flush_interval=60, batch_size=10)
+        cache.set_many({f"key{i}": i for i in range(10)})
+
+        deadline = time.time() + 2
+        while len(self._rows()) < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self._rows()), 10)
+
+    def test_write_through(self):
+        """测试关闭批量写入时每次写入立即提交"""
+        cache = self._cache(write_behind=False)
+        cache.put("key1", "value1")
+        self.assertEqual(self._rows(), [("key1",)])
+
+    def test_close_flushes(self):
+        """测试关闭时写入队列中的操作"""
+        cache = DatabaseCache(db_path=self.db_path, flush_interval=60)
+        cache.put("key1", "value1")
+        cache.close()
+        self.assertEqual(self._rows(), [("key1",)])
+
+    def test_wal_mode(self):
+        """测试文件数据库使用 WAL 日志"""
+        self._cache()
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        finally:
+            conn.close()
+
+    def test_never_expire(self):
+        """测试过期时间为 0 的键永不过期"""
+        cache = self._cache()
+        cache.put("key1", "value1", expiration=0)
+        self.assertEqual(cache.get("key1"), "value1")
+        cache.flush()
+        self.assertEqual(cache.get("key1"), "value1")
+        self.assertEqual(cache.ttl("key1"), -1)
+
+    def test_threads(self):
+        """测试多个线程同时读写"""
+        cache = self._cache()
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(50):
+                    cache.put(f"t{n}:{i}", i)
+                    assert cache.get(f"t{n}:{i}") == i
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 200)
+
+    def test_thread_connections_closed(self):
+        """测试线程结束后关闭该线程的连接"""
+        cache = self._cache()
+        cache.put("key1", "value1")
+        cache.flush()
+        opened = []
+
+        def worker():
+            opened.append(cache._store.connect())
+            assert cache.get("key1") == "value1"
+
+        for _ in range(20):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+
+        self.assertLessEqual(len(cache._store._connections), 2)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import contextlib
+import io
 import unittest
 import os
+import shutil
+import sqlite3
 import tempfile
 from litefs.session import DatabaseSession, Session
 
@@ -137,5 +141,59 @@ class TestDatabaseSession(unittest.TestCase):
             self.assertEqual(retrieved_session.data["preferences"], {"theme": "dark", "language": "zh"})
 
 
+class TestDatabaseSessionWriteBehind(unittest.TestCase):
+    """测试 DatabaseSession 的批量写入"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test_sessions.db")
+        self.session_store = DatabaseSession(db_path=self.db_path, flush_interval=60)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.session_store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def _count(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_save_is_queued(self):
+        """测试保存时不输出调试信息，写入前当前进程能读到"""
+        session = self.session_store.create()
+        session.data["user_id"] = 1
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.session_store.save(session)
+
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(self.session_store.get(session.id).data["user_id"], 1)
+        self.assertEqual(self._count(), 0)
+
+        self.session_store.flush()
+        self.assertEqual(self._count(), 1)
+
+    def test_get_many_and_set_many(self):
+        """测试批量保存和获取"""
+        sessions = {}
+        for i in range(3):
+            session = self.session_store.create()
+            session.data["n"] = i
+            sessions[session.id] = session
+        ids = list(sessions)
+        self.session_store.set_many(dict(list(sessions.items())[:2]))
+        self.session_store.flush()
+        self.session_store.put(ids[2], sessions[ids[2]])
+        self.session_store.delete(ids[0])
+
+        result = self.session_store.get_many(ids + ["nonexistent_id"])
+        self.assertEqual(sorted(result), sorted(ids[1:]))
+        self.assertEqual(result[ids[2]].data["n"], 2)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -43,6 +43,36 @@ class TestMakeEnviron(unittest.TestCase):
         
         self.assertEqual(environ['QUERY_STRING'], 'name=value&foo=bar')
 
+    def test_query_string_not_decoded(self):
+        """测试查询字符串原样传给处理器，编码的 & 和 = 只在解析参数时解码一次"""
+        request_line = b"GET /test?a=x%26b%3D1&c=%2541+z HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        environ = make_environ(self.server, BytesIO(request_line), ('127.0.0.1', 12345))
+        self.assertEqual(environ['QUERY_STRING'], 'a=x%26b%3D1&c=%2541+z')
+
+    def test_query_params_end_to_end(self):
+        """测试内置服务器从请求行到 request.params 的完整路径"""
+        from litefs import Litefs
+
+        class RW(BytesIO):
+            def close(self):
+                pass
+
+        app = Litefs()
+        self.addCleanup(app.sessions.clear)
+
+        @app.add_get('/test')
+        def params(request):
+            return dict(request.params)
+
+        rw = RW(b"GET /test?a=x%26b%3D1&c=%2541+z HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        environ = make_environ(self.server, rw, ('127.0.0.1', 12345))
+        rw.seek(0)
+        rw.truncate()
+        app.handler(None, rw, environ, self.server)
+        body = rw.getvalue().partition(b'\r\n\r\n')[2]
+        self.assertIn(b'"a":"x&b=1"', body.replace(b' ', b''))
+        self.assertIn(b'"c":"%41z"', body.replace(b' ', b''))
+
     def test_url_encoded_path(self):
         """测试 URL 编码的路径"""
         request_line = b"GET /test%20path HTTP/1.1\r\nHost: localhost\r\n\r\n"
@@ -145,7 +175,7 @@ class TestMakeEnviron(unittest.TestCase):
         environ = make_environ(self.server, rw, ('127.0.0.1', 12345))
         
         self.assertIn('HTTP_X_CUSTOM', environ)
-        self.assertEqual(environ['HTTP_X_CUSTOM'], 'value2')
+        self.assertEqual(environ['HTTP_X_CUSTOM'], 'value1, value2')
 
     def test_post_method(self):
         """测试 POST 方法"""
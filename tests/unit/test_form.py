@@ -110,6 +110,51 @@ class TestParseForm(unittest.TestCase):
         self.assertEqual(form['user']['name'], 'jerry')
         self.assertEqual(form['user']['age'], '30')
 
+    def test_encoded_separators(self):
+        """测试编码后的 & 和 = 不会被当作分隔符"""
+        form = parse_form("q=a%26b%3Dc&next=%2Fhome%3Fx%3D1")
+
+        self.assertEqual(form, {'q': 'a&b=c', 'next': '/home?x=1'})
+
+    def test_no_double_decode(self):
+        """测试值只解码一次"""
+        form = parse_form("v=%2541&w=1%2B1")
+
+        self.assertEqual(form['v'], '%41')
+        self.assertEqual(form['w'], '1+1')
+
+    def test_repeated_dict_key(self):
+        """测试字典表示法中重复的键合并为列表"""
+        form = parse_form("user[tag]=a&user[tag]=b&user[tag]=c")
+
+        self.assertEqual(form['user']['tag'], ['a', 'b', 'c'])
+
+    def test_result_not_shared(self):
+        """测试修改解析结果不影响相同查询字符串的后续解析"""
+        query_string = "name=tom&tags[]=a&user[name]=jerry"
+        form = parse_form(query_string)
+        form['name'] = 'changed'
+        form['tags'].append('b')
+        form['user']['name'] = 'changed'
+
+        self.assertEqual(parse_form(query_string), {
+            'name': 'tom', 'tags': ['a'], 'user': {'name': 'jerry'},
+        })
+
+    def test_memo_bounded(self):
+        """测试备忘录有上限且不记录长查询字符串"""
+        from litefs.handlers import form_parser
+
+        form_parser._form_cache.clear()
+        for i in range(form_parser.FORM_MEMO_SIZE + 100):
+            parse_form(f"id={i}")
+        self.assertEqual(len(form_parser._form_cache), form_parser.FORM_MEMO_SIZE)
+
+        form_parser._form_cache.clear()
+        long_query = "x=" + "a" * form_parser.FORM_MEMO_MAX_LENGTH
+        self.assertEqual(parse_form(long_query)['x'], "a" * form_parser.FORM_MEMO_MAX_LENGTH)
+        self.assertEqual(len(form_parser._form_cache), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -107,9 +107,11 @@ class TestGreenletServer:
         
         environ = make_environ(server, rw, client_address)
         
-        # 验证 URL 解码
+        # 路径被解码，查询字符串原样保留，由 parse_form 解析参数时解码
         assert 'path with spaces' in environ['PATH_INFO']
-        assert '中文' in environ['QUERY_STRING']
+        assert environ['QUERY_STRING'] == 'name=%E4%B8%AD%E6%96%87'
+        from litefs.handlers.form_parser import parse_form
+        assert parse_form(environ['QUERY_STRING']) == {'name': '中文'}
     
     def test_make_environ_post_request(self):
         """测试构建 POST 请求的 environ"""
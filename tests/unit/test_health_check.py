@@ -189,6 +189,29 @@ class TestHealthCheck(unittest.TestCase):
         self.assertEqual(response_data['checks']['cache']['status'], 'error')
         self.assertIn('error', response_data['checks']['cache'])
 
+    def test_health_check_metrics(self):
+        """测试健康检查返回指标"""
+        from litefs.cache import MemoryCache
+        
+        cache = MemoryCache(max_size=10)
+        cache.put('key', 'value')
+        cache.get('key')
+        self.health_check = HealthCheck(self.app, metrics={'cache': cache.get_stats})
+        self.health_check.add_metrics('broken', lambda: 1 / 0)
+        
+        request_handler = MockRequestHandler()
+        request_handler._environ = {
+            'PATH_INFO': '/health',
+            'REQUEST_METHOD': 'GET'
+        }
+        
+        response = self.health_check.process_request(request_handler)
+        response_data = json.loads(request_handler.handle_response(response))
+        
+        self.assertEqual(response_data['status'], 'healthy')
+        self.assertEqual(response_data['metrics']['cache']['hits'], 1)
+        self.assertIn('error', response_data['metrics']['broken'])
+
     def test_ready_check_all_pass(self):
         """测试所有就绪检查通过"""
         def check1():
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试 JSON 编解码模块
+"""
+
+import dataclasses
+import datetime
+import decimal
+import unittest
+import uuid
+
+from litefs import json
+
+
+@dataclasses.dataclass
+class User:
+    name: str
+    age: int
+
+
+class TestJSON(unittest.TestCase):
+    """测试 litefs.json"""
+
+    def setUp(self):
+        """每个测试使用标准库实现，结束后恢复自动选择"""
+        json.set_backend("json")
+
+    def tearDown(self):
+        json.set_backend("auto")
+
+    def test_dumps_bytes(self):
+        """测试直接输出 UTF-8 字节串"""
+        data = json.dumps_bytes({"name": "张三"})
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(json.loads(data), {"name": "张三"})
+        self.assertEqual(json.dumps({"name": "张三"}), '{"name": "张三"}')
+
+    def test_default_hooks(self):
+        """测试 datetime、dataclass 等类型的默认转换"""
+        value = {
+            "time": datetime.datetime(2024, 1, 2, 3, 4, 5),
+            "day": datetime.date(2024, 1, 2),
+            "price": decimal.Decimal("1.50"),
+            "id": uuid.UUID(int=1),
+            "user": User("tom", 25),
+            "tags": {"a"},
+        }
+        self.assertEqual(json.loads(json.dumps(value)), {
+            "time": "2024-01-02T03:04:05",
+            "day": "2024-01-02",
+            "price": "1.50",
+            "id": "00000000-0000-0000-0000-000000000001",
+            "user": {"name": "tom", "age": 25},
+            "tags": ["a"],
+        })
+
+    def test_sqlalchemy_row(self):
+        """测试 SQLAlchemy 查询结果行的转换"""
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT 1 AS id, 'tom' AS name")).first()
+        self.assertEqual(json.loads(json.dumps(row)), {"id": 1, "name": "tom"})
+
+    def test_unsupported_type(self):
+        """测试不支持的类型和自定义 default"""
+        with self.assertRaises(TypeError):
+            json.dumps(object())
+        self.assertEqual(json.dumps(object(), default=lambda obj: "x"), '"x"')
+
+    def test_set_backend(self):
+        """测试切换实现"""
+        self.assertEqual(json.get_backend().name, "json")
+        self.assertIn(json.set_backend("auto").name, json.BACKENDS)
+        with self.assertRaises(ValueError):
+            json.set_backend("invalid")
+
+
+if __name__ == '__main__':
+    unittest.main()
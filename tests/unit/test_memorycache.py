@@ -4,6 +4,8 @@
 import unittest
 import sys
 import os
+import threading
+import time
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
 
@@ -141,5 +143,104 @@ class TestMemoryCache(unittest.TestCase):
         self.assertEqual(cache.get('key4'), 'value4')
 
 
+    def test_expiration(self):
+        """测试默认过期时间和按键设置的过期时间"""
+        cache = MemoryCache(max_size=self.max_size, expiration_time=0.05)
+        
+        cache.put('default', 1)
+        cache.put('custom', 2, expiration=60)
+        cache.put('forever', 3, expiration=0)
+        time.sleep(0.1)
+        
+        self.assertIsNone(cache.get('default'))
+        self.assertEqual(cache.get('custom'), 2)
+        self.assertEqual(cache.get('forever'), 3)
+        self.assertEqual(cache.get_stats()['expirations'], 1)
+
+    def test_expired_entries_purged_on_put(self):
+        """测试写入时清理已过期的项，不淘汰未过期的项"""
+        cache = MemoryCache(max_size=3)
+        
+        cache.put('live', 'value')
+        cache.put('short1', 'value', expiration=0.05)
+        cache.put('short2', 'value', expiration=0.05)
+        time.sleep(0.1)
+        cache.put('new', 'value')
+        
+        stats = cache.get_stats()
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(stats['expirations'], 2)
+        self.assertEqual(stats['evictions'], 0)
+        self.assertEqual(cache.get('live'), 'value')
+
+    def test_max_bytes(self):
+        """测试按值的总大小淘汰"""
+        cache = MemoryCache(max_size=self.max_size, max_bytes=100, sizer=len)
+        
+        cache.put('a', b'x' * 40)
+        cache.put('b', b'x' * 40)
+        cache.get('a')
+        cache.put('c', b'x' * 40)
+        
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'x' * 40)
+        self.assertEqual(cache.get_stats()['bytes'], 80)
+        
+        # 超过容量的值不缓存，并替换掉旧值
+        cache.put('a', b'x' * 200)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['bytes'], 40)
+        
+        cache.put('c', b'x' * 10)
+        cache.delete('c')
+        self.assertEqual(cache.get_stats()['bytes'], 0)
+
+    def test_stats(self):
+        """测试统计信息"""
+        cache = MemoryCache(max_size=2)
+        
+        cache.put('key1', 'value1')
+        cache.put('key2', 'value2')
+        cache.put('key3', 'value3')
+        cache.get('key3')
+        cache.get('key1')
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['max_size'], 2)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['stripes'], 1)
+
+    def test_lock_striping(self):
+        """测试分段后总容量不变，并发读写不丢失数据"""
+        cache = MemoryCache(max_size=16000)
+        self.assertEqual(cache.get_stats()['stripes'], 16)
+        
+        def worker(n):
+            for i in range(1000):
+                cache.put(f'{n}-{i}', i)
+                self.assertEqual(cache.get(f'{n}-{i}'), i)
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['size'], 8000)
+        self.assertEqual(stats['hits'], 8000)
+        
+        for i in range(20000):
+            cache.put(f'extra-{i}', i)
+        self.assertEqual(len(cache), 16000)
+        
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试 multipart 流式解析模块
+"""
+
+import asyncio
+import unittest
+from io import BytesIO
+
+from litefs.exceptions import HttpError
+from litefs.handlers.multipart import (
+    MultipartParser,
+    parse_content_disposition,
+    parse_multipart_asgi,
+    parse_multipart_receive,
+    parse_multipart_stream,
+    parse_multipart_wsgi,
+)
+
+BOUNDARY = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
+
+
+def make_body(fields=(), files=(), boundary=BOUNDARY):
+    """构造 multipart 请求体"""
+    lines = []
+    for name, value in fields:
+        lines.append(f"--{boundary}\r\n".encode())
+        lines.append(f'Content-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+        lines.append(value.encode("utf-8") + b"\r\n")
+    for name, filename, content in files:
+        lines.append(f"--{boundary}\r\n".encode())
+        lines.append(
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode()
+        )
+        lines.append(content + b"\r\n")
+    lines.append(f"--{boundary}--\r\n".encode())
+    return b"".join(lines)
+
+
+class TestMultipartParser(unittest.TestCase):
+    """测试 MultipartParser"""
+
+    def test_parse(self):
+        """测试字段和文件解析，内容不含边界前的 CRLF"""
+        body = make_body(
+            fields=[("name", "张三"), ("empty", "")],
+            files=[("avatar", "a.bin", b"\x00\r\n--data\r\n")],
+        )
+        posts, files = parse_multipart_asgi(body, BOUNDARY)
+        self.assertEqual(posts, {"name": "张三", "empty": ""})
+        self.assertEqual(files["avatar"].read(), b"\x00\r\n--data\r\n")
+
+    def test_any_chunk_size(self):
+        """测试边界跨块时的解析结果与整块一致"""
+        body = make_body(
+            fields=[("a", "1"), ("b", "hello world")],
+            files=[("f", "f.txt", b"x" * 1000)],
+        )
+        for size in (1, 2, 7, 40, 64, 1000):
+            parser = MultipartParser(BOUNDARY)
+            for i in range(0, len(body), size):
+                parser.feed(body[i:i + size])
+            posts, files = parser.close()
+            self.assertEqual(posts, {"a": "1", "b": "hello world"}, size)
+            self.assertEqual(files["f"].read(), b"x" * 1000, size)
+
+    def test_spool(self):
+        """测试文件超过 spool_size 后转存到磁盘"""
+        body = make_body(files=[("small", "s", b"s" * 10), ("big", "b", b"b" * 5000)])
+        _, files = parse_multipart_asgi(body, BOUNDARY, spool_size=1024)
+        self.assertFalse(files["small"]._rolled)
+        self.assertTrue(files["big"]._rolled)
+        self.assertEqual(files["big"].read(), b"b" * 5000)
+
+    def test_max_size(self):
+        """测试超过大小限制"""
+        body = make_body(files=[("f", "f", b"x" * 2000)])
+        with self.assertRaises(HttpError) as ctx:
+            parse_multipart_asgi(body, BOUNDARY, max_upload_size=1000)
+        self.assertEqual(ctx.exception.status_code, 413)
+
+    def test_truncated(self):
+        """测试请求体在分段中途截断"""
+        body = make_body(fields=[("a", "1")])
+        parser = MultipartParser(BOUNDARY)
+        parser.feed(body[:60])
+        with self.assertRaises(HttpError) as ctx:
+            parser.close()
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_preamble_and_epilogue(self):
+        """测试忽略首个边界前和结束边界后的内容"""
+        body = b"preamble\r\n" + make_body(fields=[("a", "1")]) + b"epilogue"
+        posts, _ = parse_multipart_asgi(body, BOUNDARY)
+        self.assertEqual(posts, {"a": "1"})
+
+    def test_content_disposition(self):
+        """测试 Content-Disposition 解析"""
+        disposition, params = parse_content_disposition(
+            'form-data; name="file"; filename="a;b.txt"'
+        )
+        self.assertEqual(disposition, "form-data")
+        self.assertEqual(params, {"name": "file", "filename": "a;b.txt"})
+
+
+class TestMultipartAdapters(unittest.TestCase):
+    """测试各运行环境的适配函数"""
+
+    def setUp(self):
+        self.body = make_body(fields=[("a", "1")], files=[("f", "f.txt", b"data")])
+
+    def test_wsgi(self):
+        """测试从 wsgi.input 读取"""
+        posts, files = parse_multipart_wsgi(BytesIO(self.body), BOUNDARY, len(self.body))
+        self.assertEqual(posts, {"a": "1"})
+        self.assertEqual(files["f"].read(), b"data")
+
+    def test_stream_keeps_next_request(self):
+        """测试 Socket 流只读取本请求的请求体"""
+        next_request = b"GET / HTTP/1.1\r\n\r\n"
+        for content_length in (len(self.body), None):
+            rw = BytesIO(self.body + next_request)
+            posts, _ = parse_multipart_stream(
+                rw, BOUNDARY, content_length=content_length
+            )
+            self.assertEqual(posts, {"a": "1"})
+            self.assertEqual(rw.read(), next_request)
+
+    def test_receive(self):
+        """测试直接消费 ASGI receive() 消息"""
+        body = self.body
+        messages = [
+            {"type": "http.request", "body": body[i:i + 10], "more_body": i + 10 < len(body)}
+            for i in range(0, len(body), 10)
+        ]
+
+        async def receive():
+            return messages.pop(0)
+
+        posts, files = asyncio.run(parse_multipart_receive(receive, BOUNDARY))
+        self.assertEqual(posts, {"a": "1"})
+        self.assertEqual(files["f"].read(), b"data")
+        self.assertEqual(messages, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
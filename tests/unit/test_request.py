@@ -9,6 +9,7 @@ LiteFS Request 模块测试
 
 import sys
 import os
+import json
 import unittest
 import tempfile
 from io import BytesIO
@@ -531,7 +532,170 @@ class TestSocketRequestHandler(unittest.TestCase):
         handler = SocketRequestHandler(self.mock_app, mock_rw, environ, Mock())
         handler._response_headers["Content-Type"] = "application/json"
         result = handler._cast({"name": "tom"})
-        self.assertEqual(result, [b'{"name": "tom"}'])
+        self.assertEqual(json.loads(b"".join(result)), {"name": "tom"})
+
+    def test_lazy_body_parsing(self):
+        """测试请求体延迟到首次访问时才读取"""
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'QUERY_STRING': 'name=tom',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '13',
+            'CONTENT_TYPE': 'application/json',
+        }
+
+        mock_rw = Mock()
+        mock_rw.read = Mock(return_value=b'{"age": "25"}')
+        handler = SocketRequestHandler(self.mock_app, mock_rw, environ, Mock())
+        mock_rw.read.assert_not_called()
+        self.assertIsNone(handler._get)
+
+        self.assertEqual(handler.params, {'name': 'tom'})
+        self.assertEqual(handler.json, {'age': '25'})
+        self.assertEqual(handler.body, b'{"age": "25"}')
+        mock_rw.read.assert_called_once_with(13)
+
+    def test_drain_unread_body(self):
+        """测试未读取的请求体在响应前被丢弃"""
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '5',
+            'CONTENT_TYPE': 'text/plain',
+        }
+
+        mock_rw = Mock()
+        mock_rw.read = Mock(side_effect=[b'hel', b'lo'])
+        handler = SocketRequestHandler(self.mock_app, mock_rw, environ, Mock())
+        handler._drain_body()
+        self.assertEqual(mock_rw.read.call_count, 2)
+        self.assertEqual(handler.body, "")
+
+    def test_drain_chunked_body(self):
+        """测试未读取的 chunked 请求体按块解码后丢弃，不读取后续请求的数据"""
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_TRANSFER_ENCODING': 'chunked',
+            'CONTENT_TYPE': 'text/plain',
+        }
+
+        rw = BytesIO(b'3\r\nhel\r\n2\r\nlo\r\n0\r\n\r\nNEXT')
+        handler = SocketRequestHandler(self.mock_app, rw, environ, Mock())
+        handler._drain_body()
+        self.assertEqual(rw.read(), b'NEXT')
+        self.assertNotIn('Connection', handler._response_headers)
+
+    def test_drain_skips_body_over_limit(self):
+        """测试超过上限的请求体不再读取，响应后关闭连接"""
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '100',
+            'CONTENT_TYPE': 'text/plain',
+        }
+
+        self.mock_app.config.max_request_size = 10
+        mock_rw = Mock()
+        handler = SocketRequestHandler(self.mock_app, mock_rw, environ, Mock())
+        handler._drain_body()
+        mock_rw.read.assert_not_called()
+        self.assertEqual(handler._response_headers.get('Connection'), 'close')
+
+        environ['HTTP_TRANSFER_ENCODING'] = 'chunked'
+        del environ['CONTENT_LENGTH']
+        rw = BytesIO(b'20\r\n' + b'x' * 32 + b'\r\n0\r\n\r\n')
+        handler = SocketRequestHandler(self.mock_app, rw, environ, Mock())
+        handler._drain_body()
+        self.assertEqual(handler._response_headers.get('Connection'), 'close')
+
+    def test_lazy_session(self):
+        """测试未访问会话时不加载也不保存会话"""
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '0',
+            'CONTENT_TYPE': '',
+        }
+
+        mock_rw = Mock()
+        handler = SocketRequestHandler(self.mock_app, mock_rw, environ, Mock())
+        handler._response(200, content="ok")
+        self.mock_app.sessions.get.assert_not_called()
+        self.mock_app.sessions.put.assert_not_called()
+        self.assertIsNone(handler._cookies)
+
+    def test_session_created_on_write(self):
+        """测试新会话只在写入后才保存并设置 cookie"""
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '0',
+            'CONTENT_TYPE': '',
+        }
+
+        handler = SocketRequestHandler(self.mock_app, Mock(), environ, Mock())
+        self.assertIsNone(handler.session.get('user'))
+        handler._response(200, content="ok")
+        self.mock_app.sessions.put.assert_not_called()
+        self.assertIsNone(handler._cookies)
+
+        handler = SocketRequestHandler(self.mock_app, Mock(), environ, Mock())
+        handler.session['user'] = 'tom'
+        handler._response(200, content="ok")
+        self.mock_app.sessions.put.assert_called_once_with(
+            handler.session.id, handler.session
+        )
+        self.assertIn('session_id', handler._cookies)
+
+    def test_unmodified_session_not_saved(self):
+        """测试已存在但未修改的会话不会回写"""
+        from litefs.session import Session
+
+        stored = Session('abc123')
+        stored.update({'user': 'tom'})
+        self.mock_app.sessions.get = Mock(return_value=stored)
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': '/',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_LENGTH': '0',
+            'CONTENT_TYPE': '',
+            'HTTP_COOKIE': 'session_id=abc123',
+        }
+
+        handler = SocketRequestHandler(self.mock_app, Mock(), environ, Mock())
+        self.assertEqual(handler.session['user'], 'tom')
+        self.assertEqual(handler.session_id, 'abc123')
+        handler._response(200, content="ok")
+        self.mock_app.sessions.put.assert_not_called()
+        self.assertIsNone(handler._cookies)
 
 
 class TestBaseRequestHandler(unittest.TestCase):
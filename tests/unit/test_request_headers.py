@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试请求头与 Cookie 解析模块
+"""
+
+import unittest
+from unittest.mock import Mock
+
+from litefs.handlers import WSGIRequestHandler
+from litefs.handlers.request_headers import RequestHeaders, parse_cookie
+
+
+class TestRequestHeaders(unittest.TestCase):
+    """测试 RequestHeaders"""
+
+    def test_case_insensitive(self):
+        """测试名称大小写不敏感"""
+        headers = RequestHeaders([("Content-Type", "text/plain")])
+        self.assertEqual(headers["content-type"], "text/plain")
+        self.assertEqual(headers.get("CONTENT-TYPE"), "text/plain")
+        self.assertIn("Content-Type", headers)
+        self.assertIsNone(headers.get("Accept"))
+
+    def test_multi_value(self):
+        """测试重复头部保留全部值并按约定合并"""
+        headers = RequestHeaders([
+            ("Accept", "text/html"),
+            ("accept", "application/json"),
+            ("Cookie", "a=1"),
+            ("Cookie", "b=2"),
+        ])
+        self.assertEqual(headers["accept"], "text/html, application/json")
+        self.assertEqual(headers.get_all("Accept"), ["text/html", "application/json"])
+        self.assertEqual(headers["cookie"], "a=1; b=2")
+        self.assertEqual(headers.get_all("X-Missing"), [])
+
+    def test_from_environ(self):
+        """测试从 environ 构建"""
+        headers = RequestHeaders.from_environ({
+            "HTTP_USER_AGENT": "test",
+            "CONTENT_TYPE": "text/plain",
+            "CONTENT_LENGTH": "3",
+            "PATH_INFO": "/",
+        })
+        self.assertEqual(dict(headers), {
+            "user-agent": "test",
+            "content-type": "text/plain",
+            "content-length": "3",
+        })
+
+    def test_from_asgi(self):
+        """测试从 ASGI headers 构建"""
+        headers = RequestHeaders.from_asgi([
+            (b"host", b"localhost"),
+            (b"cookie", b"a=1"),
+            (b"cookie", b"b=2"),
+        ])
+        self.assertEqual(headers["Host"], "localhost")
+        self.assertEqual(headers.get_all("cookie"), ["a=1", "b=2"])
+
+
+class TestParseCookie(unittest.TestCase):
+    """测试 parse_cookie"""
+
+    def test_parse(self):
+        """测试基本解析"""
+        self.assertEqual(
+            parse_cookie("session_id=abc123; theme=dark"),
+            {"session_id": "abc123", "theme": "dark"},
+        )
+        self.assertEqual(parse_cookie(""), {})
+        self.assertEqual(parse_cookie(None), {})
+
+    def test_quoted_value(self):
+        """测试带引号的值"""
+        self.assertEqual(parse_cookie('name="hello world"'), {"name": "hello world"})
+
+    def test_invalid_chunk(self):
+        """测试不合法片段只跳过自身"""
+        self.assertEqual(
+            parse_cookie("a=1; invalid; =x; b=2=3"),
+            {"a": "1", "b": "2=3"},
+        )
+
+    def test_duplicate_name(self):
+        """测试同名 Cookie 以最后出现的为准"""
+        self.assertEqual(parse_cookie("a=1; a=2"), {"a": "2"})
+
+
+class TestRequestHandlerHeaders(unittest.TestCase):
+    """测试处理器按请求缓存请求头和 Cookie"""
+
+    def setUp(self):
+        self.app = Mock()
+        self.app.config.session_name = "session_id"
+        self.app.sessions.get = Mock(return_value=None)
+        self.app._get_middleware_instances = Mock(return_value=[])
+        self.environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": "/",
+            "HTTP_COOKIE": "session_id=abc123; theme=dark",
+            "HTTP_USER_AGENT": "test",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "8000",
+            "CONTENT_LENGTH": "0",
+            "CONTENT_TYPE": "",
+        }
+
+    def test_cached(self):
+        """测试多次访问返回同一对象"""
+        handler = WSGIRequestHandler(self.app, self.environ)
+        self.assertIs(handler.headers, handler.headers)
+        self.assertIs(handler.cookies, handler.cookies)
+        self.assertIs(handler.cookie, handler.cookie)
+        self.assertEqual(handler.headers["User-Agent"], "test")
+        self.assertEqual(handler.cookies, {"session_id": "abc123", "theme": "dark"})
+        self.assertEqual(handler.cookie["theme"].value, "dark")
+
+    def test_session_lookup(self):
+        """测试会话查找使用解析后的 Cookie"""
+        WSGIRequestHandler(self.app, self.environ)
+        self.app.sessions.get.assert_called_once_with("abc123")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import gzip
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from litefs import Litefs
+from litefs.cache import MemoryCache
+from litefs.handlers.response import Response
+from litefs.middleware import Middleware, ResponseCacheMiddleware
+from litefs.middleware.response_cache import parse_cache_control
+
+
+class CountingMiddleware(Middleware):
+    """记录经过请求处理器的请求数"""
+
+    requests = 0
+
+    def process_request(self, request_handler):
+        CountingMiddleware.requests += 1
+
+
+class TestResponseCacheMiddleware(unittest.TestCase):
+    """测试 ResponseCacheMiddleware"""
+
+    def setUp(self):
+        CountingMiddleware.requests = 0
+        self.calls = []
+        self.cache = MemoryCache(max_size=100)
+        self.app = Litefs()
+        self.app.add_middleware(ResponseCacheMiddleware, cache=self.cache)
+        self.app.add_middleware(CountingMiddleware)
+
+        @self.app.add_get('/page')
+        def page(request):
+            self.calls.append(request.params.get('q'))
+            body = 'page %s ' % request.params.get('q') + 'x' * 2000
+            return Response(body, 200, [
+                ('Content-Type', 'text/html; charset=utf-8'),
+                ('Cache-Control', 'public, max-age=60'),
+            ])
+
+        @self.app.add_get('/lang')
+        def lang(request):
+            self.calls.append('lang')
+            return Response(request.environ.get('HTTP_ACCEPT_LANGUAGE', ''), 200, [
+                ('Cache-Control', 'max-age=60'),
+                ('Vary', 'Accept-Language'),
+            ])
+
+        @self.app.add_get('/private')
+        def private(request):
+            self.calls.append('private')
+            return Response('secret', 200, [('Cache-Control', 'private, max-age=60')])
+
+        @self.app.add_get('/cookie')
+        def cookie(request):
+            self.calls.append('cookie')
+            response = Response('cookie', 200, [('Cache-Control', 'max-age=60')])
+            return response.set_cookie('theme', 'dark', path=None)
+
+        self.application = self.app.wsgi()
+
+    def request(self, path, query='', method='GET', **headers):
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '8000',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+        }
+        for name, value in headers.items():
+            environ['HTTP_' + name.upper()] = value
+        result = {}
+
+        def start_response(status, response_headers):
+            result['status'] = status
+            result['headers'] = response_headers
+
+        body = b''.join(self.application(environ, start_response))
+        return result['status'], dict(result['headers']), body, result['headers']
+
+    def test_hit_skips_handler(self):
+        """测试命中时不执行处理器和请求阶段的中间件"""
+        status, headers, body, _ = self.request('/page', 'q=1')
+        self.assertEqual(status, '200 OK')
+        self.assertTrue(body.startswith(b'page 1'))
+        etag = headers['ETag']
+
+        status, headers, cached, _ = self.request('/page', 'q=1')
+        self.assertEqual(cached, body)
+        self.assertEqual(headers['ETag'], etag)
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+        self.assertEqual(self.calls, ['1'])
+        self.assertEqual(CountingMiddleware.requests, 1)
+
+        # 查询字符串不同是不同的缓存项
+        self.request('/page', 'q=2')
+        self.assertEqual(self.calls, ['1', '2'])
+
+    def test_not_modified(self):
+        """测试 If-None-Match 匹配时返回 304"""
+        _, headers, _, _ = self.request('/page')
+        status, headers, body, _ = self.request('/page', if_none_match=headers['ETag'])
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_compressed_variant(self):
+        """测试按 Accept-Encoding 返回压缩版本"""
+        _, identity_headers, body, _ = self.request('/page')
+        status, headers, compressed, _ = self.request('/page', accept_encoding='gzip, br')
+
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed), body)
+        self.assertNotEqual(headers['ETag'], identity_headers['ETag'])
+        self.assertIn('Accept-Encoding', headers['Vary'])
+        self.assertEqual(len(self.calls), 1)
+
+        # 第一次请求就接受 gzip 时也返回压缩版本
+        status, headers, compressed, _ = self.request('/page', 'q=3', accept_encoding='gzip')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+
+    def test_vary(self):
+        """测试 Vary 中的请求头是缓存键的一部分"""
+        self.assertEqual(self.request('/lang', accept_language='zh')[2], b'zh')
+        self.assertEqual(self.request('/lang', accept_language='en')[2], b'en')
+        self.assertEqual(self.request('/lang', accept_language='zh')[2], b'zh')
+        self.assertEqual(self.calls, ['lang', 'lang'])
+
+    def test_not_cacheable(self):
+        """测试 private、带其他 cookie 和非 GET 请求不缓存"""
+        self.request('/private')
+        self.request('/private')
+        self.request('/cookie')
+        _, _, _, raw_headers = self.request('/cookie')
+        self.request('/page', method='POST')
+        self.assertEqual(self.calls.count('private'), 2)
+        self.assertEqual(self.calls.count('cookie'), 2)
+        self.assertIn(('Set-Cookie', 'theme=dark; SameSite=Lax'), raw_headers)
+
+    def test_session_cookie_not_cached(self):
+        """测试会话 cookie 只发送给触发缓存的请求"""
+        _, _, _, first = self.request('/page')
+        _, _, _, second = self.request('/page')
+        session_name = self.app.config.session_name
+        self.assertTrue(any(v.startswith(session_name + '=') for k, v in first if k == 'Set-Cookie'))
+        self.assertFalse(any(k == 'Set-Cookie' for k, v in second))
+
+    def test_invalidate(self):
+        """测试使缓存失效"""
+        self.request('/page', 'q=1')
+        middleware = [m for m in self.app._get_middleware_instances()
+                      if isinstance(m, ResponseCacheMiddleware)][0]
+        middleware.invalidate('/page', 'q=1')
+        self.request('/page', 'q=1')
+        self.assertEqual(self.calls, ['1', '1'])
+
+    def test_asgi(self):
+        """测试 ASGI 应用命中时不读取请求体、不执行处理器"""
+        application = self.app.asgi()
+
+        async def call():
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': '/page', 'query_string': b'',
+                'headers': [], 'server': ('localhost', 8000), 'client': ('127.0.0.1', 1234),
+            }
+            await application(scope, receive, send)
+            return messages
+
+        first = asyncio.run(call())
+        second = asyncio.run(call())
+        self.assertEqual(first[1]['body'], second[1]['body'])
+        self.assertEqual(self.calls, [None])
+
+
+class TestParseCacheControl(unittest.TestCase):
+    """测试 parse_cache_control"""
+
+    def test_parse(self):
+        self.assertEqual(
+            parse_cache_control('Public, max-age=60, s-maxage="120"'),
+            {'public': None, 'max-age': '60', 's-maxage': '120'},
+        )
+        self.assertEqual(parse_cache_control(None), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试响应编码模块
+"""
+
+import unittest
+
+from litefs import Response, json
+from litefs.handlers.response_encoder import (
+    DEFAULT_HEADERS_BLOCK,
+    ResponseHeaders,
+    encode_body,
+    encode_response,
+    infer_content_type,
+    iter_chunked,
+)
+
+
+class TestResponseHeaders(unittest.TestCase):
+    """测试 ResponseHeaders"""
+
+    def test_case_insensitive(self):
+        """测试头部名称大小写不敏感，后写覆盖先写"""
+        headers = ResponseHeaders([("Content-Type", "text/plain")])
+        headers.add("content-type", "application/json")
+        self.assertIn("CONTENT-TYPE", headers)
+        self.assertEqual(headers.get("Content-Type"), "application/json")
+        self.assertEqual(len(headers), 1)
+
+    def test_multi_value_headers(self):
+        """测试 Set-Cookie 允许重复"""
+        headers = ResponseHeaders()
+        headers.add("Set-Cookie", "a=1")
+        headers.append(("Set-Cookie", "b=2"))
+        self.assertEqual(headers.get_all("set-cookie"), ["a=1", "b=2"])
+        headers.set("Set-Cookie", "c=3")
+        self.assertEqual(headers.get_all("Set-Cookie"), ["c=3"])
+
+    def test_default_headers_block(self):
+        """测试默认头部未改写时复用预编码字节块"""
+        headers = ResponseHeaders([("Content-Type", "text/plain")], defaults=True)
+        self.assertTrue(headers.encode().startswith(DEFAULT_HEADERS_BLOCK))
+        self.assertTrue(headers.encode().endswith(b"Content-Type: text/plain\r\n"))
+
+        headers.set("Server", "custom")
+        self.assertIn(b"Server: custom\r\n", headers.encode())
+        self.assertFalse(headers.encode().startswith(DEFAULT_HEADERS_BLOCK))
+
+    def test_remove(self):
+        """测试移除头部"""
+        headers = ResponseHeaders([("X-A", "1"), ("X-B", "2")])
+        del headers["x-a"]
+        self.assertNotIn("X-A", headers)
+        self.assertEqual(headers["X-B"], "2")
+        with self.assertRaises(KeyError):
+            headers["X-A"]
+
+
+class TestEncodeBody(unittest.TestCase):
+    """测试响应体编码"""
+
+    def test_infer_content_type(self):
+        """测试 Content-Type 推断"""
+        self.assertIn("text/html", infer_content_type("hello"))
+        self.assertIn("application/json", infer_content_type({"a": 1}))
+        self.assertIn("application/json", infer_content_type([1, 2]))
+        self.assertEqual(infer_content_type(b"data"), "application/octet-stream")
+        self.assertIn("text/plain", infer_content_type(iter(["a"])))
+        self.assertIn("text/html", infer_content_type({"a": 1}, 500))
+
+    def test_fixed_length(self):
+        """测试定长内容"""
+        self.assertEqual(encode_body("你好"), ([b"\xe4\xbd\xa0\xe5\xa5\xbd"], 6))
+        self.assertEqual(encode_body(b"abc"), ([b"abc"], 3))
+        self.assertEqual(encode_body(None), ([], 0))
+        body, length = encode_body({"a": 1})
+        self.assertEqual(json.loads(body[0]), {"a": 1})
+        self.assertEqual(length, len(body[0]))
+        self.assertEqual(encode_body(["a", b"b", 1], "text/plain"), ([b"ab1"], 3))
+
+    def test_json_string(self):
+        """测试 JSON 响应中的字符串"""
+        content_type = "application/json; charset=utf-8"
+        self.assertEqual(encode_body("2024-01-01", content_type)[0], [b'"2024-01-01"'])
+        self.assertEqual(encode_body('{"a": 1}', content_type)[0], [b'{"a": 1}'])
+
+    def test_stream(self):
+        """测试流式内容逐块编码并跳过空块"""
+        body, length = encode_body(item for item in ["a", "", b"b", 1])
+        self.assertIsNone(length)
+        self.assertEqual(list(body), [b"a", b"b", b"1"])
+
+    def test_iter_chunked(self):
+        """测试 chunked 编码"""
+        self.assertEqual(
+            b"".join(iter_chunked([b"hello", b"", b"world!"])),
+            b"5\r\nhello\r\n6\r\nworld!\r\n0\r\n\r\n",
+        )
+
+
+class TestEncodeResponse(unittest.TestCase):
+    """测试 encode_response"""
+
+    def test_bare_content(self):
+        """测试裸内容"""
+        response = encode_response({"name": "tom"})
+        self.assertEqual(response.status, "200 OK")
+        self.assertIn("application/json", response.headers["Content-Type"])
+        self.assertEqual(response.headers["Content-Length"], str(response.length))
+        self.assertIn("Server", response.headers)
+
+    def test_triple(self):
+        """测试三元组返回值"""
+        response = encode_response(
+            ("404 Not Found", [("Content-Type", "text/plain")], "missing")
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.headers["Content-Type"], "text/plain")
+        self.assertEqual(response.body, [b"missing"])
+
+    def test_response_object(self):
+        """测试 Response 对象"""
+        response = encode_response(Response.json({"ok": True}, status_code=201))
+        self.assertEqual(response.status, "201 Created")
+        self.assertEqual(json.loads(response.body[0]), {"ok": True})
+
+    def test_stream_chunked(self):
+        """测试流式响应按需添加 Transfer-Encoding"""
+        response = encode_response(iter(["a", "b"]))
+        self.assertNotIn("Transfer-Encoding", response.headers)
+        self.assertNotIn("Content-Length", response.headers)
+
+        response = encode_response(iter(["a", "b"]), chunked=True)
+        self.assertTrue(response.chunked)
+
+    def test_bodyless_status(self):
+        """测试 304 响应不携带响应体"""
+        response = encode_response(Response("ignored", 304))
+        self.assertEqual(response.body, [])
+        self.assertNotIn("Content-Length", response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -113,6 +113,41 @@ class TestSession(unittest.TestCase):
         self.assertEqual(session.data['bool'], True)
         self.assertIsNone(session.data['none'])
 
+    def test_modified_flag(self):
+        """测试写入和删除键时设置修改标记"""
+        session = Session('test_session_id')
+        self.assertFalse(session.modified)
+
+        session['user'] = 'tom'
+        self.assertTrue(session.modified)
+
+        session.modified = False
+        del session['user']
+        self.assertTrue(session.modified)
+
+    def test_save_resets_modified(self):
+        """测试保存后清除修改标记"""
+        class Store:
+            def __init__(self):
+                self.saved = {}
+
+            def put(self, session_id, session):
+                self.saved[session_id] = session
+
+        store = Store()
+        session = Session(store=store)
+        session['key'] = 'value'
+        self.assertTrue(session.save())
+        self.assertFalse(session.modified)
+        self.assertIn(session.id, store.saved)
+
+    def test_generated_id(self):
+        """测试自动生成的 Session ID 唯一且 URL 安全"""
+        ids = {Session().id for _ in range(100)}
+        self.assertEqual(len(ids), 100)
+        for session_id in ids:
+            self.assertRegex(session_id, r'^[A-Za-z0-9_-]+$')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from litefs.cache import CacheBackend, CacheFactory, SharedMemoryCache
+
+
+def start_child(func):
+    """在 fork 出的子进程中执行 func，func 抛出异常时子进程退出码为 1"""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            func()
+            code = 0
+        finally:
+            os._exit(code)
+    return pid
+
+
+def wait_child(pid):
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), '需要 fork')
+class TestSharedMemoryCache(unittest.TestCase):
+    """测试 SharedMemoryCache"""
+
+    def _cache(self, **kwargs):
+        cache = SharedMemoryCache(**kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_put_get_delete(self):
+        """测试基本读写"""
+        cache = self._cache(max_size=64, slot_size=256)
+
+        cache.put('user:1', {'id': 1, 'tags': ['a', 'b']})
+        cache.put('count', 3)
+        cache.put('count', 4)
+
+        self.assertEqual(cache.get('user:1'), {'id': 1, 'tags': ['a', 'b']})
+        self.assertEqual(cache.get('count'), 4)
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(len(cache), 2)
+
+        cache.delete('count')
+        self.assertIsNone(cache.get('count'))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+
+    def test_shared_across_fork(self):
+        """测试 fork 出的工作进程读写同一份数据"""
+        cache = self._cache(max_size=64, slot_size=256)
+        cache.put('from_parent', 'parent')
+
+        def child():
+            assert cache.get('from_parent') == 'parent'
+            cache.put('from_child', 'child')
+            cache.delete('from_parent')
+
+        self.assertEqual(wait_child(start_child(child)), 0)
+        self.assertEqual(cache.get('from_child'), 'child')
+        self.assertIsNone(cache.get('from_parent'))
+
+    def test_open_by_path(self):
+        """测试按路径打开同一个缓存，参数以文件中的为准"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'cache.shm')
+
+        first = self._cache(max_size=32, slot_size=128, path=path)
+        second = self._cache(max_size=1000, slot_size=4096, path=path)
+        first.put('key', 'value')
+
+        self.assertEqual(second.get('key'), 'value')
+        self.assertEqual(second.get_stats()['max_size'], 32)
+
+        with open(os.path.join(directory, 'other'), 'wb') as f:
+            f.write(b'x' * 100)
+        with self.assertRaises(ValueError):
+            SharedMemoryCache(path=os.path.join(directory, 'other'))
+
+    def test_expiration(self):
+        """测试默认过期时间和按键设置的过期时间"""
+        cache = self._cache(max_size=64, slot_size=256, expiration_time=0.05)
+
+        cache.put('default', 1)
+        cache.put('custom', 2, 60)
+        time.sleep(0.1)
+
+        self.assertIsNone(cache.get('default'))
+        self.assertEqual(cache.get('custom'), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_eviction(self):
+        """测试组满时淘汰最久未访问的槽"""
+        cache = self._cache(max_size=4, slot_size=128, ways=4)
+
+        for i in range(4):
+            cache.put(f'key{i}', i)
+        cache.get('key0')
+        cache.put('key4', 4)
+
+        self.assertEqual(len(cache), 4)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertEqual(cache.get('key4'), 4)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_value_too_large(self):
+        """测试超过槽容量的值不缓存，并删除旧值"""
+        cache = self._cache(max_size=16, slot_size=128)
+
+        cache.put('key', 'small')
+        cache.put('key', 'x' * 1000)
+
+        self.assertIsNone(cache.get('key'))
+
+    def test_concurrent_writers(self):
+        """测试多个进程和线程同时写入同一批键时不会读到不完整的值"""
+        cache = self._cache(max_size=64, slot_size=512, ways=4)
+        keys = [f'key{i}' for i in range(16)]
+
+        def writer(tag):
+            for n in range(300):
+                key = keys[n % len(keys)]
+                cache.put(key, {'key': key, 'tag': tag, 'payload': tag * (n % 50)})
+
+        def reader():
+            for n in range(3000):
+                key = keys[n % len(keys)]
+                value = cache.get(key)
+                assert value is None or value['key'] == key, value
+
+        def child():
+            threads = [threading.Thread(target=writer, args=('c',)), threading.Thread(target=reader)]
+            for thread in threads:
+                thread.start()
+            writer('d')
+            for thread in threads:
+                thread.join()
+
+        pid = start_child(child)
+        writer('p')
+        reader()
+        self.assertEqual(wait_child(pid), 0)
+
+    def test_factory(self):
+        """测试通过工厂创建"""
+        cache = CacheFactory.create_cache(CacheBackend.SHM, max_size=128, expiration_time=60)
+        self.addCleanup(cache.close)
+        self.assertIsInstance(cache, SharedMemoryCache)
+        self.assertEqual(cache.get_stats()['max_size'], 128)
+
+        class Config:
+            cache_backend = CacheBackend.SHM
+            cache_max_size = 256
+            cache_shm_slot_size = 2048
+
+        cache = CacheFactory.create_from_config(Config())
+        self.addCleanup(cache.close)
+        self.assertEqual(cache.get_stats()['slot_size'], 2048)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试静态文件处理器
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from litefs.static_compress import (
+    compress_directory,
+    compress_file,
+    parse_accept_encoding,
+)
+from litefs.static_handler import StaticFileHandler, parse_range
+
+
+def wait_compress(handler):
+    """等待后台压缩完成，压缩线程只有一个，提交一个空任务即可"""
+    if handler._executor is not None:
+        handler._executor.submit(lambda: None).result()
+
+
+class TestStaticFileHandler(unittest.TestCase):
+    """测试 StaticFileHandler 的响应和缓存"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self._write('app.js', 'console.log(1);')
+        self._write('style.css', 'body { color: red; }\n' * 100)
+        os.makedirs(os.path.join(self.directory, 'img'))
+        self._write('img/a.bin', 'x' * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def _handler(self, **kwargs):
+        kwargs.setdefault('watch', False)
+        handler = StaticFileHandler(self.directory, **kwargs)
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_serve(self):
+        """测试正常响应、压缩和错误状态"""
+        handler = self._handler()
+        status, headers, body = handler.serve('/app.js')
+        headers = dict(headers)
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'console.log(1);')
+        self.assertIn('javascript', headers['Content-Type'])
+        self.assertTrue(headers['ETag'].startswith('"'))
+
+        # 后台压缩完成前返回未压缩的内容
+        release = threading.Event()
+        compress_entry = handler._compress_entry
+        handler._compress_entry = lambda *args: release.wait(5) and compress_entry(*args)
+        status, headers, _ = handler.serve('style.css', {'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', dict(headers))
+        release.set()
+        wait_compress(handler)
+        status, headers, body = handler.serve('style.css', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(dict(headers)['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), b'body { color: red; }\n' * 100)
+
+        self.assertEqual(handler.serve('missing.js')[0], 404)
+        self.assertEqual(handler.serve('img')[0], 403)
+        self.assertEqual(handler.serve('../etc/passwd')[0], 403)
+
+    def test_conditional(self):
+        """测试 If-None-Match 和 If-Modified-Since"""
+        handler = self._handler()
+        _, headers, _ = handler.serve('app.js')
+        headers = dict(headers)
+        etag = headers['ETag']
+
+        self.assertEqual(handler.serve('app.js', {'If-None-Match': etag})[0], 304)
+        self.assertEqual(handler.serve('app.js', {'If-None-Match': f'"x", W/{etag}'})[0], 304)
+        self.assertEqual(handler.serve('app.js', {'If-None-Match': '"x"'})[0], 200)
+        self.assertEqual(handler.serve('app.js', {'If-Modified-Since': headers['Last-Modified']})[0], 304)
+        self.assertEqual(
+            handler.serve('app.js', {'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'})[0], 200
+        )
+
+    def test_cache_hit_without_syscalls(self):
+        """测试监控目录时命中缓存不访问文件系统"""
+        handler = self._handler(watch=True)
+        handler.serve('app.js')
+        with mock.patch('litefs.static_handler.os.stat', side_effect=AssertionError), \
+                mock.patch('pathlib.Path.resolve', side_effect=AssertionError):
+            status, _, body = handler.serve('app.js')
+        self.assertEqual((status, body), (200, b'console.log(1);'))
+        self.assertEqual(handler.get_cache_info()['hits'], 1)
+
+    def test_lru_bounded_by_bytes(self):
+        """测试按总字节数淘汰最久未使用的文件"""
+        for i in range(5):
+            self._write(f'f{i}.bin', str(i) * 100)
+        handler = self._handler(cache_max_bytes=400)
+
+        for name in ('f0.bin', 'f1.bin', 'f2.bin', 'f3.bin', 'f0.bin', 'f4.bin'):
+            handler.serve(name)
+
+        info = handler.get_cache_info()
+        self.assertEqual(info['cached_files'], ['f2.bin', 'f3.bin', 'f0.bin', 'f4.bin'])
+        self.assertEqual(info['cache_bytes'], 400)
+        self.assertEqual(info['evictions'], 1)
+
+        # 超过缓存总大小四分之一的文件只缓存元数据
+        self._write('big.bin', 'b' * 200)
+        self.assertEqual(handler.serve('big.bin')[2], b'b' * 200)
+        info = handler.get_cache_info()
+        self.assertIn('big.bin', info['cached_files'])
+        self.assertEqual(info['cache_bytes'], 400)
+
+    def test_lru_bounded_by_count(self):
+        """测试按文件数量淘汰"""
+        handler = self._handler(cache_size=1)
+        handler.serve('app.js')
+        handler.serve('img/a.bin')
+        self.assertEqual(handler.get_cache_info()['cached_files'], ['img/a.bin'])
+
+    def test_revalidate_without_watch(self):
+        """测试不监控目录时命中缓存会检查文件是否变化"""
+        handler = self._handler()
+        handler.serve('app.js')
+        self._write('app.js', 'console.log(2);')
+        os.utime(os.path.join(self.directory, 'app.js'), (time.time() + 10, time.time() + 10))
+        self.assertEqual(handler.serve('app.js')[2], b'console.log(2);')
+
+        os.remove(os.path.join(self.directory, 'app.js'))
+        self.assertEqual(handler.serve('app.js')[0], 404)
+
+    def test_invalidate(self):
+        """测试按文件、目录和全部失效"""
+        handler = self._handler()
+        handler.serve('app.js')
+        handler.serve('img/a.bin')
+
+        handler.invalidate(os.path.join(os.path.realpath(self.directory), 'img'))
+        self.assertEqual(handler.get_cache_info()['cached_files'], ['app.js'])
+        handler.clear_cache()
+        self.assertEqual(handler.get_cache_info()['cache_bytes'], 0)
+
+    def test_load_during_invalidate_not_cached(self):
+        """测试读取文件期间发生失效时不缓存读到的内容"""
+        handler = self._handler()
+        load_entry = handler._load_entry
+
+        def racing_load(*args):
+            entry = load_entry(*args)
+            handler.invalidate()
+            return entry
+
+        with mock.patch.object(handler, '_load_entry', side_effect=racing_load):
+            self.assertEqual(handler.serve('app.js')[0], 200)
+        self.assertEqual(handler.get_cache_info()['cached_files'], [])
+
+    def test_watch_invalidates(self):
+        """测试文件修改和删除事件使缓存失效"""
+        handler = self._handler(watch=True)
+        self.assertTrue(handler.get_cache_info()['watching'])
+        handler.serve('app.js')
+        handler.serve('img/a.bin')
+
+        self._write('app.js', 'console.log(2);')
+        os.remove(os.path.join(self.directory, 'img', 'a.bin'))
+        deadline = time.time() + 5
+        while handler.get_cache_info()['cached_files'] and time.time() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(handler.get_cache_info()['cached_files'], [])
+        self.assertEqual(handler.serve('app.js')[2], b'console.log(2);')
+        self.assertEqual(handler.serve('img/a.bin')[0], 404)
+
+
+class TestStaticCompression(unittest.TestCase):
+    """测试预压缩文件和 Accept-Encoding 协商"""
+
+    CSS = b'body { color: red; }\n' * 100
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.css = os.path.join(self.directory, 'style.css')
+        with open(self.css, 'wb') as f:
+            f.write(self.CSS)
+        compress_file(self.css, ['gzip'])
+        # 测试环境不一定安装 brotli，直接写入一个 .br 文件
+        self._write_sibling('.br', b'fake brotli')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_sibling(self, suffix, content):
+        path = self.css + suffix
+        with open(path, 'wb') as f:
+            f.write(content)
+        st = os.stat(self.css)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    def _handler(self, **kwargs):
+        kwargs.setdefault('watch', False)
+        kwargs.setdefault('lazy_compress', False)
+        handler = StaticFileHandler(self.directory, **kwargs)
+        self.addCleanup(handler.close)
+        return handler
+
+    def _serve(self, handler, accept_encoding=None, **headers):
+        if accept_encoding is not None:
+            headers['Accept-Encoding'] = accept_encoding
+        status, response_headers, body = handler.serve('style.css', headers)
+        return status, dict(response_headers), body
+
+    def test_parse_accept_encoding(self):
+        """测试解析 q 值和 x-gzip"""
+        self.assertEqual(parse_accept_encoding('gzip, br;q=0.5, *;q=0'),
+                         {'gzip': 1.0, 'br': 0.5, '*': 0.0})
+        self.assertEqual(parse_accept_encoding('x-gzip; q=bad'), {'gzip': 0.0})
+        self.assertEqual(parse_accept_encoding(None), {})
+
+    def test_negotiation(self):
+        """测试按服务器优先顺序选择客户端接受的预压缩版本"""
+        handler = self._handler()
+
+        status, headers, body = self._serve(handler, 'gzip, deflate, br')
+        self.assertEqual((headers['Content-Encoding'], body), ('br', b'fake brotli'))
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+
+        status, headers, body = self._serve(handler, 'gzip, br;q=0')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.CSS)
+
+        for accept_encoding in (None, 'identity', 'gzip;q=0, br;q=0'):
+            status, headers, body = self._serve(handler, accept_encoding)
+            self.assertNotIn('Content-Encoding', headers)
+            self.assertEqual(headers['Vary'], 'Accept-Encoding')
+            self.assertEqual(body, self.CSS)
+
+        # * 表示接受任意编码
+        status, headers, _ = self._serve(handler, '*')
+        self.assertEqual(headers['Content-Encoding'], 'br')
+
+    def test_variant_etags(self):
+        """测试每个版本有各自的 ETag"""
+        handler = self._handler()
+        _, br_headers, _ = self._serve(handler, 'br')
+        _, plain_headers, _ = self._serve(handler)
+        self.assertNotEqual(br_headers['ETag'], plain_headers['ETag'])
+
+        status, headers, _ = self._serve(handler, 'br', **{'If-None-Match': br_headers['ETag']})
+        self.assertEqual(status, 304)
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        status, _, _ = self._serve(handler, 'gzip', **{'If-None-Match': br_headers['ETag']})
+        self.assertEqual(status, 200)
+
+    def test_stale_sibling_ignored(self):
+        """测试比原文件旧的预压缩文件不使用"""
+        self._write_sibling('.br', b'old brotli')
+        future = time.time() + 10
+        os.utime(self.css, (future, future))
+        handler = self._handler()
+        _, headers, _ = self._serve(handler, 'br, gzip')
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_disabled(self):
+        """测试关闭压缩"""
+        handler = self._handler(enable_gzip=False)
+        _, headers, body = self._serve(handler, 'br, gzip')
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertNotIn('Vary', headers)
+        self.assertEqual(body, self.CSS)
+
+    def test_lazy_compress(self):
+        """测试没有预压缩文件时在后台压缩"""
+        for suffix in ('.gz', '.br'):
+            os.remove(self.css + suffix)
+        handler = self._handler(lazy_compress=True)
+        release = threading.Event()
+        compress_entry = handler._compress_entry
+        handler._compress_entry = lambda *args: release.wait(5) and compress_entry(*args)
+        _, headers, _ = self._serve(handler, 'gzip')
+        self.assertNotIn('Content-Encoding', headers)
+
+        release.set()
+        wait_compress(handler)
+        _, headers, body = self._serve(handler, 'gzip')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.CSS)
+        self.assertEqual(handler.get_cache_info()['cache_bytes'], len(self.CSS) + len(body))
+
+    def test_sibling_change_invalidates(self):
+        """测试预压缩文件更新时原文件的缓存失效"""
+        handler = self._handler(watch=True)
+        self._serve(handler, 'br')
+        self._write_sibling('.br', b'new brotli')
+        deadline = time.time() + 5
+        while handler.get_cache_info()['cached_files'] and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self._serve(handler, 'br')[2], b'new brotli')
+
+    def test_compress_file(self):
+        """测试生成预压缩文件：修改时间与原文件相同，已是最新时跳过"""
+        os.remove(self.css + '.gz')
+        self.assertEqual(list(compress_file(self.css, ['gzip'])), ['gzip'])
+        self.assertEqual(os.stat(self.css + '.gz').st_mtime_ns, os.stat(self.css).st_mtime_ns)
+        with open(self.css + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), self.CSS)
+        self.assertEqual(compress_file(self.css, ['gzip']), {})
+        self.assertEqual(list(compress_file(self.css, ['gzip'], force=True)), ['gzip'])
+
+        # 压缩后不比原文件小时不生成
+        tiny = os.path.join(self.directory, 'tiny.css')
+        with open(tiny, 'wb') as f:
+            f.write(b'a')
+        self.assertEqual(compress_file(tiny, ['gzip']), {})
+        self.assertFalse(os.path.exists(tiny + '.gz'))
+
+    def test_compress_directory(self):
+        """测试压缩目录下的可压缩文件，跳过小文件、二进制文件和预压缩文件"""
+        os.makedirs(os.path.join(self.directory, 'js'))
+        with open(os.path.join(self.directory, 'js', 'app.js'), 'wb') as f:
+            f.write(b'console.log(1);\n' * 200)
+        with open(os.path.join(self.directory, 'logo.png'), 'wb') as f:
+            f.write(b'\x89PNG' * 1000)
+        with open(os.path.join(self.directory, 'small.css'), 'wb') as f:
+            f.write(b'a {}')
+
+        stats = compress_directory(self.directory, ['gzip'], force=True)
+        self.assertEqual(stats['files'], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'js', 'app.js.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'logo.png.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'small.css.gz')))
+        self.assertFalse(os.path.exists(self.css + '.br.gz'))
+        self.assertGreater(stats['compressed']['gzip'], 0)
+
+
+class TestStaticRange(unittest.TestCase):
+    """测试 Range 和 If-Range"""
+
+    DATA = bytes(range(256)) * 40
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'video.mp4'), 'wb') as f:
+            f.write(self.DATA)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _handler(self, **kwargs):
+        kwargs.setdefault('watch', False)
+        handler = StaticFileHandler(self.directory, **kwargs)
+        self.addCleanup(handler.close)
+        return handler
+
+    def _serve(self, handler, range_header, **headers):
+        headers['Range'] = range_header
+        status, response_headers, body = handler.serve('video.mp4', headers)
+        return status, dict(response_headers), body
+
+    def test_parse_range(self):
+        """测试解析、截断、合并和格式错误"""
+        self.assertEqual(parse_range('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parse_range('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parse_range('bytes=-10', 100), [(90, 99)])
+        self.assertEqual(parse_range('bytes=-500', 100), [(0, 99)])
+        self.assertEqual(parse_range('bytes=50-500', 100), [(50, 99)])
+        self.assertEqual(parse_range('bytes=20-29, 0-9, 5-14, 30-39', 100), [(0, 14), (20, 39)])
+        self.assertEqual(parse_range('bytes=100-200', 100), [])
+        self.assertEqual(parse_range('bytes=-0', 100), [])
+        for header in ('items=0-9', 'bytes=9-0', 'bytes=a-b', 'bytes=0-9x', 'bytes=5'):
+            self.assertIsNone(parse_range(header, 100), header)
+
+    def test_single_range(self):
+        """测试单个范围返回 206 和 Content-Range"""
+        handler = self._handler()
+        status, headers, body = self._serve(handler, 'bytes=100-199')
+        self.assertEqual(status, 206)
+        self.assertEqual(body, self.DATA[100:200])
+        self.assertEqual(headers['Content-Range'], f'bytes 100-199/{len(self.DATA)}')
+        self.assertEqual(headers['Content-Length'], '100')
+        self.assertEqual(headers['Content-Type'], 'video/mp4')
+
+        status, headers, body = self._serve(handler, 'bytes=-16')
+        self.assertEqual(body, self.DATA[-16:])
+
+    def test_multiple_ranges(self):
+        """测试多个范围返回 multipart/byteranges"""
+        handler = self._handler()
+        status, headers, body = self._serve(handler, 'bytes=0-9,1000-1009')
+        self.assertEqual(status, 206)
+        content_type = headers['Content-Type']
+        self.assertTrue(content_type.startswith('multipart/byteranges; boundary='))
+        boundary = content_type.split('=', 1)[1].encode()
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+
+        parts = body.split(b'--' + boundary)
+        self.assertEqual(parts[-1], b'--\r\n')
+        head, _, data = parts[1].partition(b'\r\n\r\n')
+        self.assertIn(b'Content-Range: bytes 0-9/10240', head)
+        self.assertEqual(data, self.DATA[0:10] + b'\r\n')
+        head, _, data = parts[2].partition(b'\r\n\r\n')
+        self.assertIn(b'Content-Range: bytes 1000-1009/10240', head)
+        self.assertEqual(data, self.DATA[1000:1010] + b'\r\n')
+
+    def test_unsatisfiable_and_ignored(self):
+        """测试无法满足的范围返回 416，格式错误或范围过多时返回完整内容"""
+        handler = self._handler()
+        status, headers, _ = self._serve(handler, 'bytes=20000-')
+        self.assertEqual(status, 416)
+        self.assertEqual(headers['Content-Range'], 'bytes */10240')
+
+        self.assertEqual(self._serve(handler, 'bytes=oops')[0], 200)
+        many = 'bytes=' + ','.join(f'{i * 10}-{i * 10 + 1}' for i in range(20))
+        self.assertEqual(self._serve(handler, many)[0], 200)
+        self.assertEqual(self._handler(enable_range=False).serve('video.mp4', {'Range': 'bytes=0-9'})[0], 200)
+
+    def test_if_range(self):
+        """测试 If-Range 与当前版本一致时才返回部分内容"""
+        handler = self._handler()
+        _, headers, _ = handler.serve('video.mp4')
+        headers = dict(headers)
+
+        self.assertEqual(self._serve(handler, 'bytes=0-9', **{'If-Range': headers['ETag']})[0], 206)
+        self.assertEqual(self._serve(handler, 'bytes=0-9', **{'If-Range': '"other"'})[0], 200)
+        self.assertEqual(self._serve(handler, 'bytes=0-9', **{'If-Range': 'W/' + headers['ETag']})[0], 200)
+        self.assertEqual(self._serve(handler, 'bytes=0-9', **{'If-Range': headers['Last-Modified']})[0], 206)
+        self.assertEqual(
+            self._serve(handler, 'bytes=0-9', **{'If-Range': 'Thu, 01 Jan 1970 00:00:00 GMT'})[0], 200
+        )
+
+    def test_range_on_compressed_variant(self):
+        """测试范围作用于所选的压缩版本"""
+        css = b'body { color: red; }\n' * 100
+        with open(os.path.join(self.directory, 'style.css'), 'wb') as f:
+            f.write(css)
+        compress_file(os.path.join(self.directory, 'style.css'), ['gzip'])
+        with open(os.path.join(self.directory, 'style.css.gz'), 'rb') as f:
+            compressed = f.read()
+
+        handler = self._handler(lazy_compress=False)
+        status, headers, body = handler.serve('style.css', {'Accept-Encoding': 'gzip', 'Range': 'bytes=0-9'})
+        headers = dict(headers)
+        self.assertEqual((status, body), (206, compressed[:10]))
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Content-Range'], f'bytes 0-9/{len(compressed)}')
+
+    def test_large_file_from_disk(self):
+        """测试超过缓存限制的文件只读取请求的范围"""
+        handler = self._handler(max_file_size=1024)
+        self.assertEqual(handler.serve('video.mp4')[0], 413)
+
+        with mock.patch('builtins.open', side_effect=AssertionError):
+            status, headers, body = self._serve(handler, 'bytes=5000-5099')
+        self.assertEqual((status, body), (206, self.DATA[5000:5100]))
+        self.assertEqual(handler.get_cache_info()['cache_bytes'], 0)
+
+        # 播放器常用的 bytes=0- 被截短为 max_file_size
+        status, headers, body = self._serve(handler, 'bytes=0-')
+        self.assertEqual(status, 206)
+        self.assertEqual(headers['Content-Range'], 'bytes 0-1023/10240')
+        self.assertEqual(body, self.DATA[:1024])
+        self.assertEqual(self._serve(handler, 'bytes=0-999,2000-2999')[0], 413)
+
+    def test_large_file_changed(self):
+        """测试从磁盘读取时发现文件已变化则重新加载"""
+        handler = self._handler(max_file_size=1024, watch=True)
+        self._serve(handler, 'bytes=0-9')
+        with open(os.path.join(self.directory, 'video.mp4'), 'wb') as f:
+            f.write(b'new' * 4000)
+        os.utime(os.path.join(self.directory, 'video.mp4'), (time.time() + 10, time.time() + 10))
+        # 不等待 watchdog 事件，直接请求
+        status, headers, body = self._serve(handler, 'bytes=0-5')
+        self.assertEqual((status, body), (206, b'newnew'))
+        self.assertEqual(headers['Content-Range'], 'bytes 0-5/12000')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试多进程共享的静态资源存储
+"""
+
+import gzip
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from litefs.static_handler import StaticFileHandler
+from litefs.static_store import SharedStaticStore
+
+
+class TestSharedStaticStore(unittest.TestCase):
+    """测试 SharedStaticStore"""
+
+    CSS = b'body { color: red; }\n' * 100
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store_path = os.path.join(tempfile.mkdtemp(), 'static.store')
+        self._write('css/style.css', self.CSS)
+        self._write('logo.png', b'\x89PNG' * 100)
+        self._write('.hidden', b'secret')
+        self._write('big.bin', b'x' * 5000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        shutil.rmtree(os.path.dirname(self.store_path))
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _build(self, **kwargs):
+        kwargs.setdefault('max_file_size', 4096)
+        return SharedStaticStore.build(self.directory, self.store_path, **kwargs)
+
+    def _handler(self, store, **kwargs):
+        handler = StaticFileHandler(self.directory, watch=False, lazy_compress=False, store=store, **kwargs)
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_build(self):
+        """测试生成存储：压缩可压缩文件，跳过隐藏文件和大文件"""
+        store = self._build(encodings=['gzip'])
+        self.assertEqual(len(store), 2)
+        self.assertNotIn('.hidden', store)
+        self.assertNotIn('big.bin', store)
+
+        asset = store.get('css/style.css')
+        self.assertEqual(asset.mime_type, 'text/css')
+        self.assertEqual(bytes(asset.variants['identity']), self.CSS)
+        self.assertEqual(gzip.decompress(asset.variants['gzip']), self.CSS)
+        self.assertEqual(list(store.get('logo.png').variants), ['identity'])
+        self.assertIsNone(store.get('missing.css'))
+
+        # 另一个进程按路径打开同一个文件
+        other = SharedStaticStore(self.store_path)
+        self.assertEqual(bytes(other.get('logo.png').variants['identity']), b'\x89PNG' * 100)
+
+    def test_precompressed_sibling(self):
+        """测试优先使用预压缩文件"""
+        path = os.path.join(self.directory, 'css', 'style.css')
+        sibling = self._write('css/style.css.br', b'fake brotli')
+        st = os.stat(path)
+        os.utime(sibling, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+        store = self._build(compress_missing=False)
+        self.assertEqual(set(store.get('css/style.css').variants), {'identity', 'br'})
+        self.assertNotIn('css/style.css.br', store)
+
+    def test_build_error_removes_temporary_files(self):
+        """测试遍历目录时出错不留下临时文件"""
+        with mock.patch('litefs.static_store.compress', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self._build(encodings=['gzip'])
+        self.assertEqual(os.listdir(os.path.dirname(self.store_path)), [])
+
+    def test_invalid_file(self):
+        """测试打开不是存储格式的文件"""
+        with open(self.store_path, 'wb') as f:
+            f.write(b'not a store at all')
+        with self.assertRaises(ValueError):
+            SharedStaticStore(self.store_path)
+
+    def test_serve_from_store(self):
+        """测试处理器返回映射区域的切片，不占用进程内缓存"""
+        handler = self._handler(self._build(encodings=['gzip']))
+
+        status, headers, body = handler.serve('css/style.css')
+        self.assertEqual(status, 200)
+        self.assertIsInstance(body, memoryview)
+        self.assertIsInstance(body.obj, mmap.mmap)
+        self.assertEqual(bytes(body), self.CSS)
+
+        status, headers, body = handler.serve('css/style.css', {'Accept-Encoding': 'gzip'})
+        self.assertEqual(dict(headers)['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.CSS)
+
+        status, headers, body = handler.serve('logo.png', {'Range': 'bytes=0-3'})
+        self.assertEqual((status, bytes(body)), (206, b'\x89PNG'))
+
+        info = handler.get_cache_info()
+        self.assertEqual(info['cache_bytes'], 0)
+        self.assertEqual(info['store_files'], 2)
+
+    def test_modified_file_not_served_from_store(self):
+        """测试存储生成后被修改的文件从磁盘读取"""
+        handler = self._handler(self._build())
+        path = self._write('logo.png', b'new logo')
+        os.utime(path, (time.time() + 10, time.time() + 10))
+
+        status, _, body = handler.serve('logo.png')
+        self.assertEqual(body, b'new logo')
+        self.assertIsInstance(body, bytes)
+
+    def test_refresh(self):
+        """测试重新生成存储后工作进程映射新文件"""
+        store = self._build(refresh_interval=0)
+        handler = self._handler(store)
+        self.assertEqual(bytes(handler.serve('logo.png')[2]), b'\x89PNG' * 100)
+
+        path = self._write('logo.png', b'new logo')
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self._write('new.txt', b'hello')
+        SharedStaticStore.build(self.directory, self.store_path, max_file_size=4096)
+
+        # 缓存未命中时检查存储文件是否被替换
+        status, _, body = handler.serve('new.txt')
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(bytes(body), b'hello')
+        body = handler.serve('logo.png')[2]
+        self.assertIsInstance(body, memoryview)
+        self.assertEqual(bytes(body), b'new logo')
+        self.assertFalse(store.refresh())
+
+    @unittest.skipUnless(hasattr(os, 'fork'), '需要 fork')
+    def test_shared_across_fork(self):
+        """测试 fork 出的工作进程直接使用继承的映射"""
+        handler = self._handler(self._build())
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                status, _, body = handler.serve('css/style.css')
+                shared = isinstance(body, memoryview)
+                os.write(write_fd, b'%d %d ' % (status, shared) + bytes(body[:20]))
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            result = f.read()
+        os.waitpid(pid, 0)
+        self.assertEqual(result, b'200 1 ' + self.CSS[:20])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试模板片段和页面缓存
+"""
+
+import os
+import shutil
+import tempfile
+import json
+import unittest
+from unittest import mock
+
+from litefs.cache import MemoryCache
+from litefs.template_cache import TemplateCache, make_page_key
+from litefs.template_engine import TemplateEngine
+
+
+class Counter:
+    """记录模板中表达式被求值的次数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return self.count
+
+
+class JsonBackend(MemoryCache):
+    """按 JSON 保存值的后端，与默认配置的 RedisCache、MemcacheCache 一样把元组读回为列表"""
+
+    def put(self, key, val, *args, **kwargs):
+        return super().put(key, json.dumps(val), *args, **kwargs)
+
+    def get(self, key):
+        value = super().get(key)
+        return None if value is None else json.loads(value)
+
+
+class TestTemplateCache(unittest.TestCase):
+    """测试 TemplateCache"""
+
+    def setUp(self):
+        self.backend = MemoryCache(max_size=100)
+        self.cache = TemplateCache(self.backend, default_timeout=60)
+
+    def test_get_set(self):
+        """测试读写和删除"""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 'html')
+        self.assertEqual(self.cache.get('a'), 'html')
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_timeout(self):
+        """测试过期时间由 TemplateCache 自己判断"""
+        with mock.patch('litefs.template_cache.time.time', return_value=1000.0):
+            self.cache.set('a', 'html', timeout=10)
+        with mock.patch('litefs.template_cache.time.time', return_value=1009.0):
+            self.assertEqual(self.cache.get('a'), 'html')
+        with mock.patch('litefs.template_cache.time.time', return_value=1011.0):
+            self.assertIsNone(self.cache.get('a'))
+
+    def test_invalidate_tags(self):
+        """测试按标签失效"""
+        self.cache.set('nav', 'nav', tags='nav, layout')
+        self.cache.set('tile', 'tile', tags=['product'])
+        self.cache.set('plain', 'plain')
+
+        self.cache.invalidate_tags('layout')
+        self.assertIsNone(self.cache.get('nav'))
+        self.assertEqual(self.cache.get('tile'), 'tile')
+        self.assertEqual(self.cache.get('plain'), 'plain')
+
+    def test_evicted_tag_does_not_revive(self):
+        """测试标签版本被后端淘汰后旧条目不会重新生效"""
+        self.cache.set('nav', 'nav', tags=['nav'])
+        self.backend.delete('template:tag:nav')
+        self.assertIsNone(self.cache.get('nav'))
+
+    def test_json_backend(self):
+        """测试 JSON 序列化的后端上带标签的条目可以命中"""
+        cache = TemplateCache(JsonBackend(max_size=100))
+        cache.set('nav', 'nav', tags='nav, layout')
+        self.assertEqual(cache.get('nav'), 'nav')
+        cache.invalidate_tags('layout')
+        self.assertIsNone(cache.get('nav'))
+
+    def test_page_key(self):
+        """测试页面缓存键只由模板名和 vary 变量决定"""
+        a = make_page_key('index.html', {'lang': 'zh', 'user': 1}, ['lang'])
+        b = make_page_key('index.html', {'lang': 'zh', 'user': 2}, ['lang'])
+        c = make_page_key('index.html', {'lang': 'en', 'user': 1}, ['lang'])
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertEqual(make_page_key('index.html', {}), 'page:index.html')
+
+
+class TestTemplateFragmentCache(unittest.TestCase):
+    """测试模板中的片段缓存"""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self._write('page.html', (
+            '<%block name="nav" cached="True" cache_key="nav:${lang}" '
+            'cache_timeout="60" cache_tags="nav">[nav ${counter()} ${lang}]</%block>'
+            '[body ${counter()}]'
+        ))
+        self._write('other.html', (
+            '<%block name="nav" cached="True" cache_key="nav:${lang}">[other ${lang}]</%block>'
+        ))
+        self.cache = TemplateCache(MemoryCache(max_size=100))
+        self.engine = TemplateEngine([self.template_dir], cache=self.cache)
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.template_dir, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_fragment_cached(self):
+        """测试片段只渲染一次，片段外的内容每次都渲染"""
+        counter = Counter()
+        self.assertEqual(self.engine.render('page.html', lang='zh', counter=counter),
+                         '[nav 1 zh][body 2]')
+        self.assertEqual(self.engine.render('page.html', lang='zh', counter=counter),
+                         '[nav 1 zh][body 3]')
+        self.assertEqual(self.engine.render('page.html', lang='en', counter=counter),
+                         '[nav 4 en][body 5]')
+
+    def test_fragment_keyed_by_template(self):
+        """测试不同模板中相同的 cache_key 互不影响"""
+        self.engine.render('page.html', lang='zh', counter=Counter())
+        self.assertEqual(self.engine.render('other.html', lang='zh'), '[other zh]')
+
+    def test_fragment_invalidate_tags(self):
+        """测试按标签失效片段"""
+        counter = Counter()
+        self.engine.render('page.html', lang='zh', counter=counter)
+        self.cache.invalidate_tags('nav')
+        self.assertEqual(self.engine.render('page.html', lang='zh', counter=counter),
+                         '[nav 3 zh][body 4]')
+
+    def test_debug_disables_cache(self):
+        """测试调试模式下不缓存"""
+        engine = TemplateEngine([self.template_dir], cache=self.cache, debug=True)
+        counter = Counter()
+        engine.render('page.html', lang='zh', counter=counter)
+        self.assertEqual(engine.render('page.html', lang='zh', counter=counter),
+                         '[nav 3 zh][body 4]')
+
+    def test_no_cache(self):
+        """测试没有配置缓存时直接渲染"""
+        engine = TemplateEngine([self.template_dir])
+        counter = Counter()
+        engine.render('page.html', lang='zh', counter=counter)
+        self.assertEqual(engine.render('page.html', lang='zh', counter=counter),
+                         '[nav 3 zh][body 4]')
+
+    def test_render_cached(self):
+        """测试整页缓存按 vary 变量区分"""
+        counter = Counter()
+        render = self.engine.render_cached
+        first = render('page.html', cache_vary=['lang'], cache_tags=['page'],
+                       lang='zh', counter=counter)
+        self.assertEqual(render('page.html', cache_vary=['lang'], lang='zh', counter=counter), first)
+        self.assertEqual(counter.count, 2)
+
+        render('page.html', cache_vary=['lang'], lang='en', counter=counter)
+        self.assertEqual(counter.count, 4)
+
+        self.cache.invalidate_tags('page')
+        render('page.html', cache_vary=['lang'], cache_tags=['page'], lang='zh', counter=counter)
+        # 片段仍在缓存中，只有片段外的内容重新渲染
+        self.assertEqual(counter.count, 5)
+
+
+class TestHandlerRenderCached(unittest.TestCase):
+    """测试请求处理器的 render_template_cached"""
+
+    def test_render_template_cached(self):
+        from io import BytesIO
+        from litefs import Litefs
+        from litefs.handlers import WSGIRequestHandler
+
+        template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, template_dir)
+        with open(os.path.join(template_dir, 'hello.html'), 'w', encoding='utf-8') as f:
+            f.write('hello ${name} ${counter()}')
+
+        app = Litefs(template_dir=template_dir)
+        self.addCleanup(app.sessions.clear)
+        handler = WSGIRequestHandler(app, {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'wsgi.input': BytesIO(),
+        })
+        counter = Counter()
+        name = f'test-{id(self)}'
+        self.assertEqual(
+            handler.render_template_cached('hello.html', cache_vary=['name'], name=name, counter=counter),
+            f'hello {name} 1',
+        )
+        self.assertEqual(
+            handler.render_template_cached('hello.html', cache_vary=['name'], name=name, counter=counter),
+            f'hello {name} 1',
+        )
+        app.templates.cache.delete(make_page_key('hello.html', {'name': name}, ['name']))
+
+
+if __name__ == '__main__':
+    unittest.main()
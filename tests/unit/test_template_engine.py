@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+测试应用级模板引擎
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from litefs import Litefs
+from litefs.template_engine import TemplateEngine
+
+
+class TestTemplateEngine(unittest.TestCase):
+    """测试 TemplateEngine"""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.module_dir = tempfile.mkdtemp()
+        self._write('base.html', '<title>${title}</title>${self.body()}')
+        self._write('index.html', '<%inherit file="base.html"/>hello ${name}')
+        os.makedirs(os.path.join(self.template_dir, 'admin'))
+        self._write('admin/list.html', '% for i in items:\n${i}\n% endfor\n')
+        self._write('readme.md', 'not a template')
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+        shutil.rmtree(self.module_dir)
+
+    def _write(self, name, content, mtime=None):
+        path = os.path.join(self.template_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_render(self):
+        """测试渲染和模板继承"""
+        engine = TemplateEngine([self.template_dir])
+        self.assertEqual(
+            engine.render('index.html', title='T', name='tom'),
+            '<title>T</title>hello tom',
+        )
+        self.assertIs(engine.get_template('/index.html'), engine.get_template('index.html'))
+
+    def test_precompile(self):
+        """测试预编译全部模板并写入编译模块目录"""
+        engine = TemplateEngine([self.template_dir], module_directory=self.module_dir)
+        self.assertEqual(sorted(engine.list_templates()),
+                         ['admin/list.html', 'base.html', 'index.html'])
+        self.assertEqual(engine.precompile(), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.module_dir, 'admin', 'list.html.py')))
+
+        # 另一个进程中的引擎直接加载编译好的模块
+        other = TemplateEngine([self.template_dir], module_directory=self.module_dir)
+        self.assertEqual(other.render('admin/list.html', items=[1, 2]), '1\n2\n')
+
+    def test_precompile_error(self):
+        """测试预编译时直接暴露模板语法错误"""
+        self._write('broken.html', '% for x in y\n')
+        engine = TemplateEngine([self.template_dir])
+        with self.assertRaises(Exception):
+            engine.precompile()
+
+    def test_filesystem_checks(self):
+        """测试只有调试模式才检查模板修改时间"""
+        past = time.time() - 100
+        self._write('page.html', 'v1', mtime=past)
+        engine = TemplateEngine([self.template_dir])
+        debug_engine = TemplateEngine([self.template_dir], debug=True)
+        self.assertEqual(engine.render('page.html'), 'v1')
+        self.assertEqual(debug_engine.render('page.html'), 'v1')
+
+        # Mako 按整秒比较修改时间
+        self._write('page.html', 'v2', mtime=time.time() + 10)
+        self.assertEqual(engine.render('page.html'), 'v1')
+        self.assertEqual(debug_engine.render('page.html'), 'v2')
+
+
+class TestAppTemplates(unittest.TestCase):
+    """测试应用共用模板引擎"""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.template_dir, 'hello.html'), 'w', encoding='utf-8') as f:
+            f.write('hello ${name}')
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+
+    def test_shared_engine(self):
+        """测试多个请求共用同一个模板引擎"""
+        from io import BytesIO
+        from litefs.handlers import WSGIRequestHandler
+
+        app = Litefs(template_dir=self.template_dir)
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'wsgi.input': BytesIO()}
+        first = WSGIRequestHandler(app, dict(environ))
+        second = WSGIRequestHandler(app, dict(environ))
+        self.assertEqual(first.render_template('hello.html', name='a'), 'hello a')
+        self.assertEqual(second.render_template('hello.html', name='b'), 'hello b')
+        self.assertIs(app.templates, app.templates)
+        self.assertEqual(len(app.templates.lookup._collection), 1)
+        app.sessions.clear()
+
+    def test_precompile_on_wsgi(self):
+        """测试 precompile_templates 配置在创建 WSGI application 时预编译"""
+        app = Litefs(template_dir=self.template_dir, precompile_templates=True)
+        app.wsgi()
+        self.assertIn('hello.html', app.templates.lookup._collection)
+
+
+class TestTemplateStream(unittest.TestCase):
+    """测试流式渲染"""
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self._write('report.html', (
+            '<head>${title}</head>${flush()}\n'
+            '% for i in range(rows):\n<tr>${i}</tr>\n% endfor\n'
+        ))
+        self._write('fail.html', 'ok\n${1 / 0}')
+        self.engine = TemplateEngine([self.template_dir])
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+
+    def _write(self, name, content):
+        with open(os.path.join(self.template_dir, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_stream_matches_render(self):
+        """测试流式输出与一次性渲染内容一致，flush() 立即输出页面头部"""
+        chunks = list(self.engine.stream('report.html', chunk_size=256, title='报表', rows=500))
+        self.assertEqual(chunks[0], '<head>报表</head>'.encode('utf-8'))
+        self.assertEqual(b''.join(chunks).decode('utf-8'),
+                         self.engine.render('report.html', title='报表', rows=500))
+        self.assertGreater(len(chunks), 10)
+        # 每块不超过目标大小加上一次写入的长度
+        self.assertLess(max(len(c) for c in chunks), 256 + 32)
+
+    def test_stream_is_lazy(self):
+        """测试迭代前不渲染，提前停止时结束渲染 greenlet"""
+        stream = self.engine.stream('report.html', chunk_size=64, title='t', rows=10 ** 6)
+        self.assertEqual(next(stream), b'<head>t</head>')
+        next(stream)
+        stream.close()
+
+    def test_stream_errors(self):
+        """测试找不到模板时立即抛出，渲染中的异常在迭代时抛出"""
+        from mako.exceptions import TopLevelLookupException
+
+        with self.assertRaises(TopLevelLookupException):
+            self.engine.stream('missing.html')
+        with self.assertRaises(ZeroDivisionError):
+            list(self.engine.stream('fail.html'))
+
+    def test_socket_handler_stream(self):
+        """测试内置服务器按 chunked 编码发送并逐块刷新"""
+        from io import BytesIO
+        from litefs.handlers import SocketRequestHandler
+
+        class RW(BytesIO):
+            flushes = 0
+
+            def flush(self):
+                self.flushes += 1
+
+            def close(self):
+                pass
+
+        app = Litefs(template_dir=self.template_dir)
+        self.addCleanup(app.sessions.clear)
+        rw = RW()
+        handler = SocketRequestHandler(app, rw, {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': '/report', 'QUERY_STRING': '',
+        }, None)
+        response = handler.stream_template('report.html', chunk_size=256, title='t', rows=100)
+        handler.finish(response)
+
+        data = rw.getvalue()
+        head, _, body = data.partition(b'\r\n\r\n')
+        self.assertIn(b'Transfer-Encoding: chunked', head)
+        self.assertIn(b'Content-Type: text/html', head)
+        self.assertNotIn(b'Content-Length', head)
+        self.assertTrue(body.startswith(b'e\r\n<head>t</head>\r\n'))
+        self.assertTrue(body.endswith(b'0\r\n\r\n'))
+        self.assertGreater(rw.flushes, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
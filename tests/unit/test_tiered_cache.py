@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../src'))
+
+from litefs.cache import (
+    CacheBackend,
+    CacheFactory,
+    DatabaseCache,
+    MemoryCache,
+    RedisCache,
+    RedisInvalidator,
+    SocketInvalidator,
+    TieredCache,
+)
+
+
+class CountingCache(MemoryCache):
+    """记录 get 次数的 L2"""
+
+    def __init__(self):
+        super().__init__(max_size=1000)
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class TestTieredCache(unittest.TestCase):
+    """测试 TieredCache"""
+
+    def setUp(self):
+        self.l2 = CountingCache()
+
+    def test_read_through(self):
+        """测试 L1 未命中时从 L2 读取并写入 L1"""
+        cache = TieredCache(self.l2)
+        self.l2.put('key', 'value')
+
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(self.l2.reads, 2)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['l1_hits'], 1)
+        self.assertEqual(stats['l2_hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertAlmostEqual(stats['near_hit_rate'], 1 / 3)
+        self.assertEqual(stats['l1']['size'], 1)
+
+    def test_write_and_delete(self):
+        """测试写入和删除同时更新两级"""
+        cache = TieredCache(self.l2)
+
+        cache.put('key', 'value')
+        self.assertEqual(self.l2.get('key'), 'value')
+        self.assertEqual(cache.l1.get('key'), 'value')
+        self.assertEqual(len(cache), 1)
+
+        cache.delete('key')
+        self.assertIsNone(self.l2.get('key'))
+        self.assertIsNone(cache.get('key'))
+
+    def test_l2_expiration(self):
+        """测试 L2 过期时间透传"""
+        l2 = Mock()
+        cache = TieredCache(l2)
+
+        cache.put('a', 1)
+        cache.put('b', 2, 60)
+
+        l2.put.assert_any_call('a', 1)
+        l2.put.assert_any_call('b', 2, 60)
+
+    def test_l1_expiration(self):
+        """测试没有失效通道时旧值最多保留 L1 过期时间"""
+        worker1 = TieredCache(self.l2, l1_expiration_time=0.05)
+        worker2 = TieredCache(self.l2, l1_expiration_time=0.05)
+
+        worker1.put('key', 'old')
+        self.assertEqual(worker2.get('key'), 'old')
+        worker1.put('key', 'new')
+        self.assertEqual(worker2.get('key'), 'old')
+
+        time.sleep(0.1)
+        self.assertEqual(worker2.get('key'), 'new')
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), '需要 Unix 套接字')
+class TestSocketInvalidation(unittest.TestCase):
+    """测试通过本机套接字广播失效消息"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # 清理按注册的相反顺序执行，目录在关闭工作进程之后删除
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.l2 = CountingCache()
+        self.worker1 = self._worker()
+        self.worker2 = self._worker()
+
+    def _worker(self):
+        cache = TieredCache(self.l2, l1_expiration_time=60, invalidator=SocketInvalidator(self.directory))
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_invalidation(self):
+        """测试更新后其他工作进程的 L1 失效"""
+        self.worker1.put('key', 'old')
+        self.assertEqual(self.worker2.get('key'), 'old')
+
+        self.worker1.put('key', 'new')
+        self.assertTrue(wait_for(lambda: self.worker2.get_stats()['invalidations'] == 2))
+        self.assertEqual(self.worker2.get('key'), 'new')
+
+        self.worker1.delete('key')
+        self.assertTrue(wait_for(lambda: self.worker2.get_stats()['invalidations'] == 3))
+        self.assertIsNone(self.worker2.get('key'))
+
+        # 自己发出的消息不处理，写入后 L1 仍然命中
+        self.assertEqual(self.worker1.get_stats()['invalidations'], 0)
+
+    def test_clear(self):
+        """测试清空时所有工作进程的 L1 被清空"""
+        self.worker1.put('a', 1)
+        self.worker1.put('b', 2)
+        self.worker2.get('a')
+        self.worker2.get('b')
+        self.assertTrue(wait_for(lambda: self.worker2.get_stats()['invalidations'] == 2))
+
+        self.worker1.clear()
+        self.assertTrue(wait_for(lambda: self.worker2.get_stats()['l1']['size'] == 0))
+
+    def test_close_removes_socket(self):
+        """测试关闭后删除套接字文件，发布时跳过已退出的订阅者"""
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.worker2.close()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        self.worker1.put('key', 'value')
+
+
+def _fork_reader(cache, ready, results):
+    # 父进程的 L1 中已有旧值
+    ready.put(cache.get('key'))
+    wait_for(lambda: cache.get('key') == 'new', timeout=5)
+    results.put((cache.get('key'), cache.get_stats()['invalidations']))
+
+
+def _fork_writer(cache, ready):
+    ready.get(timeout=5)
+    cache.put('key', 'new')
+
+
+@unittest.skipUnless(
+    hasattr(socket, 'AF_UNIX') and 'fork' in multiprocessing.get_all_start_methods(),
+    '需要 Unix 套接字和 fork'
+)
+class TestForkedWorkers(unittest.TestCase):
+    """测试 fork 出的工作进程之间的失效通知"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_forked_invalidation(self):
+        """测试先创建缓存再 fork 时，子进程之间可以互相通知"""
+        l2 = DatabaseCache(db_path=os.path.join(self.directory, 'cache.db'), write_behind=False)
+        self.addCleanup(l2.close)
+        cache = TieredCache(
+            l2, l1_expiration_time=60,
+            invalidator=SocketInvalidator(os.path.join(self.directory, 'sockets'))
+        )
+        self.addCleanup(cache.close)
+        cache.put('key', 'old')
+
+        context = multiprocessing.get_context('fork')
+        ready = context.Queue()
+        results = context.Queue()
+        reader = context.Process(target=_fork_reader, args=(cache, ready, results))
+        writer = context.Process(target=_fork_writer, args=(cache, ready))
+        reader.start()
+        writer.start()
+        writer.join(10)
+        value, invalidations = results.get(timeout=10)
+        reader.join(10)
+
+        self.assertEqual(writer.exitcode, 0)
+        self.assertEqual(value, 'new')
+        self.assertGreater(invalidations, 0)
+        # 父进程仍然接收失效消息
+        self.assertTrue(wait_for(lambda: cache.get('key') == 'new'))
+
+
+class TestRedisInvalidator(unittest.TestCase):
+    """测试 Redis 发布/订阅失效通道"""
+
+    def test_publish_and_receive(self):
+        """测试发布消息并处理收到的消息"""
+        client = Mock()
+        l2 = MemoryCache(max_size=100)
+        worker1 = TieredCache(l2, invalidator=RedisInvalidator(client, 'test:invalidate'))
+        worker2 = TieredCache(l2, invalidator=RedisInvalidator(Mock(), 'test:invalidate'))
+
+        worker2.put('key', 'old')
+        worker1.put('key', 'new')
+        channel, payload = client.publish.call_args[0]
+        self.assertEqual(channel, 'test:invalidate')
+
+        # decode_responses=True 时收到的是 str
+        handler = worker2.invalidator._pubsub.subscribe.call_args[1]['test:invalidate']
+        handler({'data': payload.decode('utf-8')})
+        self.assertEqual(worker2.get('key'), 'new')
+        self.assertEqual(worker2.get_stats()['invalidations'], 1)
+
+        thread = worker2.invalidator._thread
+        worker2.close()
+        thread.stop.assert_called_once()
+
+
+class TestTieredCacheFactory(unittest.TestCase):
+    """测试通过工厂创建两级缓存"""
+
+    def test_create_with_socket_invalidation(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = CacheFactory.create_cache(
+            CacheBackend.TIERED,
+            l2_backend=CacheBackend.MEMORY,
+            l1_max_size=50,
+            invalidation_socket_dir=directory,
+        )
+        self.addCleanup(cache.close)
+
+        self.assertIsInstance(cache, TieredCache)
+        self.assertIsInstance(cache.l2, MemoryCache)
+        self.assertIsInstance(cache.invalidator, SocketInvalidator)
+        self.assertEqual(cache.l1.get_stats()['max_size'], 50)
+
+    def test_create_with_redis(self):
+        cache = CacheFactory.create_cache(
+            CacheBackend.TIERED,
+            redis_client=Mock(),
+            key_prefix='app:',
+        )
+
+        self.assertIsInstance(cache.l2, RedisCache)
+        self.assertIsInstance(cache.invalidator, RedisInvalidator)
+        self.assertEqual(cache.invalidator.channel, 'app:invalidate')
+
+    def test_nested_tiered(self):
+        with self.assertRaises(ValueError):
+            CacheFactory.create_cache(CacheBackend.TIERED, l2_backend=CacheBackend.TIERED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -180,5 +180,83 @@ class TestTreeCache(unittest.TestCase):
         self.assertEqual(result, 'no_expire_value')
 
 
+    def test_delete_prefix_is_segment_exact(self):
+        """测试前缀删除按路径段匹配，不受 SQL 通配符和大小写影响"""
+        cache = TreeCache(clean_period=60, expiration_time=3600)
+        
+        cache.put('/api/v1', 'v1')
+        cache.put('/api/v1/users', 'v1_users')
+        cache.put('/api/v10/users', 'v10_users')
+        cache.put('/API/v1/users', 'upper')
+        cache.put('/a_c/x', 'underscore')
+        cache.put('/abc/x', 'abc')
+        
+        cache.delete('/api/v1')
+        cache.delete('/a_c')
+        
+        self.assertIsNone(cache.get('/api/v1'))
+        self.assertIsNone(cache.get('/api/v1/users'))
+        self.assertIsNone(cache.get('/a_c/x'))
+        self.assertEqual(cache.get('/api/v10/users'), 'v10_users')
+        self.assertEqual(cache.get('/API/v1/users'), 'upper')
+        self.assertEqual(cache.get('/abc/x'), 'abc')
+        self.assertEqual(len(cache), 3)
+
+    def test_delete_prunes_tree(self):
+        """测试删除和过期后不留下空节点"""
+        cache = TreeCache(clean_period=0, expiration_time=3600)
+        
+        cache.put('/a/b/c', 1)
+        cache.put('/a/b/d', 2)
+        cache.delete('/a/b/c')
+        self.assertEqual(cache.get('/a/b/d'), 2)
+        cache.delete('/a/b/d')
+        self.assertEqual(cache._root.children, {})
+        
+        cache.expiration_time = -1
+        cache.put('/x/y', 1)
+        cache.auto_clean()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache._root.children, {})
+
+    def test_expiry_heap_bounded(self):
+        """测试反复更新同一批键时过期堆不会无限增长"""
+        cache = TreeCache(clean_period=60, expiration_time=3600)
+        
+        for i in range(10000):
+            cache.put(f'/key{i % 10}', i)
+        
+        self.assertEqual(len(cache), 10)
+        self.assertLess(len(cache._expiry), 200)
+        self.assertEqual(cache.get('/key9'), 9999)
+
+    def test_updated_key_not_expired_by_old_entry(self):
+        """测试更新后的键不会因为旧的过期记录被清理"""
+        cache = TreeCache(clean_period=0, expiration_time=3600)
+        
+        cache.expiration_time = -1
+        cache.put('/key', 'old')
+        cache.expiration_time = 3600
+        cache.put('/key', 'new')
+        cache.auto_clean()
+        
+        self.assertEqual(cache.get('/key'), 'new')
+        self.assertEqual(len(cache._expiry), 1)
+
+    def test_clear_and_non_string_keys(self):
+        """测试清空缓存以及非字符串键"""
+        cache = TreeCache(clean_period=60, expiration_time=3600)
+        
+        cache.put(('tuple', 1), 'tuple')
+        cache.put(42, 'int')
+        self.assertEqual(cache.get(('tuple', 1)), 'tuple')
+        cache.delete(42)
+        self.assertIsNone(cache.get(42))
+        
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get(('tuple', 1)))
+
+
 if __name__ == '__main__':
     unittest.main()